@@ -355,7 +355,7 @@ wait_for_apt_lock
 # Install Python and Flask
 echo "Installing Python dependencies..."
 apt-get update -qq
-apt-get install -y python3-flask python3-pip python3-yaml wget curl rtl-sdr vnstat nginx avahi-daemon avahi-utils libnss-mdns hostapd dnsmasq iptables wireless-tools rfkill
+apt-get install -y python3-flask python3-brotli python3-pip python3-yaml wget curl rtl-sdr vnstat nginx avahi-daemon avahi-utils libnss-mdns hostapd dnsmasq iptables wireless-tools rfkill
 
 # Phase B: Install SoapySDR for universal SDR support
 echo "Installing SoapySDR tools (Phase B universal SDR detection)..."
@@ -588,7 +588,7 @@ fi
 
 # Create directories
 echo "Creating directories..."
-mkdir -p /opt/adsb/{config,scripts,ultrafeeder,web/{templates,static/{css,js}}}
+mkdir -p /opt/adsb/{config,scripts,ultrafeeder,web/{blueprints,templates,static/{css,js}}}
 
 # Download files (REPO set at top from INSTALL_BRANCH)
 echo "Downloading configuration files from branch: ${INSTALL_BRANCH}"
@@ -665,6 +665,19 @@ chmod +x /opt/adsb/scripts/get-gps-coordinates.py
 echo "  - gps_provider.py..."
 wget -q $REPO/scripts/gps_provider.py -O /opt/adsb/scripts/gps_provider.py
 
+echo "  - netbird_provider.py..."
+wget -q $REPO/scripts/netbird_provider.py -O /opt/adsb/scripts/netbird_provider.py
+
+echo "  - command_runner.py..."
+wget -q $REPO/scripts/command_runner.py -O /opt/adsb/scripts/command_runner.py
+
+echo "  - ttl_cache.py..."
+wget -q $REPO/scripts/ttl_cache.py -O /opt/adsb/scripts/ttl_cache.py
+
+echo "  - web_startup_benchmark.py..."
+wget -q $REPO/scripts/web_startup_benchmark.py -O /opt/adsb/scripts/web_startup_benchmark.py
+chmod +x /opt/adsb/scripts/web_startup_benchmark.py
+
 echo "  - mobile-mode-gps.py..."
 wget -q $REPO/scripts/mobile-mode-gps.py -O /opt/adsb/scripts/mobile-mode-gps.py
 chmod +x /opt/adsb/scripts/mobile-mode-gps.py
@@ -719,6 +732,10 @@ wget -q $REPO/VERSION -O /opt/adsb/VERSION 2>/dev/null || echo "2.50.0" > /opt/a
 # Web UI files
 echo "Installing Web UI..."
 wget -q $REPO/web/app.py -O /opt/adsb/web/app.py
+wget -q $REPO/web/core.py -O /opt/adsb/web/core.py
+for blueprint in __init__ assets feeds gps sdr system vpn wifi; do
+    wget -q $REPO/web/blueprints/$blueprint.py -O /opt/adsb/web/blueprints/$blueprint.py
+done
 wget -q $REPO/web/templates/setup.html -O /opt/adsb/web/templates/setup.html
 wget -q $REPO/web/templates/setup-sdr.html -O /opt/adsb/web/templates/setup-sdr.html
 wget -q $REPO/web/templates/dashboard.html -O /opt/adsb/web/templates/dashboard.html
@@ -732,6 +749,9 @@ wget -q $REPO/web/templates/taknet-ps-status.html -O /opt/adsb/web/templates/tak
 wget -q $REPO/web/static/css/style.css -O /opt/adsb/web/static/css/style.css
 wget -q $REPO/web/static/js/setup.js -O /opt/adsb/web/static/js/setup.js
 wget -q $REPO/web/static/js/dashboard.js -O /opt/adsb/web/static/js/dashboard.js
+wget -q $REPO/web/static/js/dashboard-gps.js -O /opt/adsb/web/static/js/dashboard-gps.js
+wget -q $REPO/web/static/js/settings.js -O /opt/adsb/web/static/js/settings.js
+wget -q $REPO/web/static/js/settings-system.js -O /opt/adsb/web/static/js/settings-system.js
 wget -q $REPO/web/static/taknetlogo.png -O /opt/adsb/web/static/taknetlogo.png 2>/dev/null || echo "  (taknet logo not found, skipping)"
 chmod +x /opt/adsb/web/app.py
 
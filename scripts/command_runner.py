@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Instrumented command runner for TAKNET-PS ADS-B Feeder.
+
+Drop-in replacements for ``subprocess.run``, ``subprocess.check_output`` and
+``subprocess.Popen`` that every caller in the web app goes through:
+
+  - records wall time, exit code, timeout hits and the calling file:line
+  - keeps a rolling window of recent calls plus per-command totals, so the
+    slowest and most frequent commands can be listed (:func:`report`)
+  - enforces per-command concurrency limits, so e.g. two requests never
+    run ``SoapySDRUtil --find`` or ``nmcli ... --rescan`` at the same time
+
+Arguments, return values and exceptions are exactly those of the
+``subprocess`` functions; callers only gain an optional ``limit=`` keyword
+naming a concurrency group (:func:`hold` takes a slot around other work).
+Observers (the web app's /metrics) are told about every finished call via
+:func:`add_observer`.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from typing import Any, Callable, Iterator
+
+RECENT_CALLS = 1000      # rolling window for slowest/most-frequent
+RECENT_TIMEOUTS = 20
+MAX_SITES_PER_COMMAND = 10
+ARGV_PREVIEW = 160       # characters of the command line kept per call
+
+# Concurrency groups: (name, pattern matched against the joined argv, max
+# concurrent). Callers can also pass limit="<name>" explicitly.
+DEFAULT_LIMITS: list[tuple[str, str, int]] = [
+    ("sdr-enumerate", r"\bSoapySDRUtil\b.*--(find|probe)|detect-all-sdrs\.sh|\brtl_test\b", 1),
+    ("wifi-scan", r"\bnmcli\b.*--rescan|\biwlist\b.*\bscan\b", 1),
+    ("apt", r"\b(apt|apt-get|dpkg)\b", 1),
+    ("compose-up", r"\bdocker compose\b.*\bup\b(?!.*--help)", 1),
+    ("netbird-session", r"\bnetbird\b.*\b(up|down|login|logout)\b", 1),
+]
+
+_WRAPPERS = ("nice", "ionice", "timeout", "sudo", "stdbuf")
+_SUBCOMMAND_TOOLS = ("docker", "systemctl", "netbird", "tailscale", "nmcli", "ip", "iw")
+_NESTED_SUBCOMMANDS = ("compose", "image", "container", "network")
+_VALUE_FLAGS = frozenset((
+    "-f", "--file", "--fields", "--format", "--filter", "-o", "--output",
+    "--env-file", "--profile", "--project-directory", "-p", "-H", "--host",
+))
+
+_lock = threading.Lock()
+_recent: deque[dict[str, Any]] = deque(maxlen=RECENT_CALLS)
+_timeouts: deque[dict[str, Any]] = deque(maxlen=RECENT_TIMEOUTS)
+_totals: dict[str, dict[str, Any]] = {}
+_in_flight: dict[int, dict[str, Any]] = {}
+_observers: list[Callable[[dict[str, Any]], None]] = []
+_limits: dict[str, dict[str, Any]] = {}
+_limit_patterns: list[tuple[str, re.Pattern[str]]] = []
+_next_id = 0
+
+
+# ---------------------------------------------------------------------------
+# Labels and call sites
+# ---------------------------------------------------------------------------
+
+
+def _argv(args: Any) -> list[str]:
+    if isinstance(args, (str, bytes, os.PathLike)):
+        return os.fsdecode(args).split()
+    return [os.fsdecode(a) if isinstance(a, (bytes, os.PathLike)) else str(a) for a in args or []]
+
+
+def _words(parts: list[str]) -> list[str]:
+    """Positional words of an argv tail, skipping flags and their values."""
+    words = []
+    skip = False
+    for part in parts:
+        if skip:
+            skip = False
+        elif part.startswith("-"):
+            skip = part in _VALUE_FLAGS
+        else:
+            words.append(part)
+    return words
+
+
+def command_label(args: Any) -> str:
+    """Bounded label: 'docker compose up', 'python3 config_builder.py', 'ping'."""
+    parts = _argv(args)
+    while parts and os.path.basename(parts[0]) in _WRAPPERS:
+        parts = parts[1:]
+        while parts and (parts[0].startswith("-") or parts[0].isdigit()):
+            parts = parts[1:]
+    if not parts:
+        return "unknown"
+    tool = os.path.basename(parts[0])
+    if tool.startswith("python") and len(parts) > 1:
+        if parts[1] == "-c":
+            return f"{tool} -c"
+        if parts[1] == "-m" and len(parts) > 2:
+            return f"{tool} -m {parts[2]}"
+    words = _words(parts[1:])
+    if tool.startswith("python") and words:
+        return f"{tool} {os.path.basename(words[0])}"
+    if tool in _SUBCOMMAND_TOOLS and words:
+        if words[0] in _NESTED_SUBCOMMANDS and len(words) > 1:
+            return f"{tool} {words[0]} {words[1]}"
+        return f"{tool} {words[0]}"
+    return tool
+
+
+def _call_site() -> str:
+    """'file.py:123 function' of the first frame outside this module."""
+    frame = sys._getframe(2)
+    while frame and frame.f_globals.get("__name__") == __name__:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    return f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+# ---------------------------------------------------------------------------
+# Concurrency limits
+# ---------------------------------------------------------------------------
+
+
+def set_limit(name: str, max_concurrent: int, pattern: str | None = None) -> None:
+    """Create or resize a concurrency group, optionally matched by *pattern*."""
+    with _lock:
+        group = _limits.get(name)
+        if group is None:
+            _limits[name] = {
+                "limit": max_concurrent, "active": 0, "waiting": 0,
+                "cond": threading.Condition(_lock),
+            }
+        else:
+            group["limit"] = max_concurrent
+            group["cond"].notify_all()
+        if pattern:
+            _limit_patterns[:] = [(n, p) for n, p in _limit_patterns if n != name]
+            _limit_patterns.append((name, re.compile(pattern)))
+
+
+for _name, _pattern, _max in DEFAULT_LIMITS:
+    set_limit(_name, _max, _pattern)
+
+
+def _limit_for(argv: list[str], explicit: str | None) -> str | None:
+    if explicit:
+        if explicit not in _limits:
+            set_limit(explicit, 1)
+        return explicit
+    joined = " ".join(argv)
+    for name, pattern in _limit_patterns:
+        if pattern.search(joined):
+            return name
+    return None
+
+
+def _acquire(name: str, timeout: float | None) -> bool:
+    """Wait for a slot in group *name*; False if *timeout* elapsed first."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _lock:
+        group = _limits[name]
+        group["waiting"] += 1
+        try:
+            while group["active"] >= group["limit"]:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                group["cond"].wait(remaining)
+            group["active"] += 1
+            return True
+        finally:
+            group["waiting"] -= 1
+
+
+def _release(name: str) -> None:
+    with _lock:
+        group = _limits[name]
+        group["active"] -= 1
+        group["cond"].notify()
+
+
+@contextlib.contextmanager
+def hold(name: str, timeout: float | None = None) -> Iterator[None]:
+    """Hold a slot in group *name* for work :func:`run` does not cover.
+
+    Popen callers (which are not limited) use this to exclude ``run`` calls
+    in the same group, e.g. a streamed ``docker compose up``. Raises
+    ``TimeoutError`` if no slot frees up within *timeout* seconds.
+    """
+    if name not in _limits:
+        set_limit(name, 1)
+    if not _acquire(name, timeout):
+        raise TimeoutError(f"concurrency group {name!r} busy")
+    try:
+        yield
+    finally:
+        _release(name)
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+
+def _start(args: Any, site: str, limit: str | None, wait_seconds: float = 0.0) -> dict[str, Any]:
+    global _next_id
+    argv = _argv(args)
+    record = {
+        "id": 0,
+        "label": command_label(args),
+        "argv": " ".join(argv)[:ARGV_PREVIEW],
+        "site": site,
+        "limit": limit,
+        "started_at": time.time(),
+        "started": time.monotonic(),
+        "wait_seconds": round(wait_seconds, 3),
+        "seconds": None,
+        "returncode": None,
+        "timed_out": False,
+        "error": None,
+    }
+    with _lock:
+        _next_id += 1
+        record["id"] = _next_id
+        _in_flight[_next_id] = record
+    return record
+
+
+def _finish(record: dict[str, Any]) -> None:
+    with _lock:
+        if _in_flight.pop(record["id"], None) is None:
+            return  # already finished (wait() after poll())
+        record["seconds"] = round(time.monotonic() - record.pop("started"), 3)
+        record.pop("proc", None)
+        _recent.append(record)
+        if record["timed_out"]:
+            _timeouts.append(record)
+        totals = _totals.get(record["label"])
+        if totals is None:
+            totals = _totals[record["label"]] = {
+                "count": 0, "errors": 0, "timeouts": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0, "sites": {},
+            }
+        totals["count"] += 1
+        totals["total_seconds"] += record["seconds"]
+        totals["max_seconds"] = max(totals["max_seconds"], record["seconds"])
+        if record["timed_out"]:
+            totals["timeouts"] += 1
+        elif record["error"] or record["returncode"]:
+            totals["errors"] += 1
+        sites = totals["sites"]
+        if record["site"] in sites or len(sites) < MAX_SITES_PER_COMMAND:
+            sites[record["site"]] = sites.get(record["site"], 0) + 1
+        observers = list(_observers)
+    for callback in observers:
+        try:
+            callback(dict(record))
+        except Exception as e:
+            print(f"⚠ command_runner: observer error: {e}")
+
+
+def add_observer(callback: Callable[[dict[str, Any]], None]) -> None:
+    """Call ``callback(record)`` after every command finishes.
+
+    *record* has ``label, argv, site, limit, started_at, wait_seconds,
+    seconds, returncode, timed_out, error``.
+    """
+    with _lock:
+        _observers.append(callback)
+
+
+# ---------------------------------------------------------------------------
+# subprocess replacements
+# ---------------------------------------------------------------------------
+
+
+def run(*popenargs: Any, limit: str | None = None, **kwargs: Any) -> subprocess.CompletedProcess:
+    """``subprocess.run`` with recording and concurrency limits.
+
+    Time spent waiting for a concurrency slot counts against *timeout*; if
+    no slot frees up in time ``subprocess.TimeoutExpired`` is raised.
+    """
+    args = popenargs[0] if popenargs else kwargs.get("args")
+    site = _call_site()
+    group = _limit_for(_argv(args), limit)
+    timeout = kwargs.get("timeout")
+    waited = 0.0
+    if group:
+        wait_started = time.monotonic()
+        if not _acquire(group, timeout):
+            record = _start(args, site, group, time.monotonic() - wait_started)
+            record["timed_out"] = True
+            _finish(record)
+            raise subprocess.TimeoutExpired(args, timeout)
+        waited = time.monotonic() - wait_started
+        if timeout is not None:
+            kwargs["timeout"] = max(0.1, timeout - waited)
+
+    record = _start(args, site, group, waited)
+    try:
+        result = subprocess.run(*popenargs, **kwargs)
+        record["returncode"] = result.returncode
+        return result
+    except subprocess.TimeoutExpired:
+        record["timed_out"] = True
+        raise
+    except subprocess.CalledProcessError as e:
+        record["returncode"] = e.returncode
+        raise
+    except OSError as e:
+        record["error"] = str(e)
+        raise
+    finally:
+        if group:
+            _release(group)
+        _finish(record)
+
+
+def check_output(*popenargs: Any, **kwargs: Any) -> Any:
+    """``subprocess.check_output`` through :func:`run`."""
+    return run(*popenargs, stdout=subprocess.PIPE, check=True, **kwargs).stdout
+
+
+class Popen(subprocess.Popen):
+    """``subprocess.Popen`` recorded from spawn until wait()/poll() sees it exit.
+
+    Concurrency limits are not applied: a Popen caller streams output for
+    as long as it likes (wrap it in :func:`hold` to take part in a group).
+    """
+
+    def __init__(self, args: Any, *pargs: Any, **kwargs: Any) -> None:
+        self._record = _start(args, _call_site(), None)
+        try:
+            super().__init__(args, *pargs, **kwargs)
+        except OSError as e:
+            self._record["error"] = str(e)
+            _finish(self._record)
+            raise
+        self._record["proc"] = weakref.ref(self)
+
+    def _recorded_exit(self, returncode: int | None) -> None:
+        if returncode is not None and "proc" in self._record:
+            self._record["returncode"] = returncode
+            _finish(self._record)
+
+    def wait(self, timeout: float | None = None) -> int:
+        returncode = super().wait(timeout)
+        self._recorded_exit(returncode)
+        return returncode
+
+    def poll(self) -> int | None:
+        returncode = super().poll()
+        self._recorded_exit(returncode)
+        return returncode
+
+
+popen = Popen
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+
+def _public(record: dict[str, Any]) -> dict[str, Any]:
+    return {k: v for k, v in record.items() if k not in ("started", "proc")}
+
+
+def report(top: int = 10) -> dict[str, Any]:
+    """Slowest and most frequent commands, recent timeouts and what is running now."""
+    # Reap fire-and-forget Popens whose owner never waits on them
+    with _lock:
+        orphans = [r.get("proc") for r in _in_flight.values() if r.get("proc")]
+    for ref in orphans:
+        proc = ref()
+        if proc is not None:
+            proc.poll()
+
+    now = time.monotonic()
+    with _lock:
+        recent = list(_recent)
+        timeouts = [_public(r) for r in _timeouts]
+        in_flight = [
+            {**_public(r), "running_seconds": round(now - r["started"], 1)}
+            for r in _in_flight.values()
+        ]
+        totals = {
+            label: {**t, "sites": dict(sorted(t["sites"].items(), key=lambda kv: -kv[1]))}
+            for label, t in _totals.items()
+        }
+        limits = {
+            name: {"limit": g["limit"], "active": g["active"], "waiting": g["waiting"]}
+            for name, g in _limits.items()
+        }
+
+    frequency: dict[str, dict[str, Any]] = {}
+    for r in recent:
+        entry = frequency.setdefault(r["label"], {"label": r["label"], "count": 0, "total_seconds": 0.0,
+                                                  "max_seconds": 0.0, "timeouts": 0})
+        entry["count"] += 1
+        entry["total_seconds"] += r["seconds"]
+        entry["max_seconds"] = max(entry["max_seconds"], r["seconds"])
+        entry["timeouts"] += int(r["timed_out"])
+    for entry in frequency.values():
+        entry["total_seconds"] = round(entry["total_seconds"], 3)
+        entry["avg_seconds"] = round(entry["total_seconds"] / entry["count"], 3)
+
+    for t in totals.values():
+        t["total_seconds"] = round(t["total_seconds"], 3)
+        t["avg_seconds"] = round(t["total_seconds"] / t["count"], 3) if t["count"] else None
+
+    return {
+        "window": len(recent),
+        "window_started_at": recent[0]["started_at"] if recent else None,
+        "slowest": [_public(r) for r in sorted(recent, key=lambda r: -r["seconds"])[:top]],
+        "most_frequent": sorted(frequency.values(), key=lambda e: -e["count"])[:top],
+        "most_time": sorted(frequency.values(), key=lambda e: -e["total_seconds"])[:top],
+        "timeouts": timeouts[::-1],
+        "in_flight": sorted(in_flight, key=lambda r: -r["running_seconds"]),
+        "limits": limits,
+        "totals": dict(sorted(totals.items(), key=lambda kv: -kv[1]["count"])),
+    }
@@ -4,13 +4,23 @@ TAKNET-PS-ADSB-Feeder Config Builder v3.0.21
 Tactical Awareness Kit Network for Enhanced Tracking – Public Safety
 Builds ULTRAFEEDER_CONFIG with TAKNET-PS Server as hardcoded priority
 Supports primary/fallback connection modes with automatic configuration repair
+
+Run as a script (systemd ExecStartPre, updater, installer) or import and call
+build(env) - the web app does, passing the NetBird state from its own cache.
 """
 
 import re
 import sys
 import socket
+import threading
 from pathlib import Path
 
+ENV_FILE = Path("/opt/adsb/config/.env")
+COMPOSE_FILE = Path("/opt/adsb/config/docker-compose.yml")
+
+# One build at a time per process (the web app builds from several threads)
+_build_lock = threading.Lock()
+
 # Internal Beast listener when TAKNET claim proxy is used (ultrafeeder → this → aggregator)
 BEAST_CLAIM_PROXY_PORT = 39904
 BEAST_CLAIM_PROXY_HOST = "taknet-beast-claim"
@@ -40,10 +50,11 @@ def normalize_feeder_mac(raw):
     return ":".join(s[i:i + 2] for i in range(0, 12, 2)).lower()
 
 
-def taknet_beast_uses_claim_proxy(env_vars):
+def taknet_beast_uses_claim_proxy(env_vars, netbird=None):
     """
     True when the TAKNET-PS Beast feed should use the local identity proxy
     (valid claim key, valid feeder MAC, OR FEEDER_UUID + TAKNET enabled + resolvable upstream host).
+    netbird: see select_taknet_host.
     """
     if env_vars.get("TAKNET_PS_ENABLED", "true").lower() != "true":
         return False
@@ -54,7 +65,7 @@ def taknet_beast_uses_claim_proxy(env_vars):
     if claim_uuid is None and feeder_mac is None and not feeder_uuid:
         return False
         
-    host, _ctype = select_taknet_host(env_vars)
+    host, _ctype = select_taknet_host(env_vars, netbird)
     return bool(host)
 
 # Phase B: Valid gain values per driver type
@@ -129,23 +140,28 @@ def read_env(env_file):
                 env_vars[key] = value
     return env_vars
 
-def write_env(env_file, env_vars):
-    """Write dict to .env file, quoting values for safety"""
+def render_env(env_vars):
+    """.env file contents for env_vars, quoting values for safety"""
     lines = []
     # For simplicity and consistency with app.py, we write a clean quoted file
     for key, value in env_vars.items():
         val_str = str(value)
         val_escaped = val_str.replace('"', '\\"')
         lines.append(f'{key}="{val_escaped}"\n')
+    return ''.join(lines)
+
+def write_env(env_file, env_vars):
+    """Write dict to .env file, quoting values for safety"""
     with open(env_file, 'w') as f:
-        f.writelines(lines)
+        f.write(render_env(env_vars))
 
-def ensure_taknet_config(env_vars, env_file):
+def ensure_taknet_config(env_vars, env_file=None):
     """
     Ensure TAKNET-PS configuration exists
     Builds missing values automatically to prevent user skip
     Uses FQDNs for automatic Tailscale detection
     Migrates old IP addresses to FQDNs
+    Repairs are saved to env_file when given (build() saves them itself)
     Returns: (env_vars, was_repaired)
     """
     required_config = {
@@ -220,7 +236,7 @@ def ensure_taknet_config(env_vars, env_file):
                 was_repaired = True
     
     # Write back if repaired
-    if was_repaired:
+    if was_repaired and env_file:
         write_env(env_file, env_vars)
         print("✓ TAKNET-PS configuration auto-repaired and saved")
     
@@ -240,75 +256,13 @@ def check_host_reachable(host, port, timeout=2):
 def check_netbird_running():
     """
     Check if NetBird is running and connected.
+    Served from netbird_provider's TTL cache, so repeated calls within one
+    build (select_taknet_host is hit more than once) probe only once.
     Returns: (is_running, netbird_ip)
     """
-    import subprocess
     try:
-        result = subprocess.run(['which', 'netbird'],
-                              capture_output=True, timeout=2)
-        if result.returncode != 0:
-            print("⚠ NetBird: Not installed")
-            return (False, None)
-
-        connected = False
-        nb_ip = None
-
-        # Try JSON first
-        result = subprocess.run(['netbird', 'status', '--json'],
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0 and result.stdout.strip():
-            try:
-                import json
-                status = json.loads(result.stdout)
-                mgmt = status.get('managementState', status.get('management', {}))
-                if isinstance(mgmt, dict):
-                    connected = mgmt.get('connected', False)
-                elif isinstance(mgmt, str):
-                    connected = mgmt.lower() == 'connected'
-                nb_ip = (status.get('netbirdIp') or
-                         status.get('localPeerState', {}).get('ip') or
-                         status.get('ip'))
-                if nb_ip and '/' in nb_ip:
-                    nb_ip = nb_ip.split('/')[0]
-            except Exception:
-                pass
-
-        # Plain-text fallback
-        if not connected:
-            plain = subprocess.run(['netbird', 'status'],
-                                 capture_output=True, text=True, timeout=5)
-            if plain.returncode == 0:
-                output = plain.stdout
-                connected = 'Management: Connected' in output
-                if connected and not nb_ip:
-                    for line in output.splitlines():
-                        if 'NetBird IP:' in line:
-                            nb_ip = line.split('NetBird IP:')[-1].strip().split('/')[0]
-                            break
-
-        # Interface fallback
-        if not connected:
-            iface = subprocess.run(['ip', 'addr', 'show', 'wt0'],
-                                 capture_output=True, text=True, timeout=3)
-            if iface.returncode == 0 and 'inet ' in iface.stdout:
-                connected = True
-                if not nb_ip:
-                    for line in iface.stdout.splitlines():
-                        line = line.strip()
-                        if line.startswith('inet '):
-                            nb_ip = line.split()[1].split('/')[0]
-                            break
-
-        if connected:
-            print(f"✓ NetBird: Connected ({nb_ip or 'IP unknown'})")
-            return (True, nb_ip)
-
-        print("⚠ NetBird: Not connected")
-        return (False, None)
-
-    except subprocess.TimeoutExpired:
-        print("⚠ NetBird: Check timed out")
-        return (False, None)
+        from netbird_provider import check_netbird_running as _check_netbird_running
+        return _check_netbird_running()
     except Exception as e:
         print(f"⚠ NetBird: Check failed: {e}")
         return (False, None)
@@ -351,33 +305,39 @@ def check_tailscale_running():
         return (False, None)
 
 
-def select_taknet_host(env_vars):
+def select_taknet_host(env_vars, netbird=None, quiet=False):
     """
     Select TAKNET-PS Server host based on VPN status.
     NetBird active → vpn.tak-solutions.com
     No VPN        → adsb.tak-solutions.com
+    netbird: NetBird state dict ('connected', 'ip') to use instead of probing
+    quiet: don't print the choice (for periodic callers)
     Returns: (selected_host, connection_type)
     """
+    say = (lambda msg: None) if quiet else print
     mode = env_vars.get('TAKNET_PS_CONNECTION_MODE', 'auto').lower()
     vpn_host = env_vars.get('TAKNET_PS_SERVER_HOST_VPN', 'vpn.tak-solutions.com').strip()
     fallback  = env_vars.get('TAKNET_PS_SERVER_HOST_FALLBACK', 'adsb.tak-solutions.com').strip()
 
     if mode == 'vpn' and vpn_host:
-        print(f"ℹ TAKNET-PS: Forced to VPN host: {vpn_host}")
+        say(f"ℹ TAKNET-PS: Forced to VPN host: {vpn_host}")
         return (vpn_host, 'vpn-forced')
 
     if mode == 'fallback' and fallback:
-        print(f"ℹ TAKNET-PS: Forced to fallback: {fallback}")
+        say(f"ℹ TAKNET-PS: Forced to fallback: {fallback}")
         return (fallback, 'fallback-forced')
 
     # Auto mode - NetBird check only
     if mode == 'auto':
-        netbird_running, _ = check_netbird_running()
+        if netbird is None:
+            netbird_running, _ = check_netbird_running()
+        else:
+            netbird_running = bool(netbird.get('connected'))
         if netbird_running:
-            print(f"✓ TAKNET-PS: NetBird active, using VPN host: {vpn_host}")
+            say(f"✓ TAKNET-PS: NetBird active, using VPN host: {vpn_host}")
             return (vpn_host, 'netbird-active')
 
-        print(f"⚠ TAKNET-PS: NetBird inactive, using fallback: {fallback}")
+        say(f"⚠ TAKNET-PS: NetBird inactive, using fallback: {fallback}")
         return (fallback, 'vpn-inactive')
 
     if vpn_host:
@@ -387,19 +347,19 @@ def select_taknet_host(env_vars):
 
     return (None, 'disabled')
 
-def build_config(env_vars):
+def build_config(env_vars, netbird=None):
     """Build ULTRAFEEDER_CONFIG string with TAKNET-PS as priority"""
     config_parts = []
     
     # TAKNET-PS Server - ALWAYS FIRST (Priority Feed)
     if env_vars.get('TAKNET_PS_ENABLED', 'true').lower() == 'true':
-        taknet_host, connection_type = select_taknet_host(env_vars)
+        taknet_host, connection_type = select_taknet_host(env_vars, netbird)
         port = env_vars.get('TAKNET_PS_SERVER_PORT', '30004').strip()
         mlat_port = env_vars.get('TAKNET_PS_MLAT_PORT', '30105').strip()
         
         if taknet_host:
             # Beast feed - raw Beast (full position data required for track rendering)
-            if taknet_beast_uses_claim_proxy(env_vars):
+            if taknet_beast_uses_claim_proxy(env_vars, netbird):
                 config_parts.append(
                     f"adsb,{BEAST_CLAIM_PROXY_HOST},{BEAST_CLAIM_PROXY_PORT},beast_out"
                 )
@@ -680,7 +640,7 @@ def get_feeder_software_version(env_vars):
     return 'unknown'
 
 
-def build_docker_compose(env_vars):
+def build_docker_compose(env_vars, netbird=None):
     """Build docker-compose.yml with conditional FR24 service"""
     # Get all env vars needed for ultrafeeder (write actual values, not ${VARIABLE})
     feeder_tz = env_vars.get('FEEDER_TZ', 'UTC')
@@ -770,12 +730,12 @@ def build_docker_compose(env_vars):
 
     services = {'ultrafeeder': ultrafeeder_service}
 
-    if taknet_beast_uses_claim_proxy(env_vars):
+    if taknet_beast_uses_claim_proxy(env_vars, netbird):
         claim_uuid = normalize_feeder_claim_uuid(
             env_vars.get('TAKNET_PS_FEEDER_CLAIM_KEY', '')
         )
         feeder_mac = normalize_feeder_mac(env_vars.get('TAKNET_PS_FEEDER_MAC', '')) or ''
-        taknet_upstream, _ = select_taknet_host(env_vars)
+        taknet_upstream, _ = select_taknet_host(env_vars, netbird)
         beast_port = env_vars.get('TAKNET_PS_SERVER_PORT', '30004').strip()
         services['taknet-beast-claim'] = {
             'image': 'python:3.12-alpine',
@@ -973,43 +933,80 @@ def build_docker_compose(env_vars):
     
     return compose
 
+def render_docker_compose(compose_dict):
+    """docker-compose.yml text for compose_dict"""
+    import yaml
+    return yaml.dump(compose_dict, default_flow_style=False, sort_keys=False)
+
 def write_docker_compose(compose_dict, compose_file):
     """Write docker-compose.yml from dict"""
-    import yaml
     with open(compose_file, 'w') as f:
-        yaml.dump(compose_dict, f, default_flow_style=False, sort_keys=False)
+        f.write(render_docker_compose(compose_dict))
+
+def _write_if_changed(path, text):
+    """Write text to path unless it already holds exactly that; True if written"""
+    try:
+        if Path(path).read_text() == text:
+            return False
+    except OSError:
+        pass
+    with open(path, 'w') as f:
+        f.write(text)
+    return True
+
+def build(env=None, netbird=None, env_file=ENV_FILE, compose_file=COMPOSE_FILE):
+    """
+    Rebuild ULTRAFEEDER_CONFIG in .env and docker-compose.yml.
+    env: full .env contents (read from env_file when None)
+    netbird: NetBird state dict ('connected', 'ip'); probed once when None
+    Files are only rewritten when their contents change.
+    Returns dict: ultrafeeder_config, feeds, taknet_host, connection_type,
+    repaired, env_changed, compose_changed
+    """
+    with _build_lock:
+        env_vars = dict(env) if env is not None else read_env(env_file)
+        if netbird is None:
+            connected, ip = check_netbird_running()
+            netbird = {'connected': connected, 'ip': ip}
+        
+        # Ensure TAKNET-PS config exists (auto-repair if missing)
+        env_vars, was_repaired = ensure_taknet_config(env_vars)
+        
+        # Build config
+        config_str = build_config(env_vars, netbird)
+        env_vars['ULTRAFEEDER_CONFIG'] = config_str
+        
+        env_changed = _write_if_changed(env_file, render_env(env_vars))
+        compose_changed = _write_if_changed(
+            compose_file, render_docker_compose(build_docker_compose(env_vars, netbird))
+        )
+        
+        taknet_host, connection_type = (None, 'disabled')
+        if env_vars.get('TAKNET_PS_ENABLED', 'true').lower() == 'true':
+            taknet_host, connection_type = select_taknet_host(env_vars, netbird)
+        return {
+            'ultrafeeder_config': config_str,
+            'feeds': len(config_str.split(';')) if config_str else 0,
+            'taknet_host': taknet_host,
+            'connection_type': connection_type,
+            'repaired': was_repaired,
+            'env_changed': env_changed,
+            'compose_changed': compose_changed,
+        }
 
 def main():
-    env_file = Path("/opt/adsb/config/.env")
+    env_file = ENV_FILE
     
     if not env_file.exists():
         print(f"✗ Error: {env_file} not found")
         sys.exit(1)
     
-    # Read environment
-    env_vars = read_env(env_file)
-    
-    # Ensure TAKNET-PS config exists (auto-repair if missing)
-    env_vars, was_repaired = ensure_taknet_config(env_vars, env_file)
-    
-    # Build config
-    config_str = build_config(env_vars)
-    
-    # Update ULTRAFEEDER_CONFIG
-    env_vars['ULTRAFEEDER_CONFIG'] = config_str
-    
-    # Write back to .env
-    write_env(env_file, env_vars)
-    
-    # Build and write docker-compose.yml
-    compose_dict = build_docker_compose(env_vars)
-    compose_file = Path("/opt/adsb/config/docker-compose.yml")
-    write_docker_compose(compose_dict, compose_file)
+    result = build(env_file=env_file)
     
     print(f"\n✓ Configuration built successfully")
-    if was_repaired:
+    if result['repaired']:
         print("✓ Missing TAKNET-PS settings were automatically configured")
-    print(f"Active feeds: {len(config_str.split(';')) if config_str else 0}")
+    print(f"Active feeds: {result['feeds']}")
 
 if __name__ == "__main__":
     main()
@@ -6,7 +6,7 @@ Reads GPS_SOURCE / GPS_NETWORK_HOST / GPS_NETWORK_PORT / GPS_NETWORK_PROTOCOL
 from .env and provides a uniform interface for all GPS consumers:
 
   - get-gps-coordinates.py   (one-shot coordinate grab)
-  - app.py                   (web API GPS endpoints)
+  - web/blueprints/gps.py    (web API GPS endpoints)
   - mobile-mode-gps.py       (mobile mode daemon)
 
 Supported sources
@@ -27,6 +27,8 @@ import time
 from pathlib import Path
 from typing import Any
 
+import command_runner
+
 # ---------------------------------------------------------------------------
 # .env helpers
 # ---------------------------------------------------------------------------
@@ -372,7 +374,7 @@ def get_gps_fix(
         return None
 
     try:
-        r = subprocess.run(
+        r = command_runner.run(
             cmd,
             capture_output=True,
             text=True,
@@ -453,7 +455,7 @@ def check_gps_status(env: dict[str, str]) -> dict[str, Any]:
         cmd = build_gpspipe_cmd(env, n_lines=15, timeout=3)
         if cmd:
             try:
-                r = subprocess.run(
+                r = command_runner.run(
                     cmd,
                     capture_output=True,
                     text=True,
@@ -482,7 +484,7 @@ def check_gps_status(env: dict[str, str]) -> dict[str, Any]:
     # Check if gpsd is running
     gpsd_running = False
     try:
-        r = subprocess.run(
+        r = command_runner.run(
             ["systemctl", "is-active", "gpsd"],
             capture_output=True,
             text=True,
@@ -491,7 +493,7 @@ def check_gps_status(env: dict[str, str]) -> dict[str, Any]:
         gpsd_running = r.returncode == 0 and (r.stdout or "").strip() == "active"
     except (FileNotFoundError, subprocess.TimeoutExpired):
         try:
-            r = subprocess.run(
+            r = command_runner.run(
                 ["pgrep", "-x", "gpsd"],
                 capture_output=True,
                 timeout=5,
@@ -512,7 +514,7 @@ def check_gps_status(env: dict[str, str]) -> dict[str, Any]:
     # Check for a connected USB device via gpspipe
     gps_present = False
     try:
-        r = subprocess.run(
+        r = command_runner.run(
             ["timeout", "3", "gpspipe", "-w", "-n", "15"],
             capture_output=True,
             text=True,
@@ -624,7 +626,7 @@ def test_network_connection(
         f"{host}:{port}",
     ]
     try:
-        r = subprocess.run(
+        r = command_runner.run(
             cmd,
             capture_output=True,
             text=True,
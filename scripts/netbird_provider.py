@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+NetBird state provider for TAKNET-PS ADS-B Feeder.
+
+One cached source of NetBird connection state for every consumer:
+
+  - config_builder.py   (select_taknet_host, once or twice per build)
+  - web app             (vpn_watchdog, NetBird / TAKNET-PS status APIs)
+
+State comes from a single ``netbird status --json`` call. When the CLI is
+missing, fails or reports management disconnected, the wt0 interface is
+read directly from ``/sys/class/net/wt0`` (no ``ip addr`` spawn). Results
+are cached for a short TTL (:mod:`ttl_cache`; a slightly older state is
+served while one thread re-probes); callers that change NetBird
+(up/down/login) call :func:`invalidate`. Subscribers are told when
+connected/IP changes.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import shutil
+import socket
+import struct
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import command_runner
+import ttl_cache
+
+NETBIRD_IFACE = "wt0"
+SYS_CLASS_NET = Path("/sys/class/net")
+DEFAULT_TTL = 10.0  # seconds
+STALE_TTL = 20.0  # seconds past DEFAULT_TTL an old state is served while re-probing
+
+IFF_UP = 0x1
+SIOCGIFADDR = 0x8915
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+
+_lock = threading.Lock()
+_cache = ttl_cache.TTLCache("netbird", ttl=DEFAULT_TTL, stale=STALE_TTL, max_entries=1)
+_state: dict[str, Any] | None = None  # last probe, for subscriber change detection
+_subscribers: list[Callable[[dict[str, Any] | None, dict[str, Any]], None]] = []
+_watcher_started = False
+
+
+# ---------------------------------------------------------------------------
+# Probes
+# ---------------------------------------------------------------------------
+
+
+def _probe_cli() -> dict[str, Any] | None:
+    """``netbird status --json`` → partial state, or None if unavailable."""
+    if not shutil.which("netbird"):
+        return None
+    try:
+        result = command_runner.run(
+            ["netbird", "status", "--json"],
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0 or not result.stdout.strip():
+        return None
+    try:
+        status = json.loads(result.stdout)
+    except ValueError:
+        return None
+
+    mgmt = status.get("managementState", status.get("management", {}))
+    if isinstance(mgmt, dict):
+        connected = bool(mgmt.get("connected", False))
+        management_url = mgmt.get("url")
+    else:
+        connected = str(mgmt).lower() == "connected"
+        management_url = None
+    ip = (status.get("netbirdIp")
+          or (status.get("localPeerState") or {}).get("ip")
+          or status.get("ip"))
+    if ip and "/" in ip:
+        ip = ip.split("/")[0]
+    peers = status.get("peers") or {}
+    return {
+        "connected": connected,
+        "ip": ip or None,
+        "management_url": management_url,
+        "fqdn": status.get("fqdn"),
+        "peers_connected": peers.get("connected") if isinstance(peers, dict) else None,
+        "peers_total": peers.get("total") if isinstance(peers, dict) else None,
+    }
+
+
+def _interface_ipv4(iface: str) -> str | None:
+    """IPv4 address of *iface* via SIOCGIFADDR, or None."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        packed = fcntl.ioctl(sock.fileno(), SIOCGIFADDR,
+                             struct.pack("256s", iface[:15].encode()))
+        return socket.inet_ntoa(packed[20:24])
+    except OSError:
+        return None
+    finally:
+        sock.close()
+
+
+def read_interface_state(iface: str = NETBIRD_IFACE) -> dict[str, Any]:
+    """Link state of *iface* from sysfs: ``{'present', 'up', 'ip'}``."""
+    base = SYS_CLASS_NET / iface
+    if not base.exists():
+        return {"present": False, "up": False, "ip": None}
+    try:
+        flags = int((base / "flags").read_text().strip(), 16)
+    except (OSError, ValueError):
+        flags = 0
+    up = bool(flags & IFF_UP)
+    return {"present": True, "up": up, "ip": _interface_ipv4(iface) if up else None}
+
+
+def _probe() -> dict[str, Any]:
+    """Full state from the CLI, falling back to the wt0 interface."""
+    installed = bool(shutil.which("netbird"))
+    cli = _probe_cli() if installed else None
+    iface = read_interface_state()
+
+    state: dict[str, Any] = {
+        "installed": installed,
+        "connected": False,
+        "ip": None,
+        "source": "none",
+        "interface_up": iface["up"],
+        "checked_at": time.time(),
+    }
+    if cli:
+        state.update(cli)
+        state["source"] = "cli"
+    if not state["connected"] and iface["up"] and iface["ip"]:
+        # Same rule as the old `ip addr show wt0` fallback: an addressed wt0
+        # means the tunnel is up even if management is unreachable.
+        state["connected"] = True
+        state["source"] = "interface"
+    if not state["ip"]:
+        state["ip"] = iface["ip"]
+    return state
+
+
+# ---------------------------------------------------------------------------
+# Cached state
+# ---------------------------------------------------------------------------
+
+
+def get_netbird_state(max_age: float = DEFAULT_TTL, force: bool = False) -> dict[str, Any]:
+    """Cached NetBird state, refreshed when older than *max_age* seconds.
+
+    Concurrent callers share one probe; up to STALE_TTL seconds past
+    *max_age* the previous state is returned while it is re-probed in the
+    background. Returns a copy; keys are
+    ``installed, connected, ip, source, interface_up, checked_at`` plus
+    CLI details (``management_url, fqdn, peers_connected, peers_total``)
+    when the JSON status was available.
+    """
+    return dict(_cache.get("state", lambda: _store(_probe()), ttl=max_age, force=force))
+
+
+def _store(new: dict[str, Any]) -> dict[str, Any]:
+    """Save *new* and notify subscribers if connected/IP changed."""
+    global _state
+    with _lock:
+        old = _state
+        _state = new
+        subscribers = list(_subscribers)
+    changed = old is None or (old["connected"], old["ip"]) != (new["connected"], new["ip"])
+    if changed:
+        for callback in subscribers:
+            try:
+                callback(dict(old) if old else None, dict(new))
+            except Exception as e:
+                print(f"⚠ NetBird: subscriber error: {e}")
+    return new
+
+
+def invalidate() -> None:
+    """Force the next :func:`get_netbird_state` call to probe again."""
+    _cache.invalidate()
+
+
+def subscribe(callback: Callable[[dict[str, Any] | None, dict[str, Any]], None]) -> None:
+    """Call ``callback(old, new)`` whenever connected or IP changes.
+
+    *old* is None on the first probe of the process.
+    """
+    with _lock:
+        _subscribers.append(callback)
+
+
+def check_netbird_running() -> tuple[bool, str | None]:
+    """Backwards-compatible ``(is_running, netbird_ip)`` from the cache."""
+    state = get_netbird_state()
+    if not state["installed"] and not state["connected"]:
+        print("⚠ NetBird: Not installed")
+        return (False, None)
+    if state["connected"]:
+        print(f"✓ NetBird: Connected ({state['ip'] or 'IP unknown'})")
+        return (True, state["ip"])
+    print("⚠ NetBird: Not connected")
+    return (False, None)
+
+
+# ---------------------------------------------------------------------------
+# Background refresh
+# ---------------------------------------------------------------------------
+
+
+def _open_link_monitor() -> socket.socket | None:
+    """rtnetlink socket for link/IPv4 address changes, or None."""
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+        sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR))
+        return sock
+    except (AttributeError, OSError):
+        return None
+
+
+def start_watcher(interval: float = 30.0) -> None:
+    """Refresh state every *interval* seconds and on any link/address change.
+
+    Interface events arrive over rtnetlink, so wt0 going up or down is noticed
+    within a second instead of at the next poll. Safe to call more than once.
+    """
+    global _watcher_started
+    with _lock:
+        if _watcher_started:
+            return
+        _watcher_started = True
+
+    def run() -> None:
+        monitor = _open_link_monitor()
+        last_iface = read_interface_state()
+        next_poll = time.time() + interval
+        while True:
+            try:
+                timeout = max(0.1, next_poll - time.time())
+                if monitor:
+                    monitor.settimeout(timeout)
+                    try:
+                        monitor.recv(65536)
+                        # Let bursts of events (link + addr) settle, then drain
+                        time.sleep(1)
+                        monitor.setblocking(False)
+                        try:
+                            while monitor.recv(65536):
+                                pass
+                        except OSError:
+                            pass
+                    except socket.timeout:
+                        pass
+                else:
+                    time.sleep(timeout)
+
+                # Events fire for every interface (docker veths included);
+                # only a wt0 change warrants an immediate CLI probe.
+                iface = read_interface_state()
+                if iface != last_iface:
+                    get_netbird_state(force=True)
+                    next_poll = time.time() + interval
+                elif time.time() >= next_poll:
+                    get_netbird_state(max_age=interval)
+                    next_poll = time.time() + interval
+                last_iface = iface
+            except Exception as e:
+                print(f"⚠ NetBird: watcher error: {e}")
+                time.sleep(interval)
+
+    threading.Thread(target=run, daemon=True, name="netbird-watcher").start()
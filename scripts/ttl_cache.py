@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Thread-safe TTL cache for TAKNET-PS ADS-B Feeder.
+
+One primitive for every "probe something slow, reuse it for a while" cache
+in the web app and its helpers (service state, SDR inventory, NetBird
+state, public IP, version.json):
+
+  - per-key TTL (a default per cache, overridable per call)
+  - stale-while-revalidate: within ``stale`` seconds after expiry the old
+    value is returned at once while one background thread refreshes it
+  - singleflight: concurrent misses for a key share one loader call; the
+    others wait for its result (or its exception)
+  - size bound: least recently used keys are evicted past ``max_entries``
+  - invalidation that wins over in-flight loads: a value loaded across an
+    :meth:`TTLCache.invalidate` of its key is handed to the callers already
+    waiting for it but not stored; later callers start a fresh load
+  - hit / stale / miss / error / eviction counts and load latency per cache,
+    reported by :func:`report` and pushed to observers (:func:`add_observer`)
+
+Loader exceptions propagate to every caller waiting on that load and are
+never cached; the previous value, if any, stays available to :meth:`peek`.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+_DEFAULT = object()  # "use the cache's own ttl"
+
+_lock = threading.Lock()
+_caches: list["TTLCache"] = []
+_observers: list[Callable[[str, str, float | None], None]] = []
+
+
+def add_observer(callback: Callable[[str, str, float | None], None]) -> None:
+    """Call ``callback(cache, event, seconds)`` for every lookup and load.
+
+    *event* is ``hit``, ``stale``, ``miss``, ``load``, ``error`` or
+    ``evict``; *seconds* is the loader's wall time for ``load``/``error``
+    and None otherwise.
+    """
+    with _lock:
+        _observers.append(callback)
+
+
+def _notify(cache: str, event: str, seconds: float | None = None) -> None:
+    with _lock:
+        observers = list(_observers)
+    for callback in observers:
+        try:
+            callback(cache, event, seconds)
+        except Exception as e:
+            print(f"⚠ ttl_cache: observer error: {e}")
+
+
+def report() -> dict[str, dict[str, Any]]:
+    """Stats of every cache created in this process, by name."""
+    with _lock:
+        caches = list(_caches)
+    return {cache.name: cache.stats() for cache in caches}
+
+
+class _Flight:
+    """One in-progress load that other callers can wait on."""
+
+    __slots__ = ("done", "value", "error", "discarded")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+        self.discarded = False  # key invalidated meanwhile: don't store the value
+
+
+class TTLCache:
+    """Keyed cache whose values expire *ttl* seconds after they were loaded.
+
+    ``ttl=None`` never expires (only :meth:`invalidate` drops a value).
+    ``stale`` seconds past expiry a value is still served while it is
+    refreshed in the background; 0 makes every expired lookup wait.
+    """
+
+    def __init__(self, name: str, ttl: float | None, stale: float = 0.0,
+                 max_entries: int | None = None) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, dict[str, Any]] = OrderedDict()
+        self._flights: dict[Hashable, _Flight] = {}
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0,
+                       "errors": 0, "evictions": 0, "load_seconds": 0.0, "max_load_seconds": 0.0}
+        with _lock:
+            _caches.append(self)
+
+    # Lookups ---------------------------------------------------------------
+
+    def get(self, key: Hashable, loader: Callable[[], Any], ttl: Any = _DEFAULT,
+            stale: float | None = None, force: bool = False, wait: bool = True,
+            default: Any = None) -> Any:
+        """Value for *key*, calling ``loader()`` when missing or expired.
+
+        *ttl* / *stale* override the cache defaults; a value loaded by this
+        call keeps them as its own (per-key) lifetime. ``force``
+        reloads even a fresh value. ``wait=False`` never blocks on a load:
+        without a usable value it starts one in the background and returns
+        *default*.
+        """
+        lifetime = (self.ttl if ttl is _DEFAULT else ttl, self.stale if stale is None else stale)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                age = now - entry["loaded_at"]
+                ttl = entry["ttl"] if ttl is _DEFAULT else lifetime[0]
+                stale = entry["stale"] if stale is None else lifetime[1]
+            if entry and not force and (ttl is None or age < ttl):
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                event = "hit"
+            elif entry and not force and age < ttl + stale:
+                self._entries.move_to_end(key)
+                self._stats["stale_hits"] += 1
+                event = "stale"
+            else:
+                self._stats["misses"] += 1
+                event = "miss"
+            flight, owner = self._flights.get(key), False
+            if event != "hit" and flight is None:
+                flight = self._flights[key] = _Flight()
+                owner = True
+        _notify(self.name, event)
+
+        if event == "hit":
+            return entry["value"]
+        if event == "stale" or not wait:
+            if owner:
+                threading.Thread(target=self._load, args=(key, loader, flight, lifetime), daemon=True,
+                                 name=f"ttl-cache-{self.name}").start()
+            return entry["value"] if event == "stale" else default
+        if owner:
+            self._load(key, loader, flight, lifetime)
+        else:
+            flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key: Hashable, loader: Callable[[], Any], flight: _Flight,
+              lifetime: tuple[float | None, float]) -> None:
+        """Run *loader* for *flight*; store the value unless invalidated meanwhile."""
+        started = time.monotonic()
+        evicted, loaded = 0, False
+        try:
+            flight.value = loader()
+            loaded = True
+        except Exception as e:
+            flight.error = e
+        finally:
+            seconds = time.monotonic() - started
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                self._stats["loads"] += 1
+                self._stats["load_seconds"] += seconds
+                self._stats["max_load_seconds"] = max(self._stats["max_load_seconds"], seconds)
+                if flight.error is not None:
+                    self._stats["errors"] += 1
+                elif loaded and not flight.discarded:
+                    self._entries[key] = {"value": flight.value, "loaded_at": time.monotonic(),
+                                          "load_seconds": seconds, "ttl": lifetime[0], "stale": lifetime[1]}
+                    self._entries.move_to_end(key)
+                    evicted = self._evict()
+            flight.done.set()
+        _notify(self.name, "error" if flight.error is not None else "load", seconds)
+        for _ in range(evicted):
+            _notify(self.name, "evict")
+
+    def _evict(self) -> int:
+        """Drop least recently used entries past max_entries (lock held)."""
+        evicted = 0
+        while self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        self._stats["evictions"] += evicted
+        return evicted
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Last loaded value for *key*, however old; never loads."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry["value"] if entry else default
+
+    def age(self, key: Hashable) -> float | None:
+        """Seconds since *key* was loaded, or None if not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return time.monotonic() - entry["loaded_at"] if entry else None
+
+    # Updates ---------------------------------------------------------------
+
+    def set(self, key: Hashable, value: Any, ttl: Any = _DEFAULT, stale: float | None = None) -> None:
+        """Store *value* as freshly loaded (with its own *ttl* / *stale* if given)."""
+        with self._lock:
+            self._entries[key] = {"value": value, "loaded_at": time.monotonic(), "load_seconds": 0.0,
+                                  "ttl": self.ttl if ttl is _DEFAULT else ttl,
+                                  "stale": self.stale if stale is None else stale}
+            self._entries.move_to_end(key)
+            evicted = self._evict()
+        for _ in range(evicted):
+            _notify(self.name, "evict")
+
+    def touch(self, key: Hashable) -> bool:
+        """Mark *key* fresh again without changing its value (e.g. HTTP 304)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                entry["loaded_at"] = time.monotonic()
+        return entry is not None
+
+    def invalidate(self, key: Any = _DEFAULT) -> None:
+        """Drop *key* (every key if omitted); loads already running for it are not stored."""
+        with self._lock:
+            if key is _DEFAULT:
+                self._entries.clear()
+                flights = list(self._flights.values())
+                self._flights.clear()
+            else:
+                self._entries.pop(key, None)
+                flight = self._flights.pop(key, None)
+                flights = [flight] if flight else []
+            for flight in flights:
+                flight.discarded = True
+
+    clear = invalidate
+
+    # Stats -----------------------------------------------------------------
+
+    def stats(self) -> dict[str, Any]:
+        """Counters plus current size and per-key age / last load time."""
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["loading"] = len(self._flights)
+            keys = {str(key): {"age_seconds": round(now - entry["loaded_at"], 3),
+                               "load_seconds": round(entry["load_seconds"], 3), "ttl": entry["ttl"]}
+                    for key, entry in self._entries.items()}
+        stats["load_seconds"] = round(stats["load_seconds"], 3)
+        stats["max_load_seconds"] = round(stats["max_load_seconds"], 3)
+        stats["avg_load_seconds"] = round(stats["load_seconds"] / stats["loads"], 3) if stats["loads"] else None
+        stats["ttl"] = self.ttl
+        stats["stale"] = self.stale
+        stats["keys"] = keys
+        return stats
@@ -7,6 +7,7 @@ Enables remote access by web address without router port forwarding.
 
 import json
 import base64
+import os
 import shutil
 import socket
 import subprocess
@@ -29,12 +30,27 @@ except ImportError:
 
 ENV_FILE = Path("/opt/adsb/config/.env")
 STATUS_FILE = Path("/opt/adsb/var/tunnel-status.json")
+# Counters refreshed while connected live on tmpfs so they cost no SD-card writes
+COUNTERS_FILE = Path("/run/taknet/tunnel-counters.json")
 LOCAL_HOST = "127.0.0.1"
 # Local Flask app runs on 5000; hitting it directly avoids nginx proxying issues for tunneled requests
 LOCAL_PORT = 5000
 # Local tar1090/graphs1090 stack (map/stats) served on 8080
 TAR1090_HOST = "127.0.0.1"
 TAR1090_PORT = WEB_UI_PORT
+# Cumulative counters published in COUNTERS_FILE (exported by the web app's /metrics)
+COUNTERS = {
+    "connect_attempts": 0,
+    "requests": 0,
+    "request_errors": 0,
+    "request_bytes": 0,
+    "response_bytes": 0,
+    "request_seconds": 0.0,
+}
+COUNTERS_WRITE_INTERVAL = 30  # seconds between counter refreshes while connected
+_connected_since = None
+_last_counters_write = 0.0
+_last_counters = None
 # Hop-by-hop headers we should not forward to localhost
 SKIP_HEADERS = frozenset(
     k.lower()
@@ -216,30 +232,52 @@ def log(msg):
     sys.stderr.flush()
 
 
+def _replace_json(path, data):
+    """Write data as JSON to a temp file and rename it over path, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data) + "\n")
+    os.replace(tmp, path)
+
+
+def write_counters(force=False):
+    """Publish COUNTERS to COUNTERS_FILE (tmpfs) if they changed since the last write."""
+    global _last_counters_write, _last_counters
+    _last_counters_write = time.time()
+    if not force and COUNTERS == _last_counters:
+        return
+    try:
+        _replace_json(COUNTERS_FILE, COUNTERS)
+        _last_counters = dict(COUNTERS)
+    except Exception as e:
+        log(f"Could not write counters file: {e}")
+
+
 def write_status(connected, feeder_id=None, error=None):
-    """Write tunnel status for dashboard and troubleshooting."""
+    """Write tunnel status for dashboard and troubleshooting (on connect/disconnect only)."""
+    global _connected_since
+    write_counters()
     try:
-        STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
         if connected and feeder_id:
-            STATUS_FILE.write_text(
-                json.dumps({
-                    "connected": True,
-                    "feeder_id": feeder_id,
-                    "since": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                }) + "\n"
-            )
-        elif STATUS_FILE.exists():
-            STATUS_FILE.write_text(
-                json.dumps({
-                    "connected": False,
-                    "error": error,
-                    "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                }) + "\n"
-            )
+            if _connected_since is None:
+                _connected_since = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            _replace_json(STATUS_FILE, {
+                "connected": True,
+                "feeder_id": feeder_id,
+                "since": _connected_since,
+                "counters": COUNTERS,
+            })
+            return
+        _connected_since = None
+        if STATUS_FILE.exists():
+            _replace_json(STATUS_FILE, {
+                "connected": False,
+                "error": error,
+                "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "counters": COUNTERS,
+            })
         else:
-            STATUS_FILE.write_text(
-                json.dumps({"connected": False, "error": error}) + "\n"
-            )
+            _replace_json(STATUS_FILE, {"connected": False, "error": error, "counters": COUNTERS})
     except Exception as e:
         log(f"Could not write status file: {e}")
 
@@ -361,6 +399,7 @@ def forward_request(method, path, headers, body_b64):
 def run_once(ws_url, feeder_id):
     """Connect, register, and process messages until disconnect. Returns True if should reconnect."""
     log(f"Connecting to {ws_url} as feeder_id={feeder_id}")
+    COUNTERS["connect_attempts"] += 1
     write_status(False, error="connecting")
     try:
         ws = websocket.create_connection(ws_url, timeout=30)
@@ -398,6 +437,8 @@ def run_once(ws_url, feeder_id):
 
                 # Proactively send a pong if no activity for 30s
                 ws.send(json.dumps({"type": "pong"}))
+                if time.time() - _last_counters_write >= COUNTERS_WRITE_INTERVAL:
+                    write_counters()
                 continue
 
             if not raw:
@@ -415,9 +456,16 @@ def run_once(ws_url, feeder_id):
                 path = msg.get("path", "/")
                 headers = msg.get("headers") or {}
                 body_b64 = msg.get("body") or ""
+                started = time.monotonic()
                 status, resp_headers, resp_b64, target, upstream_base, path_up = forward_request(
                     method, path, headers, body_b64
                 )
+                COUNTERS["requests"] += 1
+                COUNTERS["request_seconds"] += time.monotonic() - started
+                COUNTERS["request_bytes"] += len(body_b64) * 3 // 4
+                COUNTERS["response_bytes"] += len(resp_b64) * 3 // 4
+                if status >= 500:
+                    COUNTERS["request_errors"] += 1
                 log(
                     f"[tunnel-proxy] id={req_id} path={path_up}"
                     + (f" (from {path})" if path != path_up else "")
@@ -434,6 +482,8 @@ def run_once(ws_url, feeder_id):
                         }
                     )
                 )
+                if time.time() - _last_counters_write >= COUNTERS_WRITE_INTERVAL:
+                    write_counters()
                 continue
     except websocket.WebSocketConnectionClosedException:
         log("Connection closed by server or network")
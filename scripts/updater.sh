@@ -151,11 +151,20 @@ restart_services() {
         fi
     }
     sync_web_file "web/app.py"
+    sync_web_file "web/core.py"
+    for blueprint in __init__ assets feeds gps sdr system vpn wifi; do
+        sync_web_file "web/blueprints/${blueprint}.py"
+    done
     sync_web_file "web/templates/dashboard.html"
     sync_web_file "web/templates/settings.html"
     sync_web_file "web/templates/setup.html"
     sync_web_file "web/static/js/dashboard.js"
+    sync_web_file "web/static/js/dashboard-gps.js"
+    sync_web_file "web/static/js/settings.js"
+    sync_web_file "web/static/js/settings-system.js"
     sync_web_file "web/static/js/setup.js"
+    # adsb-web keeps compiled templates until VERSION or this flag changes
+    mkdir -p /opt/adsb/var && touch /opt/adsb/var/reload-templates
 
     # Verify SSH is configured for remote user via VPN
     if ! grep -q "# TAKNET-PS: remote VPN-only access" /etc/ssh/sshd_config 2>/dev/null; then
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the TAKNET-PS web interface (adsb-web).
+
+Every run starts a fresh interpreter that executes web/app.py the way the
+systemd unit does (compiled from source, not imported) without starting the
+server or its background threads, then sends one request through Flask's
+test client. No port is opened, so it can run next to the live service.
+
+Per run:
+
+  startup_s         interpreter start until app.py has run (imports,
+                    blueprint registration)
+  first_response_s  interpreter start until the first response is built
+
+The first start after an update also byte-compiles core.py and blueprints/;
+``--cold`` clears the web directory's __pycache__ before every run to
+measure that case.
+``--record`` appends the medians to a JSON-lines history so releases can be
+compared on the same Pi; ``--importtime`` lists the slowest imports.
+
+Usage:
+  python3 /opt/adsb/scripts/web_startup_benchmark.py [--runs 5] [--path /about]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+DEFAULT_APP = Path("/opt/adsb/web/app.py")
+HISTORY_FILE = Path("/opt/adsb/var/web-startup-benchmark.jsonl")
+VERSION_FILE = Path("/opt/adsb/VERSION")
+MODEL_FILE = Path("/proc/device-tree/model")
+
+# Runs inside the child interpreter: argv = [app.py, path]
+CHILD = r"""
+import json, os, runpy, sys, time
+app_path, path = sys.argv[1], sys.argv[2]
+out = sys.stdout
+sys.stdout = open(os.devnull, 'w')  # app.py prints status lines while loading
+sys.path.insert(0, os.path.dirname(app_path))
+started = time.perf_counter()
+ns = runpy.run_path(app_path, run_name='__benchmark__')
+loaded = time.perf_counter()
+status = ns['app'].test_client().get(path).status_code
+done = time.perf_counter()
+out.write(json.dumps({'load': loaded - started, 'request': done - loaded, 'status': status}) + '\n')
+"""
+
+
+def run_once(app: Path, path: str, cold: bool, importtime: bool = False) -> dict[str, Any]:
+    """One child interpreter; timings in seconds from spawn."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # the systemd unit writes .pyc files
+    if cold:
+        for cache in app.parent.glob("**/__pycache__"):
+            shutil.rmtree(cache, ignore_errors=True)
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", CHILD, str(app), path]
+    started = time.perf_counter()
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300, env=env)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0 or not result.stdout.strip():
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "child failed")
+    child = json.loads(result.stdout.strip().splitlines()[-1])
+    # Interpreter start-up is whatever the child did not account for itself
+    interpreter = max(0.0, elapsed - child["load"] - child["request"])
+    return {
+        "startup_s": interpreter + child["load"],
+        "first_response_s": interpreter + child["load"] + child["request"],
+        "status": child["status"],
+        "importtime": result.stderr if importtime else None,
+    }
+
+
+def slowest_imports(stderr: str, top: int) -> list[tuple[int, int, str]]:
+    """(self_us, cumulative_us, module) from ``-X importtime`` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+        except ValueError:
+            continue
+    return sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+
+
+def read_text(path: Path) -> str | None:
+    try:
+        return path.read_text().strip("\x00\n ")
+    except OSError:
+        return None
+
+
+def last_record(path: str, cold: bool) -> dict[str, Any] | None:
+    """Most recent history entry for the same path and cache mode."""
+    try:
+        lines = HISTORY_FILE.read_text().splitlines()
+    except OSError:
+        return None
+    for line in reversed(lines):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue
+        if entry.get("path") == path and entry.get("cold") == cold:
+            return entry
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure adsb-web time-to-first-response")
+    parser.add_argument("--app", type=Path, default=DEFAULT_APP, help="web/app.py to load")
+    parser.add_argument("--path", default="/about", help="route for the first request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="clear web/ bytecode caches before every run")
+    parser.add_argument("--importtime", type=int, nargs="?", const=20, metavar="N",
+                        help="show the N slowest imports of one extra run")
+    parser.add_argument("--record", action="store_true", help=f"append medians to {HISTORY_FILE}")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    if not args.app.exists():
+        print(f"❌ {args.app} not found", file=sys.stderr)
+        return 1
+
+    runs = []
+    for i in range(max(1, args.runs)):
+        try:
+            runs.append(run_once(args.app, args.path, args.cold))
+        except (RuntimeError, subprocess.TimeoutExpired, ValueError) as e:
+            print(f"❌ Run {i + 1} failed: {e}", file=sys.stderr)
+            return 1
+        if not args.json:
+            r = runs[-1]
+            print(f"  run {i + 1}: startup {r['startup_s']:.3f}s, "
+                  f"first response {r['first_response_s']:.3f}s (HTTP {r['status']})")
+
+    startup = [r["startup_s"] for r in runs]
+    first = [r["first_response_s"] for r in runs]
+    summary = {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "version": read_text(VERSION_FILE) or "unknown",
+        "model": read_text(MODEL_FILE),
+        "python": sys.version.split()[0],
+        "path": args.path,
+        "cold": args.cold,
+        "runs": len(runs),
+        "startup_median_s": round(statistics.median(startup), 4),
+        "first_response_median_s": round(statistics.median(first), 4),
+        "first_response_min_s": round(min(first), 4),
+        "first_response_max_s": round(max(first), 4),
+        "first_run_s": round(first[0], 4),
+    }
+    previous = last_record(args.path, args.cold)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"\n{summary['model'] or 'unknown host'} · Python {summary['python']} · "
+              f"version {summary['version']} · {args.path}{' · cold cache' if args.cold else ''}")
+        print(f"  startup         median {summary['startup_median_s']:.3f}s")
+        print(f"  first response  median {summary['first_response_median_s']:.3f}s "
+              f"(min {summary['first_response_min_s']:.3f}s, max {summary['first_response_max_s']:.3f}s, "
+              f"first run {summary['first_run_s']:.3f}s)")
+        if previous:
+            delta = summary["first_response_median_s"] - previous["first_response_median_s"]
+            print(f"  previous        median {previous['first_response_median_s']:.3f}s "
+                  f"({previous['version']}, {previous['at']}) → {delta:+.3f}s")
+
+    if args.importtime:
+        result = run_once(args.app, args.path, args.cold, importtime=True)
+        print(f"\nSlowest imports (cumulative, of {result['first_response_s']:.3f}s):")
+        for self_us, cumulative_us, name in slowest_imports(result["importtime"], args.importtime):
+            print(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name.strip()}")
+
+    if args.record:
+        try:
+            HISTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+            with open(HISTORY_FILE, "a") as f:
+                f.write(json.dumps(summary) + "\n")
+            if not args.json:
+                print(f"\n✓ Recorded in {HISTORY_FILE}")
+        except OSError as e:
+            print(f"⚠ Could not record: {e}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""
+Route blueprints for the web interface, one module per feature area.
+
+Each module defines ``bp``; register_blueprints() imports and registers
+them at startup (Flask does not accept new routes once it is serving).
+Blueprint modules are byte-compiled and cached, unlike app.py which runs
+as __main__, and keep their heavy imports inside the functions that need
+them so importing one stays cheap.
+"""
+
+import importlib
+
+BLUEPRINTS = ('assets', 'feeds', 'wifi', 'gps', 'sdr', 'system', 'vpn')
+
+
+def register_blueprints(app):
+    """Import every blueprint module and register it on app"""
+    for name in BLUEPRINTS:
+        module = importlib.import_module(f'{__name__}.{name}')
+        app.register_blueprint(module.bp)
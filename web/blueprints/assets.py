@@ -0,0 +1,159 @@
+"""
+Fingerprinted static assets.
+
+asset_url('css/style.css') in a template gives /assets/<hash>/css/style.css,
+where <hash> is taken from the file's content. Those URLs are served with
+Cache-Control: immutable so browsers (often on a tunnel or cellular link)
+only fetch an asset again once it has actually changed. Text assets get
+.gz (and .br when python3-brotli is installed) siblings under
+/opt/adsb/var/static-cache, built once per content hash.
+
+Each lookup stats the file, so an asset replaced by the updater gets a new
+hash without restarting adsb-web. A request for an outdated hash (a page
+rendered before the change) is answered with the current file, uncached.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import threading
+from pathlib import Path
+
+from flask import Blueprint, abort, request, send_file, url_for
+
+bp = Blueprint('assets', __name__)
+
+ASSET_CACHE_DIR = Path('/opt/adsb/var/static-cache')
+COMPRESSIBLE_SUFFIXES = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+asset_lock = threading.Lock()
+asset_manifest = {}  # filename -> {'digest', 'stat', 'path', 'mimetype', 'variants'}
+asset_root = {'path': None}
+
+
+def _compressed_variants(path, digest):
+    """Build missing .gz/.br copies of path for digest; {'gzip': Path, 'br': Path}"""
+    variants = {}
+    if path.suffix not in COMPRESSIBLE_SUFFIXES:
+        return variants
+    try:
+        ASSET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        print(f"⚠ [Assets] Cannot create {ASSET_CACHE_DIR}: {e}")
+        return variants
+    data = None
+    base = ASSET_CACHE_DIR / f"{digest}-{path.name}"
+    encoders = [('gzip', '.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    try:
+        import brotli
+        encoders.append(('br', '.br', lambda raw: brotli.compress(raw, quality=11)))
+    except ImportError:
+        pass
+    for encoding, suffix, compress in encoders:
+        target = base.with_name(base.name + suffix)
+        if not target.exists():
+            if data is None:
+                data = path.read_bytes()
+            packed = compress(data)
+            if len(packed) >= len(data):
+                continue
+            tmp = target.with_name(target.name + '.tmp')
+            try:
+                tmp.write_bytes(packed)
+                tmp.replace(target)
+            except OSError as e:
+                print(f"⚠ [Assets] Cannot write {target}: {e}")
+                continue
+        variants[encoding] = target
+    return variants
+
+
+def _asset(filename):
+    """Manifest entry for filename under the static folder, refreshed if the file changed"""
+    root = asset_root['path']
+    if root is None:
+        return None
+    path = (root / filename).resolve()
+    if root not in path.parents:
+        return None
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    stat_key = (st.st_mtime_ns, st.st_size)
+    entry = asset_manifest.get(filename)
+    if entry and entry['stat'] == stat_key:
+        return entry
+    with asset_lock:
+        entry = asset_manifest.get(filename)
+        if entry and entry['stat'] == stat_key:
+            return entry
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+        entry = {
+            'digest': digest,
+            'stat': stat_key,
+            'path': path,
+            'mimetype': mimetypes.guess_type(path.name)[0] or 'application/octet-stream',
+            'variants': _compressed_variants(path, digest),
+        }
+        asset_manifest[filename] = entry
+    return entry
+
+
+def _prune_compressed(keep):
+    """Drop compressed copies whose content hash is no longer current"""
+    try:
+        for cached in ASSET_CACHE_DIR.iterdir():
+            if cached not in keep:
+                cached.unlink()
+    except OSError:
+        pass
+
+
+def _fingerprint_static(state):
+    """Hash every static file at registration so the first page view doesn't"""
+    asset_root['path'] = Path(state.app.static_folder).resolve()
+    keep = set()
+    for path in sorted(asset_root['path'].rglob('*')):
+        if path.is_file():
+            entry = _asset(path.relative_to(asset_root['path']).as_posix())
+            if entry:
+                keep.update(entry['variants'].values())
+    _prune_compressed(keep)
+
+
+bp.record_once(_fingerprint_static)
+
+
+@bp.app_template_global()
+def asset_url(filename):
+    """Content-hashed URL for a static file (plain /static URL if unknown)"""
+    entry = _asset(filename)
+    if not entry:
+        return url_for('static', filename=filename)
+    return url_for('assets.asset', digest=entry['digest'], filename=filename)
+
+
+@bp.route('/assets/<digest>/<path:filename>')
+def asset(digest, filename):
+    """Serve a fingerprinted static file, precompressed when the client allows"""
+    entry = _asset(filename)
+    if not entry:
+        abort(404)
+    path, encoding = entry['path'], None
+    for candidate in ('br', 'gzip'):
+        if candidate in entry['variants'] and request.accept_encodings[candidate]:
+            path, encoding = entry['variants'][candidate], candidate
+            break
+    response = send_file(path, mimetype=entry['mimetype'],
+                         etag=f"{entry['digest']}-{encoding or 'identity'}")
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if entry['variants']:
+        response.vary.add('Accept-Encoding')
+    if digest == entry['digest']:
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
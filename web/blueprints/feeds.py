@@ -0,0 +1,1051 @@
+"""
+Feed APIs: FR24, PiAware and ADSBHub setup/toggle, and the community stats proxy.
+"""
+
+import subprocess
+import re
+from pathlib import Path
+import threading
+import time
+import gzip
+import io
+import urllib.parse
+from collections import OrderedDict
+
+from flask import Blueprint, request, jsonify
+
+from core import (
+    current_job, ENV_FILE, get_or_create_feeder_uuid, JobCancelled, list_jobs,
+    METRIC_COLLECTORS, read_env, reconcile_outcome, request_reconcile, restart_service,
+    submit_job, write_env,
+)
+import command_runner
+
+bp = Blueprint('feeds', __name__)
+
+FEED_SETUP_TIMEOUT = 180  # seconds a setup route waits for its container to be applied
+
+def update_env_var(key, value):
+    """Update a single environment variable in .env file"""
+    env_vars = read_env()
+    env_vars[key] = value
+    write_env(env_vars)
+
+def apply_feed(reason, service):
+    """Rebuild + compose up one feed container via the reconciler and wait
+
+    Returns None once it is up, else an error message for the response.
+    """
+    generation = request_reconcile(reason, services=[service], progress_service=service)
+    outcome = reconcile_outcome(generation, FEED_SETUP_TIMEOUT)
+    if outcome is None:
+        return f'Timed out after {FEED_SETUP_TIMEOUT}s waiting for {service} to start'
+    return None if outcome['success'] else outcome['error']
+
+@bp.route('/api/feeds/toggle', methods=['POST'])
+def api_feeds_toggle():
+    """Toggle feed on/off"""
+    try:
+        data = request.json
+        feed_name = data.get('feed')
+        enabled = data.get('enabled', False)
+        
+        # Map feed names to env variables
+        feed_map = {
+            'taknet': 'TAKNET_PS_ENABLED',
+            'airplaneslive': 'AIRPLANESLIVE_ENABLED',
+            'adsbfi': 'ADSBFI_ENABLED',
+            'adsblol': 'ADSBLOL_ENABLED',
+            'adsbexchange': 'ADSBX_ENABLED'
+        }
+        
+        if feed_name not in feed_map:
+            return jsonify({'success': False, 'message': 'Unknown feed'})
+        
+        env_var = feed_map[feed_name]
+        value = 'true' if enabled else 'false'
+        
+        # Update .env file
+        update_env_var(env_var, value)
+        
+        # For feeds that need UUID (adsb.lol, ADSBexchange), ensure UUID exists
+        if feed_name in ['adsblol', 'adsbexchange'] and enabled:
+            get_or_create_feeder_uuid()
+        
+        # Rebuild + restart ultrafeeder after a short quiet period, so toggling
+        # several feeds in a row costs one restart
+        generation = request_reconcile(f'feed {feed_name} {"enabled" if enabled else "disabled"}',
+                                       services=['ultrafeeder'])
+        
+        return jsonify({'success': True, 'message': f'Feed {feed_name} updated', 'generation': generation})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/fr24/setup', methods=['POST'])
+def api_fr24_setup():
+    """Setup FR24 feeder with existing key"""
+    try:
+        data = request.json
+        feeder_id = data.get('feeder_id', '').strip()
+        feeder_id_uat = data.get('feeder_id_uat', '').strip()
+        
+        if not feeder_id:
+            return jsonify({'success': False, 'message': 'Feeder ID is required'})
+        
+        # Update .env with FR24 keys
+        update_env_var('FR24_KEY', feeder_id)
+        update_env_var('FR24_KEY_UAT', feeder_id_uat)
+        update_env_var('FR24_ENABLED', 'true')
+        
+        # Use the correct paths - config is at /opt/adsb not /opt/taknet-ps
+        compose_file = '/opt/adsb/config/docker-compose.yml'
+        env_file = str(ENV_FILE)  # This is /opt/adsb/config/.env
+        
+        # Verify files exist before attempting docker compose
+        if not Path(compose_file).exists():
+            return jsonify({
+                'success': False,
+                'message': f'docker-compose.yml not found at: {compose_file}\n\nPlease run the installer to create the docker-compose.yml file.'
+            })
+        
+        if not ENV_FILE.exists():
+            return jsonify({
+                'success': False,
+                'message': f'.env file not found at: {env_file}\n\nPlease run the installer to create the .env file.'
+            })
+        
+        # The rebuild writes the FR24KEY into docker-compose.yml, so compose up
+        # recreates the container with the new key
+        error = apply_feed('FR24 setup', 'fr24')
+        if error is None:
+            return jsonify({'success': True, 'message': 'FR24 feed enabled successfully'})
+        else:
+            return jsonify({'success': False, 'message': f'Failed to start FR24: {error}'})
+        
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'message': 'Operation timed out'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/fr24/test', methods=['POST'])
+def api_fr24_test():
+    """Test FR24 key validity"""
+    try:
+        data = request.json
+        feeder_id = data.get('feeder_id', '').strip()
+        
+        if not feeder_id:
+            return jsonify({'success': False, 'message': 'Feeder ID is required'})
+        
+        # Simple validation - check if key format is reasonable
+        if len(feeder_id) < 10:
+            return jsonify({'success': False, 'message': 'Feeder ID appears invalid (too short)'})
+        
+        # Key looks valid
+        return jsonify({'success': True, 'message': 'FR24 key format appears valid'})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/fr24/register', methods=['POST'])
+def api_fr24_register():
+    """Register new FR24 account - smart registration with coordinate formatting"""
+    try:
+        data = request.json
+        email = data.get('email', '').strip()
+        
+        if not email:
+            return jsonify({'success': False, 'message': 'Email is required'})
+        
+        # Validate email format
+        import re
+        if not re.match(r'^[^\s@]+@[^\s@]+\.[^\s@]+$', email):
+            return jsonify({'success': False, 'message': 'Invalid email format'})
+        
+        # Read current env for location data
+        env = read_env()
+        lat_str = env.get('FEEDER_LAT', '0')
+        lon_str = env.get('FEEDER_LONG', '0')
+        alt_ft_str = env.get('FEEDER_ALT_FT', '0')
+        
+        # Validate we have location data
+        try:
+            lat = float(lat_str)
+            lon = float(lon_str)
+            alt_ft = float(alt_ft_str)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid feeder location data. Please configure location in Settings first.'
+            })
+        
+        if lat == 0 or lon == 0:
+            return jsonify({
+                'success': False,
+                'message': 'Feeder location not configured. Please set up your location in Settings first.'
+            })
+        
+        # Format coordinates to EXACTLY 4 decimal places (FR24 requirement)
+        lat_formatted = f"{lat:.4f}"
+        lon_formatted = f"{lon:.4f}"
+        alt_formatted = str(int(alt_ft))  # Altitude in feet, no decimals
+        
+        # Prepare answers for fr24feed --signup
+        signup_inputs = f'''{email}
+
+yes
+{lat_formatted}
+{lon_formatted}
+{alt_formatted}
+yes
+4
+ultrafeeder
+30005
+no
+no
+'''
+        
+        # We write a custom bash script that ensures install_feeder.sh doesn't consume stdin
+        # and inputs are safely pushed specifically to fr24feed
+        docker_bash_script = f'''
+mkdir -p /run/tmp
+curl -sSL https://raw.githubusercontent.com/sdr-enthusiasts/docker-flightradar24/main/install_feeder.sh > /run/tmp/install_feeder.sh
+chmod a+x /run/tmp/install_feeder.sh
+export DEBIAN_FRONTEND=noninteractive
+INSTALL_X86_FROMDEB=true /run/tmp/install_feeder.sh < /dev/null >/dev/null 2>&1
+
+cat << 'EOF' > /tmp/inputs.txt
+{signup_inputs}EOF
+
+if /usr/bin/fr24feed --version >/dev/null 2>&1; then
+    /usr/bin/fr24feed --signup --configfile=/tmp/config.txt < /tmp/inputs.txt
+else
+    qemu-arm-static /usr/bin/fr24feed --signup --configfile=/tmp/config.txt < /tmp/inputs.txt
+fi
+'''
+        
+        docker_cmd = [
+            'docker', 'run', '-i', '--rm',
+            'ghcr.io/sdr-enthusiasts/docker-baseimage:qemu',
+            'bash', '-c', docker_bash_script
+        ]
+        
+        try:
+            result = command_runner.run(
+                docker_cmd,
+                capture_output=True,
+                text=True,
+                timeout=240
+            )
+            
+            output = result.stdout + result.stderr
+            
+            # Try to extract sharing key FIRST (success case)
+            import re
+            key_match = re.search(r'sharing key \(([a-zA-Z0-9]+)\)', output)
+            
+            if key_match:
+                # SUCCESS: Key found and extracted
+                sharing_key = key_match.group(1)
+                return jsonify({
+                    'success': True,
+                    'sharing_key': sharing_key,
+                    'message': f'Registration successful! Your sharing key: {sharing_key}'
+                })
+            
+            # If we get here, no key was extracted
+            # Check for CLEAR FAILURE indicators
+            
+            # ERROR 1: Three-key limit reached
+            if 'limit' in output.lower() or 'maximum' in output.lower() or ('three' in output.lower() and 'feeder' in output.lower()):
+                return jsonify({
+                    'success': False,
+                    'error_type': 'key_limit',
+                    'message': f'Your FlightRadar24 account has reached the 3-feeder limit.\n\nTo add this feeder, you need to:\n1. Log in to your FR24 account with: {email}\n2. Remove an old feeder or request additional keys from FR24 support\n3. Copy your sharing key and paste it in the field above',
+                    'url': 'https://www.flightradar24.com/account/data-sharing',
+                    'email': email,
+                    'debug_output': output[:1000]
+                })
+            
+            # ERROR 2: Clear failure messages
+            clear_failures = [
+                'connection refused' in output.lower(),
+                'network unreachable' in output.lower(),
+                'could not connect' in output.lower(),
+                'timeout' in output.lower() and 'error' in output.lower()
+            ]
+            
+            if any(clear_failures):
+                return jsonify({
+                    'success': False,
+                    'error_type': 'network_error',
+                    'message': f'Network error during registration.\n\nYou can register manually:\n1. Log in or create account with: {email}\n2. Complete the FR24 feeder registration\n3. Copy your sharing key and paste it in the field above',
+                    'url': 'https://www.flightradar24.com/share-your-data',
+                    'email': email,
+                    'debug_output': output[:1000]
+                })
+            
+            # DEFAULT: Assume registration succeeded but we couldn't extract the key
+            # This is the "fail-open" approach - better to assume success and let user verify
+            return jsonify({
+                'success': False,
+                'error_type': 'key_extraction_failed',
+                'message': f'We couldn\'t automatically retrieve your sharing key.\n\nNext steps:\n1. Log in with: {email}\n2. Copy your sharing key\n3. Paste it in the field above and click "Save & Enable FR24"',
+                'url': 'https://www.flightradar24.com/account/data-sharing',
+                'email': email,
+                'registration_successful': True,
+                'debug_output': output[:1000]
+            })
+                
+        except subprocess.TimeoutExpired:
+            return jsonify({
+                'success': False,
+                'error_type': 'timeout',
+                'message': f'Registration process timed out (took over 2 minutes).\n\nThe registration may have completed successfully.\n\nNext steps:\n1. Log in to your FR24 account with: {email}\n2. Check if your feeder was registered\n3. If yes, copy your sharing key and paste it above',
+                'url': 'https://www.flightradar24.com/account/data-sharing',
+                'email': email
+            })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error_type': 'exception',
+            'message': f'Unexpected error during registration: {str(e)}\n\nYou can register manually:\n1. Visit the FR24 registration page (link below)\n2. Complete registration with your email\n3. Copy your sharing key and paste it above',
+            'url': 'https://www.flightradar24.com/share-your-data'
+        })
+
+@bp.route('/api/feeds/fr24/status', methods=['GET'])
+def api_fr24_status():
+    """Get FR24 feed enabled/disabled status"""
+    try:
+        env = read_env()
+        enabled = env.get('FR24_ENABLED', 'false').lower() == 'true'
+        
+        return jsonify({
+            'success': True,
+            'enabled': enabled
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/fr24/diagnostics', methods=['GET'])
+def api_fr24_diagnostics():
+    """Get FR24 container status and logs for troubleshooting"""
+    try:
+        # Check if container exists and is running
+        inspect = command_runner.run(
+            ['docker', 'inspect', 'fr24'],
+            capture_output=True, text=True
+        )
+        
+        if inspect.returncode != 0:
+            return jsonify({
+                'success': True,
+                'running': False,
+                'message': 'FR24 container not found. Enable FR24 first.',
+                'logs': ''
+            })
+        
+        # Get container status
+        status = command_runner.run(
+            ['docker', 'inspect', '--format={{.State.Status}}', 'fr24'],
+            capture_output=True, text=True
+        ).stdout.strip()
+        
+        # Get last 100 lines of logs
+        logs = command_runner.run(
+            ['docker', 'logs', '--tail', '100', 'fr24'],
+            capture_output=True, text=True
+        )
+        
+        # Get environment variables to check FR24KEY
+        env_check = command_runner.run(
+            ['docker', 'inspect', '--format={{range .Config.Env}}{{println .}}{{end}}', 'fr24'],
+            capture_output=True, text=True
+        )
+        
+        has_key = 'FR24KEY=' in env_check.stdout and 'FR24KEY=' not in env_check.stdout.replace('FR24KEY=\n', '')
+        
+        return jsonify({
+            'success': True,
+            'running': status == 'running',
+            'status': status,
+            'has_key': has_key,
+            'logs': logs.stdout + logs.stderr,
+            'message': f'Container status: {status}'
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/fr24/toggle', methods=['POST'])
+def api_fr24_toggle():
+    """Toggle FR24 feed enabled/disabled"""
+    try:
+        data = request.json
+        enabled = data.get('enabled', False)
+        
+        # Update .env
+        update_env_var('FR24_ENABLED', 'true' if enabled else 'false')
+        
+        # Use the correct paths - config is at /opt/adsb not /opt/taknet-ps
+        compose_file = '/opt/adsb/config/docker-compose.yml'
+        env_file = str(ENV_FILE)  # This is /opt/adsb/config/.env
+        
+        # Verify files exist before attempting docker compose
+        if not Path(compose_file).exists():
+            return jsonify({
+                'success': False,
+                'message': f'docker-compose.yml not found at: {compose_file}\n\nPlease run the installer to create the docker-compose.yml file.'
+            })
+        
+        if not ENV_FILE.exists():
+            return jsonify({
+                'success': False,
+                'message': f'.env file not found at: {env_file}\n\nPlease run the installer to create the .env file.'
+            })
+        
+        # Start or stop FR24 with the next reconcile (config rebuild writes the
+        # FR24KEY value into docker-compose.yml first)
+        if enabled:
+            generation = request_reconcile('FR24 enabled', services=['fr24'], progress_service='fr24')
+        else:
+            generation = request_reconcile('FR24 disabled', services=[], stop=['fr24'], progress_service='fr24')
+        
+        return jsonify({'success': True, 'message': f'FR24 feed {"enabled" if enabled else "disabled"}',
+                        'generation': generation})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+PIAWARE_ID_TIMEOUT = 90  # seconds (adsb.im uses 60)
+
+PIAWARE_ID_PATTERN = re.compile(r'my feeder[- ]?id is ([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})', re.IGNORECASE)
+
+def _generate_piaware_feeder_id(lat, lon):
+    """Job: run a throwaway PiAware container until it prints a new feeder ID.
+
+    Returns (feeder_id or None, output lines, seconds). Streams the output
+    line-by-line and kills the container as soon as the ID appears, like the
+    official `timeout 60 docker run ... | grep "my feeder ID"` method.
+    """
+    job = current_job()
+    docker_cmd = [
+        'docker', 'run', '--rm',
+        '-e', f'LAT={lat}',
+        '-e', f'LONG={lon}',
+        'ghcr.io/sdr-enthusiasts/docker-piaware:latest'
+    ]
+    if job:
+        job.progress(5, 'Starting PiAware container...')
+    
+    # Start process with line-buffered output
+    process = command_runner.Popen(
+        docker_cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,  # Line buffered
+        universal_newlines=True
+    )
+    if job:
+        job.attach(process)
+    
+    start_time = time.time()
+    feeder_id = None
+    full_output = []
+    
+    # Read output line by line in real-time
+    while True:
+        # Check timeout
+        if time.time() - start_time > PIAWARE_ID_TIMEOUT:
+            process.kill()
+            process.wait()
+            raise subprocess.TimeoutExpired(docker_cmd, PIAWARE_ID_TIMEOUT)
+        
+        line = process.stdout.readline()
+        
+        if not line:
+            # Process ended
+            break
+        
+        full_output.append(line)
+        if job:
+            job.progress(min(95, 5 + int((time.time() - start_time) * 90 / PIAWARE_ID_TIMEOUT)),
+                         'Waiting for feeder ID...', line.strip()[:200])
+        
+        # Check for feeder ID in this line
+        match = PIAWARE_ID_PATTERN.search(line)
+        if match:
+            feeder_id = match.group(1)
+            # Found it! Kill the container immediately (like grep does)
+            process.kill()
+            process.wait()
+            break
+    
+    # Wait for process to complete (if it hasn't been killed already)
+    if process.poll() is None:
+        process.wait(timeout=5)
+    if job:
+        job.attach(None)
+        job.check_cancelled()
+    return feeder_id, full_output, time.time() - start_time
+
+@bp.route('/api/feeds/piaware/setup', methods=['POST'])
+def api_piaware_setup():
+    """Setup PiAware feeder - smart detection: generate new ID or use existing"""
+    try:
+        data = request.json
+        feeder_id_input = data.get('feeder_id', '').strip()
+        
+        # SMART DETECTION: Check if user provided a feeder ID
+        if feeder_id_input:
+            # User provided an existing feeder ID - use it directly
+            # Validate UUID format (loose validation)
+            import re
+            if not re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', feeder_id_input, re.IGNORECASE):
+                return jsonify({
+                    'success': False,
+                    'message': 'Invalid FlightAware Feeder ID format. Should be UUID format like: c478b1c9-23d3-4376-1f82-47352a28cg37'
+                })
+            
+            # Save feeder ID and enable
+            update_env_var('PIAWARE_FEEDER_ID', feeder_id_input)
+            update_env_var('PIAWARE_ENABLED', 'true')
+            
+            compose_file = '/opt/adsb/config/docker-compose.yml'
+            env_file = str(ENV_FILE)
+            
+            # Verify files exist
+            if not Path(compose_file).exists():
+                return jsonify({
+                    'success': False,
+                    'message': f'docker-compose.yml not found at: {compose_file}\n\nPlease run the installer to create the docker-compose.yml file.'
+                })
+            
+            if not ENV_FILE.exists():
+                return jsonify({
+                    'success': False,
+                    'message': f'.env file not found at: {env_file}\n\nPlease run the installer to create the .env file.'
+                })
+            
+            # Rebuild (writes FEEDER_ID into docker-compose.yml) and start PiAware
+            error = apply_feed('PiAware setup', 'piaware')
+            if error is None:
+                return jsonify({
+                    'success': True,
+                    'message': 'FlightAware feed configured successfully! Container is starting...',
+                    'feeder_id': feeder_id_input,
+                    'mode': 'existing'
+                })
+            else:
+                return jsonify({
+                    'success': False,
+                    'message': f'Failed to start PiAware: {error}'
+                })
+        
+        else:
+            # No feeder ID provided - GENERATE NEW ONE
+            # Run PiAware container temporarily to get a new feeder ID
+            
+            # Read location from env
+            env = read_env()
+            lat = env.get('FEEDER_LAT', '0')
+            lon = env.get('FEEDER_LONG', '0')
+            
+            try:
+                # Generation runs as a job: a second click waits on the same
+                # container instead of starting another one, and the job can
+                # be cancelled from /api/jobs
+                job = next((j for j in list_jobs('piaware-feeder-id') if not j.done.is_set()), None)
+                if job is None:
+                    job = submit_job('piaware-feeder-id', _generate_piaware_feeder_id, lat, lon,
+                                     resource='piaware', coalesce=True)
+                try:
+                    feeder_id, full_output, elapsed = job.result(timeout=PIAWARE_ID_TIMEOUT + 30)
+                except TimeoutError:
+                    raise subprocess.TimeoutExpired('docker run piaware', PIAWARE_ID_TIMEOUT)
+                
+                if feeder_id:
+                    # Success! Got the ID - now save it and enable PiAware
+                    update_env_var('PIAWARE_FEEDER_ID', feeder_id)
+                    update_env_var('PIAWARE_ENABLED', 'true')
+                    
+                    # Rebuild (writes FEEDER_ID into docker-compose.yml) and start PiAware
+                    error = apply_feed('PiAware setup (generated ID)', 'piaware')
+                    
+                    if error is None:
+                        return jsonify({
+                            'success': True,
+                            'feeder_id': feeder_id,
+                            'mode': 'generated',
+                            'message': f'New FlightAware Feeder ID generated in {int(elapsed)} seconds and enabled: {feeder_id}',
+                            'claim_url': f'https://flightaware.com/adsb/piaware/claim/{feeder_id}'
+                        })
+                    else:
+                        return jsonify({
+                            'success': False,
+                            'message': f'ID generated but failed to start PiAware: {error}'
+                        })
+                else:
+                    # Failed to extract ID
+                    output_str = ''.join(full_output)
+                    return jsonify({
+                        'success': False,
+                        'error_type': 'id_extraction_failed',
+                        'message': 'Could not generate Feeder ID. Please try again or get one manually from FlightAware.',
+                        'url': 'https://flightaware.com/adsb/piaware/claim',
+                        'debug_output': output_str[:1000] if output_str else 'No output captured'
+                    })
+                    
+            except subprocess.TimeoutExpired:
+                return jsonify({
+                    'success': False,
+                    'error_type': 'timeout',
+                    'message': 'Timeout while generating Feeder ID (took longer than 90 seconds). This can happen if Docker image is downloading (~500MB, 5-10 min) or network is slow. Please wait for download to complete and try again.',
+                    'url': 'https://flightaware.com/adsb/piaware/claim',
+                    'manual_method': [
+                        'Check if image is downloading: docker images | grep piaware',
+                        'Or run manually: cd /tmp && bash generate-piaware-feederid.sh',
+                        'Or get ID from FlightAware website (link above)'
+                    ]
+                })
+            except JobCancelled:
+                return jsonify({
+                    'success': False,
+                    'error_type': 'cancelled',
+                    'message': 'Feeder ID generation was cancelled.',
+                    'url': 'https://flightaware.com/adsb/piaware/claim'
+                })
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error_type': 'exception',
+                    'message': f'Error generating Feeder ID: {str(e)}',
+                    'url': 'https://flightaware.com/adsb/piaware/claim'
+                })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/piaware/status', methods=['GET'])
+def api_piaware_status():
+    """Get FlightAware/PiAware feed enabled/disabled status"""
+    try:
+        env = read_env()
+        enabled = env.get('PIAWARE_ENABLED', 'false').lower() == 'true'
+        
+        return jsonify({
+            'success': True,
+            'enabled': enabled
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/piaware/toggle', methods=['POST'])
+def api_piaware_toggle():
+    """Toggle PiAware feed enabled/disabled"""
+    try:
+        data = request.json
+        enabled = data.get('enabled', False)
+        
+        # Update .env
+        update_env_var('PIAWARE_ENABLED', 'true' if enabled else 'false')
+        
+        # Use the correct paths
+        compose_file = '/opt/adsb/config/docker-compose.yml'
+        env_file = str(ENV_FILE)
+        
+        # Verify files exist
+        if not Path(compose_file).exists():
+            return jsonify({
+                'success': False,
+                'message': f'docker-compose.yml not found at: {compose_file}\n\nPlease run the installer to create the docker-compose.yml file.'
+            })
+        
+        if not ENV_FILE.exists():
+            return jsonify({
+                'success': False,
+                'message': f'.env file not found at: {env_file}\n\nPlease run the installer to create the .env file.'
+            })
+        
+        # Start or stop the PiAware container with the next reconcile
+        if enabled:
+            generation = request_reconcile('PiAware enabled', services=['piaware'], progress_service='piaware')
+        else:
+            generation = request_reconcile('PiAware disabled', services=[], stop=['piaware'], progress_service='piaware')
+        
+        return jsonify({'success': True, 'message': f'FlightAware feed {"enabled" if enabled else "disabled"}',
+                        'generation': generation})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+# ========================================
+# ADSBHub Feed API Endpoints
+# ========================================
+
+@bp.route('/api/feeds/adsbhub/setup', methods=['POST'])
+def api_adsbhub_setup():
+    """Configure ADSBHub feed with station key"""
+    try:
+        data = request.json
+        station_key = data.get('station_key', '').strip()
+        
+        if not station_key:
+            return jsonify({'success': False, 'message': 'Station key is required'})
+        
+        # Update .env file
+        update_env_var('ADSBHUB_STATION_KEY', station_key)
+        update_env_var('ADSBHUB_ENABLED', 'true')
+        
+        # Use the correct paths
+        compose_file = '/opt/adsb/config/docker-compose.yml'
+        env_file = str(ENV_FILE)
+        
+        # Verify files exist
+        if not Path(compose_file).exists():
+            return jsonify({
+                'success': False,
+                'message': f'docker-compose.yml not found at: {compose_file}\n\nPlease run the installer to create the docker-compose.yml file.'
+            })
+        
+        if not ENV_FILE.exists():
+            return jsonify({
+                'success': False,
+                'message': f'.env file not found at: {env_file}\n\nPlease run the installer to create the .env file.'
+            })
+        
+        # Rebuild and start ADSBHub
+        error = apply_feed('ADSBHub setup', 'adsbhub')
+        if error is None:
+            return jsonify({'success': True, 'message': 'ADSBHub feed configured successfully'})
+        else:
+            return jsonify({'success': False, 'message': f'Failed to start ADSBHub: {error}'})
+        
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'message': 'Operation timed out'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/feeds/adsbhub/status', methods=['GET'])
+def api_adsbhub_status():
+    """Get ADSBHub feed enabled/disabled status"""
+    try:
+        env = read_env()
+        enabled = env.get('ADSBHUB_ENABLED', 'false').lower() == 'true'
+        
+        return jsonify({
+            'success': True,
+            'enabled': enabled
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+# =============================================================
+# Community stats proxy (bounded LRU/TTL cache, single-pass rewriter)
+# =============================================================
+# Mapping of service keys to their base host and default page
+STATS_PROXY_SERVICES = {
+    'adsblol': {'host': 'https://api.adsb.lol', 'index': '/0/me'},
+    'adsbfi': {'host': 'https://api.adsb.fi', 'index': '/v1/myip'},
+    'airplaneslive': {'host': 'https://airplanes.live', 'index': '/myfeed/'},
+    'airplaneslive_api': {'host': 'https://api.airplanes.live', 'index': '/feed-status'}
+}
+
+STATS_PROXY_CACHE_MAX_ENTRIES = 256
+
+STATS_PROXY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+STATS_PROXY_STATIC_MIN_TTL = 3600  # seconds; assets rarely change between deploys
+
+STATS_PROXY_STATIC_EXTENSIONS = ('.js', '.css', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico',
+                                 '.woff', '.woff2', '.ttf', '.eot', '.map', '.webp')
+
+# One alternation for every rewrite: absolute URLs of any configured service
+# (https://, http:// or protocol-relative), plus <head> and root-relative
+# href/src for HTML. Longest host first so api.airplanes.live wins.
+_STATS_PROXY_HOST_TO_SERVICE = {cfg['host'].split('//', 1)[1]: key for key, cfg in STATS_PROXY_SERVICES.items()}
+
+STATS_PROXY_REWRITE_RE = re.compile(
+    r'(?:https?:)?//(?P<host>' +
+    '|'.join(re.escape(h) for h in sorted(_STATS_PROXY_HOST_TO_SERVICE, key=len, reverse=True)) +
+    r')|(?P<head><head>)|(?P<attr>href|src)="/(?!stats/)'
+)
+
+stats_proxy_cache_lock = threading.Lock()
+
+stats_proxy_cache = OrderedDict()  # (service, target_url, prefix) -> entry, LRU order
+
+stats_proxy_cache_stats = {
+    'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'bytes': 0,
+    'rewrites': 0, 'rewrite_ms_total': 0.0, 'rewrite_ms_max': 0.0
+}
+
+def rewrite_stats_proxy_content(text, service, prefix, is_html):
+    """Point every configured service URL (and HTML root links) back through the proxy, in one pass"""
+    base_proxy = f'{prefix}/api/stats/proxy/{service}'
+    base_tag = f'<base href="{base_proxy}/">'
+    saw_head = False
+
+    def replace(m):
+        nonlocal saw_head
+        if m.group('host'):
+            return f"{prefix}/api/stats/proxy/{_STATS_PROXY_HOST_TO_SERVICE[m.group('host')]}"
+        if not is_html:
+            return m.group(0)
+        if m.group('head'):
+            saw_head = True
+            return f'<head>{base_tag}'
+        return f'{m.group("attr")}="{base_proxy}/'
+
+    text = STATS_PROXY_REWRITE_RE.sub(replace, text)
+    if is_html and not saw_head:
+        text = f'{base_tag}{text}'
+    return text
+
+def stats_proxy_ttl(headers, target_url, mime_type):
+    """Seconds the response may be reused: upstream max-age/Expires, floored for static assets"""
+    ttl = 0
+    cache_control = (headers.get('Cache-Control') or '').lower()
+    if 'no-store' not in cache_control:
+        m = re.search(r'(?:s-maxage|max-age)=(\d+)', cache_control)
+        if m:
+            ttl = int(m.group(1))
+        elif headers.get('Expires'):
+            try:
+                from email.utils import parsedate_to_datetime
+                ttl = max(0, int(parsedate_to_datetime(headers['Expires']).timestamp() - time.time()))
+            except Exception:
+                ttl = 0
+        if 'no-cache' in cache_control:
+            ttl = 0
+
+    path = urllib.parse.urlsplit(target_url).path.lower()
+    is_static = path.endswith(STATS_PROXY_STATIC_EXTENSIONS) or mime_type.startswith(('image/', 'font/')) \
+        or mime_type in ('text/css', 'application/javascript', 'text/javascript')
+    if is_static:
+        ttl = max(ttl, STATS_PROXY_STATIC_MIN_TTL)
+    return ttl
+
+def _stats_proxy_cache_get(key):
+    """Fresh cached entry (moved to MRU) or None"""
+    with stats_proxy_cache_lock:
+        entry = stats_proxy_cache.get(key)
+        if entry and entry['expires_at'] > time.time():
+            stats_proxy_cache.move_to_end(key)
+            stats_proxy_cache_stats['hits'] += 1
+            return entry
+        if entry:
+            stats_proxy_cache_stats['bytes'] -= len(entry['content'])
+            del stats_proxy_cache[key]
+        stats_proxy_cache_stats['misses'] += 1
+        return None
+
+def _stats_proxy_cache_put(key, content, mime_type, ttl):
+    """Store and evict least-recently-used entries beyond the count/byte bounds"""
+    if ttl <= 0 or len(content) > STATS_PROXY_CACHE_MAX_BYTES // 4:
+        return
+    with stats_proxy_cache_lock:
+        old = stats_proxy_cache.pop(key, None)
+        if old:
+            stats_proxy_cache_stats['bytes'] -= len(old['content'])
+        stats_proxy_cache[key] = {'content': content, 'mime_type': mime_type,
+                                  'expires_at': time.time() + ttl, 'ttl': ttl}
+        stats_proxy_cache_stats['bytes'] += len(content)
+        stats_proxy_cache_stats['stores'] += 1
+        while stats_proxy_cache and (len(stats_proxy_cache) > STATS_PROXY_CACHE_MAX_ENTRIES or
+                                     stats_proxy_cache_stats['bytes'] > STATS_PROXY_CACHE_MAX_BYTES):
+            _, evicted = stats_proxy_cache.popitem(last=False)
+            stats_proxy_cache_stats['bytes'] -= len(evicted['content'])
+            stats_proxy_cache_stats['evictions'] += 1
+
+def _stats_proxy_response(content, mime_type, cache_status, ttl_remaining):
+    asset_headers = {
+        'Content-Type': mime_type,
+        'Access-Control-Allow-Origin': '*',
+        'Cache-Control': f'max-age={int(ttl_remaining)}' if ttl_remaining > 0 else 'no-cache',
+        'X-Proxy-Cache': cache_status
+    }
+    return content, 200, asset_headers
+
+def _collect_stats_proxy_cache():
+    with stats_proxy_cache_lock:
+        stats = dict(stats_proxy_cache_stats)
+        entries = len(stats_proxy_cache)
+    yield 'taknet_stats_proxy_cache_requests_total', 'counter', 'Stats proxy cache lookups', [
+        ({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])]
+    yield 'taknet_stats_proxy_cache_evictions_total', 'counter', 'Stats proxy cache LRU evictions', [(None, stats['evictions'])]
+    yield 'taknet_stats_proxy_cache_entries', 'gauge', 'Stats proxy cache entries', [(None, entries)]
+    yield 'taknet_stats_proxy_cache_bytes', 'gauge', 'Stats proxy cache size in bytes', [(None, stats['bytes'])]
+
+METRIC_COLLECTORS.append(_collect_stats_proxy_cache)
+
+@bp.route('/api/stats/proxy/<service>', defaults={'path': ''})
+@bp.route('/api/stats/proxy/<service>/<path:path>')
+def stats_proxy(service, path=''):
+    """Proxy community stats links through the feeder's IP with recursive asset support"""
+    import urllib.request
+    config = STATS_PROXY_SERVICES
+    
+    if service not in config:
+        return f"Service {service} not supported for proxying.", 404
+        
+    try:
+        cfg = config[service]
+        # Construct the target URL
+        if not path:
+            target_url = cfg['host'] + cfg['index']
+        else:
+            # Ensure path starts with /
+            clean_path = path if path.startswith('/') else '/' + path
+            target_url = cfg['host'] + clean_path
+
+        prefix = request.headers.get('X-Forwarded-Prefix', '')
+        cache_key = (service, target_url, prefix)
+        cached = _stats_proxy_cache_get(cache_key)
+        if cached:
+            return _stats_proxy_response(cached['content'], cached['mime_type'], 'HIT',
+                                         cached['expires_at'] - time.time())
+
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': '*/*'
+        }
+        
+        # Apply aggressive proxy masking and compression ONLY for airplanes.live
+        if service in ('airplaneslive', 'airplaneslive_api'):
+            headers['Accept-Encoding'] = 'gzip'
+            headers['Referer'] = cfg['host'] + cfg['index']
+
+        # Determine target host for Referer/Origin if needed
+        req = urllib.request.Request(target_url, headers=headers)
+        with urllib.request.urlopen(req, timeout=12) as response:
+            encoding = response.info().get('Content-Encoding')
+            content = response.read()
+            
+            # 1. Handle decompression if necessary
+            if encoding == 'gzip':
+                with gzip.GzipFile(fileobj=io.BytesIO(content)) as f:
+                    content = f.read()
+                    
+            mime_type = response.info().get_content_type()
+            ttl = stats_proxy_ttl(response.info(), target_url, mime_type)
+            
+            # 2. Perform deep content rewriting (HTML, JS, and JSON)
+            # This ensures that even nested API calls or links in JSON avoid bypassing the tunnel
+            if 'text/html' in mime_type or 'javascript' in mime_type or 'json' in mime_type:
+                try:
+                    started = time.perf_counter()
+                    text = content.decode('utf-8', errors='ignore')
+                    text = rewrite_stats_proxy_content(text, service, prefix, 'text/html' in mime_type)
+                    content = text.encode('utf-8')
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    with stats_proxy_cache_lock:
+                        stats_proxy_cache_stats['rewrites'] += 1
+                        stats_proxy_cache_stats['rewrite_ms_total'] += elapsed_ms
+                        stats_proxy_cache_stats['rewrite_ms_max'] = max(stats_proxy_cache_stats['rewrite_ms_max'], elapsed_ms)
+                except Exception as e:
+                    print(f"⚠️ Proxy rewriting error for {service}: {str(e)}")
+                    pass
+            
+            _stats_proxy_cache_put(cache_key, content, mime_type, ttl)
+            return _stats_proxy_response(content, mime_type, 'MISS', ttl)
+            
+    except urllib.error.HTTPError as e:
+        status_code = e.code if e.code else 502
+        error_body = e.read().decode('utf-8', errors='ignore') if hasattr(e, 'read') else str(e)
+        return (
+            f"Upstream Error: The aggregator ({target_url}) returned HTTP {status_code}: {e.reason}.<br><br>"
+            f"This indicates their stats server is currently experiencing an outage or rejected the connection.<br><br>"
+            f"Server Response:<br> <pre>{error_body}</pre>"
+        ), 502
+    except Exception as e:
+        return f"Proxy Configuration Error routing {service} to {target_url}: {str(e)}", 500
+
+@bp.route('/api/stats/proxy-cache', methods=['GET'])
+def stats_proxy_cache_status():
+    """Community stats proxy cache hit ratio, size and rewrite timing"""
+    with stats_proxy_cache_lock:
+        stats = dict(stats_proxy_cache_stats)
+        entries = len(stats_proxy_cache)
+    lookups = stats['hits'] + stats['misses']
+    return jsonify({
+        'success': True,
+        'entries': entries,
+        'max_entries': STATS_PROXY_CACHE_MAX_ENTRIES,
+        'bytes': stats['bytes'],
+        'max_bytes': STATS_PROXY_CACHE_MAX_BYTES,
+        'hits': stats['hits'],
+        'misses': stats['misses'],
+        'hit_ratio': round(stats['hits'] / lookups, 3) if lookups else None,
+        'stores': stats['stores'],
+        'evictions': stats['evictions'],
+        'rewrites': stats['rewrites'],
+        'rewrite_ms_avg': round(stats['rewrite_ms_total'] / stats['rewrites'], 2) if stats['rewrites'] else None,
+        'rewrite_ms_max': round(stats['rewrite_ms_max'], 2)
+    })
+
+@bp.route('/api/feeds/adsbhub/toggle', methods=['POST'])
+def api_adsbhub_toggle():
+    """Toggle ADSBHub feed enabled/disabled"""
+    try:
+        data = request.json
+        enabled = data.get('enabled', False)
+        
+        # Update .env
+        update_env_var('ADSBHUB_ENABLED', 'true' if enabled else 'false')
+        
+        # Use the correct paths
+        compose_file = '/opt/adsb/config/docker-compose.yml'
+        env_file = str(ENV_FILE)
+        
+        # Verify files exist
+        if not Path(compose_file).exists():
+            return jsonify({
+                'success': False,
+                'message': f'docker-compose.yml not found at: {compose_file}\n\nPlease run the installer to create the docker-compose.yml file.'
+            })
+        
+        if not ENV_FILE.exists():
+            return jsonify({
+                'success': False,
+                'message': f'.env file not found at: {env_file}\n\nPlease run the installer to create the .env file.'
+            })
+        
+        # Start or stop the ADSBHub container with the next reconcile
+        if enabled:
+            generation = request_reconcile('ADSBHub enabled', services=['adsbhub'], progress_service='adsbhub')
+        else:
+            generation = request_reconcile('ADSBHub disabled', services=[], stop=['adsbhub'], progress_service='adsbhub')
+        
+        return jsonify({'success': True, 'message': f'ADSBHub feed {"enabled" if enabled else "disabled"}',
+                        'generation': generation})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/fr24/activate', methods=['POST'])
+def api_activate_fr24():
+    """Activate FR24 service - start container and monitor download"""
+    try:
+        env = read_env()
+        
+        # Check if FR24 is enabled and has key
+        if env.get('FR24_ENABLED') != 'true':
+            return jsonify({'success': False, 'message': 'FR24 is not enabled in configuration'}), 400
+        
+        if not env.get('FR24_SHARING_KEY', '').strip():
+            return jsonify({'success': False, 'message': 'FR24 sharing key is not configured'}), 400
+        
+        # Rebuild docker-compose.yml and start FR24 (docker compose up) with download monitoring
+        generation = restart_service('fr24')
+        if not generation:
+            return jsonify({'success': False, 'message': 'Could not queue FR24 activation'}), 500
+        print("✓ Queued FR24 container start and download monitoring")
+        
+        return jsonify({'success': True, 'message': 'FR24 service activation started', 'generation': generation})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
@@ -0,0 +1,464 @@
+"""
+GPS APIs: fix acquisition, status, coordinates and mobile-mode status.
+"""
+
+import subprocess
+import os
+import shutil
+from pathlib import Path
+import json
+import threading
+import time
+
+from flask import Blueprint, request, jsonify
+
+from core import current_job, publish_event, read_env, restart_service, submit_job, write_env
+import command_runner
+
+bp = Blueprint('gps', __name__)
+
+# GPS acquisition state (for modal with live status)
+gps_state = {
+    'status': 'idle',  # idle, acquiring, fix, timeout, error
+    'message': '',
+    'lat': None,
+    'lon': None,
+    'alt': None,
+    'accuracy_m': None,
+    'satellites_used': None,
+    'mode': None,  # '2D' or '3D'
+    'log_lines': []  # recent status lines for UI
+}
+
+gps_lock = threading.Lock()
+
+GPS_LOG_MAX = 20
+
+GPS_ACQUIRE_TIMEOUT = 20
+
+def _gps_acquisition_job():
+    """Background job: acquire a GPS fix from the configured source, update gps_state."""
+    global gps_state
+    import math
+    import sys
+    sys.path.insert(0, '/opt/adsb/scripts')
+    from gps_provider import get_gps_source, build_gpspipe_cmd, read_nmea_tcp  # noqa: E402
+
+    env_vars = read_env()
+    source, host, port, protocol = get_gps_source(env_vars)
+
+    # ---------- Network NMEA: direct TCP, no gpspipe ----------
+    if source == 'network' and protocol == 'nmea':
+        try:
+            with gps_lock:
+                gps_state['log_lines'].append(f'Connecting to NMEA stream at {host}:{port}...')
+            fix = read_nmea_tcp(host, port, timeout=GPS_ACQUIRE_TIMEOUT)
+            with gps_lock:
+                if fix and fix.get('lat') is not None:
+                    gps_state['lat'] = round(fix['lat'], 5)
+                    gps_state['lon'] = round(fix['lon'], 5)
+                    gps_state['alt'] = int(round(float(fix['alt']))) if fix.get('alt') is not None else None
+                    gps_state['mode'] = fix.get('mode')
+                    gps_state['satellites_used'] = fix.get('satellites_used')
+                    gps_state['accuracy_m'] = None
+                    gps_state['status'] = 'fix'
+                    gps_state['message'] = 'Fix acquired (NMEA)'
+                    gps_state['log_lines'].append(
+                        f"Fix: {gps_state['lat']}, {gps_state['lon']} ({gps_state['mode'] or 'NMEA'})"
+                    )
+                else:
+                    gps_state['status'] = 'timeout'
+                    gps_state['message'] = f'No NMEA fix from {host}:{port}. Ensure device is sending data.'
+        except Exception as e:
+            with gps_lock:
+                gps_state['status'] = 'error'
+                gps_state['message'] = str(e)
+        return
+
+    # ---------- USB or Network gpsd: use gpspipe ----------
+    cmd = build_gpspipe_cmd(env_vars, n_lines=100, timeout=GPS_ACQUIRE_TIMEOUT)
+    if not cmd:
+        with gps_lock:
+            gps_state['status'] = 'error'
+            gps_state['message'] = 'GPS source is disabled or misconfigured.'
+        return
+
+    try:
+        proc = command_runner.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            cwd='/opt/adsb/scripts',
+            env={**os.environ}
+        )
+        job = current_job()
+        if job:
+            job.attach(proc)  # cancelling the job stops gpspipe
+        last_tpv = {}
+        satellites_used = None
+        start = time.time()
+        while True:
+            line = proc.stdout.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+                cls = obj.get('class')
+                with gps_lock:
+                    if cls == 'TPV':
+                        last_tpv = obj
+                        lat = obj.get('lat')
+                        lon = obj.get('lon')
+                        if lat is not None and lon is not None:
+                            epx = obj.get('epx')
+                            epy = obj.get('epy')
+                            epv = obj.get('epv')
+                            mode = obj.get('mode', 0)
+                            acc = None
+                            if epx is not None and epy is not None:
+                                acc = round(math.sqrt(epx*epx + epy*epy), 1)
+                            gps_state['lat'] = round(lat, 5)
+                            gps_state['lon'] = round(lon, 5)
+                            gps_state['alt'] = int(round(obj['alt'])) if obj.get('alt') is not None else None
+                            gps_state['accuracy_m'] = acc
+                            gps_state['mode'] = '3D' if mode == 2 else ('2D' if mode == 1 else None)
+                            gps_state['satellites_used'] = satellites_used
+                            gps_state['status'] = 'fix'
+                            gps_state['message'] = 'Fix acquired'
+                            gps_state['log_lines'].append(
+                                f"Fix: {gps_state['lat']}, {gps_state['lon']} "
+                                f"(accuracy ~{acc}m, {gps_state['mode']})" if acc else
+                                f"Fix: {gps_state['lat']}, {gps_state['lon']} ({gps_state['mode']})"
+                            )
+                            if len(gps_state['log_lines']) > GPS_LOG_MAX:
+                                gps_state['log_lines'] = gps_state['log_lines'][-GPS_LOG_MAX:]
+                            try:
+                                proc.terminate()
+                            except OSError:
+                                pass
+                            break
+                        else:
+                            # lat/lon not valid yet — mode is only set inside branch above; use obj
+                            _m = obj.get('mode')
+                            gps_state['log_lines'].append(
+                                f"Waiting for fix... mode={_m}" if _m is not None else "Waiting for fix..."
+                            )
+                    elif cls == 'SKY':
+                        sats = obj.get('satellites', [])
+                        used = sum(1 for s in sats if s.get('used'))
+                        satellites_used = used if sats else satellites_used
+                        gps_state['satellites_used'] = satellites_used
+                        if satellites_used is not None:
+                            gps_state['log_lines'].append(f"Satellites used: {satellites_used}")
+                    if len(gps_state['log_lines']) > GPS_LOG_MAX:
+                        gps_state['log_lines'] = gps_state['log_lines'][-GPS_LOG_MAX:]
+            except (json.JSONDecodeError, KeyError):
+                continue
+        proc.wait(timeout=2)
+    except FileNotFoundError:
+        with gps_lock:
+            gps_state['status'] = 'error'
+            gps_state['message'] = 'gpspipe not found. Run the installer or update.'
+    except Exception as e:
+        with gps_lock:
+            gps_state['status'] = 'error'
+            gps_state['message'] = str(e)
+    finally:
+        job = current_job()
+        with gps_lock:
+            if gps_state['status'] == 'acquiring' and job and job.cancelled:
+                gps_state['status'] = 'idle'
+                gps_state['message'] = 'GPS acquisition cancelled.'
+            elif gps_state['status'] == 'acquiring':
+                gps_state['status'] = 'timeout'
+                src_hint = 'network GPS' if source == 'network' else 'USB GPS'
+                gps_state['message'] = f'No GPS fix (timeout). Check {src_hint} connection and sky view.'
+            fix = {key: gps_state[key] for key in ('lat', 'lon', 'alt', 'accuracy_m', 'mode', 'satellites_used')} \
+                if gps_state['status'] == 'fix' else None
+        if fix:
+            publish_event('gps.fix', source=source, **fix)
+
+def _gps_acquisition_cancelled():
+    """on_cancel for a gps-acquire job cancelled while queued: its finally never runs"""
+    with gps_lock:
+        if gps_state['status'] == 'acquiring':
+            gps_state['status'] = 'idle'
+            gps_state['message'] = 'GPS acquisition cancelled.'
+
+def _gps_state_snapshot():
+    """Return a JSON-serializable snapshot of gps_state."""
+    with gps_lock:
+        return {
+            'status': gps_state['status'],
+            'message': gps_state['message'],
+            'lat': gps_state['lat'],
+            'lon': gps_state['lon'],
+            'alt': gps_state['alt'],
+            'accuracy_m': gps_state['accuracy_m'],
+            'satellites_used': gps_state['satellites_used'],
+            'mode': gps_state['mode'],
+            'log_lines': list(gps_state['log_lines']),
+        }
+
+@bp.route('/api/gps/start', methods=['POST'])
+def api_gps_start():
+    """Start background GPS acquisition. Frontend polls GET /api/gps/status for progress and result."""
+    import sys
+    sys.path.insert(0, '/opt/adsb/scripts')
+    from gps_provider import get_gps_source  # noqa: E402
+
+    env_vars = read_env()
+    source, host, port, protocol = get_gps_source(env_vars)
+
+    if source == 'disabled':
+        return jsonify({'success': False, 'message': 'GPS is disabled. Set GPS source in Settings → Location.'})
+
+    with gps_lock:
+        if gps_state['status'] == 'acquiring':
+            return jsonify({'success': True, 'message': 'Acquisition already in progress'})
+        gps_state['status'] = 'acquiring'
+        gps_state['message'] = 'Starting GPS...'
+        gps_state['lat'] = gps_state['lon'] = gps_state['alt'] = None
+        gps_state['accuracy_m'] = gps_state['satellites_used'] = gps_state['mode'] = None
+        gps_state['log_lines'] = []
+
+    # For USB and network-gpsd, gpspipe is required
+    if not (source == 'network' and protocol == 'nmea'):
+        if not shutil.which('gpspipe'):
+            with gps_lock:
+                gps_state['status'] = 'error'
+                gps_state['message'] = 'gpspipe not found. Run the installer or update.'
+            return jsonify({'success': False, 'message': gps_state['message']})
+
+    job = submit_job('gps-acquire', _gps_acquisition_job, resource='gps', on_cancel=_gps_acquisition_cancelled)
+    return jsonify({'success': True, 'job_id': job.id})
+
+@bp.route('/api/gps/status', methods=['GET'])
+def api_gps_status():
+    """Return current GPS acquisition status (for modal polling)."""
+    return jsonify(_gps_state_snapshot())
+
+@bp.route('/api/gps/check', methods=['GET'])
+def api_gps_check():
+    """Check GPS source status (USB gpsd, network gpsd, or NMEA). For status modal."""
+    import sys
+    sys.path.insert(0, '/opt/adsb/scripts')
+    from gps_provider import check_gps_status as _check_gps_status  # noqa: E402
+
+    env_vars = read_env()
+    result = _check_gps_status(env_vars)
+
+    # Map gps_provider result to the UI-expected format
+    out = {
+        'gpsd_running': result.get('details', {}).get('gpsd_running', result.get('source') != 'usb'),
+        'gps_present': result.get('available', False),
+        'message': result.get('message', ''),
+        'details': result.get('details', {}),
+        'source': result.get('source', 'usb'),
+        'protocol': result.get('protocol'),
+    }
+    return jsonify(out)
+
+@bp.route('/api/gps/apply-location', methods=['POST'])
+def api_gps_apply_location():
+    """
+    Write FEEDER_LAT/LONG/ALT_M from a completed GPS fix, enable MLAT, rebuild config, restart ultrafeeder.
+    Intended for dashboard mobile-mode "Force location re-sync" after GET /api/gps/status has a fix.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        lat = data.get('lat')
+        lon = data.get('lon')
+        alt = data.get('alt')
+
+        env = read_env()
+        deployment = (env.get('FEEDER_DEPLOYMENT_MODE') or 'stationary').strip().lower()
+        if deployment != 'mobile':
+            return jsonify({'success': False, 'message': 'Mobile deployment mode is not enabled'}), 403
+
+        try:
+            lat_f = float(lat)
+            lon_f = float(lon)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'Invalid latitude or longitude'}), 400
+
+        if not (-90.0 <= lat_f <= 90.0) or not (-180.0 <= lon_f <= 180.0):
+            return jsonify({'success': False, 'message': 'Latitude or longitude out of range'}), 400
+
+        if alt is not None and alt != '':
+            try:
+                alt_i = int(round(float(alt)))
+            except (TypeError, ValueError):
+                return jsonify({'success': False, 'message': 'Invalid altitude'}), 400
+        else:
+            try:
+                alt_i = int(env.get('FEEDER_ALT_M', '0') or '0')
+            except ValueError:
+                alt_i = 0
+
+        env['FEEDER_LAT'] = f'{lat_f:.5f}'
+        env['FEEDER_LONG'] = f'{lon_f:.5f}'
+        env['FEEDER_ALT_M'] = str(alt_i)
+        env['TAKNET_PS_MLAT_ENABLED'] = 'true'
+        write_env(env)
+
+        generation = restart_service()
+        return jsonify({
+            'success': True,
+            'message': 'Location saved, MLAT enabled, ultrafeeder restart initiated',
+            'restart_initiated': bool(generation),
+            'generation': generation,
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@bp.route('/api/mobile/status', methods=['GET'])
+def api_mobile_status():
+    """Mobile feeder mode: in-motion (GPS speed) and MLAT on/paused. Used by dashboard when FEEDER_DEPLOYMENT_MODE=mobile."""
+    env = read_env()
+    deployment = (env.get('FEEDER_DEPLOYMENT_MODE') or 'stationary').strip().lower()
+    if deployment != 'mobile':
+        return jsonify({
+            'success': True,
+            'mobile_mode_enabled': False,
+            'deployment_mode': deployment or 'stationary'
+        })
+    out = {
+        'success': True,
+        'mobile_mode_enabled': True,
+        'deployment_mode': 'mobile',
+        'in_motion': False,
+        'in_motion_unknown': True,
+        'speed_mps': None,
+        'mlat_on': env.get('TAKNET_PS_MLAT_ENABLED', 'true').lower() == 'true',
+        'mlat_paused': env.get('TAKNET_PS_MLAT_ENABLED', 'true').lower() != 'true',
+        'stationary_seconds': None,
+        'stationary_target_seconds': 60,
+        'awaiting_stationary_sync': False,
+        'daemon_message': None,
+    }
+    # Prefer daemon state file (authoritative mobile-mode-gps.py)
+    state_path = Path('/opt/adsb/var/mobile-mode-state.json')
+    if state_path.exists():
+        try:
+            st = json.loads(state_path.read_text())
+            if st.get('active'):
+                im = st.get('in_motion')
+                out['in_motion_unknown'] = im is None
+                if im is True:
+                    out['in_motion'] = True
+                elif im is False:
+                    out['in_motion'] = False
+                if st.get('speed_mps') is not None:
+                    out['speed_mps'] = st.get('speed_mps')
+                out['mlat_paused'] = bool(st.get('mlat_paused', out['mlat_paused']))
+                out['mlat_on'] = not out['mlat_paused']
+                out['stationary_seconds'] = st.get('stationary_seconds')
+                out['stationary_target_seconds'] = st.get('stationary_target_seconds', 60)
+                out['awaiting_stationary_sync'] = bool(st.get('awaiting_stationary_sync'))
+                out['daemon_message'] = st.get('message')
+            return jsonify(out)
+        except (json.JSONDecodeError, OSError):
+            pass
+    try:
+        import sys
+        sys.path.insert(0, '/opt/adsb/scripts')
+        from gps_provider import get_gps_source, build_gpspipe_cmd, read_nmea_tcp  # noqa: E402
+
+        source, host, port, protocol = get_gps_source(env)
+
+        if source == 'network' and protocol == 'nmea':
+            # Raw NMEA — try to get speed from TCP
+            if host:
+                fix = read_nmea_tcp(host, port, timeout=3.0)
+                if fix and fix.get('speed') is not None:
+                    out['in_motion_unknown'] = False
+                    out['speed_mps'] = round(float(fix['speed']), 2)
+                    out['in_motion'] = abs(fix['speed']) > 0.5
+        else:
+            cmd = build_gpspipe_cmd(env, n_lines=15, timeout=3)
+            if cmd:
+                r = command_runner.run(
+                    cmd,
+                    capture_output=True,
+                    text=True,
+                    timeout=5,
+                    cwd='/opt/adsb/scripts',
+                    env={**os.environ}
+                )
+                for line in (r.stdout or '').strip().splitlines():
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        obj = json.loads(line)
+                        if obj.get('class') == 'TPV' and obj.get('speed') is not None:
+                            out['in_motion_unknown'] = False
+                            speed = float(obj['speed'])
+                            out['speed_mps'] = round(speed, 2)
+                            out['in_motion'] = abs(speed) > 0.5
+                            break
+                    except (json.JSONDecodeError, TypeError, ValueError):
+                        continue
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        pass
+    except Exception:
+        pass
+    return jsonify(out)
+
+@bp.route('/api/gps/coordinates', methods=['GET'])
+def api_gps_coordinates():
+    """Legacy: single-shot GPS coordinates. Prefer POST /api/gps/start + GET /api/gps/status for modal flow."""
+    try:
+        # Try Python script first (source-aware), fall back to shell script
+        script = '/opt/adsb/scripts/get-gps-coordinates.py'
+        if not Path(script).exists():
+            script = '/opt/adsb/scripts/get-gps-coordinates.sh'
+        if not Path(script).exists():
+            return jsonify({'success': False, 'message': 'GPS script not found. Run the installer or update.'})
+        cmd = ['python3', script] if script.endswith('.py') else [script]
+        result = command_runner.run(
+            cmd,
+            capture_output=True,
+            text=True,
+            timeout=20,
+            cwd='/opt/adsb/scripts'
+        )
+        out = (result.stdout or '').strip()
+        if not out:
+            return jsonify({'success': False, 'message': 'No output from GPS. Check source configuration in Settings.'})
+        data = json.loads(out)
+        return jsonify(data)
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'message': 'GPS read timed out. Check GPS source and connection.'})
+    except json.JSONDecodeError as e:
+        return jsonify({'success': False, 'message': f'Invalid GPS output: {e}'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/gps/test-connection', methods=['POST'])
+def api_gps_test_connection():
+    """Test connectivity to a network GPS source (gpsd or NMEA-over-TCP)."""
+    import sys
+    sys.path.insert(0, '/opt/adsb/scripts')
+    from gps_provider import test_network_connection  # noqa: E402
+
+    data = request.json or {}
+    host = (data.get('host') or '').strip()
+    try:
+        port = int(data.get('port', 2947))
+    except (TypeError, ValueError):
+        port = 2947
+    protocol = (data.get('protocol') or 'gpsd').strip().lower()
+    if protocol not in ('gpsd', 'nmea'):
+        protocol = 'gpsd'
+
+    if not host:
+        return jsonify({'success': False, 'message': 'Host is required.'})
+
+    result = test_network_connection(host, port, protocol, timeout=5.0)
+    return jsonify(result)
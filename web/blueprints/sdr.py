@@ -0,0 +1,553 @@
+"""
+SDR APIs: detection, gain options, 1090/978 configuration and dump978.
+"""
+
+import subprocess
+import json
+
+from flask import Blueprint, request, jsonify
+
+from core import (
+    build_sdr_status, detect_all_sdrs, read_env, request_reconcile,
+    restart_service, soapy_find_sdrs, write_env,
+)
+import command_runner
+
+bp = Blueprint('sdr', __name__)
+
+def sdr_rescan_requested():
+    """True when the request asks to bypass the cached SDR inventory"""
+    return request.args.get('rescan', '').lower() in ('1', 'true', 'yes')
+
+@bp.route('/api/sdr/status', methods=['GET'])
+def api_sdr_status():
+    """Get detected SDR devices with configured values for dashboard read-only view"""
+    status = build_sdr_status(sdr_rescan_requested())
+    if 'error' in status:
+        return jsonify(status), 500
+    return jsonify(status)
+
+@bp.route('/api/sdr/detect', methods=['GET'])
+def api_sdr_detect():
+    """Detect connected SDR devices (cached until USB hotplug; ?rescan=1 forces a scan)"""
+    try:
+        env = read_env()
+        devices = []
+
+        for idx, found in enumerate(soapy_find_sdrs(sdr_rescan_requested())):
+            serial = found['serial']
+            driver = found['driver']
+            label  = found['label']
+
+            device = {
+                'index': idx,
+                'type': label or driver or 'RTL-SDR',
+                'serial': serial or 'Unknown',
+                'useFor': '',
+                'gain': 'auto',
+                'biastee': False
+            }
+
+            # Check if already configured
+            if serial and env.get('SDR_1090_SERIAL', '').strip() == serial:
+                device['useFor'] = '1090'
+                device['gain'] = env.get('SDR_1090_GAIN', 'auto')
+                device['biastee'] = env.get('READSB_ENABLE_BIASTEE', '').upper() == 'ON'
+            elif serial and env.get('SDR_978_SERIAL', '').strip() == serial:
+                device['useFor'] = '978'
+                device['gain'] = env.get('SDR_978_GAIN', '') or env.get('DUMP978_GAIN', 'auto')
+
+            devices.append(device)
+
+        return jsonify({'success': True, 'devices': devices})
+        
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'devices': [], 'error': 'SoapySDR detection timed out'}), 500
+    except FileNotFoundError:
+        return jsonify({'success': False, 'devices': [], 'error': 'SoapySDRUtil not found'}), 500
+    except Exception as e:
+        return jsonify({'success': False, 'devices': [], 'error': str(e)}), 500
+
+@bp.route('/api/sdr/configure', methods=['POST'])
+def api_sdr_configure():
+    """Save SDR configuration"""
+    try:
+        data = request.json
+        devices = data.get('devices', [])
+        
+        env = read_env()
+        
+        # Save each configured device
+        for device in devices:
+            if device.get('useFor'):
+                index = device.get('index')
+                use_for = device.get('useFor', '')
+                gain = device.get('gain', 'auto')
+                biastee = 'true' if device.get('biastee', False) else 'false'
+                
+                # Store as SDR_0=1090,auto,false
+                env[f'SDR_{index}'] = f"{use_for},{gain},{biastee}"
+                
+                # Set primary device (first 1090 device found)
+                if use_for == '1090' and 'READSB_DEVICE' not in env:
+                    env['READSB_DEVICE'] = str(index)
+                    env['READSB_GAIN'] = gain
+                    if biastee == 'true':
+                        env['READSB_ENABLE_BIASTEE'] = 'ON'
+        
+        write_env(env)
+        return jsonify({'success': True})
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+# =============================================================
+# Multi-SDR Detection & Configuration API Endpoints
+# =============================================================
+
+@bp.route('/api/sdrs/detect', methods=['GET'])
+def api_detect_sdrs():
+    """Detect all RTL-SDR devices (cached until USB hotplug; ?rescan=1 forces a scan)"""
+    try:
+        return jsonify(detect_all_sdrs(sdr_rescan_requested()))
+
+    except json.JSONDecodeError as e:
+        print(f"Error parsing SDR detection output: {e}")
+        return jsonify({
+            'count': 0,
+            'devices': [],
+            'error': 'Failed to parse detection output'
+        })
+    except RuntimeError as e:
+        print(f"SDR detection script failed: {e}")
+        return jsonify({
+            'count': 0,
+            'devices': [],
+            'error': str(e)
+        })
+    except subprocess.TimeoutExpired:
+        return jsonify({
+            'count': 0,
+            'devices': [],
+            'error': 'Detection timeout'
+        })
+    except Exception as e:
+        print(f"Error detecting SDRs: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'count': 0,
+            'devices': [],
+            'error': str(e)
+        })
+
+@bp.route('/api/sdrs/gain-options/<driver>', methods=['GET'])
+def api_gain_options(driver):
+    """Get valid gain options for a specific driver type"""
+    # Driver-specific gain options
+    gain_options = {
+        'rtlsdr': {
+            'options': [
+                'auto', '0.0', '0.9', '1.4', '2.7', '3.7', '7.7', '8.7',
+                '12.5', '14.4', '15.7', '16.6', '19.7', '20.7', '22.9',
+                '25.4', '28.0', '29.7', '32.8', '33.8', '36.4', '37.2',
+                '38.6', '40.2', '42.1', '43.4', '43.9', '44.5', '48.0', '49.6'
+            ],
+            'default': 'auto',
+            'recommended': 'auto',
+            'description': 'RTL-SDR supports auto or manual values 0.0-49.6 dB'
+        },
+        'airspy': {
+            'options': ['0', '3', '6', '9', '12', '15', '18', '21'],
+            'default': '21',
+            'recommended': '21',
+            'description': 'Airspy gain in steps of 3 dB (0-21). Recommended: 21 for maximum sensitivity'
+        },
+        'hackrf': {
+            'options': ['0', '8', '16', '24', '32', '40', '48'],
+            'default': '40',
+            'recommended': '40',
+            'description': 'HackRF gain in steps of 8 dB (0-48). Recommended: 40 for high gain'
+        },
+        'ftdi': {
+            'options': ['auto'],
+            'default': 'auto',
+            'recommended': 'auto',
+            'description': 'FTDI UATRadio does not support gain control'
+        }
+    }
+    
+    driver_lower = driver.lower()
+    if driver_lower in gain_options:
+        return jsonify({
+            'success': True,
+            'driver': driver_lower,
+            **gain_options[driver_lower]
+        })
+    else:
+        # Unknown driver, return generic options
+        return jsonify({
+            'success': True,
+            'driver': driver_lower,
+            'options': ['auto', '0', '10', '20', '30', '40', '50'],
+            'default': 'auto',
+            'recommended': 'auto',
+            'description': f'Generic gain options for {driver}'
+        })
+
+def validate_gain_for_driver(driver, gain):
+    """Validate gain value for specific driver - used in API"""
+    valid_gains = {
+        'rtlsdr': ['auto', '0.0', '0.9', '1.4', '2.7', '3.7', '7.7', '8.7',
+                   '12.5', '14.4', '15.7', '16.6', '19.7', '20.7', '22.9',
+                   '25.4', '28.0', '29.7', '32.8', '33.8', '36.4', '37.2',
+                   '38.6', '40.2', '42.1', '43.4', '43.9', '44.5', '48.0', '49.6'],
+        'airspy': ['0', '3', '6', '9', '12', '15', '18', '21'],
+        'hackrf': ['0', '8', '16', '24', '32', '40', '48'],
+        'ftdi': ['auto']
+    }
+    
+    defaults = {
+        'rtlsdr': 'auto',
+        'airspy': '21',
+        'hackrf': '40',
+        'ftdi': 'auto'
+    }
+    
+    if driver in valid_gains and gain in valid_gains[driver]:
+        return gain
+    
+    return defaults.get(driver, 'auto')
+
+@bp.route('/api/sdrs/configure', methods=['POST'])
+def api_configure_sdrs():
+    """Configure multiple SDRs based on user selections"""
+    try:
+        data = request.json
+        sdrs = data.get('sdrs', [])
+        
+        if not sdrs:
+            return jsonify({
+                'success': False,
+                'message': 'No SDR configuration provided'
+            }), 400
+        
+        env = read_env()
+        
+        # Reset SDR configuration
+        sdr_1090 = None
+        sdr_978 = None
+        
+        # Process each SDR
+        for sdr in sdrs:
+            index = sdr.get('index')
+            use = sdr.get('use')
+            gain = sdr.get('gain', 'auto')
+            device_type = sdr.get('type', 'rtlsdr')
+            device_path = sdr.get('device_path', str(index))
+            driver = sdr.get('driver', 'rtlsdr')  # Phase B
+            serial = sdr.get('serial', '')  # Phase B
+            
+            # Phase B: Validate gain for driver type
+            gain = validate_gain_for_driver(driver, gain)
+            
+            if use == '1090':
+                if sdr_1090 is not None:
+                    return jsonify({
+                        'success': False,
+                        'message': 'Cannot assign multiple SDRs to 1090 MHz'
+                    }), 400
+                sdr_1090 = sdr
+                env['READSB_DEVICE'] = str(index)
+                env['READSB_GAIN'] = gain
+                env['SDR_1090_DEVICE'] = str(index)
+                env['SDR_1090_TYPE'] = device_type
+                env['SDR_1090_PATH'] = device_path
+                env['SDR_1090_GAIN'] = gain
+                # Phase B: Add driver and serial
+                env['SDR_1090_DRIVER'] = driver
+                env['SDR_1090_SERIAL'] = serial
+                print(f"✓ SDR {index} ({driver}) configured for 1090 MHz (gain: {gain}, serial: {serial})")
+                
+            elif use == '978':
+                if sdr_978 is not None:
+                    return jsonify({
+                        'success': False,
+                        'message': 'Cannot assign multiple SDRs to 978 MHz'
+                    }), 400
+                sdr_978 = sdr
+                env['DUMP978_ENABLED'] = 'true'
+                env['DUMP978_DEVICE'] = str(index)
+                env['DUMP978_GAIN'] = gain
+                env['SDR_978_DEVICE'] = str(index)
+                env['SDR_978_TYPE'] = device_type
+                env['SDR_978_PATH'] = device_path
+                env['SDR_978_GAIN'] = gain
+                # Phase B: Add driver and serial
+                env['SDR_978_DRIVER'] = driver
+                env['SDR_978_SERIAL'] = serial
+                print(f"✓ SDR {index} ({driver}) configured for 978 MHz (gain: {gain}, serial: {serial})")
+        
+        # Validate we have at least one SDR configured
+        if sdr_1090 is None and sdr_978 is None:
+            return jsonify({
+                'success': False,
+                'message': 'At least one SDR must be assigned'
+            }), 400
+        
+        # Disable 978 MHz if not configured
+        if sdr_978 is None:
+            if env.get('DUMP978_FORCE_OVERRIDE', 'false') != 'true':
+                env['DUMP978_ENABLED'] = 'false'
+                print("ℹ 978 MHz UAT disabled (no SDR assigned)")
+            else:
+                env['DUMP978_ENABLED'] = 'true'
+                print("ℹ 978 MHz UAT kept enabled due to force override")
+        
+        # Write environment
+        write_env(env)
+        
+        # Rebuild configuration (applied with the restart that follows)
+        generation = request_reconcile('SDR configuration saved', services=[])
+        return jsonify({
+            'success': True,
+            'message': 'SDR configuration saved',
+            'generation': generation,
+            'config': {
+                '1090_mhz': sdr_1090 is not None,
+                '978_mhz': sdr_978 is not None
+            }
+        })
+        
+    except Exception as e:
+        print(f"Error configuring SDRs: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@bp.route('/api/sdrs/force-dump978', methods=['POST'])
+def api_force_dump978():
+    """Toggle the dump978 daemon force override"""
+    try:
+        data = request.json
+        force = data.get('force', False)
+        env = read_env()
+        
+        if force:
+            env['DUMP978_ENABLED'] = 'true'
+            env['DUMP978_FORCE_OVERRIDE'] = 'true'
+            
+            # Ensure compatible keys for config_builder
+            if not env.get('DUMP978_DEVICE') or env.get('DUMP978_DEVICE') == 'disabled':
+                env['DUMP978_DEVICE'] = '1'
+            if not env.get('DUMP978_GAIN'):
+                env['DUMP978_GAIN'] = 'auto'
+                
+            env['SDR_978_DEVICE'] = env['DUMP978_DEVICE']
+            env['SDR_978_PATH'] = env['DUMP978_DEVICE']
+            env['SDR_978_GAIN'] = env['DUMP978_GAIN']
+            env['SDR_978_TYPE'] = 'rtlsdr'
+            print("ℹ Forced UAT on via override")
+        else:
+            # When unforcing, we clear the override flag
+            env['DUMP978_FORCE_OVERRIDE'] = 'false'
+            
+            # CRITICAL: Check if a physical SDR is assigned to 978 before disabling.
+            # Physical SDR assignments (via the radio table) always set 'SDR_978_SERIAL'.
+            # Virtual 'Force' toggles never set this variable. We check if it has a non-empty value.
+            physical_sdr_present = bool(env.get('SDR_978_SERIAL', '').strip())
+            
+            if not physical_sdr_present:
+                # It was a purely virtual toggle, so we should actually disable and cleanup
+                env['DUMP978_ENABLED'] = 'false'
+                env['DUMP978_DEVICE'] = 'disabled'
+                env['SDR_978_DEVICE'] = 'disabled'
+                env['SDR_978_PATH'] = 'disabled'
+                
+                print("ℹ Force override removed and no physical SDR found; disabling UAT")
+                
+                # Explicitly stop the virtual container in the background (non-blocking)
+                try:
+                    command_runner.Popen(['docker', 'compose', 'stop', '-t', '1', 'dump978'], cwd='/opt/adsb/config')
+                    command_runner.Popen(['docker', 'compose', 'rm', '-f', 'dump978'], cwd='/opt/adsb/config')
+                except Exception:
+                    pass
+            else:
+                # A physical SDR is still assigned in the radio table!
+                # We KEEP DUMP978 enabled, just remove the force-override flag.
+                env['DUMP978_ENABLED'] = 'true'
+                print("ℹ Force override removed, but keeping UAT active for physical SDR")
+            
+        write_env(env)
+        generation = request_reconcile('UAT force override changed', services=[])
+        return jsonify({'success': True, 'generation': generation})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@bp.route('/api/sdrs/current-config', methods=['GET'])
+def api_get_current_sdr_config():
+    """Get current SDR configuration from environment"""
+    try:
+        env = read_env()
+        
+        config = {
+            'readsb_device': env.get('READSB_DEVICE', '0'),
+            'readsb_gain': env.get('READSB_GAIN', 'auto'),
+            'dump978_enabled': env.get('DUMP978_ENABLED', 'false') == 'true',
+            'dump978_force_override': env.get('DUMP978_FORCE_OVERRIDE', 'false') == 'true',
+            'dump978_device': env.get('DUMP978_DEVICE', '1'),
+            'dump978_gain': env.get('DUMP978_GAIN', 'auto')
+        }
+        
+        return jsonify(config)
+        
+    except Exception as e:
+        print(f"Error getting current SDR config: {e}")
+        return jsonify({}), 500
+
+# =============================================================
+# 978 MHz UAT / dump978 API Endpoints
+# =============================================================
+
+@bp.route('/api/dump978/status', methods=['GET'])
+def api_dump978_status():
+    """Get dump978 container status"""
+    try:
+        env = read_env()
+        enabled = env.get('DUMP978_ENABLED', 'false') == 'true'
+        
+        if not enabled:
+            return jsonify({
+                'success': True,
+                'enabled': False,
+                'running': False,
+                'message': '978 MHz UAT is disabled'
+            })
+        
+        # Check if container is running
+        result = command_runner.run(
+            ['docker', 'ps', '--filter', 'name=dump978', '--format', '{{.Status}}'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        
+        running = result.returncode == 0 and result.stdout.strip() != ''
+        
+        return jsonify({
+            'success': True,
+            'enabled': True,
+            'running': running,
+            'message': 'Running' if running else 'Container not running'
+        })
+        
+    except Exception as e:
+        print(f"Error checking dump978 status: {e}")
+        return jsonify({
+            'success': False,
+            'enabled': False,
+            'running': False,
+            'error': str(e)
+        }), 500
+
+@bp.route('/api/dump978/enable', methods=['POST'])
+def api_dump978_enable():
+    """Enable 978 MHz UAT via dump978 container"""
+    import urllib.request
+    try:
+        # Check if docker-compose.yml has dump978 service (upgrade detection)
+        compose_file = '/opt/adsb/config/docker-compose.yml'
+        needs_update = False
+        
+        try:
+            with open(compose_file, 'r') as f:
+                compose_content = f.read()
+                if 'dump978:' not in compose_content:
+                    print("⚠ docker-compose.yml missing dump978 service - upgrading from older version")
+                    needs_update = True
+        except Exception as e:
+            print(f"Error reading docker-compose.yml: {e}")
+            return jsonify({
+                'success': False,
+                'message': 'Failed to read docker-compose.yml'
+            }), 500
+        
+        # If upgrading, download latest docker-compose.yml
+        if needs_update:
+            print("→ Updating docker-compose.yml with dump978 service...")
+            try:
+                url = 'https://raw.githubusercontent.com/cfd2474/TAKNET-PS_ADS-B_Feeder/main/config/docker-compose.yml'
+                urllib.request.urlretrieve(url, compose_file)
+                print("✓ docker-compose.yml updated")
+            except Exception as e:
+                print(f"Error downloading docker-compose.yml: {e}")
+                return jsonify({
+                    'success': False,
+                    'message': f'Failed to update docker-compose.yml: {str(e)}'
+                }), 500
+        
+        # Update environment with all dump978 variables
+        env = read_env()
+        env['DUMP978_ENABLED'] = 'true'
+        # Add dump978 vars if they don't exist (upgrade from older version)
+        if 'DUMP978_DEVICE' not in env:
+            env['DUMP978_DEVICE'] = '1'
+        if 'DUMP978_GAIN' not in env:
+            env['DUMP978_GAIN'] = 'auto'
+        write_env(env)
+        
+        # One rebuild (adds the UAT connector) and one compose up for dump978
+        # and ultrafeeder; naming dump978 starts it despite its compose profile
+        generation = request_reconcile('978 MHz UAT enabled', services=['dump978', 'ultrafeeder'])
+        return jsonify({
+            'success': True,
+            'message': '978 MHz UAT enabled. Restarting services...',
+            'generation': generation
+        })
+        
+    except Exception as e:
+        print(f"Error enabling dump978: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@bp.route('/api/dump978/disable', methods=['POST'])
+def api_dump978_disable():
+    """Disable 978 MHz UAT"""
+    try:
+        # Stop and remove container
+        command_runner.run(
+            ['docker', 'compose', 'stop', 'dump978'],
+            cwd='/opt/adsb/config',
+            capture_output=True,
+            timeout=10
+        )
+        
+        command_runner.run(
+            ['docker', 'compose', 'rm', '-f', 'dump978'],
+            cwd='/opt/adsb/config',
+            capture_output=True,
+            timeout=10
+        )
+        
+        # Update environment
+        env = read_env()
+        env['DUMP978_ENABLED'] = 'false'
+        write_env(env)
+        
+        # Rebuild configuration to remove UAT connector and restart ultrafeeder
+        generation = restart_service()
+        return jsonify({
+            'success': True,
+            'message': '978 MHz UAT disabled',
+            'generation': generation
+        })
+        
+    except Exception as e:
+        print(f"Error disabling dump978: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': str(e)}), 500
@@ -0,0 +1,1880 @@
+"""
+System APIs: config, services, dashboard bootstrap, logs, network status,
+updates, health, /metrics and the debug endpoints.
+"""
+
+import subprocess
+import os
+import re
+import shutil
+from pathlib import Path
+import json
+import concurrent.futures
+import threading
+import time
+import socket
+import math
+from collections import deque
+import sys
+
+from flask import Blueprint, current_app, request, jsonify, make_response
+from werkzeug.test import EnvironBuilder
+
+from core import (
+    atomic_write_text, bind_request_scope, build_adsbhub_stats, build_fr24_stats,
+    build_piaware_stats, build_sdr_status, build_taknet_stats, cancel_job,
+    classify_link_quality, ENV_FILE, EVENT_TYPES, get_docker_status,
+    get_image_prepull_status, get_job, get_netbird_state, get_network_facts,
+    get_reconcile_status, get_service_state, get_update_availability,
+    image_prepull_lock, image_prepull_state, invalidate_netbird_state,
+    LINK_QUALITY_DEFAULT_TARGET, LINK_QUALITY_INTERVAL, link_quality_lock,
+    link_quality_state, LINK_QUALITY_WINDOW, link_quality_windows, link_window_stats,
+    list_jobs, load_health_state, METRIC_COLLECTORS, metric_observe, network_facts,
+    network_facts_lock, new_link_window, progress_lock, read_container_tcp_connections,
+    read_env, read_events, rebuild_config, render_metrics, request_image_prepull,
+    request_reconcile, restart_service, sdr_inventory_stats, service_progress,
+    start_link_quality_sampler, taknet_ps_beast_status_port, update_check_lock,
+    update_check_state, VERSION, wait_reconcile, write_env,
+)
+import command_runner
+import ttl_cache
+
+bp = Blueprint('system', __name__)
+
+# TAKNET-PS Server hardcoded connection details - NEVER allow user to change these
+TAK_PROTECTED_SETTINGS = {
+    'TAKNET_PS_SERVER_HOST_VPN': 'vpn.tak-solutions.com',
+    'TAKNET_PS_SERVER_HOST_FALLBACK': 'adsb.tak-solutions.com',
+    'TAKNET_PS_SERVER_PORT': '30004',
+    'TAKNET_PS_CONNECTION_MODE': 'auto'
+}
+
+# Power status tracking
+POWER_STATUS_FILE = '/opt/adsb/data/power_status.json'
+
+POWER_ISSUE_CLEAR_TIME = 3600  # 1 hour - time to keep showing warning after last issue
+
+def get_power_status():
+    """
+    Check voltage/throttling status on Raspberry Pi
+    Returns dict with current and historical status
+    """
+    status = {
+        'current_issue': False,
+        'past_issue': False,
+        'undervoltage_now': False,
+        'throttled_now': False,
+        'undervoltage_past': False,
+        'throttled_past': False,
+        'message': '',
+        'last_issue_time': 0
+    }
+    
+    try:
+        # Check if running on Raspberry Pi
+        result = command_runner.run(
+            ['vcgencmd', 'get_throttled'],
+            capture_output=True, text=True, timeout=2
+        )
+        
+        if result.returncode == 0:
+            # Parse output: throttled=0x50000
+            output = result.stdout.strip()
+            if 'throttled=' in output:
+                hex_value = output.split('=')[1].strip()
+                throttled_value = int(hex_value, 16)
+                
+                # Bit 0: Under-voltage detected
+                # Bit 1: Arm frequency capped
+                # Bit 2: Currently throttled
+                # Bit 16: Under-voltage has occurred
+                # Bit 17: Arm frequency capping has occurred
+                # Bit 18: Throttling has occurred
+                
+                # Check current issues (bits 0-2)
+                status['undervoltage_now'] = bool(throttled_value & 0x1)
+                status['throttled_now'] = bool(throttled_value & 0x4)
+                status['current_issue'] = status['undervoltage_now'] or status['throttled_now']
+                
+                # Check past issues (bits 16-18)
+                status['undervoltage_past'] = bool(throttled_value & 0x10000)
+                status['throttled_past'] = bool(throttled_value & 0x40000)
+                
+                # Load stored status to track when last issue occurred
+                if os.path.exists(POWER_STATUS_FILE):
+                    with open(POWER_STATUS_FILE, 'r') as f:
+                        stored = json.load(f)
+                        status['last_issue_time'] = stored.get('last_issue_time', 0)
+                
+                # Update last issue time if current issue
+                if status['current_issue']:
+                    status['last_issue_time'] = int(time.time())
+                    # Save to file
+                    os.makedirs(os.path.dirname(POWER_STATUS_FILE), exist_ok=True)
+                    with open(POWER_STATUS_FILE, 'w') as f:
+                        json.dump({'last_issue_time': status['last_issue_time']}, f)
+                
+                # Determine if we should show past issue warning
+                if not status['current_issue'] and (status['undervoltage_past'] or status['throttled_past']):
+                    # Show warning if within clear time
+                    time_since_issue = int(time.time()) - status['last_issue_time']
+                    if time_since_issue < POWER_ISSUE_CLEAR_TIME and status['last_issue_time'] > 0:
+                        status['past_issue'] = True
+                
+                # Build message
+                if status['current_issue']:
+                    issues = []
+                    if status['undervoltage_now']:
+                        issues.append('under-voltage')
+                    if status['throttled_now']:
+                        issues.append('CPU throttling')
+                    status['message'] = f"⚠️ {' and '.join(issues).title()} detected"
+                elif status['past_issue']:
+                    status['message'] = 'ℹ️ Previous power issues detected'
+                
+    except FileNotFoundError:
+        # vcgencmd not available (not a Raspberry Pi)
+        pass
+    except Exception as e:
+        print(f"Error checking power status: {e}")
+    
+    return status
+
+# =============================================================
+# Log streaming (shared followers, ring buffer, cursor long-poll)
+# =============================================================
+# One `docker logs -f` / `journalctl -f` per source feeds a bounded ring
+# buffer that every viewer reads from by sequence-number cursor. A follower
+# stops after LOG_STREAM_IDLE_TIMEOUT with no viewers and resumes from where
+# it left off (docker --since timestamp, journald --after-cursor).
+LOG_STREAM_BUFFER_LINES = 2000
+
+LOG_STREAM_INITIAL_LINES = 500
+
+LOG_STREAM_IDLE_TIMEOUT = 60  # seconds without a poll before the follower stops
+
+LOG_STREAM_MAX_WAIT = 25  # seconds a long-poll may block
+
+LOG_LEVEL_RANK = {'error': 3, 'warning': 2, 'success': 1, 'info': 1, 'other': 0}
+
+_LOG_LEVEL_PATTERNS = (
+    ('error', re.compile(r'error|failed|fatal|critical', re.IGNORECASE)),
+    ('warning', re.compile(r'warning|warn', re.IGNORECASE)),
+    ('success', re.compile(r'success|started|connected|running', re.IGNORECASE)),
+    ('info', re.compile(r'info|notice', re.IGNORECASE)),
+)
+
+log_streams_lock = threading.Lock()
+
+log_streams = {}  # source -> stream dict (see _new_log_stream)
+
+def classify_log_line(line):
+    """Same keyword buckets logs.html colours by"""
+    for level, pattern in _LOG_LEVEL_PATTERNS:
+        if pattern.search(line):
+            return level
+    return 'other'
+
+_DOCKER_TS_RE = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z$')
+
+def _docker_ts_key(ts):
+    """Sortable form of an RFC3339Nano timestamp (docker trims trailing zeros)"""
+    base, _, frac = ts.rstrip('Z').partition('.')
+    return base + '.' + frac.ljust(9, '0')
+
+def _log_follow_command(source, resume):
+    """Follower command for source, resuming after `resume` when set"""
+    if source == 'ultrafeeder':
+        cmd = ['docker', 'logs', '--follow', '--timestamps']
+        cmd += ['--since', resume] if resume else ['--tail', str(LOG_STREAM_INITIAL_LINES)]
+        return cmd + ['ultrafeeder']
+    if source == 'tailscale':
+        cmd = ['journalctl', '-u', 'tailscaled', '--follow', '--no-pager', '-o', 'json']
+        cmd += ['--after-cursor', resume] if resume else ['-n', str(LOG_STREAM_INITIAL_LINES)]
+        return cmd
+    return None
+
+def _parse_log_output(source, raw, stream):
+    """(display line, resume cursor) for one line of follower output, or (None, None) to skip"""
+    text = raw.decode('utf-8', errors='replace')
+    if source == 'ultrafeeder':
+        # "2024-01-01T00:00:00.123456789Z message"; docker's own errors have no timestamp
+        ts, _, line = text.partition(' ')
+        if not _DOCKER_TS_RE.match(ts):
+            return text, None
+        if stream['resume'] and _docker_ts_key(ts) <= _docker_ts_key(stream['resume']):
+            return None, None  # --since is inclusive; drop lines already buffered
+        return line, ts
+    if source == 'tailscale':
+        try:
+            entry = json.loads(text)
+        except ValueError:
+            return text, None
+        message = entry.get('MESSAGE', '')
+        if isinstance(message, list):  # journald encodes non-UTF-8 messages as byte arrays
+            message = bytes(message).decode('utf-8', errors='replace')
+        try:
+            when = time.strftime('%b %d %H:%M:%S', time.localtime(int(entry['__REALTIME_TIMESTAMP']) / 1e6))
+        except (KeyError, ValueError):
+            when = ''
+        ident = entry.get('SYSLOG_IDENTIFIER', 'tailscaled')
+        pid = entry.get('_PID')
+        line = f"{when} {entry.get('_HOSTNAME', '')} {ident}{f'[{pid}]' if pid else ''}: {message}"
+        return line, entry.get('__CURSOR')
+    return text, None
+
+def _new_log_stream():
+    return {
+        'cond': threading.Condition(),
+        'lines': deque(maxlen=LOG_STREAM_BUFFER_LINES),  # (seq, line, level)
+        'seq': 0,
+        'resume': None,       # docker timestamp / journald cursor of the last line
+        'running': False,
+        'last_access': time.time(),
+        'ready': threading.Event(),  # set once the initial tail has been read
+        'error': None
+    }
+
+def _log_stream_reader(source, stream):
+    """Background thread: run the follower, append lines, stop when nobody is watching"""
+    import select
+    try:
+        while time.time() - stream['last_access'] < LOG_STREAM_IDLE_TIMEOUT:
+            cmd = _log_follow_command(source, stream['resume'])
+            try:
+                proc = command_runner.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            except FileNotFoundError:
+                stream['error'] = f'Service {source} not found or not installed'
+                stream['ready'].set()
+                return
+
+            pending = b''
+            try:
+                while time.time() - stream['last_access'] < LOG_STREAM_IDLE_TIMEOUT:
+                    readable, _, _ = select.select([proc.stdout], [], [], 1.0)
+                    if not readable:
+                        # A quiet second after start means the initial tail is in
+                        stream['ready'].set()
+                        continue
+                    chunk = os.read(proc.stdout.fileno(), 65536)
+                    if not chunk:
+                        break  # follower exited (e.g. container restarted)
+                    pending += chunk
+                    *complete, pending = pending.split(b'\n')
+                    new_lines = []
+                    for raw in complete:
+                        line, resume = _parse_log_output(source, raw, stream)
+                        if line is None:
+                            continue
+                        if resume:
+                            stream['resume'] = resume
+                        new_lines.append(line)
+                    if new_lines:
+                        with stream['cond']:
+                            for line in new_lines:
+                                stream['seq'] += 1
+                                stream['lines'].append((stream['seq'], line, classify_log_line(line)))
+                            stream['cond'].notify_all()
+            finally:
+                if proc.poll() is None:
+                    proc.terminate()
+                    try:
+                        proc.wait(timeout=5)
+                    except subprocess.TimeoutExpired:
+                        proc.kill()
+                stream['ready'].set()
+            time.sleep(2)  # don't spin if the follower keeps exiting
+    finally:
+        with log_streams_lock:
+            stream['running'] = False
+
+def get_log_stream(source):
+    """Shared stream for source, (re)starting its follower if needed"""
+    with log_streams_lock:
+        stream = log_streams.setdefault(source, _new_log_stream())
+        stream['last_access'] = time.time()
+        if not stream['running']:
+            stream['running'] = True
+            stream['error'] = None
+            threading.Thread(target=_log_stream_reader, args=(source, stream), daemon=True).start()
+    return stream
+
+def read_log_stream(stream, cursor, wait, min_level=None, pattern=None):
+    """
+    Lines after `cursor` (seq), blocking up to `wait` seconds for new ones.
+    cursor None returns the whole buffer. Returns (lines, next_cursor, reset):
+    reset is True when lines between cursor and the buffer start were lost.
+    """
+    deadline = time.time() + wait
+    with stream['cond']:
+        while True:
+            first_seq = stream['lines'][0][0] if stream['lines'] else stream['seq'] + 1
+            if cursor is None or stream['seq'] > cursor or time.time() >= deadline:
+                break
+            stream['cond'].wait(max(0.0, deadline - time.time()))
+        reset = cursor is not None and cursor + 1 < first_seq
+        entries = [e for e in stream['lines'] if cursor is None or e[0] > cursor]
+        next_cursor = stream['seq']
+
+    min_rank = LOG_LEVEL_RANK.get(min_level, 0)
+    lines = [
+        {'seq': seq, 'line': line, 'level': level}
+        for seq, line, level in entries
+        if LOG_LEVEL_RANK[level] >= min_rank and (pattern is None or pattern.search(line))
+    ]
+    return lines, next_cursor, reset
+
+@bp.route('/api/logs/<source>')
+def get_logs(source):
+    """Fetch logs from various sources (full text; see /api/logs/<source>/stream for incremental)"""
+    try:
+        if source in ('ultrafeeder', 'tailscale'):
+            # Served from the shared follower's buffer
+            stream = get_log_stream(source)
+            stream['ready'].wait(10)
+            if stream['error']:
+                return jsonify({'success': False, 'message': stream['error']})
+            with stream['cond']:
+                logs = '\n'.join(line for _, line, _ in list(stream['lines'])[-LOG_STREAM_INITIAL_LINES:])
+            
+        elif source == 'vnstat':
+            # Get vnstat hour and day reports
+            hour_result = command_runner.run(['vnstat', '-h'],
+                                       capture_output=True, text=True, timeout=10)
+            day_result = command_runner.run(['vnstat', '-d'],
+                                      capture_output=True, text=True, timeout=10)
+            logs = "=== HOURLY REPORT ===\n" + hour_result.stdout + "\n\n=== DAILY REPORT ===\n" + day_result.stdout
+            
+        else:
+            return jsonify({'success': False, 'message': f'Unknown log source: {source}'})
+        
+        if not logs or logs.strip() == '':
+            logs = f'No logs available for {source}'
+        
+        return jsonify({'success': True, 'logs': logs})
+        
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'message': 'Timeout while fetching logs'})
+    except FileNotFoundError:
+        return jsonify({'success': False, 'message': f'Service {source} not found or not installed'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/logs/<source>/stream')
+def get_logs_stream(source):
+    """
+    Incremental logs by cursor (long-poll).
+    ?cursor=<seq> returns only newer lines, waiting up to ?wait= seconds
+    (max 25) for some to arrive; omit cursor for the buffered tail.
+    ?level=error|warning|info filters by minimum level, ?q= by regex.
+    """
+    if source not in ('ultrafeeder', 'tailscale'):
+        return jsonify({'success': False, 'message': f'Streaming not supported for log source: {source}'}), 404
+
+    try:
+        cursor = request.args.get('cursor')
+        cursor = int(cursor) if cursor not in (None, '') else None
+        wait = min(float(request.args.get('wait', LOG_STREAM_MAX_WAIT)), LOG_STREAM_MAX_WAIT) if cursor is not None else 0
+    except ValueError:
+        return jsonify({'success': False, 'message': 'cursor and wait must be numbers'}), 400
+
+    level = request.args.get('level') or None
+    if level and level not in LOG_LEVEL_RANK:
+        return jsonify({'success': False, 'message': f'Unknown level: {level}'}), 400
+    pattern = None
+    q = request.args.get('q')
+    if q:
+        try:
+            pattern = re.compile(q[:200], re.IGNORECASE)
+        except re.error as e:
+            return jsonify({'success': False, 'message': f'Invalid filter: {e}'}), 400
+
+    stream = get_log_stream(source)
+    if cursor is None:
+        stream['ready'].wait(10)
+    if stream['error']:
+        return jsonify({'success': False, 'message': stream['error']})
+
+    lines, next_cursor, reset = read_log_stream(stream, cursor, wait, level, pattern)
+    response = jsonify({
+        'success': True,
+        'source': source,
+        'lines': lines,
+        'cursor': next_cursor,
+        'reset': reset
+    })
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/api/config', methods=['GET'])
+def get_config():
+    """Get current configuration"""
+    return jsonify(read_env())
+
+# Whitelist of environment variables that can be modified via web UI
+CONFIG_WHITELIST = {
+    'FEEDER_LAT', 'FEEDER_LONG', 'FEEDER_ALT_M', 'FEEDER_TZ',
+    'MLAT_SITE_NAME', 'FEEDER_DEPLOYMENT_MODE',
+    'GPS_SOURCE', 'GPS_NETWORK_HOST', 'GPS_NETWORK_PORT', 'GPS_NETWORK_PROTOCOL',
+    'TAKNET_PS_ENABLED', 'TAKNET_PS_MLAT_ENABLED', 'TAKNET_PS_FEEDER_CLAIM_KEY', 'TAKNET_PS_FEEDER_MAC',
+    'TUNNEL_AGGREGATOR_URL', 'TUNNEL_FEEDER_ID',
+    'SDR_1090_SERIAL', 'SDR_1090_GAIN', 'SDR_1090_DRIVER', 'SDR_1090_DEVICE', 'USE_SOAPYSDR',
+    'FR24_ENABLED', 'FR24_KEY', 'FR24_SHARING_KEY',
+    'ADSBFI_ENABLED', 'ADSBLOL_ENABLED', 'ADSBX_ENABLED', 'AIRPLANESLIVE_ENABLED', 'ADSBHUB_ENABLED', 'PIAWARE_ENABLED',
+    'PIAWARE_FEEDER_ID', 'ADSBHUB_STATION_KEY',
+    'DUMP978_ENABLED', 'DUMP978_FORCE_OVERRIDE', 'DUMP978_DEVICE', 'DUMP978_GAIN', 
+    'SDR_978_DEVICE', 'SDR_978_TYPE', 'SDR_978_PATH', 'SDR_978_GAIN',
+    'NETBIRD_ENABLED', 'NETBIRD_SETUP_KEY', 'NETBIRD_MANAGEMENT_URL',
+    'TAILSCALE_AUTH_KEY', 'TAILSCALE_HOSTNAME',
+    'FEEDER_UUID'
+}
+
+@bp.route('/api/config', methods=['POST'])
+def save_config():
+    """
+    Save configuration with security whitelisting
+    CRITICAL: User can only toggle TAKNET_PS_ENABLED, cannot change connection host/port details
+    """
+    try:
+        data = request.json
+        env = read_env()
+        
+        # 1. Filter input against the whitelist
+        sanitized_data = {}
+        for key, value in data.items():
+            if key in CONFIG_WHITELIST:
+                sanitized_data[key] = value
+            else:
+                print(f"Skipping unauthorized config key: {key}")
+
+        # 2. PROTECT TAK CONNECTION SETTINGS (Secondary safety layer)
+        # User cannot change core TAK connection details even if they tried to bypass UI
+        tak_protected_keys = ['TAKNET_PS_SERVER_HOST', 'TAKNET_PS_SERVER_HOST_VPN',
+                              'TAKNET_PS_SERVER_HOST_FALLBACK', 'TAKNET_PS_SERVER_PORT',
+                              'TAKNET_PS_CONNECTION_MODE']
+        
+        for key in tak_protected_keys:
+            if key in sanitized_data:
+                del sanitized_data[key]
+        
+        # 3. Specific validation for deployment mode
+        if 'FEEDER_DEPLOYMENT_MODE' in sanitized_data:
+            v = str(sanitized_data['FEEDER_DEPLOYMENT_MODE']).strip().lower()
+            sanitized_data['FEEDER_DEPLOYMENT_MODE'] = v if v in ('stationary', 'mobile') else 'stationary'
+        
+        # 4. Update env with sanitized data
+        for key, value in sanitized_data.items():
+            env[key] = str(value)
+        
+        # 5. Reset protected TAK connection settings to hardcoded values
+        for key, value in TAK_PROTECTED_SETTINGS.items():
+            env[key] = value
+        
+        # Write to file
+        write_env(env)
+        
+        # Rebuild ULTRAFEEDER_CONFIG once the user stops saving (the restart
+        # that usually follows joins the same run)
+        generation = request_reconcile('settings saved', services=[])
+        
+        # Handle automated NetBird registration (moved from install.sh)
+        try:
+            if shutil.which('netbird') and env.get('NETBIRD_SETUP_KEY'):
+                site_name = env.get('MLAT_SITE_NAME', 'taknet-ps-feeder')
+                command_runner.run(['systemctl', 'start', 'netbird'], timeout=10)
+                time.sleep(1)
+                
+                # If we have a setup key but we aren't enabled/connected, force logout to clear stale state
+                is_connected = get_netbird_state(force=True)['connected']
+                
+                if not is_connected:
+                    # Clear any stale states before reconnecting
+                    command_runner.run(['netbird', 'logout'], capture_output=True, timeout=10)
+                    
+                    # Run netbird up
+                    cmd = [
+                        'netbird', 'up',
+                        '--setup-key', env['NETBIRD_SETUP_KEY'],
+                        '--management-url', env.get('NETBIRD_MANAGEMENT_URL', 'https://netbird.tak-solutions.com'),
+                        '--disable-dns',
+                        '--allow-server-ssh',
+                        '--enable-ssh-root',
+                        '--hostname', site_name
+                    ]
+                    command_runner.run(cmd, capture_output=True, timeout=45)
+                    invalidate_netbird_state()
+                    
+                    # Mark as enabled
+                    env['NETBIRD_ENABLED'] = 'true'
+                    write_env(env)
+        except Exception as e:
+            print(f"NetBird auto-enroll failed: {e}")
+        
+        return jsonify({'success': True, 'message': 'Configuration saved', 'generation': generation})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@bp.route('/api/power-status', methods=['GET'])
+def api_power_status():
+    """Get current power/throttling status"""
+    try:
+        status = get_power_status()
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({
+            'current_issue': False,
+            'past_issue': False,
+            'message': '',
+            'error': str(e)
+        })
+
+@bp.route('/api/service/restart', methods=['POST'])
+def api_restart_service():
+    """Restart ultrafeeder service"""
+    try:
+        # Rebuild config and restart; a rebuild failure is reported through
+        # /api/service/progress and /api/reconcile
+        generation = restart_service()
+        if generation:
+            return jsonify({'success': True, 'message': 'Service restarting', 'generation': generation})
+        else:
+            return jsonify({
+                'success': False, 
+                'message': 'Failed to restart ultrafeeder service. Check journalctl -u ultrafeeder for details.'
+            }), 500
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Exception: {str(e)}'}), 500
+
+@bp.route('/api/service/ready', methods=['GET'])
+def api_service_ready():
+    """Check if ultrafeeder container is running and ready"""
+    try:
+        docker_status = get_docker_status()
+        
+        # Check if ultrafeeder container exists and is running
+        ultrafeeder_running = False
+        for container_name, status in docker_status.items():
+            if 'ultrafeeder' in container_name.lower():
+                # Check if status contains "Up" (Docker shows "Up X seconds/minutes")
+                if 'Up' in status:
+                    ultrafeeder_running = True
+                    break
+        
+        return jsonify({
+            'ready': ultrafeeder_running,
+            'containers': docker_status
+        })
+    except Exception as e:
+        return jsonify({
+            'ready': False,
+            'error': str(e)
+        }), 500
+
+@bp.route('/api/service/progress', methods=['GET'])
+def api_service_progress():
+    """Get current service installation progress"""
+    with progress_lock:
+        return jsonify(service_progress)
+
+# =============================================================
+# Background jobs (see core: submit_job)
+# =============================================================
+
+@bp.route('/api/jobs', methods=['GET'])
+def api_jobs():
+    """Queued, running and recently finished jobs, newest first (?kind= to filter)"""
+    jobs = [job.snapshot() for job in list_jobs(request.args.get('kind') or None)]
+    return jsonify({'success': True, 'jobs': jobs})
+
+@bp.route('/api/jobs/<job_id>', methods=['GET'])
+def api_job(job_id):
+    """One job with its progress events (?since=<seq> for only newer ones)"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        since = 0
+    return jsonify({'success': True, 'job': job.snapshot(since=since)})
+
+@bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_job_cancel(job_id):
+    """Cancel a queued job or stop a running one"""
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    return jsonify({'success': True, 'job': job.snapshot()})
+
+@bp.route('/api/reconcile', methods=['GET'])
+def api_reconcile():
+    """
+    Reconciler state (see core: request_reconcile). ?wait=<generation> blocks
+    until that generation has been applied, for at most ?timeout= seconds
+    (default and maximum 60); done is false if it timed out.
+    """
+    try:
+        generation = int(request.args.get('wait', 0))
+        timeout = min(max(float(request.args.get('timeout', 60)), 0), 60)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'wait and timeout must be numbers'}), 400
+    done = wait_reconcile(generation, timeout) if generation else True
+    return jsonify({'success': True, 'done': done, **get_reconcile_status()})
+
+EVENTS_MAX_WAIT = 25  # seconds a long-poll may block (tunnel timeouts are longer)
+
+@bp.route('/api/events', methods=['GET'])
+def api_events():
+    """
+    Internal event bus (see core: publish_event) by cursor (long-poll).
+    ?cursor=<seq> returns only newer events, waiting up to ?wait= seconds
+    (max 25) for one; omit cursor for the kept history. ?types=a,b filters.
+    reset is true when events after the cursor were already dropped.
+    """
+    try:
+        cursor = request.args.get('cursor')
+        cursor = int(cursor) if cursor not in (None, '') else None
+        wait = min(max(float(request.args.get('wait', EVENTS_MAX_WAIT)), 0), EVENTS_MAX_WAIT) if cursor is not None else 0
+    except ValueError:
+        return jsonify({'success': False, 'message': 'cursor and wait must be numbers'}), 400
+    types = {t for t in request.args.get('types', '').split(',') if t} or None
+    unknown = sorted((types or set()) - set(EVENT_TYPES))
+    if unknown:
+        return jsonify({'success': False, 'message': f"Unknown event type(s): {', '.join(unknown)}"}), 400
+
+    events, next_cursor, reset = read_events(cursor, types, wait)
+    response = jsonify({'success': True, 'events': events, 'cursor': next_cursor, 'reset': reset})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/api/images/prepull', methods=['GET', 'POST'])
+def api_images_prepull():
+    """
+    Image pre-pull status: per-image local/registry digests and pending bytes.
+    POST re-checks the registry now; POST with {"pull": true} also pulls
+    pending images immediately instead of waiting for the window.
+    """
+    try:
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            request_image_prepull(check=True, pull=bool(data.get('pull')))
+            return jsonify({'success': True, 'message': 'Pre-pull check scheduled'})
+        status = get_image_prepull_status()
+        status['success'] = True
+        return jsonify(status)
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@bp.route('/api/status', methods=['GET'])
+def api_status():
+    """Get system status"""
+    docker_status = get_docker_status()
+    env = read_env()
+    
+    # Parse ULTRAFEEDER_CONFIG to show active feeds
+    config_str = env.get('ULTRAFEEDER_CONFIG', '')
+    feeds = []
+    if config_str:
+        for part in config_str.split(';'):
+            if part.startswith('adsb,'):
+                parts = part.split(',')
+                if len(parts) >= 2:
+                    feeds.append(parts[1])  # hostname
+    
+    # Get service states
+    service_states = {
+        'ultrafeeder': get_service_state('ultrafeeder'),
+        'fr24': get_service_state('fr24') if env.get('FR24_ENABLED') == 'true' else None,
+        'piaware': get_service_state('piaware') if env.get('PIAWARE_ENABLED') == 'true' else None,
+        'adsbx': get_service_state('adsbx') if env.get('ADSBX_ENABLED') == 'true' else None,
+        'adsblol': get_service_state('adsblol') if env.get('ADSBLOL_ENABLED') == 'true' else None
+    }
+    
+    return jsonify({
+        'docker': docker_status,
+        'feeds': feeds,
+        'configured': env.get('FEEDER_LAT', '0.0') != '0.0',
+        'service_states': service_states
+    })
+
+def build_community_stats(service_name, prefix=''):
+    env = read_env()
+    enabled_var = f"{service_name.upper()}_ENABLED"
+    if env.get(enabled_var, 'false').lower() != 'true':
+        return {'enabled': False, 'success': False}
+
+    feeder_id = (env.get('MLAT_SITE_NAME') or env.get('TUNNEL_FEEDER_ID') or socket.gethostname() or 'feeder').strip()
+    feeder_uuid = env.get('FEEDER_UUID', '').strip()
+    
+    # All these feeders are integrated into ultrafeeder. 
+    # If ultrafeeder is running and the feeder is enabled, it's 'active'.
+    is_active = get_service_state('ultrafeeder') == 'running'
+    
+    stats_url = '#'
+    # Use UUID if available for community stats links to prevent 404s
+    link_id = feeder_uuid if feeder_uuid else feeder_id
+    
+    # Prefix is passed in from main thread
+    # Now uses passed-in prefix instead of accessing flask.request directly (context-safe for threads)
+    
+    if service_name == 'adsbx':
+        # Reverted to UUID pattern: https://www.adsbexchange.com/api/feeders/?feed=UUID
+        stats_url = f"https://www.adsbexchange.com/api/feeders/?feed={link_id}"
+    elif service_name == 'adsbfi':
+        # Proxy through feeder to use feeder's public IP
+        stats_url = f"{prefix}/api/stats/proxy/adsbfi"
+    elif service_name == 'adsblol':
+        # Proxy through feeder to use feeder's public IP
+        stats_url = f"{prefix}/api/stats/proxy/adsblol"
+    elif service_name == 'airplaneslive':
+        # Proxy through feeder to use feeder's public IP
+        stats_url = f"{prefix}/api/stats/proxy/airplaneslive"
+        
+    return {
+        'enabled': True,
+        'success': True,
+        'data_feed_active': is_active,
+        'mlat_active': is_active,
+        'mlat_enabled': service_name != 'adsbhub',
+        'stats_url': stats_url
+    }
+
+@bp.route('/api/dashboard/core-services', methods=['GET'])
+def api_dashboard_core_services():
+    """Lightweight endpoint for polling just the core service states at high frequency."""
+    prefix = request.headers.get('X-Forwarded-Prefix', '')
+    docker_status = get_docker_status()
+    env = read_env()
+    
+    tunnel_running = False
+    try:
+        res = command_runner.run(['systemctl', 'is-active', 'tunnel-client'], capture_output=True, text=True, timeout=1)
+        tunnel_running = (res.returncode == 0 and res.stdout.strip() == 'active')
+    except Exception:
+        pass
+
+    def get_comm_state(name, prefix):
+        stats = build_community_stats(name, prefix)
+        if not stats.get('enabled', False):
+            return 'not_installed'
+        return 'running' if stats.get('data_feed_active', False) else 'stopped'
+
+    def get_service_state_vsafe(name, env_key, docker_status):
+        if env.get(env_key, '').lower() != 'true':
+            return 'not_installed'
+        return get_service_state(name, docker_status)
+
+    service_states = {
+        'ultrafeeder': get_service_state('ultrafeeder', docker_status),
+        'dump978': get_service_state_vsafe('dump978', 'DUMP978_ENABLED', docker_status),
+        'fr24': get_service_state_vsafe('fr24', 'FR24_ENABLED', docker_status),
+        'piaware': get_service_state_vsafe('piaware', 'PIAWARE_ENABLED', docker_status),
+        'adsbx': get_comm_state('adsbx', prefix),
+        'adsbfi': get_comm_state('adsbfi', prefix),
+        'adsblol': get_comm_state('adsblol', prefix),
+        'airplaneslive': get_comm_state('airplaneslive', prefix),
+        'adsbhub': get_service_state_vsafe('adsbhub', 'ADSBHUB_ENABLED', docker_status),
+        'autoheal': get_service_state('autoheal', docker_status),
+        'mobile_mode_gps': get_service_state('mobile-mode-gps', docker_status) if env.get('FEEDER_DEPLOYMENT_MODE') == 'mobile' else None,
+        'tunnel_client': 'running' if tunnel_running else 'stopped'
+    }
+
+    response = jsonify({'service_states': service_states})
+    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    return response
+
+def build_dashboard_status(prefix=''):
+    """Docker/service-state section of the dashboard bootstrap."""
+    docker_status = get_docker_status()
+    env = read_env()
+    config_str = env.get('ULTRAFEEDER_CONFIG', '')
+    feeds = []
+    if config_str:
+        for part in config_str.split(';'):
+            if part.startswith('adsb,'):
+                parts = part.split(',')
+                if len(parts) >= 2:
+                    feeds.append(parts[1])
+    # Tunnel client status check
+    tunnel_running = False
+    try:
+        res = command_runner.run(['systemctl', 'is-active', 'tunnel-client'], capture_output=True, text=True, timeout=1)
+        tunnel_running = (res.returncode == 0 and res.stdout.strip() == 'active')
+    except Exception:
+        pass
+
+    def get_comm_state(name, prefix):
+        stats = build_community_stats(name, prefix)
+        if not stats.get('enabled', False):
+            return 'not_installed'
+        return 'running' if stats.get('data_feed_active', False) else 'stopped'
+
+    def get_service_state_vsafe(name, env_key, docker_status):
+        if env.get(env_key, '').lower() != 'true':
+            return 'not_installed'
+        return get_service_state(name, docker_status)
+
+    ultrafeeder_running = get_service_state('ultrafeeder', docker_status)
+    service_states = {
+        'ultrafeeder': ultrafeeder_running,
+        'dump978': get_service_state_vsafe('dump978', 'DUMP978_ENABLED', docker_status),
+        'fr24': get_service_state_vsafe('fr24', 'FR24_ENABLED', docker_status),
+        'piaware': get_service_state_vsafe('piaware', 'PIAWARE_ENABLED', docker_status),
+        'adsbx': get_comm_state('adsbx', prefix),
+        'adsbfi': get_comm_state('adsbfi', prefix),
+        'adsblol': get_comm_state('adsblol', prefix),
+        'airplaneslive': get_comm_state('airplaneslive', prefix),
+        'adsbhub': get_service_state_vsafe('adsbhub', 'ADSBHUB_ENABLED', docker_status),
+        'autoheal': get_service_state('autoheal', docker_status),
+        'mobile_mode_gps': get_service_state('mobile-mode-gps', docker_status) if env.get('FEEDER_DEPLOYMENT_MODE') == 'mobile' else None,
+        'tunnel_client': 'running' if tunnel_running else 'stopped'
+    }
+    return {
+        'docker': docker_status,
+        'feeds': feeds,
+        'configured': env.get('FEEDER_LAT', '0.0') != '0.0',
+        'service_states': service_states,
+    }
+
+def get_primary_ip():
+    """Source address the kernel would use to reach the internet (no packets sent)"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('8.8.8.8', 80))
+        ip = s.getsockname()[0]
+    except Exception:
+        ip = '127.0.0.1'
+    finally:
+        s.close()
+    return ip
+
+def build_network_status():
+    """Internet reachability, primary/public IP and hostname for the dashboard (cached, non-blocking)."""
+    facts = get_network_facts()
+    return {
+        'internet': facts['internet'],
+        'ip_address': get_primary_ip(),
+        'public_ip': facts['public_ip'] or ('Unknown' if facts['checked_at'] else None),
+        'hostname': socket.gethostname(),
+        'checked_at': facts['checked_at'],
+    }
+
+def build_power_status():
+    try:
+        return get_power_status()
+    except Exception as e:
+        return {
+            'current_issue': False,
+            'past_issue': False,
+            'message': '',
+            'error': str(e),
+        }
+
+# Dashboard bootstrap sections: key -> (builder, takes_prefix, fallback on error).
+# Every builder is request-context-free so all of them can run concurrently.
+DASHBOARD_SECTIONS = {
+    'status': (build_dashboard_status, True, {}),
+    'network_status': (build_network_status, False, {}),
+    'power_status': (build_power_status, False, {}),
+    'sdr_status': (build_sdr_status, False, {}),
+    'taknet_stats': (build_taknet_stats, False, {'success': False}),
+    'fr24_stats': (build_fr24_stats, False, {'enabled': True, 'success': False}),
+    'piaware_stats': (build_piaware_stats, False, {'enabled': True, 'success': False}),
+    'adsbhub_stats': (build_adsbhub_stats, False, {'enabled': True, 'success': False}),
+    'adsbfi_stats': (lambda prefix: build_community_stats('adsbfi', prefix), True, {'enabled': True, 'success': False}),
+    'adsblol_stats': (lambda prefix: build_community_stats('adsblol', prefix), True, {'enabled': True, 'success': False}),
+    'adsbx_stats': (lambda prefix: build_community_stats('adsbx', prefix), True, {'enabled': True, 'success': False}),
+    'airplaneslive_stats': (lambda prefix: build_community_stats('airplaneslive', prefix), True, {'enabled': True, 'success': False}),
+}
+
+# Global deadline for /api/dashboard/bootstrap. Sections still running when it
+# expires keep going in the background; the response carries their last known
+# value marked 'stale', or a 'pending' placeholder if they never completed.
+DASHBOARD_BOOTSTRAP_DEADLINE = 4.0  # seconds
+
+dashboard_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=len(DASHBOARD_SECTIONS), thread_name_prefix='dashboard'
+)
+
+dashboard_section_lock = threading.Lock()
+
+dashboard_section_inflight = {}  # (section, prefix) -> Future
+
+dashboard_section_last = {}      # (section, prefix) -> {'result', 'finished_at', 'ms'}
+
+def _run_dashboard_section(key, prefix):
+    """Run one bootstrap builder and record its result and duration."""
+    builder, takes_prefix, fallback = DASHBOARD_SECTIONS[key]
+    started = time.monotonic()
+    try:
+        result = builder(prefix) if takes_prefix else builder()
+    except Exception as e:
+        result = {**fallback, 'error': str(e)}
+    elapsed = time.monotonic() - started
+    elapsed_ms = round(elapsed * 1000, 1)
+    metric_observe('taknet_dashboard_section_duration_seconds', elapsed, {'section': key})
+    with dashboard_section_lock:
+        dashboard_section_last[(key, prefix)] = {
+            'result': result,
+            'finished_at': time.time(),
+            'ms': elapsed_ms,
+        }
+        dashboard_section_inflight.pop((key, prefix), None)
+    return result, elapsed_ms
+
+def _submit_dashboard_section(key, prefix):
+    """Submit a section builder, joining a run already in flight from an earlier request."""
+    with dashboard_section_lock:
+        fut = dashboard_section_inflight.get((key, prefix))
+        if fut is None:
+            fut = dashboard_executor.submit(bind_request_scope(_run_dashboard_section), key, prefix)
+            if not fut.done():
+                dashboard_section_inflight[(key, prefix)] = fut
+        return fut
+
+@bp.route('/api/dashboard/bootstrap', methods=['GET'])
+def api_dashboard_bootstrap():
+    """Aggregate dashboard data for fast load. Connection quality is NOT included — use GET /api/network-quality separately (slow ping)."""
+    # Capture prefix in main thread (which has request context)
+    prefix = request.headers.get('X-Forwarded-Prefix', '')
+    started = time.monotonic()
+
+    futures = {key: _submit_dashboard_section(key, prefix) for key in DASHBOARD_SECTIONS}
+    concurrent.futures.wait(list(futures.values()), timeout=DASHBOARD_BOOTSTRAP_DEADLINE)
+
+    results = {}
+    sections = {}
+    now = time.time()
+    for key, fut in futures.items():
+        if fut.done():
+            result, elapsed_ms = fut.result()
+            results[key] = result
+            sections[key] = {'state': 'fresh', 'ms': elapsed_ms}
+            continue
+        waited_ms = round((time.monotonic() - started) * 1000, 1)
+        with dashboard_section_lock:
+            last = dashboard_section_last.get((key, prefix))
+        if last and isinstance(last['result'], dict):
+            age = round(now - last['finished_at'], 1)
+            results[key] = {**last['result'], 'stale': True, 'age_seconds': age}
+            sections[key] = {'state': 'stale', 'ms': waited_ms, 'last_ms': last['ms'], 'age_seconds': age}
+        else:
+            results[key] = {'pending': True}
+            sections[key] = {'state': 'pending', 'ms': waited_ms}
+
+    results['timings'] = {
+        'total_ms': round((time.monotonic() - started) * 1000, 1),
+        'deadline_ms': int(DASHBOARD_BOOTSTRAP_DEADLINE * 1000),
+        'sections': sections,
+    }
+    response = jsonify(results)
+    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    return response
+
+# =============================================================
+# Batched GET requests (/api/batch)
+# =============================================================
+# Over the aggregator tunnel every request is a full WebSocket round trip.
+# A page POSTs the GETs it needs on load as one batch; each runs in-process
+# through Flask's normal dispatch (hooks, error handlers, metrics per route)
+# on a worker thread, sharing the batch's RequestScope so .env and docker ps
+# are read once for all of them.
+BATCH_MAX_REQUESTS = 16
+
+BATCH_DEADLINE = 30.0  # seconds; sub-requests still running are reported as 504
+
+BATCH_FEEDER_PREFIX = re.compile(r'^/feeder/[^/]+(?=/)')
+
+# Long-poll endpoints may hold a worker for up to a minute; one batch of them
+# would occupy the shared pool and time out every other client's batch
+BATCH_REJECTED_PATHS = re.compile(r'^/api/(batch|events|reconcile|logs/[^/]+/stream)$')
+
+BATCH_FORWARDED_HEADERS = ('Accept', 'Accept-Language', 'Cookie', 'User-Agent', 'X-Forwarded-Prefix')
+
+batch_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=BATCH_MAX_REQUESTS, thread_name_prefix='batch'
+)
+
+def _run_batch_item(app, environ):
+    """Dispatch one GET like a real request; returns its result entry"""
+    started = time.monotonic()
+    with app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            try:
+                response = app.handle_exception(e)
+            except Exception:
+                response = app.make_response((jsonify({'success': False, 'error': str(e)}), 500))
+        body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+        response.close()
+    return {
+        'status': response.status_code,
+        'content_type': response.content_type,
+        'body': body,
+        'ms': round((time.monotonic() - started) * 1000, 1),
+    }
+
+@bp.route('/api/batch', methods=['POST'])
+def api_batch():
+    """
+    Run several GET requests in one round trip.
+    Body: {"requests": ["/api/wifi/status", {"path": "/api/system/version?refresh=1"}, ...]}
+    Returns {"success": true, "responses": [{"path", "status", "content_type", "body", "ms"}, ...]}
+    in request order, each "path" as sent; a failing sub-request only affects its own entry.
+    Long-poll endpoints (/api/events, /api/reconcile, /api/logs/<source>/stream) are rejected.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'success': False, 'error': 'requests must be a non-empty list'}), 400
+    if len(items) > BATCH_MAX_REQUESTS:
+        return jsonify({'success': False, 'error': f'At most {BATCH_MAX_REQUESTS} requests per batch'}), 400
+
+    paths = []
+    for item in items:
+        path = item.get('path') if isinstance(item, dict) else item
+        # Pages rewritten by the aggregator carry /feeder/<id>/api/...; strip it like the tunnel does
+        local = BATCH_FEEDER_PREFIX.sub('', path) if isinstance(path, str) else None
+        if not local or not local.startswith('/api/') or BATCH_REJECTED_PATHS.match(local.split('?')[0]):
+            return jsonify({'success': False, 'error': f'Invalid batch path: {path!r}'}), 400
+        paths.append((path, local))
+
+    app = current_app._get_current_object()
+    headers = [(name, request.headers[name]) for name in BATCH_FORWARDED_HEADERS if name in request.headers]
+    environ_base = {'REMOTE_ADDR': request.remote_addr, 'taknet.batch': True}
+    futures = []
+    for _, local in paths:
+        builder = EnvironBuilder(path=local, method='GET', base_url=request.host_url.rstrip('/') + request.script_root,
+                                 headers=headers, environ_base=environ_base)
+        try:
+            environ = builder.get_environ()
+        finally:
+            builder.close()
+        futures.append(batch_executor.submit(bind_request_scope(_run_batch_item), app, environ))
+    concurrent.futures.wait(futures, timeout=BATCH_DEADLINE)
+
+    responses = []
+    for (path, _), fut in zip(paths, futures):
+        if fut.done() and fut.exception() is None:
+            responses.append({'path': path, **fut.result()})
+        elif fut.done():
+            responses.append({'path': path, 'status': 500, 'content_type': 'application/json',
+                              'body': {'success': False, 'error': str(fut.exception())}, 'ms': None})
+        else:
+            responses.append({'path': path, 'status': 504, 'content_type': 'application/json',
+                              'body': {'success': False, 'error': 'Timed out'}, 'ms': None})
+    response = jsonify({'success': True, 'responses': responses})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/api/service/<service_name>/state', methods=['GET'])
+def api_service_state(service_name):
+    """Get state of a specific service"""
+    state = get_service_state(service_name)
+    return jsonify({
+        'service': service_name,
+        'state': state
+    })
+
+@bp.route('/api/service/<service_name>/restart', methods=['POST'])
+def api_restart_individual_service(service_name):
+    """Restart an individual service (ultrafeeder, fr24, piaware, netbird, or tailscale)"""
+    try:
+        valid_services = ['ultrafeeder', 'fr24', 'piaware', 'netbird', 'tailscale', 'tunnel-client']
+        if service_name not in valid_services:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid service name. Must be one of: {", ".join(valid_services)}'
+            }), 400
+
+        # Rebuild config if restarting ultrafeeder
+        if service_name == 'ultrafeeder':
+            config_ok = rebuild_config()
+            if not config_ok:
+                return jsonify({
+                    'success': False,
+                    'message': 'Configuration rebuild failed. Check logs for details.'
+                }), 500
+
+        # FR24/PiAware run as Docker Compose services, not systemd units.
+        if service_name in ['fr24', 'piaware']:
+            compose_file = '/opt/adsb/config/docker-compose.yml'
+            env_file = str(ENV_FILE)
+            result = command_runner.run(
+                ['docker', 'compose', '-f', compose_file, '--env-file', env_file, 'restart', service_name],
+                capture_output=True, text=True, timeout=60
+            )
+        # NetBird on feeder runs as a systemd service.
+        elif service_name == 'netbird':
+            result = command_runner.run(
+                ['sudo', 'systemctl', 'restart', 'netbird'],
+                capture_output=True, text=True, timeout=30
+            )
+        else:
+            result = command_runner.run(
+                ['sudo', 'systemctl', 'restart', service_name],
+                capture_output=True, text=True, timeout=30
+            )
+        
+        if result.returncode == 0:
+            return jsonify({
+                'success': True,
+                'message': f'{service_name} service restarted successfully'
+            })
+        else:
+            return jsonify({
+                'success': False,
+                'message': f'Failed to restart {service_name}: {result.stderr}'
+            }), 500
+            
+    except subprocess.TimeoutExpired:
+        return jsonify({
+            'success': False,
+            'message': f'{service_name} restart timed out'
+        }), 500
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Exception: {str(e)}'
+        }), 500
+
+@bp.route('/api/service/<service_name>/status', methods=['GET'])
+def api_service_status(service_name):
+    """Check if a service is running"""
+    try:
+        valid_services = ['ultrafeeder', 'fr24', 'piaware', 'tailscale', 'tunnel-client']
+        if service_name not in valid_services:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid service name. Must be one of: {", ".join(valid_services)}'
+            }), 400
+        
+        if service_name in ['fr24', 'piaware']:
+            # Container services: inspect Docker state directly.
+            result = command_runner.run(
+                ['docker', 'inspect', '--format={{.State.Status}}', service_name],
+                capture_output=True, text=True, timeout=10
+            )
+            status_text = result.stdout.strip() if result.returncode == 0 else 'not_installed'
+            is_running = status_text == 'running'
+        else:
+            # Systemd-managed services.
+            result = command_runner.run(
+                ['systemctl', 'is-active', service_name],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            status_text = result.stdout.strip()
+            is_running = result.returncode == 0 and status_text == 'active'
+
+        return jsonify({
+            'service': service_name,
+            'running': is_running,
+            'status': status_text
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'service': service_name,
+            'running': False,
+            'error': str(e)
+        })
+
+@bp.route('/api/network-status', methods=['GET'])
+def api_network_status():
+    """Get network connectivity status"""
+    # Setup wizard calls this once at load; right after boot, give the first
+    # probe a moment rather than reporting offline.
+    facts = get_network_facts(wait=4)
+    
+    return jsonify({
+        'internet': bool(facts['internet']),
+        'ip_address': get_primary_ip(),
+        'hostname': socket.gethostname()
+    })
+
+@bp.route('/api/network-quality', methods=['GET'])
+def api_network_quality():
+    """Connection quality from the rolling sample window. Returns poor/moderate/good."""
+    try:
+        start_link_quality_sampler()
+        with link_quality_lock:
+            target_names = list(link_quality_state['targets'])
+            taknet_host = link_quality_state['taknet_host']
+            targets = {name: link_window_stats(link_quality_windows[name])
+                       for name in target_names if name in link_quality_windows}
+
+        for target_stats in targets.values():
+            target_stats['quality'] = classify_link_quality(target_stats)
+
+        # Headline quality comes from the first configured target (default 8.8.8.8)
+        primary = target_names[0] if target_names else LINK_QUALITY_DEFAULT_TARGET
+        stats = dict(targets.get(primary) or link_window_stats(new_link_window()))
+        stats['quality'] = classify_link_quality(stats)
+
+        return jsonify({
+            'success': True,
+            **stats,
+            'target': primary,
+            'taknet_host': taknet_host,
+            'window_seconds': LINK_QUALITY_WINDOW * LINK_QUALITY_INTERVAL,
+            'targets': targets
+        })
+
+    except Exception as e:
+        return jsonify({'success': False, 'quality': 'unknown', 'error': str(e)})
+
+@bp.route('/api/network-quality/history', methods=['GET'])
+def api_network_quality_history():
+    """Time series for one target (?target=, default primary): [[ts, rtt_ms|null], ...] oldest first"""
+    start_link_quality_sampler()
+    with link_quality_lock:
+        target = request.args.get('target') or (
+            link_quality_state['targets'][0] if link_quality_state['targets'] else LINK_QUALITY_DEFAULT_TARGET)
+        window = link_quality_windows.get(target)
+        if window is None:
+            return jsonify({'success': False, 'target': target, 'samples': [],
+                            'targets': list(link_quality_state['targets']),
+                            'error': 'No samples for target'}), 404
+
+        count = window['count']
+        start = (window['pos'] - count) % LINK_QUALITY_WINDOW
+        samples = []
+        for i in range(count):
+            idx = (start + i) % LINK_QUALITY_WINDOW
+            rtt = window['rtt'][idx]
+            samples.append([round(window['ts'][idx], 1), None if math.isnan(rtt) else round(rtt, 1)])
+        stats = link_window_stats(window)
+
+    return jsonify({
+        'success': True,
+        'target': target,
+        'interval_seconds': LINK_QUALITY_INTERVAL,
+        'samples': samples,
+        'stats': stats
+    })
+
+# ============================================================================
+# SYSTEM UPDATE ENDPOINTS
+# ============================================================================
+
+@bp.route('/api/system/version', methods=['GET'])
+def get_system_version():
+    """Get current version and cached update status (?refresh=1 revalidates now)"""
+    try:
+        refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+        status = get_update_availability(refresh=refresh)
+        status['success'] = True
+
+        error = status.pop('error')
+        if status['release_info'] is None:
+            # Nothing fetched yet (first check pending or offline)
+            status['error'] = f'Update check failed: {error}' if error else 'Could not check for updates'
+
+        return jsonify(status)
+    
+    except Exception as e:
+        print(f"❌ Error in get_system_version: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+SCHEDULED_UPDATE_FLAG = Path('/opt/adsb/var/scheduled-update')
+
+@bp.route('/api/system/update/schedule', methods=['POST'])
+def schedule_overnight_update():
+    """Schedule update to run at 02:00 local time (priority 2)."""
+    try:
+        SCHEDULED_UPDATE_FLAG.parent.mkdir(parents=True, exist_ok=True)
+        SCHEDULED_UPDATE_FLAG.touch()
+        return jsonify({
+            'success': True,
+            'message': 'Update scheduled for 02:00 overnight'
+        })
+    except Exception as e:
+        print(f"Error scheduling update: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/system/update/schedule/status', methods=['GET'])
+def scheduled_update_status():
+    """Check if an overnight update is scheduled."""
+    return jsonify({
+        'success': True,
+        'scheduled': SCHEDULED_UPDATE_FLAG.exists()
+    })
+
+@bp.route('/api/system/periodic-reboot/settings', methods=['POST'])
+def periodic_reboot_settings():
+    """
+    Save periodic reboot settings (Priority 3).
+    The reboot itself is triggered by a cron checker script, not by this request.
+    """
+    try:
+        data = request.json or {}
+
+        enabled_raw = data.get('enabled', False)
+        enabled = str(enabled_raw).strip().lower() in ('1', 'true', 'yes', 'on', 'enabled')
+
+        unit = (data.get('interval_unit') or 'daily').strip().lower()
+        if unit not in ('hourly', 'daily', 'weekly'):
+            unit = 'daily'
+
+        try:
+            count = int(data.get('interval_count', 1))
+        except Exception:
+            count = 1
+        count = max(1, min(count, 3650))
+
+        time_str = (data.get('reboot_time') or '02:00').strip()
+        hh = mm = None
+        if ':' in time_str:
+            parts = time_str.split(':', 1)
+            if len(parts) == 2:
+                try:
+                    hh = int(parts[0])
+                    mm = int(parts[1])
+                except Exception:
+                    hh = mm = None
+        if hh is None or mm is None or not (0 <= hh <= 23 and 0 <= mm <= 59):
+            hh, mm = 2, 0
+
+        # Hourly schedule must occur on the hour.
+        if unit == 'hourly':
+            mm = 0
+        time_str = f"{hh:02d}:{mm:02d}"
+
+        weekday = data.get('interval_weekday', 2)
+        try:
+            weekday = int(weekday)
+        except Exception:
+            weekday = 2
+        weekday = max(0, min(6, weekday))
+
+        env = read_env()
+        env['PERIODIC_REBOOT_ENABLED'] = 'true' if enabled else 'false'
+        env['PERIODIC_REBOOT_INTERVAL_UNIT'] = unit
+        env['PERIODIC_REBOOT_INTERVAL_COUNT'] = str(count)
+        env['PERIODIC_REBOOT_TIME'] = time_str
+        env['PERIODIC_REBOOT_WEEKDAY'] = str(weekday)
+        write_env(env)
+
+        return jsonify({
+            'success': True,
+            'message': 'Periodic reboot settings saved'
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/system/update', methods=['POST'])
+def trigger_system_update():
+    """Trigger system update process"""
+    def is_update_process_running():
+        """Best-effort check for updater/install update processes."""
+        def has_update_match(lines):
+            for line in lines:
+                cmd = (line or '').lower()
+                if 'pgrep -af' in cmd:
+                    continue
+                if 'updater.sh' in cmd or 'taknet_installer_update.sh' in cmd:
+                    return True
+                if 'install.sh' in cmd and '--update' in cmd:
+                    return True
+            return False
+
+        try:
+            result = command_runner.run(
+                ['pgrep', '-af', r'updater\.sh|taknet_installer_update\.sh|install\.sh.*--update'],
+                capture_output=True,
+                text=True,
+                timeout=3
+            )
+            if result.returncode == 0 and has_update_match((result.stdout or '').splitlines()):
+                return True
+        except Exception:
+            pass
+
+        # Fallback for environments where pgrep may be unavailable.
+        try:
+            result = command_runner.run(
+                ['ps', '-eo', 'args'],
+                capture_output=True,
+                text=True,
+                timeout=3
+            )
+            return has_update_match((result.stdout or '').splitlines())
+        except Exception:
+            return False
+
+    try:
+        # If a priority-2 scheduled update has been queued for 02:00,
+        # clear it so "Update Now" doesn't trigger a second run.
+        try:
+            if SCHEDULED_UPDATE_FLAG.exists():
+                SCHEDULED_UPDATE_FLAG.unlink()
+        except Exception:
+            pass
+
+        # Check if update is already running
+        update_lock = Path('/tmp/taknet_update.lock')
+        if update_lock.exists():
+            if is_update_process_running():
+                return jsonify({
+                    'success': False,
+                    'message': 'Update already in progress'
+                }), 409
+            # Stale lock from an interrupted update; clear and continue.
+            try:
+                update_lock.unlink()
+            except Exception:
+                return jsonify({
+                    'success': False,
+                    'message': 'Stale update lock detected but could not be cleared. Remove /tmp/taknet_update.lock and retry.'
+                }), 409
+        
+        # Create lock file
+        update_lock.touch()
+        
+        # Run updater script in background
+        updater_script = Path('/opt/adsb/scripts/updater.sh')
+        
+        if not updater_script.exists():
+            update_lock.unlink()
+            return jsonify({
+                'success': False,
+                'message': 'Updater script not found'
+            }), 404
+        
+        # Start update process in background
+        # Output will be logged to /tmp/taknet_update.log
+        command_runner.Popen(
+            ['sudo', 'bash', str(updater_script)],
+            stdout=open('/tmp/taknet_update.log', 'w'),
+            stderr=subprocess.STDOUT
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Update started',
+            'log_file': '/tmp/taknet_update.log'
+        })
+    
+    except Exception as e:
+        # Clean up lock file on error
+        if update_lock.exists():
+            update_lock.unlink()
+        
+        print(f"❌ Error in trigger_system_update: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/system/update/status', methods=['GET'])
+def get_update_status():
+    """Get status of ongoing update"""
+    def is_update_process_running():
+        def has_update_match(lines):
+            for line in lines:
+                cmd = (line or '').lower()
+                if 'pgrep -af' in cmd:
+                    continue
+                if 'updater.sh' in cmd or 'taknet_installer_update.sh' in cmd:
+                    return True
+                if 'install.sh' in cmd and '--update' in cmd:
+                    return True
+            return False
+
+        try:
+            result = command_runner.run(
+                ['pgrep', '-af', r'updater\.sh|taknet_installer_update\.sh|install\.sh.*--update'],
+                capture_output=True,
+                text=True,
+                timeout=3
+            )
+            if result.returncode == 0 and has_update_match((result.stdout or '').splitlines()):
+                return True
+        except Exception:
+            pass
+
+        try:
+            result = command_runner.run(
+                ['ps', '-eo', 'args'],
+                capture_output=True,
+                text=True,
+                timeout=3
+            )
+            return has_update_match((result.stdout or '').splitlines())
+        except Exception:
+            return False
+
+    try:
+        update_lock = Path('/tmp/taknet_update.lock')
+        log_file = Path('/tmp/taknet_update.log')
+        
+        is_updating = update_lock.exists() and is_update_process_running()
+        # Auto-heal stale lock to prevent future 409 conflicts.
+        if update_lock.exists() and not is_updating:
+            try:
+                update_lock.unlink()
+            except Exception:
+                pass
+        
+        # Read last 50 lines of log
+        log_tail = []
+        if log_file.exists():
+            with open(log_file, 'r') as f:
+                log_tail = f.readlines()[-50:]
+        
+        return jsonify({
+            'success': True,
+            'is_updating': is_updating,
+            'log': ''.join(log_tail)
+        })
+    
+    except Exception as e:
+        print(f"❌ Error in get_update_status: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/system/health')
+def api_system_health():
+    """Return current system health and failure state (served from memory)"""
+    state = load_health_state()
+    response = jsonify({
+        'success': True,
+        'manual_correction_required': state.get('manual_correction_required', False),
+        'reboot_count': state.get('reboot_count', 0),
+        'consecutive_failures': state.get('consecutive_failures', {})
+    })
+    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    return response
+
+@bp.route('/api/system/events')
+def api_system_events():
+    """Return recent health and system events (served from memory)"""
+    response = jsonify({
+        'success': True,
+        'events': load_health_state()['events']
+    })
+    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+    return response
+
+@bp.route('/api/system/reboot', methods=['POST'])
+def api_system_reboot():
+    """Reboot the device. Returns immediately; reboot is scheduled after a short delay."""
+    try:
+        # Delay reboot so the HTTP response can be sent first
+        command_runner.Popen(
+            ['sudo', 'bash', '-c', 'sleep 2 && reboot'],
+            start_new_session=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        return jsonify({'success': True, 'message': 'Rebooting in a few seconds...'})
+    except Exception as e:
+        print(f"❌ Error in api_system_reboot: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# =============================================================
+# Prometheus /metrics endpoint
+# =============================================================
+# Scrape alongside ultrafeeder's exporter (PROMETHEUS_ENABLE, ports 9273-9274).
+# Collectors read in-memory state, small files and /proc; the only command
+# is the claim proxy's `docker inspect`, cached with its PID.
+TUNNEL_STATUS_FILE = Path('/opt/adsb/var/tunnel-status.json')
+TUNNEL_COUNTERS_FILE = Path('/run/taknet/tunnel-counters.json')  # tmpfs, refreshed while connected
+
+CLAIM_PROXY_CONTAINER = 'taknet-beast-claim'
+
+METRICS_PROCESS_START = time.time()
+
+def _collect_process():
+    yield 'taknet_feeder_info', 'gauge', 'Feeder software version', [({'version': VERSION}, 1)]
+    yield 'taknet_process_start_time_seconds', 'gauge', 'Web app start time (unix)', [(None, METRICS_PROCESS_START)]
+
+def _collect_sdr_inventory():
+    generation, scans = sdr_inventory_stats()
+    yield 'taknet_sdr_inventory_generation', 'gauge', 'USB hotplug generation of the SDR inventory', [(None, generation)]
+    yield 'taknet_sdr_scan_duration_seconds', 'gauge', 'Duration of the last SDR scan', [
+        ({'source': source}, seconds) for source, seconds in scans.items()]
+
+def _collect_probes():
+    with network_facts_lock:
+        internet = network_facts['internet']
+    if internet is not None:
+        yield 'taknet_internet_up', 'gauge', 'Internet reachability from the background prober', [(None, internet)]
+
+    loss, rtt, jitter = [], [], []
+    with link_quality_lock:
+        windows = {name: link_window_stats(window) for name, window in link_quality_windows.items()}
+    for target, stats in windows.items():
+        if stats['packet_loss'] is not None:
+            loss.append(({'target': target}, stats['packet_loss']))
+        for quantile, key in (('0.5', 'p50_rtt_ms'), ('0.95', 'p95_rtt_ms')):
+            if stats[key] is not None:
+                rtt.append(({'target': target, 'quantile': quantile}, stats[key] / 1000))
+        if stats['jitter_ms'] is not None:
+            jitter.append(({'target': target}, stats['jitter_ms'] / 1000))
+    yield 'taknet_link_packet_loss_percent', 'gauge', 'ICMP loss over the sampling window', loss
+    yield 'taknet_link_rtt_seconds', 'gauge', 'ICMP round-trip time quantiles over the sampling window', rtt
+    yield 'taknet_link_jitter_seconds', 'gauge', 'ICMP jitter (RFC 3550) over the sampling window', jitter
+
+    with update_check_lock:
+        failures = update_check_state['failures']
+    yield 'taknet_update_check_failures', 'gauge', 'Consecutive failed update checks', [(None, failures)]
+
+    with image_prepull_lock:
+        pending = [i for i in image_prepull_state['images'].values() if i['up_to_date'] is False]
+    yield 'taknet_images_pending', 'gauge', 'Compose images with a newer registry digest', [(None, len(pending))]
+    yield 'taknet_images_pending_bytes', 'gauge', 'Estimated bytes to pre-pull', [(None, sum(i['pending_bytes'] or 0 for i in pending))]
+
+def _collect_health():
+    state = load_health_state()
+    failures = state.get('consecutive_failures', {})
+    reboots = state.get('reboot_count', 0)
+    manual = state.get('manual_correction_required', False)
+    yield 'taknet_health_consecutive_failures', 'gauge', 'Consecutive failed health polls per service', [
+        ({'service': service}, count) for service, count in failures.items()]
+    yield 'taknet_health_reboot_count', 'gauge', 'Watchdog reboots since services were last healthy', [(None, reboots)]
+    yield 'taknet_health_manual_correction_required', 'gauge', 'Watchdog gave up and needs attention', [(None, manual)]
+
+def _collect_tunnel():
+    try:
+        status = json.loads(TUNNEL_STATUS_FILE.read_text())
+    except (OSError, ValueError):
+        return
+    yield 'taknet_tunnel_connected', 'gauge', 'Aggregator tunnel connected', [(None, bool(status.get('connected')))]
+    try:
+        counters = json.loads(TUNNEL_COUNTERS_FILE.read_text())
+    except (OSError, ValueError):
+        counters = status.get('counters') or {}
+    for key, help_text in (('connect_attempts', 'Tunnel connection attempts'),
+                           ('requests', 'Requests forwarded through the tunnel'),
+                           ('request_errors', 'Tunnel requests answered with 5xx'),
+                           ('request_bytes', 'Request body bytes received through the tunnel'),
+                           ('response_bytes', 'Response body bytes sent through the tunnel'),
+                           ('request_seconds', 'Time spent forwarding tunnel requests')):
+        if key in counters:
+            yield f'taknet_tunnel_{key}_total', 'counter', help_text, [(None, counters[key])]
+
+def _collect_claim_proxy():
+    env = read_env()
+    port = env.get('TAKNET_PS_SERVER_PORT', '30004')
+    if taknet_ps_beast_status_port(env) == port:
+        return  # no claim key: ultrafeeder connects directly
+    connections = read_container_tcp_connections(CLAIM_PROXY_CONTAINER, [port])
+    if connections is None:
+        return
+    upstream = connections[str(port)]
+    yield 'taknet_claim_proxy_upstream_connections', 'gauge', 'Claim proxy connections to the aggregator Beast port', [(None, upstream['count'])]
+    yield 'taknet_claim_proxy_send_queue_bytes', 'gauge', 'Unacknowledged bytes queued toward the aggregator', [(None, upstream['tx_queue'])]
+    yield 'taknet_claim_proxy_retransmits', 'gauge', 'Retransmit timer count on the upstream sockets', [(None, upstream['retransmits'])]
+
+METRIC_COLLECTORS.extend([_collect_process, _collect_sdr_inventory, _collect_probes, _collect_health,
+                          _collect_tunnel, _collect_claim_proxy])
+
+@bp.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint"""
+    response = make_response(render_metrics())
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/api/debug/commands', methods=['GET'])
+def api_debug_commands():
+    """
+    Slow-command report from command_runner: slowest calls and most frequent /
+    most time-consuming commands over the last 1000 runs, recent timeouts,
+    commands running now and concurrency-limit occupancy. ?top=N (default 10).
+    """
+    try:
+        top = max(1, min(100, int(request.args.get('top', 10))))
+    except ValueError:
+        top = 10
+    report = command_runner.report(top)
+    report['success'] = True
+    response = jsonify(report)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@bp.route('/api/debug/caches', methods=['GET'])
+def api_debug_caches():
+    """
+    TTL cache report: per cache (service state, SDR inventory, NetBird,
+    public IP, version.json) hit / stale / miss / error / eviction counts,
+    load latency, size and the age of every key.
+    """
+    response = jsonify({'success': True, 'caches': ttl_cache.report()})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+# =============================================================
+# Sampling profiler (operator-triggered)
+# =============================================================
+# POST /api/debug/profile starts one sampler thread that snapshots every
+# thread's stack with sys._current_frames() PROFILER_DEFAULT_HZ times a
+# second for N seconds, then writes collapsed stacks (flamegraph.pl /
+# speedscope input: "thread;outer;...;inner count") to PROFILE_DIR. Nothing
+# runs and no hooks are installed while no profile is being taken.
+PROFILE_DIR = Path('/opt/adsb/var/profiles')
+
+PROFILE_KEEP = 5
+
+PROFILER_DEFAULT_SECONDS = 30
+
+PROFILER_MAX_SECONDS = 300
+
+PROFILER_DEFAULT_HZ = 100
+
+PROFILER_MAX_HZ = 250
+
+profiler_lock = threading.Lock()
+
+profiler_state = {
+    'running': False,
+    'id': None,
+    'started_at': None,
+    'seconds': 0,
+    'hz': 0,
+    'samples': 0,
+    'last_error': None,
+}
+
+profiler_request_routes = {}  # thread ident -> URL rule, only while profiling
+
+@bp.before_app_request
+def _profiler_tag_request():
+    if profiler_state['running'] and request.url_rule:
+        profiler_request_routes[threading.get_ident()] = request.url_rule.rule
+
+@bp.after_app_request
+def _profiler_untag_request(response):
+    if profiler_request_routes:
+        profiler_request_routes.pop(threading.get_ident(), None)
+    return response
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})'
+
+def _collapse_stack(thread_name, frame):
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ';'.join(reversed(labels))
+
+def _profile_sampler(profile_id, seconds, hz):
+    """Sample all thread stacks for `seconds`, then write the collapsed file"""
+    me = threading.get_ident()
+    interval = 1.0 / hz
+    stacks = {}
+    samples = 0
+    deadline = time.monotonic() + seconds
+    try:
+        while time.monotonic() < deadline:
+            tick = time.monotonic()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                thread_name = names.get(ident, f'thread-{ident}').replace(';', ':').replace(' ', '_')
+                route = profiler_request_routes.get(ident)
+                if route:
+                    thread_name = f'{thread_name};request {route}'
+                key = _collapse_stack(thread_name, frame)
+                stacks[key] = stacks.get(key, 0) + 1
+            samples += 1
+            if samples % hz == 0:
+                with profiler_lock:
+                    profiler_state['samples'] = samples
+            time.sleep(max(0.0, interval - (time.monotonic() - tick)))
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        lines = [f'{stack} {count}' for stack, count in sorted(stacks.items())]
+        atomic_write_text(PROFILE_DIR / f'{profile_id}.collapsed', '\n'.join(lines) + '\n')
+        for old in sorted(PROFILE_DIR.glob('*.collapsed'))[:-PROFILE_KEEP]:
+            old.unlink()
+        print(f"✓ [Profiler] {profile_id}: {samples} samples, {len(stacks)} distinct stacks")
+        error = None
+    except Exception as e:
+        error = str(e)
+        print(f"❌ [Profiler] {profile_id} failed: {e}")
+    finally:
+        profiler_request_routes.clear()
+        with profiler_lock:
+            profiler_state['running'] = False
+            profiler_state['samples'] = samples
+            profiler_state['last_error'] = error
+
+def start_profile(seconds=PROFILER_DEFAULT_SECONDS, hz=PROFILER_DEFAULT_HZ):
+    """Start a profile; returns its id, or None if one is already running"""
+    seconds = max(1, min(PROFILER_MAX_SECONDS, int(seconds)))
+    hz = max(1, min(PROFILER_MAX_HZ, int(hz)))
+    profile_id = time.strftime('profile-%Y%m%d-%H%M%S')
+    with profiler_lock:
+        if profiler_state['running']:
+            return None
+        profiler_state.update({
+            'running': True, 'id': profile_id, 'started_at': time.time(),
+            'seconds': seconds, 'hz': hz, 'samples': 0, 'last_error': None,
+        })
+    threading.Thread(target=_profile_sampler, args=(profile_id, seconds, hz),
+                     name='profiler', daemon=True).start()
+    return profile_id
+
+def list_profiles():
+    """Saved profiles, newest first"""
+    try:
+        files = sorted(PROFILE_DIR.glob('*.collapsed'), reverse=True)
+    except OSError:
+        return []
+    profiles = []
+    for path in files:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        profiles.append({'id': path.stem, 'bytes': st.st_size, 'created_at': st.st_mtime})
+    return profiles
+
+@bp.route('/api/debug/profile', methods=['GET', 'POST'])
+def api_debug_profile():
+    """
+    GET: profiler status and saved profiles.
+    POST {"seconds": 30, "hz": 100}: sample every thread for N seconds (max 300).
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            profile_id = start_profile(data.get('seconds', PROFILER_DEFAULT_SECONDS),
+                                       data.get('hz', PROFILER_DEFAULT_HZ))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'message': 'seconds and hz must be numbers'}), 400
+        if profile_id is None:
+            return jsonify({'success': False, 'message': 'A profile is already running'}), 409
+        return jsonify({'success': True, 'id': profile_id})
+
+    with profiler_lock:
+        status = dict(profiler_state)
+    if status['running']:
+        status['elapsed'] = round(time.time() - status['started_at'], 1)
+    return jsonify({'success': True, **status, 'profiles': list_profiles()})
+
+@bp.route('/api/debug/profile/<profile_id>', methods=['GET'])
+def api_debug_profile_download(profile_id):
+    """Download one collapsed-stack profile"""
+    if not re.fullmatch(r'profile-\d{8}-\d{6}', profile_id):
+        return jsonify({'success': False, 'message': 'Invalid profile id'}), 400
+    path = PROFILE_DIR / f'{profile_id}.collapsed'
+    try:
+        content = path.read_bytes()
+    except OSError:
+        return jsonify({'success': False, 'message': 'Profile not found'}), 404
+    response = make_response(content)
+    response.headers['Content-Type'] = 'text/plain; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename="{profile_id}.collapsed.txt"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
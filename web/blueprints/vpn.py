@@ -0,0 +1,605 @@
+"""
+Tailscale, NetBird and TAKNET-PS connection APIs.
+"""
+
+import subprocess
+import os
+import shutil
+import json
+import threading
+import time
+
+from flask import Blueprint, request, jsonify
+
+from core import (
+    build_taknet_stats, current_job, get_netbird_state, invalidate_netbird_state,
+    JobCancelled, list_jobs, read_env, restart_service, submit_job, write_env,
+)
+import command_runner
+
+bp = Blueprint('vpn', __name__)
+
+# Tailscale installation progress tracking
+tailscale_progress = {
+    'status': 'idle',  # idle, downloading, installing, registering, completed, failed
+    'download_progress': 0,
+    'install_progress': 0,
+    'register_progress': 0,
+    'message': '',
+    'download_bytes': 0,
+    'total_bytes': 0,
+    'error': None
+}
+
+tailscale_progress_lock = threading.Lock()
+
+def get_tailscale_status():
+    """Get Tailscale connection status. Accepts any tailnet for personal remote management (SSH via 100.x.x.x)."""
+    try:
+        tailscale_bin = '/usr/bin/tailscale'
+        
+        # Check if installed
+        if not os.path.exists(tailscale_bin):
+            return {
+                'installed': False,
+                'connected': False,
+                'message': 'Tailscale not installed'
+            }
+        
+        # Get status
+        result = command_runner.run([tailscale_bin, 'status', '--json'], 
+                               capture_output=True, text=True, timeout=5)
+        
+        if result.returncode == 0:
+            try:
+                status_data = json.loads(result.stdout)
+                
+                # Check if connected (BackendState should be "Running")
+                backend_state = status_data.get('BackendState', '')
+                connected = backend_state == 'Running'
+                
+                # Get self info (any tailnet - for SSH access from that tailnet)
+                self_info = status_data.get('Self', {})
+                ip = self_info.get('TailscaleIPs', [''])[0] if self_info.get('TailscaleIPs') else None
+                hostname = self_info.get('DNSName', '').rstrip('.')
+                
+                return {
+                    'installed': True,
+                    'connected': connected,
+                    'ip': ip,
+                    'hostname': hostname,
+                    'backend_state': backend_state,
+                    'message': f'Connected as {hostname}' if (connected and hostname) else ('Connected' if connected else 'Not connected')
+                }
+            except json.JSONDecodeError:
+                # Fall back to non-JSON status
+                result = command_runner.run([tailscale_bin, 'status'], 
+                                       capture_output=True, text=True, timeout=5)
+                return {
+                    'installed': True,
+                    'connected': 'running' in result.stdout.lower(),
+                    'message': 'Connected' if result.returncode == 0 else 'Not connected'
+                }
+        else:
+            return {
+                'installed': True,
+                'connected': False,
+                'message': 'Tailscale installed but not running'
+            }
+            
+    except FileNotFoundError:
+        return {
+            'installed': False,
+            'connected': False,
+            'message': 'Tailscale not installed'
+        }
+    except Exception as e:
+        return {
+            'installed': False,
+            'connected': False,
+            'error': str(e)
+        }
+
+def update_tailscale_progress(status, download_progress=0, install_progress=0, register_progress=0, message='', download_bytes=0, total_bytes=0):
+    """Update global Tailscale progress state"""
+    global tailscale_progress
+    with tailscale_progress_lock:
+        tailscale_progress['status'] = status
+        tailscale_progress['download_progress'] = download_progress
+        tailscale_progress['install_progress'] = install_progress
+        tailscale_progress['register_progress'] = register_progress
+        tailscale_progress['message'] = message
+        tailscale_progress['download_bytes'] = download_bytes
+        tailscale_progress['total_bytes'] = total_bytes
+        print(f"[Tailscale Progress] {status}: {message} (download: {download_progress}%, install: {install_progress}%, register: {register_progress}%)")
+    job = current_job()
+    if job:
+        job.progress((download_progress + install_progress + register_progress) / 3, message, status)
+
+def install_tailscale_with_progress(auth_key=None, hostname=None):
+    """Install and configure Tailscale with progress tracking"""
+    try:
+        tailscale_bin = '/usr/bin/tailscale'
+        
+        # === PHASE 1: DOWNLOAD (0-100%) ===
+        check_result = command_runner.run(['which', 'tailscale'], 
+                                     capture_output=True, timeout=5)
+        
+        was_just_installed = False
+        if check_result.returncode != 0:
+            # Download Tailscale with real progress tracking
+            update_tailscale_progress('downloading', 0, 0, 0, 'Preparing download...', 0, 0)
+            
+            # Download install script first to temp file, then execute
+            # This lets us track actual download progress
+            import tempfile
+            temp_script = tempfile.NamedTemporaryFile(mode='w', suffix='.sh', delete=False)
+            temp_script_path = temp_script.name
+            temp_script.close()
+            
+            # Download the install script with progress
+            download_cmd = ['curl', '-L', '--progress-bar', 
+                          'https://tailscale.com/install.sh',
+                          '-o', temp_script_path]
+            
+            # Run download with real-time progress capture
+            process = command_runner.Popen(download_cmd, 
+                                     stderr=subprocess.PIPE, 
+                                     text=True)
+            job = current_job()
+            if job:
+                job.attach(process)
+            
+            # Track download progress from curl's stderr
+            last_progress = 0
+            for line in process.stderr:
+                # Curl progress bar format: ### (percentage)
+                # Example: "######################################################################## 100.0%"
+                if '%' in line:
+                    try:
+                        # Extract percentage from progress bar
+                        percent_str = line.split()[-1].replace('%', '')
+                        percent = float(percent_str)
+                        
+                        # Estimate bytes (install script is ~30KB, but we'll show approximate download size)
+                        # The actual tailscale binary download happens during script execution
+                        estimated_total = 30 * 1024  # 30 KB for script
+                        downloaded_bytes = int((percent / 100) * estimated_total)
+                        
+                        # Only update if progress changed significantly
+                        if abs(percent - last_progress) >= 5:
+                            update_tailscale_progress('downloading', int(percent), 0, 0, 
+                                                    'Downloading install script...', 
+                                                    downloaded_bytes, estimated_total)
+                            last_progress = percent
+                    except:
+                        pass
+            
+            process.wait()
+            if job:
+                job.attach(None)
+            
+            if process.returncode != 0 or (job and job.cancelled):
+                os.unlink(temp_script_path)
+                update_tailscale_progress('failed', 0, 0, 0, 'Failed to download install script', 0, 0)
+                return
+            
+            update_tailscale_progress('downloading', 100, 0, 0, 'Script downloaded, installing packages...', 
+                                    30 * 1024, 30 * 1024)
+            
+            # Now run the install script
+            # Note: The actual binary download happens here, but we can't easily track it
+            # We'll show indeterminate progress during package installation
+            install_result = command_runner.run(['bash', temp_script_path], 
+                                          timeout=120, 
+                                          capture_output=True, 
+                                          text=True)
+            
+            # Clean up temp file
+            os.unlink(temp_script_path)
+            
+            if install_result.returncode != 0:
+                update_tailscale_progress('failed', 0, 0, 0, 
+                                        f'Installation failed: {install_result.stderr}', 0, 0)
+                return
+            
+            # Verify installation succeeded
+            if not os.path.exists(tailscale_bin):
+                update_tailscale_progress('failed', 0, 0, 0, 
+                                        'Installation completed but binary not found', 0, 0)
+                return
+            
+            update_tailscale_progress('downloading', 100, 0, 0, 'Download complete', 0, 0)
+            was_just_installed = True
+        else:
+            # Already installed, skip download phase
+            update_tailscale_progress('downloading', 100, 0, 0, 'Tailscale already installed', 0, 0)
+        
+        time.sleep(0.5)
+        
+        # === PHASE 2: INSTALL (0-100%) ===
+        for i in range(0, 101, 20):
+            update_tailscale_progress('installing', 100, i, 0, 'Installing...', 0, 0)
+            time.sleep(0.5)
+        
+        # Clear previous connection if needed (logout completely from old tailnet)
+        if auth_key and not was_just_installed:
+            try:
+                # Use logout to completely disconnect from old tailnet
+                # This allows connecting to a different tailnet with new auth key
+                command_runner.run([tailscale_bin, 'logout'], timeout=10, capture_output=True)
+                print("✓ Logged out of previous Tailscale tailnet")
+            except Exception as e:
+                print(f"⚠ Warning: Could not run 'tailscale logout': {e}")
+        
+        update_tailscale_progress('installing', 100, 100, 0, 'Installation complete', 0, 0)
+        time.sleep(0.5)
+        job = current_job()
+        if job:
+            job.check_cancelled()  # last point before joining a tailnet
+        
+        # === PHASE 3: REGISTER (0-100%) ===
+        if auth_key:
+            cmd = [tailscale_bin, 'up', '--authkey', auth_key]
+            if hostname:
+                cmd.extend(['--hostname', hostname])
+            
+            update_tailscale_progress('registering', 100, 100, 10, 
+                                    'Registering to Tailscale network...', 0, 0)
+            
+            result = command_runner.run(cmd, capture_output=True, text=True, timeout=30)
+            
+            if result.returncode != 0:
+                update_tailscale_progress('failed', 100, 100, 0, 
+                                        f'Authentication failed: {result.stderr}', 0, 0)
+                return
+            
+            for i in range(20, 70, 10):
+                update_tailscale_progress('registering', 100, 100, i, 
+                                        'Registering to Tailscale network...', 0, 0)
+                time.sleep(0.5)
+        else:
+            update_tailscale_progress('registering', 100, 100, 10, 'Starting Tailscale...', 0, 0)
+            result = command_runner.run([tailscale_bin, 'up'], timeout=30, 
+                                  capture_output=True, text=True)
+            if result.returncode != 0:
+                update_tailscale_progress('failed', 100, 100, 0, 
+                                        f'Failed to start: {result.stderr}', 0, 0)
+                return
+            
+            for i in range(20, 70, 10):
+                update_tailscale_progress('registering', 100, 100, i, 'Starting Tailscale...', 0, 0)
+                time.sleep(0.5)
+        
+        # Verify connection
+        connected = False
+        for attempt in range(30):
+            try:
+                status_result = command_runner.run([tailscale_bin, 'status', '--json'], 
+                                             capture_output=True, text=True, timeout=5)
+                if status_result.returncode == 0:
+                    try:
+                        status_data = json.loads(status_result.stdout)
+                        backend_state = status_data.get('BackendState', '')
+                        if backend_state == 'Running':
+                            connected = True
+                            update_tailscale_progress('registering', 100, 100, 95, 
+                                                    'Connection verified!', 0, 0)
+                            break
+                    except:
+                        pass
+            except:
+                pass
+            
+            time.sleep(1)
+            verify_progress = 70 + min(attempt, 25)
+            update_tailscale_progress('registering', 100, 100, verify_progress, 
+                                    'Verifying connection...', 0, 0)
+        
+        if not connected:
+            update_tailscale_progress('registering', 100, 100, 95, 
+                                    'Verification timed out - Tailscale may still be working', 0, 0)
+        
+        # Configure SSH
+        update_tailscale_progress('registering', 100, 100, 98, 'Configuring SSH security...', 0, 0)
+        try:
+            ssh_config_script = '/opt/adsb/configure-ssh-tailscale.sh'
+            if os.path.exists(ssh_config_script):
+                command_runner.run(['bash', ssh_config_script], 
+                             capture_output=True, 
+                             timeout=10,
+                             check=False)
+        except Exception as e:
+            print(f"⚠️ SSH configuration failed (non-critical): {e}")
+        
+        # Success!
+        update_tailscale_progress('completed', 100, 100, 100, 
+                                'Tailscale connected successfully!', 0, 0)
+        
+        # Save hostname to .env file if it was provided
+        if hostname:
+            try:
+                env = read_env()
+                env['TAILSCALE_HOSTNAME'] = hostname
+                write_env(env)
+                print(f"✓ Tailscale hostname saved: {hostname}")
+            except Exception as e:
+                print(f"⚠️ Could not save Tailscale hostname: {e}")
+        
+        # CRITICAL: Rebuild ultrafeeder config to switch from public IP to Tailscale
+        print("✓ Tailscale connected - rebuilding ultrafeeder config...")
+        try:
+            # Rebuild and restart ultrafeeder to apply new Tailscale connection
+            if restart_service():
+                print("✓ Ultrafeeder restart scheduled with Tailscale connection")
+            else:
+                print("⚠ Could not schedule ultrafeeder restart after Tailscale install")
+        except Exception as e:
+            print(f"⚠ Error rebuilding config after Tailscale install: {e}")
+        
+    except subprocess.TimeoutExpired:
+        update_tailscale_progress('failed', 0, 0, 0, 'Installation timed out', 0, 0)
+    except JobCancelled:
+        update_tailscale_progress('failed', 0, 0, 0, 'Installation cancelled', 0, 0)
+        raise
+    except Exception as e:
+        update_tailscale_progress('failed', 0, 0, 0, str(e), 0, 0)
+
+@bp.route('/api/tailscale/install', methods=['POST'])
+def api_install_tailscale():
+    """Install/update Tailscale with optional auth key and hostname"""
+    try:
+        data = request.json
+        auth_key = data.get('auth_key', None)
+        hostname = data.get('hostname', None)
+        
+        # One install at a time; a repeated click follows the running one
+        running = next((j for j in list_jobs('tailscale-install') if not j.done.is_set()), None)
+        if running:
+            return jsonify({'success': True, 'message': 'Installation already in progress', 'job_id': running.id})
+        
+        # Reset progress
+        global tailscale_progress
+        with tailscale_progress_lock:
+            tailscale_progress = {
+                'status': 'downloading',
+                'download_progress': 0,
+                'install_progress': 0,
+                'register_progress': 0,
+                'message': 'Starting installation...',
+                'download_bytes': 0,
+                'total_bytes': 0,
+                'error': None
+            }
+        
+        # Start installation as a background job
+        job = submit_job('tailscale-install', install_tailscale_with_progress, auth_key, hostname,
+                         resource='tailscale')
+        
+        return jsonify({'success': True, 'message': 'Installation started', 'job_id': job.id})
+            
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@bp.route('/api/tailscale/status', methods=['GET'])
+def api_tailscale_status():
+    """Get Tailscale connection status"""
+    try:
+        result = get_tailscale_status()
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'status': str(e)}), 500
+
+@bp.route('/api/tailscale/progress', methods=['GET'])
+def api_tailscale_progress():
+    """Get Tailscale installation progress"""
+    global tailscale_progress
+    with tailscale_progress_lock:
+        return jsonify(tailscale_progress)
+
+@bp.route('/api/tailscale/enable', methods=['POST'])
+def api_tailscale_enable():
+    """Enable Tailscale VPN"""
+    try:
+        env = read_env()
+        env['TAILSCALE_ENABLED'] = 'true'
+        write_env(env)
+        
+        # Rebuild config to activate Tailscale connection
+        generation = restart_service()
+        return jsonify({'success': True, 'message': 'Tailscale enabled successfully', 'generation': generation})
+            
+    except Exception as e:
+        print(f"❌ Error enabling Tailscale: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@bp.route('/api/tailscale/disable', methods=['POST'])
+def api_tailscale_disable():
+    """Disable Tailscale VPN"""
+    try:
+        # Logout from Tailscale (completely disconnect from tailnet)
+        try:
+            command_runner.run(['tailscale', 'logout'], timeout=10, capture_output=True, check=False)
+            print("✓ Tailscale logged out")
+        except Exception as e:
+            print(f"⚠️ Could not logout from Tailscale: {e}")
+        
+        # Update config to disable
+        env = read_env()
+        env['TAILSCALE_ENABLED'] = 'false'
+        write_env(env)
+        
+        # Rebuild config to use public IP fallback
+        generation = restart_service()
+        return jsonify({'success': True, 'message': 'Tailscale disabled successfully', 'generation': generation})
+            
+    except Exception as e:
+        print(f"❌ Error disabling Tailscale: {e}")
+        import traceback
+        traceback.print_exc()
+
+# =============================================================
+# NetBird VPN API Endpoints
+# =============================================================
+
+@bp.route('/api/netbird/status', methods=['GET'])
+def api_netbird_status():
+    """Get NetBird connection status"""
+    try:
+        state = get_netbird_state()
+        if not state['installed']:
+            return jsonify({'installed': False, 'connected': False, 'message': 'NetBird not installed'})
+
+        env = read_env()
+        enabled = env.get('NETBIRD_ENABLED', 'false').lower() == 'true'
+        connected = state['connected']
+        nb_ip = state['ip']
+
+        return jsonify({
+            'installed': True,
+            'connected': connected,
+            'enabled': enabled,
+            'ip': nb_ip,
+            'message': 'Connected' if connected else 'Not connected'
+        })
+
+    except Exception as e:
+        return jsonify({'installed': False, 'connected': False, 'message': str(e)})
+
+# TAKNET-PS NetBird management server (hardcoded; user only supplies setup key)
+NETBIRD_MANAGEMENT_URL = 'https://netbird.tak-solutions.com'
+
+NETBIRD_DEFAULT_SETUP_KEY = 'C5F35D5B-6B0D-440F-B573-D21C8BE79529'
+
+@bp.route('/api/netbird/enable', methods=['POST'])
+def api_netbird_enable():
+    """Enroll and connect NetBird"""
+    try:
+        data = request.get_json() or {}
+        setup_key = data.get('setup_key', '').strip() or NETBIRD_DEFAULT_SETUP_KEY
+        management_url = NETBIRD_MANAGEMENT_URL
+
+        if not shutil.which('netbird'):
+            return jsonify({'success': False, 'message': 'NetBird not installed'})
+
+        # Save to .env (management URL is fixed for TAKNET-PS)
+        env = read_env()
+        env['NETBIRD_MANAGEMENT_URL'] = NETBIRD_MANAGEMENT_URL
+        env['NETBIRD_SETUP_KEY'] = setup_key
+        env['NETBIRD_ENABLED'] = 'true'
+        write_env(env)
+
+        # Build hostname from site name
+        site_name = env.get('MLAT_SITE_NAME', 'taknet-ps-feeder')
+
+        # Ensure daemon is started
+        command_runner.run(['systemctl', 'start', 'netbird'], timeout=10)
+        import time
+        time.sleep(1)
+
+        # Check if already connected to avoid logout if working
+        if not get_netbird_state(force=True)['connected']:
+            # Force logout to clear stale state before enrolling
+            command_runner.run(['netbird', 'logout'], capture_output=True, timeout=10)
+
+        # Enroll
+        cmd = [
+            'netbird', 'up',
+            '--setup-key', setup_key,
+            '--management-url', management_url,
+            '--disable-dns',
+            '--allow-server-ssh',
+            '--enable-ssh-root',
+            '--hostname', site_name
+        ]
+        result = command_runner.run(cmd, capture_output=True, text=True, timeout=30)
+        invalidate_netbird_state()
+
+        if result.returncode == 0:
+            # Rebuild docker-compose with new VPN detection and restart ultrafeeder
+            # so it picks up the new VPN host (the watchdog's request joins this one)
+            generation = restart_service()
+            return jsonify({'success': True, 'message': 'NetBird connected successfully', 'generation': generation})
+        else:
+            env['NETBIRD_ENABLED'] = 'false'
+            write_env(env)
+            return jsonify({'success': False, 'message': f'NetBird enrollment failed: {result.stderr}'})
+
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'message': 'Connection timed out (30s). Check management URL and setup key.'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/netbird/disable', methods=['POST'])
+def api_netbird_disable():
+    """Disconnect and disable NetBird"""
+    try:
+        env = read_env()
+        env['NETBIRD_ENABLED'] = 'false'
+        write_env(env)
+
+        if shutil.which('netbird'):
+            command_runner.run(['netbird', 'down'], capture_output=True, timeout=10)
+        invalidate_netbird_state()
+
+        # Rebuild config to fall back to public endpoint and restart ultrafeeder
+        generation = restart_service()
+
+        return jsonify({'success': True, 'message': 'NetBird disconnected', 'generation': generation})
+
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/taknet-ps/connection', methods=['GET'])
+def api_taknet_ps_connection():
+    """Get TAKNET-PS connection information"""
+    try:
+        env = read_env()
+
+        # Check NetBird status
+        netbird_connected = False
+        netbird_ip = None
+        try:
+            state = get_netbird_state()
+            netbird_connected = state['connected']
+            netbird_ip = state['ip']
+        except Exception as e:
+            print(f"⚠ NetBird status check failed: {e}")
+
+        # Determine connection method
+        if netbird_connected:
+            connection_method = 'netbird'
+            connection_host = env.get('TAKNET_PS_SERVER_HOST_VPN', 'vpn.tak-solutions.com')
+        else:
+            connection_method = 'public_ip'
+            connection_host = env.get('TAKNET_PS_SERVER_HOST_FALLBACK', 'adsb.tak-solutions.com')
+
+        return jsonify({
+            'success': True,
+            'connection_method': connection_method,
+            'connection_host': connection_host,
+            'netbird_running': netbird_connected,
+            'netbird_ip': netbird_ip,
+            'mode': env.get('TAKNET_PS_CONNECTION_MODE', 'auto')
+        })
+
+    except Exception as e:
+        print(f"❌ Error in api_taknet_ps_connection: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@bp.route('/api/taknet-ps/stats', methods=['GET'])
+def api_taknet_ps_stats():
+    """Get TAKNET-PS feed status by checking ultrafeeder container connections"""
+    try:
+        return jsonify(build_taknet_stats())
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'error': 'Connection check timed out'}), 504
+    except Exception as e:
+        print(f"❌ Error in api_taknet_ps_stats: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,442 @@
+"""
+WiFi management APIs (NetworkManager / wpa_supplicant).
+"""
+
+import subprocess
+from pathlib import Path
+
+from flask import Blueprint, request, jsonify
+
+import command_runner
+
+bp = Blueprint('wifi', __name__)
+
+# ========================================
+# WiFi Management API Endpoints
+# ========================================
+
+@bp.route('/api/wifi/scan', methods=['GET'])
+def wifi_scan():
+    """Scan for available WiFi networks"""
+    try:
+        # Use nmcli for scanning (newer Raspberry Pi OS)
+        result = command_runner.run(
+            ['nmcli', '-t', '-f', 'SSID,SIGNAL,SECURITY', 'dev', 'wifi', 'list', '--rescan', 'yes'],
+            capture_output=True,
+            text=True,
+            timeout=30
+        )
+        
+        if result.returncode != 0:
+            # Fallback to iwlist if nmcli not available
+            result = command_runner.run(
+                ['sudo', 'iwlist', 'wlan0', 'scan'],
+                capture_output=True,
+                text=True,
+                timeout=30
+            )
+            
+            if result.returncode != 0:
+                return jsonify({'success': False, 'message': 'Failed to scan WiFi networks', 'networks': []})
+            
+            # Parse iwlist output
+            networks = []
+            current_network = {}
+            
+            for line in result.stdout.splitlines():
+                line = line.strip()
+                
+                if 'ESSID:' in line:
+                    ssid = line.split('ESSID:')[1].strip('"')
+                    if ssid:
+                        current_network['ssid'] = ssid
+                
+                if 'Quality=' in line:
+                    quality = line.split('Quality=')[1].split()[0]
+                    num, den = quality.split('/')
+                    signal = int((int(num) / int(den)) * 100)
+                    current_network['signal'] = signal
+                
+                if 'Encryption key:' in line:
+                    has_encryption = 'on' in line.lower()
+                    current_network['security'] = 'WPA2' if has_encryption else 'Open'
+                
+                if current_network and 'ssid' in current_network and 'signal' in current_network:
+                    if current_network not in networks:
+                        networks.append(current_network.copy())
+                    current_network = {}
+            
+            # Sort by signal strength
+            networks.sort(key=lambda x: x.get('signal', 0), reverse=True)
+            
+            return jsonify({'success': True, 'networks': networks[:20]})  # Top 20
+        
+        # Parse nmcli output
+        networks = []
+        seen_ssids = set()
+        
+        for line in result.stdout.splitlines():
+            if not line.strip():
+                continue
+            
+            parts = line.split(':')
+            if len(parts) >= 3:
+                ssid = parts[0].strip()
+                signal = int(parts[1]) if parts[1].isdigit() else 0
+                security = parts[2].strip() if parts[2] else 'Open'
+                
+                # Skip hidden networks and duplicates
+                if ssid and ssid != '--' and ssid not in seen_ssids:
+                    seen_ssids.add(ssid)
+                    networks.append({
+                        'ssid': ssid,
+                        'signal': signal,
+                        'security': security if security else 'Open'
+                    })
+        
+        # Sort by signal strength
+        networks.sort(key=lambda x: x['signal'], reverse=True)
+        
+        return jsonify({'success': True, 'networks': networks[:20]})  # Top 20
+    
+    except subprocess.TimeoutExpired:
+        return jsonify({'success': False, 'message': 'WiFi scan timed out', 'networks': []})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e), 'networks': []})
+
+@bp.route('/api/wifi/saved', methods=['GET'])
+def wifi_saved():
+    """Get list of saved WiFi networks"""
+    try:
+        # Use nmcli to list saved connections
+        result = command_runner.run(
+            ['nmcli', '-t', '-f', 'NAME,TYPE,DEVICE', 'connection', 'show'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        
+        if result.returncode != 0:
+            # Fallback: parse wpa_supplicant.conf
+            wpa_conf = Path('/etc/wpa_supplicant/wpa_supplicant.conf')
+            if not wpa_conf.exists():
+                return jsonify({'success': True, 'networks': []})
+            
+            networks = []
+            with open(wpa_conf) as f:
+                content = f.read()
+                current_network = {}
+                
+                for line in content.splitlines():
+                    line = line.strip()
+                    
+                    if line.startswith('network={'):
+                        current_network = {}
+                    elif 'ssid=' in line and '=' in line:
+                        ssid = line.split('=', 1)[1].strip('"')
+                        current_network['ssid'] = ssid
+                    elif 'key_mgmt=' in line:
+                        key_mgmt = line.split('=', 1)[1].strip()
+                        current_network['security'] = 'WPA2' if key_mgmt != 'NONE' else 'Open'
+                    elif line == '}' and current_network:
+                        current_network['connected'] = False  # Can't determine from file
+                        networks.append(current_network)
+                        current_network = {}
+            
+            return jsonify({'success': True, 'networks': networks})
+        
+        # Parse nmcli output
+        networks = []
+        active_device = None
+        
+        for line in result.stdout.splitlines():
+            if not line.strip():
+                continue
+            
+            parts = line.split(':')
+            if len(parts) >= 3:
+                name = parts[0].strip()
+                conn_type = parts[1].strip()
+                device = parts[2].strip()
+                
+                # Only include WiFi connections
+                if conn_type == '802-11-wireless' or conn_type == 'wifi':
+                    networks.append({
+                        'ssid': name,
+                        'connected': bool(device and device != '--'),
+                        'security': 'WPA2'  # Assume WPA2 for saved networks
+                    })
+        
+        return jsonify({'success': True, 'networks': networks})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e), 'networks': []})
+
+@bp.route('/api/wifi/add', methods=['POST'])
+def wifi_add():
+    """Add a new WiFi network configuration"""
+    try:
+        data = request.json
+        ssid = data.get('ssid', '').strip()
+        password = data.get('password', '')
+        security = data.get('security', 'WPA2')
+        save_only = data.get('saveOnly', False)  # For remote setup - don't try to connect
+        
+        if not ssid:
+            return jsonify({'success': False, 'message': 'SSID is required'})
+        
+        # Try nmcli first
+        try:
+            if save_only:
+                # Just create the connection profile without connecting
+                if security == 'OPEN':
+                    # Open network (no password)
+                    result = command_runner.run(
+                        ['sudo', 'nmcli', 'connection', 'add', 
+                         'type', 'wifi',
+                         'con-name', ssid,
+                         'ifname', 'wlan0',
+                         'ssid', ssid,
+                         '--', 
+                         'wifi-sec.key-mgmt', 'none'],
+                        capture_output=True,
+                        text=True,
+                        timeout=10
+                    )
+                else:
+                    # Secured network
+                    result = command_runner.run(
+                        ['sudo', 'nmcli', 'connection', 'add',
+                         'type', 'wifi',
+                         'con-name', ssid,
+                         'ifname', 'wlan0',
+                         'ssid', ssid,
+                         '--',
+                         'wifi-sec.key-mgmt', 'wpa-psk',
+                         'wifi-sec.psk', password],
+                        capture_output=True,
+                        text=True,
+                        timeout=10
+                    )
+                
+                if result.returncode == 0:
+                    return jsonify({'success': True, 'message': 'WiFi configuration saved (will connect when in range)'})
+                else:
+                    # Fall through to wpa_supplicant method
+                    raise subprocess.CalledProcessError(result.returncode, result.args)
+            else:
+                # Try to connect immediately (scan result selection)
+                if security == 'OPEN':
+                    # Open network (no password)
+                    result = command_runner.run(
+                        ['sudo', 'nmcli', 'dev', 'wifi', 'connect', ssid],
+                        capture_output=True,
+                        text=True,
+                        timeout=30
+                    )
+                else:
+                    # Secured network
+                    result = command_runner.run(
+                        ['sudo', 'nmcli', 'dev', 'wifi', 'connect', ssid, 'password', password],
+                        capture_output=True,
+                        text=True,
+                        timeout=30
+                    )
+                
+                if result.returncode == 0:
+                    return jsonify({'success': True, 'message': 'Connected to WiFi network successfully!'})
+                else:
+                    # Parse error message
+                    error_msg = result.stderr.strip() if result.stderr else result.stdout.strip()
+                    
+                    # Make error messages more user-friendly
+                    if 'Secrets were required' in error_msg or 'authentication' in error_msg.lower():
+                        return jsonify({'success': False, 'message': 'Authentication failed - check your password'})
+                    elif 'not found' in error_msg.lower():
+                        return jsonify({'success': False, 'message': f'Network "{ssid}" not found - try scanning again'})
+                    elif 'timeout' in error_msg.lower():
+                        return jsonify({'success': False, 'message': 'Connection timeout - network may be out of range'})
+                    else:
+                        return jsonify({'success': False, 'message': f'Connection failed: {error_msg[:100] if error_msg else "Unknown error"}'})
+        
+        except subprocess.TimeoutExpired:
+            return jsonify({'success': False, 'message': 'Connection attempt timed out (30s) - network may be weak or out of range'})
+        except (FileNotFoundError, subprocess.CalledProcessError):
+            # nmcli not available or failed, use wpa_supplicant
+            wpa_conf = Path('/etc/wpa_supplicant/wpa_supplicant.conf')
+            
+            # Create network block
+            if security == 'OPEN':
+                network_block = f'''
+network={{
+    ssid="{ssid}"
+    key_mgmt=NONE
+    priority=1
+}}
+'''
+            else:
+                network_block = f'''
+network={{
+    ssid="{ssid}"
+    psk="{password}"
+    key_mgmt=WPA-PSK
+    priority=1
+}}
+'''
+            
+            # Append to wpa_supplicant.conf
+            command_runner.run(
+                ['sudo', 'bash', '-c', f'echo "{network_block}" >> {wpa_conf}'],
+                check=True
+            )
+            
+            # Restart wpa_supplicant
+            command_runner.run(['sudo', 'wpa_cli', '-i', 'wlan0', 'reconfigure'], check=True)
+            
+            if save_only:
+                return jsonify({'success': True, 'message': 'WiFi configuration saved (will connect when in range)'})
+            else:
+                return jsonify({'success': True, 'message': 'WiFi network configured and attempting to connect'})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/wifi/remove', methods=['POST'])
+def wifi_remove():
+    """Remove a WiFi network configuration"""
+    try:
+        data = request.json
+        ssid = data.get('ssid', '').strip()
+        
+        if not ssid:
+            return jsonify({'success': False, 'message': 'SSID is required'})
+        
+        # Try nmcli first
+        try:
+            result = command_runner.run(
+                ['sudo', 'nmcli', 'connection', 'delete', ssid],
+                capture_output=True,
+                text=True,
+                timeout=10
+            )
+            
+            if result.returncode == 0:
+                return jsonify({'success': True, 'message': 'WiFi network removed successfully'})
+            else:
+                return jsonify({'success': False, 'message': 'Network not found or could not be removed'})
+        
+        except FileNotFoundError:
+            # nmcli not available, manually edit wpa_supplicant.conf
+            wpa_conf = Path('/etc/wpa_supplicant/wpa_supplicant.conf')
+            
+            if not wpa_conf.exists():
+                return jsonify({'success': False, 'message': 'WiFi configuration file not found'})
+            
+            # Read file
+            with open(wpa_conf) as f:
+                lines = f.readlines()
+            
+            # Remove network block for this SSID
+            new_lines = []
+            in_network_block = False
+            skip_block = False
+            
+            for line in lines:
+                if line.strip().startswith('network={'):
+                    in_network_block = True
+                    skip_block = False
+                    temp_block = [line]
+                elif in_network_block:
+                    temp_block.append(line)
+                    
+                    if f'ssid="{ssid}"' in line:
+                        skip_block = True
+                    
+                    if line.strip() == '}':
+                        in_network_block = False
+                        if not skip_block:
+                            new_lines.extend(temp_block)
+                else:
+                    new_lines.append(line)
+            
+            # Write back
+            with open(wpa_conf, 'w') as f:
+                f.writelines(new_lines)
+            
+            # Restart wpa_supplicant
+            command_runner.run(['sudo', 'wpa_cli', '-i', 'wlan0', 'reconfigure'])
+            
+            return jsonify({'success': True, 'message': 'WiFi network removed successfully'})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/wifi/status', methods=['GET'])
+def wifi_status():
+    """Get WiFi radio status"""
+    try:
+        # Check if WiFi radio is enabled using nmcli
+        result = command_runner.run(
+            ['nmcli', 'radio', 'wifi'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        
+        if result.returncode == 0:
+            status = result.stdout.strip().lower()
+            enabled = status == 'enabled'
+            return jsonify({
+                'success': True,
+                'enabled': enabled,
+                'status': status
+            })
+        else:
+            return jsonify({'success': False, 'message': 'Could not check WiFi status'})
+    
+    except FileNotFoundError:
+        return jsonify({'success': False, 'message': 'nmcli not available'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/wifi/enable', methods=['POST'])
+def wifi_enable():
+    """Enable WiFi radio"""
+    try:
+        result = command_runner.run(
+            ['sudo', 'nmcli', 'radio', 'wifi', 'on'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        
+        if result.returncode == 0:
+            return jsonify({'success': True, 'message': 'WiFi enabled successfully'})
+        else:
+            return jsonify({'success': False, 'message': 'Failed to enable WiFi'})
+    
+    except FileNotFoundError:
+        return jsonify({'success': False, 'message': 'nmcli not available'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
+
+@bp.route('/api/wifi/disable', methods=['POST'])
+def wifi_disable():
+    """Disable WiFi radio"""
+    try:
+        result = command_runner.run(
+            ['sudo', 'nmcli', 'radio', 'wifi', 'off'],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        
+        if result.returncode == 0:
+            return jsonify({'success': True, 'message': 'WiFi disabled successfully'})
+        else:
+            return jsonify({'success': False, 'message': 'Failed to disable WiFi'})
+    
+    except FileNotFoundError:
+        return jsonify({'success': False, 'message': 'nmcli not available'})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)})
@@ -0,0 +1,3287 @@
+"""
+Shared state and helpers for the TAKNET-PS-ADSB-Feeder web interface.
+
+Settings (.env), docker/service state, progress tracking, the health
+journal, the metrics registry, response compression and the background
+probes and schedulers.
+app.py and the route blueprints import from here; nothing in this module
+depends on Flask, so it is byte-compiled once and reused on every start.
+"""
+
+import subprocess
+import gzip
+import os
+import re
+from pathlib import Path
+import json
+import threading
+import time
+import socket
+import uuid
+import math
+import bisect
+import functools
+import struct
+from array import array
+from collections import deque
+import sys
+
+# Shared helpers deployed next to config_builder.py
+sys.path.insert(0, '/opt/adsb/scripts')
+import command_runner
+import config_builder
+import netbird_provider
+import ttl_cache
+
+# Version information - read from VERSION file
+VERSION_FILE = Path('/opt/adsb/VERSION')
+
+def get_version():
+    """Read version from VERSION file"""
+    if VERSION_FILE.exists():
+        return VERSION_FILE.read_text().strip()
+    return "unknown"
+
+VERSION = get_version()
+
+# =============================================================
+# Prometheus metrics registry
+# =============================================================
+# Plain-text exposition without the prometheus_client dependency. Counters
+# and histograms live in dicts under one lock; gauges for the caches and
+# background probes are read at scrape time from METRIC_COLLECTORS, which
+# each feature module extends (/metrics is in blueprints/system.py). Route
+# labels use the URL rule (not the raw path) and command labels come from
+# command_runner.command_label, so label sets stay bounded.
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+metrics_lock = threading.Lock()
+
+metric_counters = {}    # name -> {labels tuple: value}
+
+metric_histograms = {}  # name -> {labels tuple: [bucket counts..., +Inf, sum]}
+
+METRIC_HELP = {
+    'taknet_http_requests_total': ('counter', 'HTTP requests by route, method and status'),
+    'taknet_http_request_duration_seconds': ('histogram', 'HTTP request latency by route'),
+    'taknet_subprocess_spawns_total': ('counter', 'Child processes started, by command'),
+    'taknet_subprocess_errors_total': ('counter', 'Child processes that failed to start or exited non-zero'),
+    'taknet_subprocess_timeouts_total': ('counter', 'Child processes killed at their timeout'),
+    'taknet_subprocess_duration_seconds': ('histogram', 'Child process wall time from spawn to exit'),
+    'taknet_subprocess_limit_wait_seconds': ('histogram', 'Time spent waiting for a command concurrency slot'),
+    'taknet_cache_requests_total': ('counter', 'Cache lookups by cache and result'),
+    'taknet_watchdog_loop_duration_seconds': ('histogram', 'Duration of one background loop iteration'),
+    'taknet_dashboard_section_duration_seconds': ('histogram', 'Dashboard bootstrap section build time'),
+    'taknet_template_render_duration_seconds': ('histogram', 'Page template render time (first render includes compile)'),
+}
+
+def _metric_key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def metric_inc(name, labels=None, value=1):
+    """Add value to a counter"""
+    key = _metric_key(labels)
+    with metrics_lock:
+        series = metric_counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + value
+
+def metric_observe(name, value, labels=None):
+    """Record one observation in a histogram"""
+    key = _metric_key(labels)
+    with metrics_lock:
+        series = metric_histograms.setdefault(name, {})
+        counts = series.get(key)
+        if counts is None:
+            counts = series[key] = [0] * (len(METRICS_BUCKETS) + 2)
+        counts[bisect.bisect_left(METRICS_BUCKETS, value)] += 1
+        counts[-1] += value
+
+# Generators of (name, type, help, [(labels, value), ...]) read at scrape time;
+# each feature section appends its own next to the state it reports on.
+METRIC_COLLECTORS = []
+
+def metric_cache(cache, hit):
+    """Count a hit or miss for a named cache"""
+    metric_inc('taknet_cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'})
+
+def _format_metric_labels(labels):
+    if not labels:
+        return ''
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{key}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _format_metric_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+def render_metrics():
+    """Prometheus text exposition (format 0.0.4) of everything recorded so far"""
+    lines = []
+    with metrics_lock:
+        counters = {name: dict(series) for name, series in metric_counters.items()}
+        histograms = {name: {k: list(v) for k, v in series.items()} for name, series in metric_histograms.items()}
+
+    for name in sorted(counters):
+        mtype, help_text = METRIC_HELP.get(name, ('counter', name))
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {mtype}']
+        for key, value in sorted(counters[name].items()):
+            lines.append(f'{name}{_format_metric_labels(key)} {_format_metric_value(value)}')
+
+    bounds = [repr(float(b)) for b in METRICS_BUCKETS] + ['+Inf']
+    for name in sorted(histograms):
+        mtype, help_text = METRIC_HELP.get(name, ('histogram', name))
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {mtype}']
+        for key, counts in sorted(histograms[name].items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_metric_labels(key + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_metric_labels(key)} {_format_metric_value(float(counts[-1]))}')
+            lines.append(f'{name}_count{_format_metric_labels(key)} {cumulative}')
+
+    for collector in METRIC_COLLECTORS:
+        try:
+            for name, mtype, help_text, samples in collector():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {mtype}']
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_metric_labels(_metric_key(labels))} {_format_metric_value(value)}')
+        except Exception as e:
+            lines.append(f'# {collector.__name__} failed: {e}')
+    return '\n'.join(lines) + '\n'
+
+def _record_command_metrics(record):
+    """command_runner observer: spawn counts, errors, timeouts and durations per command"""
+    labels = {'command': record['label']}
+    if record['error'] is None:
+        metric_inc('taknet_subprocess_spawns_total', labels)
+        metric_observe('taknet_subprocess_duration_seconds', record['seconds'], labels)
+    if record['timed_out']:
+        metric_inc('taknet_subprocess_timeouts_total', labels)
+    elif record['error'] or record['returncode']:
+        metric_inc('taknet_subprocess_errors_total', labels)
+    if record['limit']:
+        metric_observe('taknet_subprocess_limit_wait_seconds', record['wait_seconds'], {'limit': record['limit']})
+
+command_runner.add_observer(_record_command_metrics)
+
+METRIC_HELP.update({
+    'taknet_cache_load_duration_seconds': ('histogram', 'Time spent loading one value into a TTL cache'),
+    'taknet_cache_load_errors_total': ('counter', 'TTL cache loads that raised (nothing cached)'),
+    'taknet_cache_evictions_total': ('counter', 'TTL cache entries dropped for the size bound'),
+})
+
+def _record_cache_metrics(cache, event, seconds):
+    """ttl_cache observer: lookups by result (hit, stale, miss), loads and evictions"""
+    labels = {'cache': cache}
+    if event in ('hit', 'stale', 'miss'):
+        metric_inc('taknet_cache_requests_total', {'cache': cache, 'result': event})
+    elif event == 'evict':
+        metric_inc('taknet_cache_evictions_total', labels)
+    else:
+        metric_observe('taknet_cache_load_duration_seconds', seconds, labels)
+        if event == 'error':
+            metric_inc('taknet_cache_load_errors_total', labels)
+
+ttl_cache.add_observer(_record_cache_metrics)
+
+def _collect_ttl_caches():
+    report = ttl_cache.report()
+    yield 'taknet_cache_entries', 'gauge', 'Entries held per TTL cache', [
+        ({'cache': name}, stats['entries']) for name, stats in report.items()]
+
+METRIC_COLLECTORS.append(_collect_ttl_caches)
+
+# =============================================================
+# Event bus
+# =============================================================
+# State changes are published as typed events instead of each consumer
+# polling for them:
+#   container.state    docker events for a container (start, die, health_status, ...)
+#   netbird.state      NetBird connected/IP changed (netbird_provider probe)
+#   config.generation  a reconcile finished applying config
+#   job.progress       a background job changed state or reported progress
+#   gps.fix            a GPS acquisition finished with a fix
+# Subscribers run on one dispatcher thread, never on the publisher's, so
+# producers can publish while holding their own locks. The newest
+# EVENT_HISTORY events are kept for /api/events, which long-polls by
+# sequence number like the log streams.
+EVENT_TYPES = ('container.state', 'netbird.state', 'config.generation', 'job.progress', 'gps.fix')
+
+EVENT_HISTORY = 500
+
+METRIC_HELP.update({
+    'taknet_events_published_total': ('counter', 'Events published on the internal bus, by type'),
+    'taknet_event_subscriber_errors_total': ('counter', 'Event subscriber callbacks that raised, by type'),
+})
+
+event_cond = threading.Condition()
+event_log = deque(maxlen=EVENT_HISTORY)  # {'seq', 'type', 'at', 'data'}, oldest first
+event_queue = deque()                    # published, not yet handed to subscribers
+event_subscribers = []                   # (set of types or None for all, callback)
+event_state = {'seq': 0, 'dispatcher': None}
+
+def publish_event(event_type, **data):
+    """Publish an event to subscribers and /api/events; returns its sequence number"""
+    with event_cond:
+        event_state['seq'] += 1
+        event = {'seq': event_state['seq'], 'type': event_type, 'at': time.time(), 'data': data}
+        event_log.append(event)
+        if event_subscribers:
+            event_queue.append(event)
+            if event_state['dispatcher'] is None:
+                event_state['dispatcher'] = threading.Thread(target=_event_dispatcher, name='event-dispatcher',
+                                                             daemon=True)
+                event_state['dispatcher'].start()
+        event_cond.notify_all()
+    metric_inc('taknet_events_published_total', {'type': event_type})
+    return event['seq']
+
+def subscribe_event(types, callback):
+    """Call callback(event) for every event of types (a type, a list of them, or '*')"""
+    types = None if types == '*' else {types} if isinstance(types, str) else set(types)
+    with event_cond:
+        event_subscribers.append((types, callback))
+
+def _event_dispatcher():
+    """Background thread: hand queued events to matching subscribers in order"""
+    while True:
+        with event_cond:
+            while not event_queue:
+                event_cond.wait()
+            event = event_queue.popleft()
+            subscribers = list(event_subscribers)
+        for types, callback in subscribers:
+            if types is not None and event['type'] not in types:
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                metric_inc('taknet_event_subscriber_errors_total', {'type': event['type']})
+                print(f"⚠ [Events] {getattr(callback, '__name__', callback)} failed on {event['type']}: {e}")
+
+def read_events(after=None, types=None, wait=0):
+    """
+    Events newer than sequence number after (all kept events if None),
+    optionally only of types, waiting up to wait seconds for one to arrive.
+    Returns (events, cursor, reset); reset means events after `after` were
+    already dropped from the history.
+    """
+    deadline = time.monotonic() + wait
+    with event_cond:
+        while True:
+            oldest = event_log[0]['seq'] if event_log else event_state['seq'] + 1
+            reset = after is not None and after < oldest - 1
+            since = after if after is not None and not reset else 0
+            events = [e for e in event_log if e['seq'] > since and (types is None or e['type'] in types)]
+            remaining = deadline - time.monotonic()
+            if events or after is None or remaining <= 0:
+                return events, event_state['seq'], reset
+            event_cond.wait(remaining)
+
+# =============================================================
+# Response compression (WSGI middleware)
+# =============================================================
+# Pages and JSON cross NetBird, Tailscale and the aggregator tunnel
+# uncompressed otherwise. Only buffered responses are compressed: they carry
+# a Content-Length of at least GZIP_MIN_SIZE and a text content type. Log
+# streams and other chunked bodies pass through untouched, as does anything
+# that already has a Content-Encoding (precompressed /assets) or a binary
+# type (images and fonts relayed by the stats proxy). Level 4 gets within a
+# few percent of the default level 6 ratio on settings.html for less CPU
+# on a Pi.
+GZIP_MIN_SIZE = 1024  # bytes
+GZIP_LEVEL = 4
+GZIP_CONTENT_TYPES = ('text/html', 'text/css', 'text/plain', 'text/javascript',
+                      'application/javascript', 'application/json', 'image/svg+xml')
+
+METRIC_HELP.update({
+    'taknet_http_compression_bytes_total': ('counter', 'Bytes of gzip-compressed responses before and after compression'),
+    'taknet_http_compression_duration_seconds': ('histogram', 'Time spent gzip-compressing one response'),
+})
+
+def _accepts_gzip(header):
+    """True if an Accept-Encoding header allows gzip (q > 0)"""
+    for part in header.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if coding.strip() in ('gzip', '*'):
+            q = params.strip()
+            if q.startswith('q='):
+                try:
+                    return float(q[2:]) > 0
+                except ValueError:
+                    return False
+            return True
+    return False
+
+class GzipMiddleware:
+    """gzip buffered text responses when the client accepts it"""
+
+    def __init__(self, app, min_size=GZIP_MIN_SIZE, level=GZIP_LEVEL):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+
+    def _compressible(self, status, headers):
+        if not status.startswith('200'):
+            return False
+        content_type = length = None
+        for name, value in headers:
+            name = name.lower()
+            if name == 'content-encoding':
+                return False
+            if name == 'content-type':
+                content_type = value.split(';')[0].strip().lower()
+            elif name == 'content-length':
+                length = value
+        try:
+            return content_type in GZIP_CONTENT_TYPES and int(length) >= self.min_size
+        except (TypeError, ValueError):
+            return False  # streamed, no Content-Length
+
+    def __call__(self, environ, start_response):
+        if environ.get('REQUEST_METHOD') == 'HEAD' or not _accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING', '')):
+            return self.app(environ, start_response)
+
+        deferred = {}
+
+        def capture(status, headers, exc_info=None):
+            if exc_info or not self._compressible(status, headers):
+                return start_response(status, headers, exc_info)
+            deferred.update(status=status, headers=headers)
+            return lambda data: deferred.setdefault('written', []).append(data)
+
+        result = self.app(environ, capture)
+        if not deferred:
+            return result
+        try:
+            body = b''.join(deferred.get('written', []) + list(result))
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+        started = time.monotonic()
+        compressed = gzip.compress(body, compresslevel=self.level, mtime=0)
+        metric_observe('taknet_http_compression_duration_seconds', time.monotonic() - started)
+        if len(compressed) >= len(body):
+            start_response(deferred['status'], deferred['headers'])
+            return [body]
+        metric_inc('taknet_http_compression_bytes_total', {'size': 'original'}, len(body))
+        metric_inc('taknet_http_compression_bytes_total', {'size': 'compressed'}, len(compressed))
+
+        headers, vary = [], False
+        for name, value in deferred['headers']:
+            lname = name.lower()
+            if lname == 'content-length':
+                continue
+            if lname == 'etag' and not value.startswith('W/'):
+                value = 'W/' + value  # the gzip bytes are a different representation
+            if lname == 'vary':
+                vary = vary or 'accept-encoding' in value.lower()
+            headers.append((name, value))
+        if not vary:
+            headers.append(('Vary', 'Accept-Encoding'))
+        headers += [('Content-Encoding', 'gzip'), ('Content-Length', str(len(compressed)))]
+        start_response(deferred['status'], headers)
+        return [compressed]
+
+# Global progress tracking
+service_progress = {
+    'service': 'idle',
+    'progress': 0,
+    'total': 0,
+    'status': 'Ready',
+    'details': ''
+}
+
+progress_lock = threading.Lock()
+
+def update_progress(service, progress, total=100, status='', details=''):
+    """Update global progress state (and that of the job running on this thread)"""
+    _set_service_progress(service, progress, total, status, details)
+
+    job = current_job()
+    if job:
+        job.progress(int(progress * 100 / total) if total else progress, status, details)
+
+def _set_service_progress(service, progress, total, status, details):
+    with progress_lock:
+        service_progress.clear()
+        service_progress.update({
+            'success': True,
+            'service': service,
+            'progress': progress,
+            'total': total,
+            'status': status,
+            'details': details,
+            'message': f'{status}\n{details}' if details else status
+        })
+
+def reset_progress():
+    """Reset progress to idle"""
+    update_progress('idle', 0, 100, 'Ready', '')
+
+# =============================================================
+# Background jobs
+# =============================================================
+# Long operations (config reconcile, Tailscale install, GPS acquisition, PiAware
+# feeder-ID generation) run as jobs on a small worker pool instead of one
+# ad-hoc thread each. A job may name a resource ('compose', 'tailscale',
+# 'gps', 'piaware', ...); jobs sharing a resource run one at a time in
+# submission order, the others wait in the queue without holding a worker.
+# With coalesce=True a submission joins an identical job that has not
+# started yet, so repeated requests become the running one plus one more.
+# Finished jobs are kept (newest JOB_HISTORY) for /api/jobs. Job functions
+# find their handle with current_job(); update_progress() reports to it.
+JOB_WORKERS = 3
+JOB_HISTORY = 50
+JOB_EVENTS_MAX = 100
+
+METRIC_HELP.update({
+    'taknet_jobs_total': ('counter', 'Background jobs finished, by kind and final state'),
+    'taknet_job_duration_seconds': ('histogram', 'Background job run time (excludes queueing)'),
+    'taknet_job_queue_wait_seconds': ('histogram', 'Time a background job waited for a worker or its resource'),
+})
+
+jobs_cond = threading.Condition()
+jobs = {}             # id -> Job, oldest first
+job_queue = deque()   # Jobs waiting to start
+job_resources = {}    # resource -> id of the running job holding it
+job_workers = []
+job_local = threading.local()
+
+class JobCancelled(Exception):
+    """Raised inside a job (by Job.check_cancelled) after cancel_job()"""
+
+class Job:
+    """One background job; the handle returned by submit_job()"""
+
+    def __init__(self, kind, target, args, kwargs, resource, coalesce_key, on_cancel=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs
+        self.resource = resource
+        self.coalesce_key = coalesce_key
+        self.on_cancel = on_cancel  # run if cancelled before it started (target never runs)
+        self.state = 'queued'  # queued, running, succeeded, failed, cancelled
+        self.percent = 0
+        self.message = 'Queued'
+        self.detail = ''
+        self.error = None
+        self.coalesced = 0
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self.events = deque(maxlen=JOB_EVENTS_MAX)
+        self.event_seq = 0
+        self.process = None
+        self.done = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def _event(self, **fields):
+        # caller holds jobs_cond
+        self.event_seq += 1
+        self.events.append({'seq': self.event_seq, 'at': time.time(), 'state': self.state, **fields})
+        publish_event('job.progress', job_id=self.id, kind=self.kind, state=self.state, **fields)
+
+    def progress(self, percent=None, message=None, detail=None):
+        """Report progress (0-100) and an optional status line"""
+        with jobs_cond:
+            if percent is not None:
+                self.percent = max(0, min(100, int(percent)))
+            if message is not None:
+                self.message = message
+            if detail is not None:
+                self.detail = detail
+            self._event(percent=self.percent, message=self.message, detail=self.detail)
+
+    def attach(self, process):
+        """Child process to terminate if the job is cancelled (None to detach)"""
+        with jobs_cond:
+            self.process = process
+            cancel = self.cancel_requested and process is not None
+        if cancel:
+            process.terminate()
+
+    @property
+    def cancelled(self):
+        return self.cancel_requested
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancel_job() was called for this job"""
+        if self.cancel_requested:
+            raise JobCancelled(f'{self.kind} job {self.id} cancelled')
+
+    def result(self, timeout=None):
+        """Wait for the job; return its value or re-raise its exception"""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f'{self.kind} job {self.id} still {self.state}')
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def snapshot(self, since=None):
+        """JSON-ready state; with since, also the progress events newer than that seq"""
+        with jobs_cond:
+            state = {
+                'id': self.id,
+                'kind': self.kind,
+                'resource': self.resource,
+                'state': self.state,
+                'percent': self.percent,
+                'message': self.message,
+                'detail': self.detail,
+                'error': self.error,
+                'coalesced': self.coalesced,
+                'submitted_at': self.submitted_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'cancel_requested': self.cancel_requested,
+            }
+            if since is not None:
+                state['events'] = [e for e in self.events if e['seq'] > since]
+            return state
+
+def current_job():
+    """Job running on this thread, or None"""
+    return getattr(job_local, 'job', None)
+
+def submit_job(kind, target, *args, resource=None, coalesce=False, on_cancel=None, **kwargs):
+    """Queue target(*args, **kwargs) as a background job and return its Job.
+
+    coalesce=True returns an already queued job with the same kind and
+    arguments instead of adding another one. on_cancel() is called if the
+    job is cancelled while still queued, for cleanup target would have done.
+    """
+    coalesce_key = (kind, args, tuple(sorted(kwargs.items()))) if coalesce else None
+    with jobs_cond:
+        if coalesce_key:
+            for queued in job_queue:
+                if queued.coalesce_key == coalesce_key:
+                    queued.coalesced += 1
+                    queued._event(message=queued.message, detail=f'Coalesced {queued.coalesced} more request(s)')
+                    return queued
+        job = Job(kind, target, args, kwargs, resource, coalesce_key, on_cancel)
+        job._event(message=job.message)
+        jobs[job.id] = job
+        job_queue.append(job)
+        _prune_jobs()
+        while len(job_workers) < JOB_WORKERS:
+            worker = threading.Thread(target=_job_worker, name=f'job-worker-{len(job_workers) + 1}', daemon=True)
+            job_workers.append(worker)
+            worker.start()
+        jobs_cond.notify_all()
+    return job
+
+def _prune_jobs():
+    # caller holds jobs_cond; drop the oldest finished jobs beyond JOB_HISTORY
+    finished = [job_id for job_id, job in jobs.items() if job.done.is_set()]
+    for job_id in finished[:max(0, len(finished) - JOB_HISTORY)]:
+        del jobs[job_id]
+
+def _next_runnable_job():
+    # caller holds jobs_cond; first queued job whose resource is free
+    busy = set()
+    for job in job_queue:
+        if job.resource and (job.resource in job_resources or job.resource in busy):
+            busy.add(job.resource)  # keep submission order within a resource
+            continue
+        job_queue.remove(job)
+        return job
+    return None
+
+def _job_worker():
+    """Worker thread: run queued jobs as their resources become free"""
+    while True:
+        with jobs_cond:
+            job = _next_runnable_job()
+            while job is None:
+                jobs_cond.wait()
+                job = _next_runnable_job()
+            if job.resource:
+                job_resources[job.resource] = job.id
+            job.state = 'running'
+            job.started_at = time.time()
+            job._event(message='Started')
+        metric_observe('taknet_job_queue_wait_seconds', job.started_at - job.submitted_at, {'kind': job.kind})
+        _run_job(job)
+
+def _run_job(job):
+    job_local.job = job
+    state, error, result, exception = 'succeeded', None, None, None
+    started = time.monotonic()
+    try:
+        job.check_cancelled()
+        result = job.target(*job.args, **job.kwargs)
+        if job.cancel_requested:
+            state = 'cancelled'
+    except JobCancelled as e:
+        state, error, exception = 'cancelled', 'Cancelled', e
+    except Exception as e:
+        state, error, exception = 'failed', str(e), e
+        print(f"✗ [Jobs] {job.kind} {job.id} failed: {e}")
+        import traceback
+        traceback.print_exc()
+    finally:
+        job_local.job = None
+    metric_observe('taknet_job_duration_seconds', time.monotonic() - started, {'kind': job.kind})
+    metric_inc('taknet_jobs_total', {'kind': job.kind, 'state': state})
+    with jobs_cond:
+        if job.resource and job_resources.get(job.resource) == job.id:
+            del job_resources[job.resource]
+        job.state, job.error, job.process = state, error, None
+        job._result, job._exception = result, exception
+        job.finished_at = time.time()
+        if state == 'succeeded':
+            job.percent = 100
+        job._event(percent=job.percent, message=job.message, detail=error or job.detail)
+        job.done.set()
+        _prune_jobs()
+        jobs_cond.notify_all()
+
+def cancel_job(job_id):
+    """Cancel a queued job, or ask a running one to stop; its Job or None"""
+    with jobs_cond:
+        job = jobs.get(job_id)
+        if job is None or job.done.is_set():
+            return job
+        job.cancel_requested = True
+        process = job.process
+        on_cancel = None
+        if job.state == 'queued':
+            on_cancel = job.on_cancel
+            job_queue.remove(job)
+            job.state, job.error = 'cancelled', 'Cancelled'
+            job._exception = JobCancelled(f'{job.kind} job {job.id} cancelled')
+            job.finished_at = time.time()
+            job._event(message='Cancelled before start')
+            job.done.set()
+            metric_inc('taknet_jobs_total', {'kind': job.kind, 'state': 'cancelled'})
+        else:
+            job._event(message='Cancel requested')
+    if on_cancel is not None:
+        try:
+            on_cancel()
+        except Exception as e:
+            print(f"⚠ [Jobs] {job.kind} cancel cleanup failed: {e}")
+    if process is not None:
+        try:
+            process.terminate()
+        except OSError:
+            pass
+    return job
+
+def get_job(job_id):
+    """Job by id (running, queued or retained), or None"""
+    with jobs_cond:
+        return jobs.get(job_id)
+
+def list_jobs(kind=None):
+    """Jobs newest first, optionally of one kind"""
+    with jobs_cond:
+        selected = [job for job in jobs.values() if kind is None or job.kind == kind]
+    return selected[::-1]
+
+def _collect_jobs():
+    with jobs_cond:
+        queued = len(job_queue)
+        running = sum(1 for job in jobs.values() if job.state == 'running')
+    yield 'taknet_jobs', 'gauge', 'Background jobs by state', [
+        ({'state': 'queued'}, queued), ({'state': 'running'}, running)]
+    yield 'taknet_job_workers', 'gauge', 'Background job worker threads', [({}, len(job_workers))]
+
+METRIC_COLLECTORS.append(_collect_jobs)
+
+# =============================================================
+# Request-scoped memoization
+# =============================================================
+# One page or API request can reach read_env() and the docker status helpers
+# many times (the dashboard bootstrap sections each read .env and ask for
+# service states). Functions decorated with @request_memoized run at most
+# once per RequestScope; concurrent callers in the same scope wait for the
+# first call instead of repeating it. The web app opens a scope per request
+# and hands it to the bootstrap worker threads with bind_request_scope();
+# background threads and jobs have none and always call through. Dicts are
+# returned as copies so callers can keep mutating what they get.
+request_local = threading.local()
+
+class RequestScope:
+    """Memoized lookups and their call/hit counts for one request"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = {}   # key -> [lock, value]
+        self.counts = {}  # name -> [calls, lookups]
+
+    def lookup(self, key, fn):
+        with self.lock:
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self.slots[key] = [threading.Lock(), _UNSET]
+            counts = self.counts.setdefault(key[0], [0, 0])
+            counts[1] += 1
+        with slot[0]:
+            hit = slot[1] is not _UNSET
+            if not hit:
+                slot[1] = fn()
+                with self.lock:
+                    counts[0] += 1
+        metric_cache('request_' + key[0], hit)
+        value = slot[1]
+        return dict(value) if isinstance(value, dict) else value
+
+    def forget(self, name):
+        """Drop memoized results of name (after writing what it reads)"""
+        with self.lock:
+            for key in [key for key in self.slots if key[0] == name]:
+                del self.slots[key]
+
+    def summary(self):
+        """'name=calls/lookups, ...' for the X-TAKNET-Probes header"""
+        with self.lock:
+            return ', '.join(f'{name}={calls}/{lookups}' for name, (calls, lookups) in sorted(self.counts.items()))
+
+_UNSET = object()
+
+def current_request_scope():
+    """RequestScope active on this thread, or None"""
+    return getattr(request_local, 'scope', None)
+
+def begin_request_scope():
+    request_local.scope = RequestScope()
+    return request_local.scope
+
+def end_request_scope():
+    request_local.scope = None
+
+def bind_request_scope(fn):
+    """fn wrapped to run inside the caller's RequestScope on another thread"""
+    scope = current_request_scope()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        previous = current_request_scope()
+        request_local.scope = scope
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            request_local.scope = previous
+    return run
+
+def request_memoized(fn):
+    """Run fn at most once per RequestScope for the same arguments"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        scope = current_request_scope()
+        if scope is None:
+            return fn(*args, **kwargs)
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        return scope.lookup(key, lambda: fn(*args, **kwargs))
+    return wrapper
+
+# Persistent health and activity tracking
+# State (failure counters, reboot flags) lives in memory and is written
+# atomically to HEALTH_STATE_FILE only when it changes, coalesced over
+# HEALTH_STATE_WRITE_DELAY. Events go to an append-only JSON-lines journal
+# (rotated at HEALTH_EVENTS_MAX_BYTES) instead of rewriting the state file.
+HEALTH_STATE_FILE = Path("/opt/adsb/config/health_state.json")
+
+HEALTH_EVENTS_FILE = Path("/opt/adsb/config/health_events.log")
+
+HEALTH_EVENTS_MAX_BYTES = 256 * 1024
+
+HEALTH_EVENTS_KEEP = 50  # events served to the dashboard
+
+HEALTH_STATE_WRITE_DELAY = 5  # seconds
+
+HEALTH_STATE_DEFAULTS = {
+    'consecutive_failures': {},
+    'manual_correction_required': False,
+    'reboot_count': 0,
+    'last_reboot_at': None
+}
+
+health_lock = threading.RLock()
+
+health_state = {}  # in-memory state, loaded on first use
+
+health_events = deque(maxlen=HEALTH_EVENTS_KEEP)  # newest first
+
+health_state_dirty = False
+
+health_state_timer = None
+
+def atomic_write_text(path, text):
+    """Write via temp file + fsync + rename so a power cut never leaves a torn file"""
+    tmp = path.with_name(f'.{path.name}.tmp')
+    with open(tmp, 'w') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def _ensure_health_loaded():
+    """Load state and the journal tail once (caller holds health_lock)"""
+    if health_state:
+        return
+    data = {}
+    if HEALTH_STATE_FILE.exists():
+        try:
+            data = json.loads(HEALTH_STATE_FILE.read_text())
+        except Exception:
+            data = {}
+    legacy_events = data.pop('events', None) or []
+    # Merge with defaults to ensure all keys exist
+    health_state.update({**json.loads(json.dumps(HEALTH_STATE_DEFAULTS)), **data})
+
+    for path in (HEALTH_EVENTS_FILE.with_suffix('.log.1'), HEALTH_EVENTS_FILE):
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        health_events.appendleft(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            continue
+
+    if legacy_events and not health_events:
+        # One-time migration from the old events list inside health_state.json (newest first)
+        for event in reversed(legacy_events[:HEALTH_EVENTS_KEEP]):
+            _append_health_event(event)
+        _schedule_health_state_write(0)
+
+def _append_health_event(event):
+    """Add to memory and the journal (caller holds health_lock)"""
+    health_events.appendleft(event)
+    try:
+        if HEALTH_EVENTS_FILE.exists() and HEALTH_EVENTS_FILE.stat().st_size > HEALTH_EVENTS_MAX_BYTES:
+            os.replace(HEALTH_EVENTS_FILE, HEALTH_EVENTS_FILE.with_suffix('.log.1'))
+        with open(HEALTH_EVENTS_FILE, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+    except Exception as e:
+        print(f"Error appending health event: {e}")
+
+def _schedule_health_state_write(delay=HEALTH_STATE_WRITE_DELAY):
+    """Mark state dirty and write it once after delay (caller holds health_lock)"""
+    global health_state_dirty, health_state_timer
+    health_state_dirty = True
+    if health_state_timer is None:
+        health_state_timer = threading.Timer(delay, flush_health_state)
+        health_state_timer.daemon = True
+        health_state_timer.start()
+
+def flush_health_state():
+    """Write pending state changes now"""
+    global health_state_dirty, health_state_timer
+    with health_lock:
+        if health_state_timer is not None:
+            health_state_timer.cancel()
+            health_state_timer = None
+        if not health_state_dirty:
+            return
+        text = json.dumps(health_state, indent=2)
+        health_state_dirty = False
+        try:
+            atomic_write_text(HEALTH_STATE_FILE, text)
+        except Exception as e:
+            health_state_dirty = True
+            print(f"Error saving health state: {e}")
+
+def load_health_state():
+    """Copy of the in-memory health state, including recent events (newest first)"""
+    with health_lock:
+        _ensure_health_loaded()
+        state = json.loads(json.dumps(health_state))
+        state['events'] = list(health_events)
+        return state
+
+def save_health_state(state, flush=False):
+    """Update in-memory state; persisted only if it changed, after the coalescing window"""
+    with health_lock:
+        _ensure_health_loaded()
+        new_state = {k: v for k, v in state.items() if k != 'events'}  # events live in the journal
+        if new_state != health_state:
+            health_state.clear()
+            health_state.update(json.loads(json.dumps(new_state)))
+            _schedule_health_state_write()
+    if flush:
+        flush_health_state()
+
+def add_health_event(message):
+    """Add a timestamped event to the health event journal"""
+    event = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'message': str(message)
+    }
+    with health_lock:
+        _ensure_health_loaded()
+        _append_health_event(event)
+
+ENV_FILE = Path("/opt/adsb/config/.env")
+
+@request_memoized
+def read_env():
+    """Read .env file and return as dict, handling optional quotes"""
+    env_vars = {}
+    if ENV_FILE.exists():
+        with open(ENV_FILE) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    key = key.strip()
+                    value = value.strip()
+                    # Strip leading/trailing quotes if matching pair
+                    if len(value) >= 2 and (
+                        (value[0] == '"' and value[-1] == '"') or
+                        (value[0] == "'" and value[-1] == "'")
+                    ):
+                        value = value[1:-1]
+                        # Unescape double quotes if they were escaped during writing
+                        value = value.replace('\\"', '"')
+                    env_vars[key] = value
+    return env_vars
+
+def taknet_ps_beast_status_port(env):
+    """
+    TCP port ultrafeeder uses for the TAKNET-PS Beast outbound connection.
+    When a valid feeder claim key is set, traffic goes through taknet-beast-claim
+    on the internal port (see config_builder.BEAST_CLAIM_PROXY_PORT).
+    """
+    try:
+        if config_builder.taknet_beast_uses_claim_proxy(env):
+            return str(config_builder.BEAST_CLAIM_PROXY_PORT)
+    except Exception as ex:
+        print(f"taknet_ps_beast_status_port: {ex}")
+    return env.get('TAKNET_PS_SERVER_PORT', '30004')
+
+def get_netbird_state(force=False):
+    """
+    Cached NetBird state shared with config_builder and the VPN watchdog
+    (see scripts/netbird_provider.py). Keys: installed, connected, ip, source.
+    """
+    return netbird_provider.get_netbird_state(force=force)
+
+def invalidate_netbird_state():
+    """Call after netbird up/down/logout so the next read probes again"""
+    netbird_provider.invalidate()
+
+def _publish_netbird_change(old, new):
+    """netbird_provider subscriber: connected/IP changes become netbird.state events"""
+    publish_event('netbird.state', connected=new['connected'], ip=new['ip'], source=new['source'],
+                  was_connected=old['connected'] if old else None, previous_ip=old['ip'] if old else None)
+
+netbird_provider.subscribe(_publish_netbird_change)
+
+def get_taknet_connection_status(env_vars):
+    """
+    Get current TAKNET-PS connection status (NetBird only; Tailscale does not affect routing).
+    Returns dict with selected_host, connection_type, etc.
+    """
+    try:
+        if env_vars.get('TAKNET_PS_ENABLED', 'true').lower() != 'true':
+            return None
+        
+        # Run the same detection logic as config_builder.py
+        selected_host, connection_type = config_builder.select_taknet_host(env_vars)
+        
+        if not selected_host:
+            return None
+        
+        return {
+            'enabled': True,
+            'selected_host': selected_host,
+            'connection_type': connection_type,
+            'port': env_vars.get('TAKNET_PS_SERVER_PORT', '30004'),
+            'mlat_port': env_vars.get('TAKNET_PS_MLAT_PORT', '30105'),
+            'mlat_enabled': env_vars.get('TAKNET_PS_MLAT_ENABLED', 'true').lower() == 'true'
+        }
+    except Exception as e:
+        print(f"Error getting TAKNET-PS status: {e}")
+        return None
+
+def write_env(env_vars):
+    """Write dict to .env file, quoting values for safety"""
+    lines = []
+    for key, value in env_vars.items():
+        # Ensure value is string
+        val_str = str(value)
+        # Escape any existing double quotes
+        val_escaped = val_str.replace('"', '\\"')
+        # Wrap in double quotes for shell safety
+        lines.append(f'{key}="{val_escaped}"\n')
+    with open(ENV_FILE, 'w') as f:
+        f.writelines(lines)
+    scope = current_request_scope()
+    if scope:
+        scope.forget('read_env')
+
+def get_or_create_feeder_uuid():
+    """
+    Get existing feeder UUID from .env or generate a new one.
+    The UUID persists across reboots and is used by aggregators like adsb.lol
+    """
+    env_vars = read_env()
+    
+    # Check if UUID already exists
+    if 'FEEDER_UUID' in env_vars and env_vars['FEEDER_UUID']:
+        return env_vars['FEEDER_UUID']
+    
+    # Generate new UUID
+    feeder_uuid = str(uuid.uuid4())
+    
+    # Save to .env
+    env_vars['FEEDER_UUID'] = feeder_uuid
+    write_env(env_vars)
+    
+    print(f"Generated new feeder UUID: {feeder_uuid}")
+    return feeder_uuid
+
+@request_memoized
+def get_docker_status():
+    """Get Docker container status"""
+    try:
+        result = command_runner.run(
+            ['docker', 'ps', '-a', '--format', '{{.Names}}\t{{.Status}}'],
+            capture_output=True, text=True, timeout=5
+        )
+        if result.returncode == 0:
+            containers = {}
+            for line in result.stdout.strip().split('\n'):
+                if line:
+                    name, status = line.split('\t', 1)
+                    containers[name] = status
+            return containers
+        return {}
+    except:
+        return {}
+
+@request_memoized
+def get_docker_status_all():
+    """Get Docker container status for ALL containers (running and stopped)"""
+    try:
+        result = command_runner.run(
+            ['docker', 'ps', '-a', '--format', '{{.Names}}\t{{.Status}}'],
+            capture_output=True, text=True, timeout=5
+        )
+        if result.returncode == 0:
+            containers = {}
+            for line in result.stdout.strip().split('\n'):
+                if line:
+                    parts = line.split('\t', 1)
+                    if len(parts) == 2:
+                        name, status = parts
+                        containers[name] = status
+            return containers
+        return {}
+    except:
+        return {}
+
+def container_exists(container_name):
+    """Check if a Docker container exists (running or stopped)"""
+    try:
+        result = command_runner.run(
+            ['docker', 'ps', '-a', '--format', '{{.Names}}'],
+            capture_output=True, text=True, timeout=5
+        )
+        if result.returncode == 0:
+            containers = result.stdout.strip().split('\n')
+            return container_name in containers
+        return False
+    except:
+        return False
+
+# Cache for service states to prevent flickering. No stale window: the UI
+# polls this right after restarts, so an expired state is always re-read.
+SERVICE_STATE_CACHE_DURATION = 2  # seconds
+
+service_state_cache = ttl_cache.TTLCache('service_state', ttl=SERVICE_STATE_CACHE_DURATION, max_entries=64)
+
+def get_service_state(service_name, docker_status_all=None):
+    """Get detailed service state: downloading, starting, running, stopped, or not_installed"""
+    return service_state_cache.get(service_name, lambda: _probe_service_state(service_name, docker_status_all))
+
+def _probe_service_state(service_name, docker_status_all):
+    """Uncached get_service_state"""
+    # Check if currently being downloaded/started (tracked by progress system)
+    with progress_lock:
+        if service_progress['service'] == service_name:
+            if service_progress['progress'] < 100:
+                return 'downloading' if service_progress['progress'] < 85 else 'starting'
+    
+    # Single atomic Docker check - get ALL container statuses at once (if not provided)
+    if docker_status_all is None:
+        docker_status_all = get_docker_status_all()
+    container_name = service_name
+    
+    # Check if container exists and get its status
+    if container_name in docker_status_all:
+        status = docker_status_all[container_name]
+        
+        # Parse Docker status string
+        if 'Up' in status:
+            state = 'running'
+        elif 'Restarting' in status:
+            state = 'starting'
+        elif 'Exited' in status or 'Created' in status:
+            state = 'stopped'
+        else:
+            # Unknown status - default to stopped
+            state = 'stopped'
+    else:
+        # Container doesn't exist
+        state = 'not_installed'
+    
+    return state
+
+# =============================================================
+# Container events (docker events -> container.state)
+# =============================================================
+# One `docker events` follower publishes lifecycle and health changes of
+# every container as they happen. The cached service state of a container
+# is dropped on each of its events, and the health watchdog wakes early.
+# If dockerd restarts, the follower reconnects after a short pause.
+CONTAINER_EVENT_ACTIONS = ('create', 'start', 'restart', 'stop', 'die', 'destroy', 'health_status')
+
+CONTAINER_EVENTS_RETRY = 5  # seconds
+
+container_events_state = {'started': False, 'connected': False}
+
+def _parse_container_event(line):
+    """(name, action, health) from one `docker events --format '{{json .}}'` line, or None"""
+    try:
+        raw = json.loads(line)
+    except ValueError:
+        return None
+    name = ((raw.get('Actor') or {}).get('Attributes') or {}).get('name')
+    if not name:
+        return None
+    action, _, health = (raw.get('Action') or raw.get('status') or '').partition(':')
+    return name, action.strip(), health.strip() or None
+
+def _container_event_follower():
+    """Background thread: follow docker events and publish container.state"""
+    cmd = ['docker', 'events', '--format', '{{json .}}', '--filter', 'type=container']
+    for action in CONTAINER_EVENT_ACTIONS:
+        cmd += ['--filter', f'event={action}']
+    while True:
+        try:
+            proc = command_runner.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        except OSError as e:
+            print(f"[Container events] Cannot run docker events: {e}")
+            time.sleep(CONTAINER_EVENTS_RETRY * 12)
+            continue
+        container_events_state['connected'] = True
+        try:
+            for line in proc.stdout:
+                parsed = _parse_container_event(line)
+                if parsed:
+                    name, action, health = parsed
+                    publish_event('container.state', name=name, action=action, health=health)
+        finally:
+            container_events_state['connected'] = False
+            if proc.poll() is None:
+                proc.terminate()
+            proc.wait()
+        time.sleep(CONTAINER_EVENTS_RETRY)
+
+def start_container_event_follower():
+    """Start the docker events follower once"""
+    with event_cond:
+        if container_events_state['started']:
+            return
+        container_events_state['started'] = True
+    threading.Thread(target=_container_event_follower, name='container-events', daemon=True).start()
+
+def _container_state_changed(event):
+    """container.state subscriber: the next get_service_state reads docker again"""
+    service_state_cache.invalidate(event['data']['name'])
+
+subscribe_event('container.state', _container_state_changed)
+
+# =============================================================
+# Image pre-pull scheduler
+# =============================================================
+# `docker compose up` downloads any image that is not present locally, so a
+# restart right after a new image set (or a newly enabled feed) waits on the
+# feeder's uplink. The pre-puller compares local RepoDigests with registry
+# manifest digests (HEAD requests, no layer traffic), estimates the bytes a
+# pull would fetch from the layer lists, and pulls changed or missing images
+# one at a time inside IMAGE_PREPULL_WINDOW or while the host is idle.
+# That schedule is the only throttle: dockerd does the download, decompression
+# and layer writes at its own priority, whatever the `docker pull` client runs at.
+# Restarts then run with `--pull never` whenever every image is local.
+COMPOSE_DIR = '/opt/adsb/config'
+
+IMAGE_PREPULL_CHECK_INTERVAL = 6 * 3600  # seconds between registry digest checks
+
+IMAGE_PREPULL_POLL_INTERVAL = 300  # seconds between window/idle checks
+
+IMAGE_PREPULL_WINDOW_DEFAULT = '01:00-05:00'  # local time; IMAGE_PREPULL_WINDOW in .env
+
+IMAGE_PREPULL_IDLE_LOAD = 0.5  # 1-minute load average per CPU below which the host is idle
+
+IMAGE_PULL_TIMEOUT = 3600
+
+DOCKER_HUB_REGISTRY = 'registry-1.docker.io'
+
+REGISTRY_MANIFEST_ACCEPT = ', '.join((
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.oci.image.manifest.v1+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+))
+
+image_prepull_lock = threading.Lock()
+
+image_prepull_wakeup = threading.Event()
+
+compose_up_lock = threading.Lock()  # held while `docker compose up` runs
+
+image_prepull_state = {
+    'started': False,
+    'images': {},          # image -> result of check_image()
+    'checked_at': None,
+    'check_requested': False,
+    'pull_requested': False,
+    'pulling': None,
+    'last_pull': None,     # {'image', 'success', 'seconds', 'finished_at', 'error'}
+    'error': None,
+}
+
+registry_tokens = {}  # (registry, repository) -> bearer token
+
+docker_engine_cache = {}
+
+def parse_image_ref(image):
+    """'ghcr.io/org/name:tag' -> (registry, repository, tag) with Docker Hub defaults"""
+    name, tag = image, 'latest'
+    if '@' in name:
+        name, tag = name.split('@', 1)
+    elif ':' in name.rsplit('/', 1)[-1]:
+        name, tag = name.rsplit(':', 1)
+    first = name.split('/', 1)[0]
+    if '/' in name and ('.' in first or ':' in first or first == 'localhost'):
+        registry, repository = name.split('/', 1)
+    else:
+        registry, repository = DOCKER_HUB_REGISTRY, name
+        if '/' not in repository:
+            repository = f'library/{repository}'
+    return registry, repository, tag
+
+def docker_platform():
+    """(architecture, variant) of the local Docker engine, e.g. ('arm64', None)"""
+    if 'platform' not in docker_engine_cache:
+        arch = None
+        try:
+            result = command_runner.run(['docker', 'version', '--format', '{{.Server.Arch}}'],
+                                    capture_output=True, text=True, timeout=10)
+            arch = result.stdout.strip() or None
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        if not arch:
+            machine = os.uname().machine
+            arch = {'x86_64': 'amd64', 'aarch64': 'arm64'}.get(machine, 'arm' if machine.startswith('arm') else machine)
+        variant = None
+        if arch == 'arm':
+            variant = 'v6' if os.uname().machine.startswith('armv6') else 'v7'
+        docker_engine_cache['platform'] = (arch, variant)
+    return docker_engine_cache['platform']
+
+def _registry_token(challenge, repository):
+    """Anonymous pull token for a `WWW-Authenticate: Bearer ...` challenge"""
+    import urllib.parse
+    import urllib.request
+    params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+    realm = params.pop('realm', None)
+    if not realm:
+        raise RuntimeError('registry requires unsupported authentication')
+    params.setdefault('scope', f'repository:{repository}:pull')
+    url = f"{realm}?{urllib.parse.urlencode(params)}"
+    with urllib.request.urlopen(url, timeout=15) as resp:
+        data = json.loads(resp.read().decode('utf-8'))
+    return data.get('token') or data.get('access_token')
+
+def registry_manifest(registry, repository, reference, method='GET'):
+    """(digest, manifest) for a tag or digest; manifest is None for HEAD"""
+    import urllib.request
+    url = f'https://{registry}/v2/{repository}/manifests/{reference}'
+    headers = {'Accept': REGISTRY_MANIFEST_ACCEPT, 'User-Agent': f'TAKNET-PS-Feeder/{VERSION}'}
+    for attempt in range(2):
+        token = registry_tokens.get((registry, repository))
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        req = urllib.request.Request(url, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=15) as resp:
+                digest = resp.headers.get('Docker-Content-Digest')
+                if method == 'HEAD':
+                    return digest, None
+                return digest, json.loads(resp.read().decode('utf-8'))
+        except urllib.error.HTTPError as e:
+            if e.code != 401 or attempt:
+                raise
+            registry_tokens[(registry, repository)] = _registry_token(
+                e.headers.get('WWW-Authenticate', ''), repository)
+
+def _platform_layers(registry, repository, manifest):
+    """{blob digest: size} for this host's platform, resolving an image index"""
+    if 'manifests' in manifest:
+        arch, variant = docker_platform()
+        chosen = None
+        for entry in manifest['manifests']:
+            platform = entry.get('platform') or {}
+            if platform.get('os') != 'linux' or platform.get('architecture') != arch:
+                continue
+            if variant and platform.get('variant') not in (None, variant):
+                continue
+            chosen = entry
+            break
+        if not chosen:
+            return None
+        _, manifest = registry_manifest(registry, repository, chosen['digest'])
+    blobs = {layer['digest']: layer.get('size', 0) for layer in manifest.get('layers', [])}
+    config = manifest.get('config') or {}
+    if config.get('digest'):
+        blobs[config['digest']] = config.get('size', 0)
+    return blobs
+
+def compose_images():
+    """Images used by the active services of the generated compose file"""
+    try:
+        result = command_runner.run(['docker', 'compose', 'config', '--images'],
+                                capture_output=True, text=True, timeout=15, cwd=COMPOSE_DIR)
+        if result.returncode == 0:
+            return sorted({line.strip() for line in result.stdout.splitlines() if line.strip()})
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    # Older compose without --images: read the generated file directly
+    try:
+        text = Path(COMPOSE_DIR, 'docker-compose.yml').read_text()
+    except OSError:
+        return []
+    return sorted(set(re.findall(r'^\s+image:\s*[\'"]?([^\'"\s]+)', text, re.MULTILINE)))
+
+def local_image_digests(images):
+    """{image: repo digest, '' if present without one, None if not present locally}"""
+    found = {image: None for image in images}
+    if not images:
+        return found
+    try:
+        # Exits non-zero when any image is missing but still prints the rest
+        result = command_runner.run(['docker', 'image', 'inspect', *images],
+                                capture_output=True, text=True, timeout=15)
+        inspected = json.loads(result.stdout or '[]')
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        return found
+    for info in inspected:
+        digests = info.get('RepoDigests') or []
+        for tag in info.get('RepoTags') or []:
+            # Docker Hub tags are stored without the registry/library prefix
+            for image in images:
+                if image == tag or image == f'docker.io/{tag}' or image == f'docker.io/library/{tag}':
+                    repo = image.rsplit(':', 1)[0] if ':' in image.rsplit('/', 1)[-1] else image
+                    match = [d for d in digests if d.split('@')[0] in (repo, tag.rsplit(':', 1)[0])]
+                    found[image] = (match or digests or ['@'])[0].split('@', 1)[1]
+    return found
+
+def check_image(image, local_digest):
+    """Compare one image with its registry tag and estimate the pull size"""
+    info = {
+        'image': image,
+        'present': local_digest is not None,
+        'local_digest': local_digest or None,
+        'remote_digest': None,
+        'up_to_date': None,
+        'pending_bytes': None,
+        'error': None,
+        'checked_at': time.time(),
+    }
+    if local_digest == '':
+        # Built or loaded locally; there is no registry copy to compare with
+        info['up_to_date'] = True
+        info['pending_bytes'] = 0
+        return info
+    try:
+        registry, repository, tag = parse_image_ref(image)
+        remote_digest, _ = registry_manifest(registry, repository, tag, method='HEAD')
+        info['remote_digest'] = remote_digest
+        if local_digest and remote_digest == local_digest:
+            info['up_to_date'] = True
+            info['pending_bytes'] = 0
+            return info
+        info['up_to_date'] = False
+
+        _, manifest = registry_manifest(registry, repository, remote_digest or tag)
+        remote_blobs = _platform_layers(registry, repository, manifest)
+        local_blobs = {}
+        if local_digest:
+            try:
+                _, old_manifest = registry_manifest(registry, repository, local_digest)
+                local_blobs = _platform_layers(registry, repository, old_manifest) or {}
+            except Exception:
+                pass  # old manifest garbage-collected upstream: count every layer
+        if remote_blobs is not None:
+            info['pending_bytes'] = sum(size for digest, size in remote_blobs.items()
+                                        if digest not in local_blobs)
+    except Exception as e:
+        info['error'] = str(e)
+    return info
+
+def check_images():
+    """Refresh registry comparisons for every compose image"""
+    images = compose_images()
+    local = local_image_digests(images)
+    results = {image: check_image(image, local[image]) for image in images}
+    with image_prepull_lock:
+        image_prepull_state['images'] = results
+        image_prepull_state['checked_at'] = time.time()
+        image_prepull_state['error'] = None if images else 'no images found in docker-compose.yml'
+    pending = [i for i in results.values() if i['up_to_date'] is False]
+    if pending:
+        total = sum(i['pending_bytes'] or 0 for i in pending)
+        print(f"[Pre-pull] {len(pending)} image(s) out of date, ~{total / 1048576:.1f} MB to fetch")
+    return results
+
+def compose_missing_images():
+    """Compose images that are not present locally (a restart would pull them)"""
+    images = compose_images()
+    local = local_image_digests(images)
+    return [image for image in images if local[image] is None]
+
+def compose_supports_pull_flag():
+    """`docker compose up --pull` needs Compose v2.22+; checked once"""
+    if 'pull_flag' not in docker_engine_cache:
+        try:
+            result = command_runner.run(['docker', 'compose', 'up', '--help'],
+                                    capture_output=True, text=True, timeout=10)
+            docker_engine_cache['pull_flag'] = '--pull' in result.stdout
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+    return docker_engine_cache['pull_flag']
+
+def _in_prepull_window(window, now=None):
+    """True if the local time falls inside 'HH:MM-HH:MM' (may wrap midnight)"""
+    window = (window or '').strip().lower()
+    if window in ('always', 'any'):
+        return True
+    match = re.match(r'^(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})$', window)
+    if not match:
+        return False
+    h1, m1, h2, m2 = (int(g) for g in match.groups())
+    start, end = h1 * 60 + m1, h2 * 60 + m2
+    tm = time.localtime(now)
+    minute = tm.tm_hour * 60 + tm.tm_min
+    if start <= end:
+        return start <= minute < end
+    return minute >= start or minute < end
+
+def _host_idle():
+    """Low load and no restart in progress"""
+    if compose_up_lock.locked():
+        return False
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1) < IMAGE_PREPULL_IDLE_LOAD
+    except OSError:
+        return False
+
+def pull_image(image):
+    """`docker pull` one image (callers decide when: window, idle or on request)"""
+    cmd = ['docker', 'pull', '--quiet', image]
+    started = time.time()
+    error = None
+    try:
+        result = command_runner.run(cmd, capture_output=True, text=True, timeout=IMAGE_PULL_TIMEOUT)
+        if result.returncode != 0:
+            error = (result.stderr or result.stdout).strip()[-300:]
+    except (OSError, subprocess.TimeoutExpired) as e:
+        error = str(e)
+    return {'image': image, 'success': error is None, 'seconds': round(time.time() - started, 1),
+            'finished_at': time.time(), 'error': error}
+
+def pull_pending_images():
+    """Pull out-of-date images one at a time; stops early if a restart begins"""
+    with image_prepull_lock:
+        pending = [i['image'] for i in image_prepull_state['images'].values() if i['up_to_date'] is False]
+    for image in pending:
+        if compose_up_lock.locked():
+            break
+        with image_prepull_lock:
+            image_prepull_state['pulling'] = image
+        print(f"[Pre-pull] Pulling {image} in the background")
+        outcome = pull_image(image)
+        info = check_image(image, local_image_digests([image])[image])
+        with image_prepull_lock:
+            image_prepull_state['pulling'] = None
+            image_prepull_state['last_pull'] = outcome
+            image_prepull_state['images'][image] = info
+        if outcome['success']:
+            print(f"✓ [Pre-pull] {image} ready ({outcome['seconds']}s)")
+        else:
+            print(f"⚠ [Pre-pull] {image} failed: {outcome['error']}")
+
+def _image_prepull_loop():
+    """Background thread: check digests periodically, pull inside the window or when idle"""
+    while True:
+        started = time.monotonic()
+        try:
+            env = read_env()
+            window = env.get('IMAGE_PREPULL_WINDOW', IMAGE_PREPULL_WINDOW_DEFAULT)
+            with image_prepull_lock:
+                checked_at = image_prepull_state['checked_at']
+                force_check = image_prepull_state['check_requested']
+                force_pull = image_prepull_state['pull_requested']
+                image_prepull_state['check_requested'] = False
+                image_prepull_state['pull_requested'] = False
+            if force_check or force_pull or not checked_at or time.time() - checked_at >= IMAGE_PREPULL_CHECK_INTERVAL:
+                check_images()
+            if window.strip().lower() != 'off':
+                idle_ok = env.get('IMAGE_PREPULL_IDLE', 'true').lower() == 'true' and _host_idle()
+                if force_pull or _in_prepull_window(window) or idle_ok:
+                    pull_pending_images()
+            elif force_pull:
+                pull_pending_images()
+        except Exception as e:
+            with image_prepull_lock:
+                image_prepull_state['error'] = str(e)
+            print(f"[Pre-pull] Error: {e}")
+        metric_observe('taknet_watchdog_loop_duration_seconds', time.monotonic() - started, {'watchdog': 'image_prepull'})
+        image_prepull_wakeup.wait(IMAGE_PREPULL_POLL_INTERVAL)
+        image_prepull_wakeup.clear()
+
+def start_image_prepuller():
+    """Start the background pre-puller once"""
+    with image_prepull_lock:
+        if image_prepull_state['started']:
+            return
+        image_prepull_state['started'] = True
+    threading.Thread(target=_image_prepull_loop, daemon=True).start()
+
+def request_image_prepull(check=True, pull=False):
+    """Ask the pre-puller to re-check digests (and optionally pull) now"""
+    start_image_prepuller()
+    with image_prepull_lock:
+        image_prepull_state['check_requested'] |= check
+        image_prepull_state['pull_requested'] |= pull
+    image_prepull_wakeup.set()
+
+def get_image_prepull_status():
+    """Snapshot of the pre-puller state for the API"""
+    start_image_prepuller()
+    env = read_env()
+    with image_prepull_lock:
+        images = [dict(i) for i in image_prepull_state['images'].values()]
+        status = {
+            'checked_at': image_prepull_state['checked_at'],
+            'pulling': image_prepull_state['pulling'],
+            'last_pull': dict(image_prepull_state['last_pull']) if image_prepull_state['last_pull'] else None,
+            'error': image_prepull_state['error'],
+        }
+    pending = [i for i in images if i['up_to_date'] is False]
+    status.update({
+        'window': env.get('IMAGE_PREPULL_WINDOW', IMAGE_PREPULL_WINDOW_DEFAULT),
+        'idle_pull': env.get('IMAGE_PREPULL_IDLE', 'true').lower() == 'true',
+        'images': images,
+        'pending_images': len(pending),
+        'pending_bytes': sum(i['pending_bytes'] or 0 for i in pending),
+        'restart_ready': not any(not i['present'] for i in images),
+    })
+    return status
+
+COMPOSE_ERROR_TAIL = 5  # output lines of a failed compose up kept for the error
+
+def monitor_docker_progress(service_name='ultrafeeder', services=None, build=True):
+    """
+    Monitor docker-compose up in real-time by streaming its output
+    v2.40.6: No timeout - monitors until actually complete
+    Parses actual Docker output for accurate progress
+    services limits the up to those compose services; build=False skips
+    config_builder when the caller (the reconciler) has just run it
+    Raises RuntimeError (with the last lines of output) if compose up fails
+    """
+    try:
+        reset_progress()
+        update_progress(service_name, 1, 100, 'Initializing...', 'Starting')
+        
+        # Run config builder first
+        if build:
+            rebuild_config()
+        
+        # Pull only what is missing; images the pre-puller already fetched
+        # are used as-is so the restart is not bounded by the uplink
+        missing_images = compose_missing_images()
+        pull_policy = 'missing' if missing_images else 'never'
+        total_images = len(missing_images)
+        if missing_images:
+            update_progress(service_name, 5, 100, 'Starting Docker Compose...', f'{total_images} image(s) to download')
+        else:
+            update_progress(service_name, 5, 100, 'Starting Docker Compose...', 'All images present locally')
+        
+        compose_cmd = ['docker', 'compose', 'up', '-d', '--remove-orphans']
+        if compose_supports_pull_flag():
+            compose_cmd += ['--pull', pull_policy]
+        compose_cmd += list(services or [])
+        
+        # Run docker compose with streaming output; the compose-up slot keeps
+        # command_runner.run(["docker", "compose", ... "up", ...]) callers out meanwhile
+        with compose_up_lock, command_runner.hold('compose-up'):
+            process = command_runner.Popen(
+                compose_cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,  # Merge stderr to stdout
+                text=True,
+                bufsize=1,  # Line buffered
+                cwd='/opt/adsb/config'
+            )
+            job = current_job()
+            if job:
+                job.attach(process)
+        
+            current_image = None
+            pull_order = []
+            images_pulled = set()
+            pull_span = 58 / max(1, total_images)  # image pulls share 10-68%
+            containers_created = set()
+            containers_started = set()
+            output_tail = deque(maxlen=COMPOSE_ERROR_TAIL)
+        
+            def pull_base(name):
+                index = pull_order.index(name) if name in pull_order else len(images_pulled)
+                return int(10 + min(index, max(0, total_images - 1)) * pull_span)
+        
+            # Read output line by line until process completes
+            for line in process.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                output_tail.append(line)
+                first = line.split()[0]
+            
+                # Image pulling started (" ultrafeeder Pulling")
+                if 'Pulling' in line and 'Container' not in line and not first.startswith('['):
+                    current_image = first
+                    if current_image not in pull_order:
+                        pull_order.append(current_image)
+                    update_progress(service_name, pull_base(current_image), 100, f'Pulling {current_image} image...', 'Downloading')
+            
+                # Download progress (format: " 14324c29e8df Downloading  25.5MB/100MB")
+                elif 'Downloading' in line and 'MB' in line:
+                    try:
+                        # Look for pattern like "25.5MB/100MB"
+                        match = re.search(r'(\d+\.?\d*)\s*MB\s*/\s*(\d+\.?\d*)\s*MB', line)
+                        if match:
+                            downloaded = float(match.group(1))
+                            total = float(match.group(2))
+                        
+                            img_progress = int((downloaded / total) * pull_span * 0.8) if total > 0 else 0
+                        
+                            update_progress(
+                                service_name,
+                                pull_base(current_image) + img_progress,
+                                100,
+                                f'Downloading {current_image}...',
+                                f'{downloaded:.1f}MB / {total:.1f}MB'
+                            )
+                    except:
+                        pass
+            
+                # Extract progress
+                elif 'Extracting' in line:
+                    if current_image:
+                        update_progress(service_name, pull_base(current_image) + int(pull_span * 0.8), 100, f'Extracting {current_image}...', 'Preparing')
+            
+                # Image pulled completely (" ultrafeeder Pulled")
+                elif 'Pulled' in line and not first.startswith('['):
+                    if first not in images_pulled:
+                        images_pulled.add(first)
+                        update_progress(
+                            service_name,
+                            min(68, int(10 + len(images_pulled) * pull_span)),
+                            100,
+                            f'{len(images_pulled)}/{total_images} images ready',
+                            f'{first} ✓'
+                        )
+            
+                # Network creation
+                elif 'Network' in line and ('Creating' in line or 'Created' in line):
+                    update_progress(service_name, 70, 100, 'Creating network...', 'Setting up')
+            
+                # Container creation
+                elif 'Container' in line and 'Creating' in line:
+                    parts = line.split()
+                    container_name = parts[1] if len(parts) > 1 else 'container'
+                    update_progress(service_name, 75, 100, f'Creating {container_name}...', 'Initializing')
+            
+                elif 'Container' in line and 'Created' in line:
+                    parts = line.split()
+                    container_name = parts[1] if len(parts) > 1 else 'container'
+                    if container_name not in containers_created:
+                        containers_created.add(container_name)
+                        progress = 75 + (len(containers_created) * 5)
+                        update_progress(service_name, progress, 100, f'{container_name} created', 'Ready')
+            
+                # Container starting
+                elif 'Container' in line and 'Starting' in line:
+                    parts = line.split()
+                    container_name = parts[1] if len(parts) > 1 else 'container'
+                    update_progress(service_name, 90, 100, f'Starting {container_name}...', 'Almost done')
+            
+                elif 'Container' in line and 'Started' in line:
+                    parts = line.split()
+                    container_name = parts[1] if len(parts) > 1 else 'container'
+                    if container_name not in containers_started:
+                        containers_started.add(container_name)
+                        progress = 90 + (len(containers_started) * 3)
+                        update_progress(service_name, min(99, progress), 100, f'{container_name} started', '✓')
+        
+            # Wait for process to complete
+            returncode = process.wait()
+            if job:
+                job.attach(None)
+                job.check_cancelled()
+            if returncode != 0:
+                raise RuntimeError('\n'.join([f"docker compose up failed (exit {returncode})"] + list(output_tail)))
+        
+        # Final verification - check if ultrafeeder is actually running
+        time.sleep(2)
+        result = command_runner.run(
+            ['docker', 'ps', '--filter', 'name=ultrafeeder', '--filter', 'status=running', '--format', '{{.Names}}'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        
+        if reconcile_pending():
+            # More changes were requested meanwhile; don't let the UI reload yet
+            update_progress(service_name, 99, 100, 'Applying newer changes...', 'Another restart is queued')
+        elif 'ultrafeeder' in result.stdout:
+            update_progress(service_name, 100, 100, 'complete', 'All containers running ✓')
+        else:
+            # Containers created but may still be initializing
+            update_progress(service_name, 95, 100, 'Finalizing startup...', 'Please wait')
+        
+    except JobCancelled:
+        update_progress(service_name, 0, 100, 'Cancelled', 'Restart cancelled')
+        raise
+    except Exception as e:
+        print(f"Docker compose monitoring error: {e}")
+        update_progress(service_name, 0, 100, 'Docker Compose failed', (str(e) or type(e).__name__).splitlines()[-1])
+        raise
+
+def restart_service(service_name='ultrafeeder'):
+    """Rebuild the config and docker compose up the stack, via the reconciler
+
+    Returns the reconcile generation to wait for (see wait_reconcile), or
+    False. Restarts requested within RECONCILE_QUIET of each other share one
+    rebuild and one compose up.
+    """
+    try:
+        generation = request_reconcile(f'restart {service_name}', progress_service=service_name)
+        print(f"✓ Docker Compose restart scheduled (generation {generation})")
+        return generation
+        
+    except Exception as e:
+        print(f"✗ Failed to initiate restart: {e}")
+        return False
+
+METRIC_HELP.update({
+    'taknet_config_build_duration_seconds': ('histogram', 'In-process config_builder.build() run time'),
+})
+
+def rebuild_config():
+    """Rebuild .env ULTRAFEEDER_CONFIG and docker-compose.yml in-process
+
+    Runs config_builder.build() with the cached NetBird state instead of
+    spawning config_builder.py. Returns its result dict, or False.
+    """
+    if not ENV_FILE.exists():
+        print(f"✗ Config rebuild failed: {ENV_FILE} not found")
+        return False
+    started = time.monotonic()
+    try:
+        result = config_builder.build(read_env(), netbird=get_netbird_state())
+    except Exception as e:
+        print(f"✗ Config rebuild exception: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+    metric_observe('taknet_config_build_duration_seconds', time.monotonic() - started)
+    scope = current_request_scope()
+    if scope:
+        scope.forget('read_env')  # build() rewrote ULTRAFEEDER_CONFIG
+    changed = [name for name, key in (('.env', 'env_changed'), ('docker-compose.yml', 'compose_changed')) if result[key]]
+    print(f"✓ Config rebuilt successfully ({result['feeds']} feeds, TAKNET-PS {result['connection_type']}; "
+          f"{', '.join(changed) + ' updated' if changed else 'no changes'})")
+    return result
+
+# =============================================================
+# Config reconcile (debounced rebuild + docker compose up)
+# =============================================================
+# Settings saves, feed toggles, SDR changes and the VPN watchdog don't run
+# config_builder.py and docker compose themselves. request_reconcile()
+# records what they want and returns a generation number; once no request
+# has arrived for RECONCILE_QUIET seconds (or RECONCILE_MAX_DELAY after the
+# first, so steady requests can't starve it) one 'reconcile' job rebuilds
+# the config and applies everything asked for with a single compose up.
+# Requests arriving while it runs form the next batch. wait_reconcile()
+# blocks until a run covering a generation has finished.
+RECONCILE_QUIET = 3.0       # seconds
+RECONCILE_MAX_DELAY = 15.0  # seconds
+
+METRIC_HELP.update({
+    'taknet_reconcile_requests_total': ('counter', 'Config rebuild/restart requests made to the reconciler'),
+    'taknet_reconcile_runs_total': ('counter', 'Reconcile runs (one rebuild + compose up each), by result'),
+})
+
+reconcile_cond = threading.Condition()
+reconcile_state = {
+    'requested': 0,   # newest generation handed out
+    'applied': 0,     # newest generation covered by a finished run
+    'running': None,  # generation being applied
+    'batch': None,    # requests not yet picked up by a run
+    'last': None,     # outcome of the latest run
+}
+reconcile_thread = []
+
+def request_reconcile(reason, services=None, stop=(), progress_service='ultrafeeder'):
+    """Schedule a config rebuild and compose apply; returns its generation
+
+    services=None runs docker compose up for the whole stack (only changed
+    containers are recreated), a list brings up just those services and an
+    empty one only rebuilds the config. stop lists services to stop instead;
+    the latest request for a service wins.
+    """
+    now = time.monotonic()
+    with reconcile_cond:
+        reconcile_state['requested'] += 1
+        generation = reconcile_state['requested']
+        batch = reconcile_state['batch']
+        if batch is None:
+            batch = reconcile_state['batch'] = {
+                'first_at': now, 'reasons': [], 'full': False,
+                'up': set(), 'stop': set(), 'progress_service': progress_service,
+            }
+        batch['last_at'] = now
+        batch['reasons'].append(reason)
+        if services is None:
+            batch['full'] = True
+        else:
+            batch['up'].update(services)
+            batch['stop'].difference_update(services)
+        batch['stop'].update(stop)
+        batch['up'].difference_update(stop)
+        if services is None or services or stop:
+            batch['progress_service'] = progress_service
+        busy = reconcile_state['running'] is not None
+        if not reconcile_thread:
+            thread = threading.Thread(target=_reconciler, name='reconciler', daemon=True)
+            reconcile_thread.append(thread)
+            thread.start()
+        reconcile_cond.notify_all()
+    metric_inc('taknet_reconcile_requests_total')
+    if not busy and (services is None or services or stop):
+        # Restart modals poll /api/service/progress straight away
+        _set_service_progress(progress_service, 1, 100, 'Waiting for more changes...',
+                              f'Applying in {RECONCILE_QUIET:g}s')
+    print(f"[Reconcile] {reason} (generation {generation})")
+    return generation
+
+def _reconciler():
+    """Scheduler thread: hand each settled batch to a 'reconcile' job"""
+    while True:
+        with reconcile_cond:
+            while True:
+                batch = reconcile_state['batch']
+                if batch is None:
+                    reconcile_cond.wait()
+                    continue
+                due = min(batch['last_at'] + RECONCILE_QUIET, batch['first_at'] + RECONCILE_MAX_DELAY)
+                remaining = due - time.monotonic()
+                if remaining <= 0:
+                    break
+                reconcile_cond.wait(remaining)
+            reconcile_state['batch'] = None
+            generation = reconcile_state['running'] = reconcile_state['requested']
+
+        job = submit_job('reconcile', _apply_reconcile, batch, resource='compose')
+        try:
+            job.result()
+            error = None
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        metric_inc('taknet_reconcile_runs_total', {'result': 'failed' if error else 'succeeded'})
+        if error:
+            add_health_event(f"Config apply failed ({', '.join(batch['reasons'])}): {error}")
+
+        with reconcile_cond:
+            reconcile_state['applied'] = generation
+            reconcile_state['running'] = None
+            reconcile_state['last'] = {
+                'generation': generation,
+                'success': error is None,
+                'error': error,
+                'reasons': batch['reasons'],
+                'job_id': job.id,
+                'finished_at': time.time(),
+            }
+            last = dict(reconcile_state['last'])
+            reconcile_cond.notify_all()
+        publish_event('config.generation', **last)
+
+def _apply_reconcile(batch):
+    """Job body: one config_builder run, then one compose up / stop"""
+    service = batch['progress_service']
+    restart = batch['full'] or batch['up'] or batch['stop']
+    reasons = ', '.join(dict.fromkeys(batch['reasons']))
+    print(f"[Reconcile] Applying {len(batch['reasons'])} request(s): {reasons}")
+    if restart:
+        update_progress(service, 1, 100, 'Rebuilding configuration...', reasons)
+    else:
+        current_job().progress(10, 'Rebuilding configuration...', reasons)
+
+    if not rebuild_config():
+        if restart:
+            update_progress(service, 0, 100, 'Configuration rebuild failed', 'Nothing was restarted; check the adsb-web log')
+        raise RuntimeError('config_builder.py failed')
+
+    if batch['full'] or batch['up']:
+        monitor_docker_progress(service, None if batch['full'] else sorted(batch['up']), build=False)
+    if batch['stop']:
+        current_job().check_cancelled()
+        result = command_runner.run(
+            ['docker', 'compose', 'stop'] + sorted(batch['stop']),
+            cwd=COMPOSE_DIR, capture_output=True, text=True, timeout=60
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"docker compose stop failed: {result.stderr.strip()}")
+        if not (batch['full'] or batch['up']):
+            update_progress(service, 100, 100, 'complete', f"Stopped {', '.join(sorted(batch['stop']))}")
+
+def reconcile_pending():
+    """True if requests are waiting for the next reconcile run"""
+    with reconcile_cond:
+        return reconcile_state['batch'] is not None
+
+def wait_reconcile(generation, timeout=None):
+    """Wait until a run covering generation has finished; False on timeout"""
+    with reconcile_cond:
+        return reconcile_cond.wait_for(lambda: reconcile_state['applied'] >= generation, timeout)
+
+def reconcile_outcome(generation, timeout=None):
+    """wait_reconcile, then the outcome of the run that applied generation
+
+    Returns that run's 'last' entry ({'success', 'error', ...}), or None on
+    timeout. Routes that must answer with the result use this.
+    """
+    with reconcile_cond:
+        if not reconcile_cond.wait_for(lambda: reconcile_state['applied'] >= generation, timeout):
+            return None
+        return dict(reconcile_state['last'])
+
+def get_reconcile_status():
+    """Generations and the outcome of the latest run, for /api/reconcile"""
+    with reconcile_cond:
+        batch = reconcile_state['batch']
+        status = {
+            'requested': reconcile_state['requested'],
+            'applied': reconcile_state['applied'],
+            'running': reconcile_state['running'],
+            'pending': list(batch['reasons']) if batch else [],
+            'last': dict(reconcile_state['last']) if reconcile_state['last'] else None,
+        }
+        if batch:
+            due = min(batch['last_at'] + RECONCILE_QUIET, batch['first_at'] + RECONCILE_MAX_DELAY)
+            status['starts_in'] = round(max(0.0, due - time.monotonic()), 1)
+        return status
+
+def _collect_reconcile():
+    with reconcile_cond:
+        requested, applied = reconcile_state['requested'], reconcile_state['applied']
+    yield 'taknet_reconcile_generation', 'gauge', 'Newest requested and applied reconcile generation', [
+        ({'state': 'requested'}, requested), ({'state': 'applied'}, applied)]
+
+METRIC_COLLECTORS.append(_collect_reconcile)
+
+def install_tailscale(auth_key=None, hostname=None):
+    """Install and configure Tailscale with optional hostname"""
+    try:
+        # Use full path to tailscale binary
+        tailscale_bin = '/usr/bin/tailscale'
+        
+        # Check if already installed
+        check_result = command_runner.run(['which', 'tailscale'], 
+                                     capture_output=True, timeout=5)
+        
+        was_just_installed = False
+        if check_result.returncode != 0:
+            # Install Tailscale
+            print("⚙ Installing Tailscale...")
+            install_cmd = 'curl -fsSL https://tailscale.com/install.sh | sh'
+            install_result = command_runner.run(install_cmd, shell=True, timeout=120, 
+                                          capture_output=True, text=True)
+            
+            if install_result.returncode != 0:
+                return {'success': False, 'message': f'Installation failed: {install_result.stderr}'}
+            
+            # Verify installation succeeded by checking if binary exists
+            if not os.path.exists(tailscale_bin):
+                return {'success': False, 'message': 'Installation completed but tailscale binary not found'}
+            
+            print("✓ Tailscale installed successfully")
+            was_just_installed = True
+        
+        # If auth key provided, authenticate
+        if auth_key:
+            # Only run 'down' if Tailscale was already installed (not if we just installed it)
+            if not was_just_installed:
+                print("⚙ Clearing previous Tailscale connection...")
+                try:
+                    command_runner.run([tailscale_bin, 'down'], timeout=10, capture_output=True)
+                except Exception as e:
+                    print(f"⚠ Warning: Could not run 'tailscale down': {e}")
+            
+            # Build up command with optional hostname
+            cmd = [tailscale_bin, 'up', '--authkey', auth_key]
+            
+            if hostname:
+                cmd.extend(['--hostname', hostname])
+            
+            print(f"⚙ Connecting to Tailscale network as: {hostname if hostname else 'default hostname'}...")
+            # Up with new key and hostname
+            result = command_runner.run(cmd, capture_output=True, text=True, timeout=30)
+            
+            if result.returncode != 0:
+                return {'success': False, 'message': f'Authentication failed: {result.stderr}'}
+            
+            print("✓ Connected to Tailscale network")
+        else:
+            # Just start Tailscale (no auth key provided)
+            print("⚙ Starting Tailscale...")
+            result = command_runner.run([tailscale_bin, 'up'], timeout=30, 
+                                  capture_output=True, text=True)
+            if result.returncode != 0:
+                return {'success': False, 'message': f'Failed to start Tailscale: {result.stderr}'}
+        
+        # SECURITY: Automatically configure SSH for Tailscale-only access
+        # Run the configure-ssh-tailscale.sh script
+        try:
+            ssh_config_script = '/opt/adsb/configure-ssh-tailscale.sh'
+            if os.path.exists(ssh_config_script):
+                command_runner.run(['bash', ssh_config_script], 
+                             capture_output=True, 
+                             timeout=10,
+                             check=False)  # Don't fail if SSH config has issues
+                print("✓ SSH configured for Tailscale-only access")
+        except Exception as e:
+            print(f"⚠️ SSH configuration failed (non-critical): {e}")
+        
+        return {'success': True, 'message': 'Tailscale configured successfully'}
+        
+    except subprocess.TimeoutExpired:
+        return {'success': False, 'message': 'Installation timed out'}
+    except Exception as e:
+        return {'success': False, 'message': str(e)}
+
+def get_network_connection_mode():
+    """Detect current internet connection type: wifi, ethernet, usb, or none"""
+    try:
+        # Check for active interfaces with internet connectivity
+        result = command_runner.run(['ip', 'route', 'get', '8.8.8.8'], 
+                              capture_output=True, text=True, timeout=5)
+        
+        if result.returncode != 0:
+            return {'mode': 'none', 'interface': None, 'details': 'No internet connection'}
+        
+        # Parse the output to find the interface
+        # Example output: "8.8.8.8 via 192.168.1.1 dev wlan0 src 192.168.1.100"
+        output = result.stdout
+        interface = None
+        
+        if ' dev ' in output:
+            parts = output.split(' dev ')
+            if len(parts) > 1:
+                interface = parts[1].split()[0]
+        
+        if not interface:
+            return {'mode': 'unknown', 'interface': None, 'details': 'Could not determine interface'}
+        
+        # Determine connection type based on interface name
+        if interface.startswith('wlan') or interface.startswith('wl'):
+            # WiFi connection - get SSID
+            try:
+                ssid_result = command_runner.run(['iwgetid', '-r'], 
+                                           capture_output=True, text=True, timeout=2)
+                ssid = ssid_result.stdout.strip() if ssid_result.returncode == 0 else 'Unknown'
+                return {
+                    'mode': 'wifi',
+                    'interface': interface,
+                    'details': f'Connected to {ssid}',
+                    'ssid': ssid
+                }
+            except:
+                return {
+                    'mode': 'wifi',
+                    'interface': interface,
+                    'details': 'WiFi connected'
+                }
+        
+        elif interface.startswith('eth') or interface.startswith('enp'):
+            # Ethernet connection
+            return {
+                'mode': 'ethernet',
+                'interface': interface,
+                'details': 'Ethernet connected'
+            }
+        
+        elif interface.startswith('usb') or interface.startswith('rndis'):
+            # USB tethering
+            return {
+                'mode': 'usb',
+                'interface': interface,
+                'details': 'USB tethering'
+            }
+        
+        elif interface.startswith('tailscale') or interface.startswith('ts'):
+            # Tailscale VPN (check underlying connection)
+            # Try to find the physical interface
+            try:
+                # Get all interfaces with IP addresses
+                ip_result = command_runner.run(['ip', '-br', 'addr', 'show'], 
+                                         capture_output=True, text=True, timeout=2)
+                for line in ip_result.stdout.split('\n'):
+                    if 'UP' in line:
+                        iface_name = line.split()[0]
+                        if iface_name.startswith('wlan'):
+                            return {
+                                'mode': 'wifi',
+                                'interface': iface_name,
+                                'details': 'WiFi (via Tailscale)'
+                            }
+                        elif iface_name.startswith('eth'):
+                            return {
+                                'mode': 'ethernet',
+                                'interface': iface_name,
+                                'details': 'Ethernet (via Tailscale)'
+                            }
+            except:
+                pass
+            
+            return {
+                'mode': 'vpn',
+                'interface': interface,
+                'details': 'Tailscale VPN'
+            }
+        
+        else:
+            # Unknown interface type
+            return {
+                'mode': 'other',
+                'interface': interface,
+                'details': f'Connected via {interface}'
+            }
+    
+    except subprocess.TimeoutExpired:
+        return {'mode': 'none', 'interface': None, 'details': 'Connection check timed out'}
+    except Exception as e:
+        return {'mode': 'unknown', 'interface': None, 'details': f'Error: {str(e)}'}
+
+# =============================================================
+# Update availability checker (background, cached)
+# =============================================================
+# version.json is fetched on a timer instead of on every dashboard render.
+# Revalidation uses ETag / If-Modified-Since so an unchanged file costs a 304,
+# and failures back off exponentially so offline feeders stop hammering DNS.
+# The parsed file lives in version_info_cache; the timer and a manual
+# "check now" share one fetch when they coincide.
+VERSION_JSON_URL = 'https://raw.githubusercontent.com/cfd2474/TAKNET-PS_ADS-B_Feeder/main/version.json'
+
+UPDATE_CHECK_INTERVAL_DEFAULT = 3600  # seconds; override with UPDATE_CHECK_INTERVAL in .env
+
+UPDATE_CHECK_BACKOFF_MIN = 60
+
+UPDATE_CHECK_BACKOFF_MAX = 6 * 3600
+
+update_check_lock = threading.Lock()
+
+update_check_wakeup = threading.Event()
+
+version_info_cache = ttl_cache.TTLCache('version_json', ttl=UPDATE_CHECK_INTERVAL_DEFAULT, max_entries=1)
+
+update_check_state = {
+    'etag': None,           # validators of the cached version.json
+    'last_modified': None,
+    'checked_at': None,     # last attempt, successful or not
+    'error': None,
+    'failures': 0,
+    'started': False
+}
+
+def compare_versions(current_version, latest_version):
+    """True when latest_version is newer than current_version (X.Y.Z, optional 'v')"""
+    cv = current_version.lstrip('v')
+    lv = latest_version.lstrip('v')
+    try:
+        current_parts = [int(x) for x in cv.split('.')]
+        latest_parts = [int(x) for x in lv.split('.')]
+
+        # Pad to same length if needed (handle 2.47 vs 2.47.0)
+        while len(current_parts) < len(latest_parts):
+            current_parts.append(0)
+        while len(latest_parts) < len(current_parts):
+            latest_parts.append(0)
+
+        return latest_parts > current_parts
+    except (ValueError, AttributeError) as e:
+        print(f"Version comparison error: {e}")
+        # If can't parse, do string comparison as fallback (cleaned)
+        return lv != cv
+
+def get_update_check_interval():
+    """UPDATE_CHECK_INTERVAL from .env (seconds, minimum 300)"""
+    try:
+        return max(300, int(read_env().get('UPDATE_CHECK_INTERVAL', UPDATE_CHECK_INTERVAL_DEFAULT)))
+    except (TypeError, ValueError):
+        return UPDATE_CHECK_INTERVAL_DEFAULT
+
+def _fetch_version_json():
+    """version.json, revalidated against the cached copy (a 304 returns that copy)"""
+    import urllib.request
+    with update_check_lock:
+        headers = {'User-Agent': f'TAKNET-PS-Feeder/{VERSION}'}
+        cached = version_info_cache.peek('version.json')
+        if cached is not None and update_check_state['etag']:
+            headers['If-None-Match'] = update_check_state['etag']
+        if cached is not None and update_check_state['last_modified']:
+            headers['If-Modified-Since'] = update_check_state['last_modified']
+
+    req = urllib.request.Request(VERSION_JSON_URL, headers=headers)
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            latest_info = json.loads(resp.read().decode('utf-8'))
+            etag = resp.headers.get('ETag')
+            last_modified = resp.headers.get('Last-Modified')
+    except urllib.error.HTTPError as e:
+        if e.code != 304:
+            raise
+        return cached  # unchanged; keep the cached copy
+
+    with update_check_lock:
+        update_check_state['etag'] = etag
+        update_check_state['last_modified'] = last_modified
+    return latest_info
+
+def check_for_update():
+    """Fetch/revalidate version.json once and record the result"""
+    try:
+        version_info_cache.get('version.json', _fetch_version_json,
+                               ttl=get_update_check_interval(), force=True)
+        with update_check_lock:
+            update_check_state['checked_at'] = time.time()
+            update_check_state['error'] = None
+            update_check_state['failures'] = 0
+        return True
+
+    except Exception as e:
+        with update_check_lock:
+            update_check_state['checked_at'] = time.time()
+            update_check_state['error'] = str(e)
+            update_check_state['failures'] += 1
+        print(f"Update check error: {e}")
+        return False
+
+def _update_checker_loop():
+    """Background thread: check on the configured interval, back off while offline"""
+    while True:
+        started = time.monotonic()
+        check_for_update()
+        metric_observe('taknet_watchdog_loop_duration_seconds', time.monotonic() - started, {'watchdog': 'update_check'})
+        with update_check_lock:
+            failures = update_check_state['failures']
+        if failures:
+            delay = min(UPDATE_CHECK_BACKOFF_MAX, UPDATE_CHECK_BACKOFF_MIN * (2 ** (failures - 1)))
+        else:
+            delay = get_update_check_interval()
+        update_check_wakeup.wait(delay)
+        update_check_wakeup.clear()
+
+def start_update_checker():
+    """Start the background checker once"""
+    with update_check_lock:
+        if update_check_state['started']:
+            return
+        update_check_state['started'] = True
+    threading.Thread(target=_update_checker_loop, daemon=True).start()
+
+def get_update_availability(refresh=False):
+    """
+    Cached update availability. refresh=True revalidates now (cheap when the
+    server answers 304). Never blocks on the network otherwise.
+    """
+    start_update_checker()
+    if refresh:
+        check_for_update()
+
+    version_file = Path('/opt/adsb/VERSION')
+    current_version = version_file.read_text().strip() if version_file.exists() else 'unknown'
+
+    latest_info = version_info_cache.peek('version.json')
+    age = version_info_cache.age('version.json')
+    with update_check_lock:
+        status = {
+            'current_version': current_version,
+            'latest_version': 'unknown',
+            'update_available': False,
+            'update_priority': 3,
+            'release_info': latest_info,
+            'fetched_at': time.time() - age if age is not None else None,
+            'checked_at': update_check_state['checked_at'],
+            'error': update_check_state['error']
+        }
+
+    if latest_info:
+        latest_version = latest_info.get('version', 'unknown')
+        status['latest_version'] = latest_version
+        if current_version != 'unknown' and latest_version != 'unknown':
+            status['update_available'] = compare_versions(current_version, latest_version)
+        # update_priority: 1=immediate, 2=overnight 02:00, 3=alert only (default)
+        try:
+            update_priority = int(latest_info.get('update_priority', 3))
+        except (TypeError, ValueError):
+            update_priority = 3
+        status['update_priority'] = update_priority if update_priority in (1, 2, 3) else 3
+    return status
+
+# =============================================================
+# SDR Inventory (cached, invalidated on USB hotplug)
+# =============================================================
+# Enumerating SDRs runs detect-all-sdrs.sh / SoapySDRUtil (8-15 s) and opens
+# every dongle, which can disturb one readsb is actively using. Scan once and
+# reuse the result until a USB device is added or removed. Hotplug is seen via
+# kernel uevents (netlink); if that socket is unavailable, the
+# /sys/bus/usb/devices signature is polled instead.
+USB_SYSFS_DIR = '/sys/bus/usb/devices'
+
+SDR_HOTPLUG_POLL_INTERVAL = 5  # seconds, sysfs fallback only
+
+NETLINK_KOBJECT_UEVENT = 15
+
+sdr_inventory_lock = threading.Lock()
+
+sdr_scan_lock = threading.Lock()  # one USB enumeration at a time
+
+sdr_inventory = ttl_cache.TTLCache('sdr_inventory', ttl=None)  # source -> scan result, until hotplug
+
+sdr_inventory_generation = 0
+
+sdr_hotplug_watcher = None  # 'netlink' or 'sysfs' once started
+
+def usb_device_signature():
+    """Sorted (device, devnum) pairs; devnum changes on every re-enumeration"""
+    signature = []
+    try:
+        for name in sorted(os.listdir(USB_SYSFS_DIR)):
+            if ':' in name:
+                continue  # interfaces, not devices
+            try:
+                with open(os.path.join(USB_SYSFS_DIR, name, 'devnum')) as f:
+                    signature.append((name, f.read().strip()))
+            except OSError:
+                signature.append((name, ''))
+    except OSError:
+        pass
+    return tuple(signature)
+
+def invalidate_sdr_inventory(reason):
+    """Drop cached SDR scans; the next reader rescans"""
+    global sdr_inventory_generation
+    with sdr_inventory_lock:
+        sdr_inventory_generation += 1
+    sdr_inventory.invalidate()
+    print(f"[SDR inventory] Invalidated: {reason}")
+
+def sdr_inventory_stats():
+    """(hotplug generation, {source: last scan seconds}) for /metrics"""
+    with sdr_inventory_lock:
+        generation = sdr_inventory_generation
+    return generation, {source: entry['load_seconds'] for source, entry in sdr_inventory.stats()['keys'].items()}
+
+def _sdr_hotplug_netlink(sock):
+    """Background thread: watch kernel uevents for USB device add/remove"""
+    while True:
+        try:
+            data = sock.recv(65536)
+        except Exception as e:
+            print(f"[SDR inventory] Netlink error, falling back to sysfs polling: {e}")
+            _sdr_hotplug_sysfs()
+            return
+        fields = {}
+        for part in data.split(b'\0')[1:]:
+            key, sep, value = part.partition(b'=')
+            if sep:
+                fields[key] = value
+        if fields.get(b'SUBSYSTEM') == b'usb' and fields.get(b'DEVTYPE') == b'usb_device' \
+                and fields.get(b'ACTION') in (b'add', b'remove'):
+            devpath = fields.get(b'DEVPATH', b'').decode(errors='replace')
+            invalidate_sdr_inventory(f"USB {fields[b'ACTION'].decode()} {devpath}")
+
+def _sdr_hotplug_sysfs():
+    """Background thread: poll /sys/bus/usb/devices for changes"""
+    last = usb_device_signature()
+    while True:
+        time.sleep(SDR_HOTPLUG_POLL_INTERVAL)
+        current = usb_device_signature()
+        if current != last:
+            invalidate_sdr_inventory('USB device list changed')
+            last = current
+
+def start_sdr_hotplug_watcher():
+    """Start the hotplug watcher once (netlink preferred, sysfs polling fallback)"""
+    global sdr_hotplug_watcher
+    with sdr_inventory_lock:
+        if sdr_hotplug_watcher:
+            return
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1))  # group 1: kernel uevents
+            target, args = _sdr_hotplug_netlink, (sock,)
+            sdr_hotplug_watcher = 'netlink'
+        except (AttributeError, OSError) as e:
+            print(f"[SDR inventory] Netlink unavailable ({e}), polling {USB_SYSFS_DIR}")
+            target, args = _sdr_hotplug_sysfs, ()
+            sdr_hotplug_watcher = 'sysfs'
+    threading.Thread(target=target, args=args, daemon=True).start()
+
+def get_sdr_inventory(source, scan, rescan=False):
+    """Cached result of scan() for source; rescans only after hotplug or when asked"""
+    start_sdr_hotplug_watcher()
+    if rescan:
+        invalidate_sdr_inventory(f"rescan requested ({source})")
+    # A hotplug during the scan drops the result (the cache's invalidation
+    # outranks in-flight loads), so the next reader scans again.
+    return sdr_inventory.get(source, lambda: _scan_sdr_inventory(source, scan))
+
+def _scan_sdr_inventory(source, scan):
+    """scan() under the USB enumeration lock; exceptions propagate and nothing is cached"""
+    with sdr_scan_lock:
+        started = time.time()
+        data = scan()
+        ms = int((time.time() - started) * 1000)
+        print(f"[SDR inventory] Scanned {source} in {ms} ms")
+        return data
+
+def _scan_detect_all_sdrs():
+    """Run the universal detector; raises on failure so errors are not cached"""
+    result = command_runner.run(
+        ['/opt/adsb/scripts/detect-all-sdrs.sh'],
+        capture_output=True,
+        text=True,
+        timeout=15
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads((result.stdout or '').strip() or '{}')
+
+def _scan_soapy_sdrs():
+    """Parse SoapySDRUtil --find into [{'serial', 'driver', 'label'}]"""
+    result = command_runner.run(
+        ['SoapySDRUtil', '--find'],
+        capture_output=True, text=True, timeout=8
+    )
+    output = result.stdout + result.stderr
+    found = []
+    # Skip index 0 - it's the header text before the first device block
+    for block in re.split(r'Found device \d+', output)[1:]:
+        if not block.strip():
+            continue
+
+        def get_field(key):
+            m = re.search(rf'{key}\s*=\s*(.+)', block, re.IGNORECASE)
+            return m.group(1).strip() if m else ''
+
+        driver = get_field('driver')
+        found.append({
+            'serial': get_field('serial'),
+            'driver': driver,
+            'label': get_field('label') or get_field('product') or driver
+        })
+    return found
+
+def detect_all_sdrs(rescan=False):
+    """detect-all-sdrs.sh output (cached until USB hotplug)"""
+    return get_sdr_inventory('detect-all-sdrs', _scan_detect_all_sdrs, rescan)
+
+def soapy_find_sdrs(rescan=False):
+    """SoapySDRUtil --find devices (cached until USB hotplug)"""
+    return get_sdr_inventory('soapysdr', _scan_soapy_sdrs, rescan)
+
+def build_sdr_status(rescan=False):
+    """Detected SDR devices with configured values (request-context-free)."""
+    try:
+        env = read_env()
+        devices = []
+
+        def format_device_type(raw_type, raw_driver, raw_name, raw_label):
+            driver = (raw_driver or raw_type or '').strip().lower()
+            if driver == 'rtlsdr':
+                return 'RTL-SDR'
+            if driver == 'ftdi':
+                return 'FTDI UATRadio'
+            if driver == 'airspy':
+                return 'Airspy'
+            if driver == 'hackrf':
+                return 'HackRF'
+            return (raw_label or raw_name or raw_driver or raw_type or 'SDR').strip()
+
+        # Preferred path: use the same universal detector used by Settings.
+        # This includes FTDI devices that Soapy-only detection can miss.
+        try:
+            detected = detect_all_sdrs(rescan)
+            detected_devices = detected.get('devices', []) or []
+            if detected_devices:
+                readsb_device = str(env.get('READSB_DEVICE', '0')).strip()
+                readsb_gain = env.get('READSB_GAIN', 'auto')
+                readsb_biastee = env.get('READSB_ENABLE_BIASTEE', '').upper() == 'ON'
+
+                dump978_enabled = env.get('DUMP978_ENABLED', 'false').lower() == 'true'
+                dump978_device = str(env.get('DUMP978_DEVICE', '1')).strip()
+                dump978_gain = env.get('DUMP978_GAIN', 'auto')
+
+                for d in detected_devices:
+                    idx = d.get('index')
+                    idx_str = str(idx)
+                    serial = (d.get('serial') or '').strip() or 'Unknown'
+                    driver = (d.get('driver') or d.get('type') or '').strip().lower()
+                    device_path = str(d.get('device_path') or '').strip()
+
+                    use_for = 'Unassigned'
+                    gain = 'auto'
+                    biastee = False
+
+                    # 1090 assignment (readsb)
+                    if readsb_device == idx_str:
+                        use_for = '1090 MHz'
+                        gain = readsb_gain or 'auto'
+                        biastee = readsb_biastee
+                    # 978 assignment (dump978): support index-based and path-based configs.
+                    elif dump978_enabled and (
+                        dump978_device == idx_str or
+                        (device_path and dump978_device == device_path)
+                    ):
+                        use_for = '978 MHz (UAT)'
+                        gain = 'auto' if driver == 'ftdi' else (dump978_gain or 'auto')
+
+                    devices.append({
+                        'index': idx if idx is not None else len(devices),
+                        'type': format_device_type(d.get('type'), d.get('driver'), d.get('name'), d.get('label')),
+                        'serial': serial,
+                        'use_for': use_for,
+                        'gain': gain,
+                        'biastee': biastee
+                    })
+
+        except Exception:
+            pass
+
+        # Try SoapySDR detection
+        try:
+            if devices:
+                return {'success': True, 'devices': devices}
+
+            # rescan (if any) already invalidated the inventory above
+            for idx, found in enumerate(soapy_find_sdrs()):
+                serial = found['serial']
+                driver = found['driver']
+                label  = found['label']
+
+                use_for = ''
+                gain = 'auto'
+                biastee = False
+
+                if serial and env.get('SDR_1090_SERIAL', '').strip() == serial:
+                    use_for = '1090 MHz'
+                    gain = env.get('SDR_1090_GAIN', 'auto')
+                    biastee = env.get('READSB_ENABLE_BIASTEE', '').upper() == 'ON'
+                elif serial and env.get('SDR_978_SERIAL', '').strip() == serial:
+                    use_for = '978 MHz (UAT)'
+                    gain = env.get('SDR_978_GAIN', '') or env.get('DUMP978_GAIN', 'auto')
+                    biastee = False
+
+                devices.append({
+                    'index': idx,
+                    'type': label or driver or 'RTL-SDR',
+                    'serial': serial or 'Unknown',
+                    'use_for': use_for or 'Unassigned',
+                    'gain': gain,
+                    'biastee': biastee
+                })
+
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            pass
+
+        # If SoapySDR found nothing, fall back to env-only view
+        if not devices:
+            if env.get('SDR_1090_SERIAL'):
+                devices.append({
+                    'index': 0,
+                    'type': env.get('SDR_1090_TYPE', 'RTL-SDR'),
+                    'serial': env.get('SDR_1090_SERIAL', 'Unknown'),
+                    'use_for': '1090 MHz',
+                    'gain': env.get('SDR_1090_GAIN', 'auto'),
+                    'biastee': env.get('READSB_ENABLE_BIASTEE', '').upper() == 'ON'
+                })
+            if env.get('SDR_978_SERIAL') and env.get('DUMP978_ENABLED', 'false').lower() == 'true':
+                devices.append({
+                    'index': 1,
+                    'type': env.get('SDR_978_TYPE', 'RTL-SDR'),
+                    'serial': env.get('SDR_978_SERIAL', 'Unknown'),
+                    'use_for': '978 MHz (UAT)',
+                    'gain': env.get('SDR_978_GAIN', 'auto') or env.get('DUMP978_GAIN', 'auto'),
+                    'biastee': False
+                })
+
+        return {'success': True, 'devices': devices}
+
+    except Exception as e:
+        return {'success': False, 'devices': [], 'error': str(e)}
+
+def classify_health_value(v):
+    """Best-effort classifier for feed status text/values."""
+    if isinstance(v, bool):
+        return v
+    s = str(v or '').strip().lower()
+    if not s:
+        return None
+    negative = ['disconnected', 'not connected', 'inactive', 'failed', 'error', 'down', 'stopped', 'no']
+    positive = ['connected', 'active', 'running', 'ok', 'online', 'yes', 'healthy', 'synchronized', 'sync']
+    if any(tok in s for tok in negative):
+        return False
+    if any(tok in s for tok in positive):
+        return True
+    return None
+
+def flatten_pairs(obj, prefix=''):
+    pairs = []
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            key = f"{prefix}.{k}" if prefix else str(k)
+            pairs.extend(flatten_pairs(v, key))
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            key = f"{prefix}[{i}]"
+            pairs.extend(flatten_pairs(v, key))
+    else:
+        pairs.append((prefix.lower(), obj))
+    return pairs
+
+def derive_data_mlat_from_payload(payload):
+    """Infer data/mlat health from FR24/PiAware JSON payloads."""
+    data_active = None
+    mlat_active = None
+    for key, value in flatten_pairs(payload):
+        state = classify_health_value(value)
+        if state is None:
+            continue
+        if 'mlat' in key:
+            mlat_active = state
+        elif any(tok in key for tok in ['feed', 'data', 'receiver', 'connection', 'piaware', 'fr24']):
+            data_active = state
+    return data_active, mlat_active
+
+def fetch_json(url):
+    import urllib.request
+    try:
+        with urllib.request.urlopen(url, timeout=4) as r:
+            body = r.read().decode('utf-8', errors='ignore')
+        return json.loads(body)
+    except Exception:
+        return None
+
+def build_fr24_stats():
+    env = read_env()
+    if env.get('FR24_ENABLED', 'false').lower() != 'true':
+        return {'enabled': False, 'success': False}
+    if get_service_state('fr24') != 'running':
+        return {'enabled': True, 'success': True, 'data_feed_active': False, 'mlat_active': False, 'mlat_enabled': True}
+
+    payload = fetch_json('http://127.0.0.1:8754/monitor.json')
+    if payload is None:
+        payload = fetch_json('http://127.0.0.1:8754/status.json')
+
+    if payload is None:
+        return {'enabled': True, 'success': False}
+
+    data_active, mlat_active = derive_data_mlat_from_payload(payload)
+    if data_active is None:
+        data_active = False
+    if mlat_active is None:
+        mlat_active = False
+    return {
+        'enabled': True,
+        'success': True,
+        'data_feed_active': data_active,
+        'mlat_active': mlat_active,
+        'mlat_enabled': False
+    }
+
+def build_piaware_stats():
+    env = read_env()
+    if env.get('PIAWARE_ENABLED', 'false').lower() != 'true':
+        return {'enabled': False, 'success': False}
+    if get_service_state('piaware') != 'running':
+        return {'enabled': True, 'success': True, 'data_feed_active': False, 'mlat_active': False, 'mlat_enabled': True}
+
+    payload = fetch_json('http://127.0.0.1:8082/status.json')
+    if payload is None:
+        payload = fetch_json('http://127.0.0.1:8082/skyaware/data/status.json')
+
+    if payload is None:
+        return {'enabled': True, 'success': False}
+
+    data_active, mlat_active = derive_data_mlat_from_payload(payload)
+    if data_active is None:
+        data_active = False
+    if mlat_active is None:
+        mlat_active = False
+    return {
+        'enabled': True,
+        'success': True,
+        'data_feed_active': data_active,
+        'mlat_active': mlat_active,
+        'mlat_enabled': True
+    }
+
+def build_adsbhub_stats():
+    env = read_env()
+    if env.get('ADSBHUB_ENABLED', 'false').lower() != 'true':
+        return {'enabled': False, 'success': False}
+    return {
+        'enabled': True,
+        'success': True,
+        'data_feed_active': get_service_state('adsbhub') == 'running',
+        'mlat_active': False,
+        'mlat_enabled': False
+    }
+
+# =============================================================
+# Network facts (background reachability prober, cached public IP)
+# =============================================================
+# Reachability and public IP used to be probed inline on every bootstrap
+# (3 s TCP connect + up to 6 s of HTTPS). A background prober now owns them:
+# the default route is read from /proc/net/route every few seconds (cheap);
+# reachability is re-probed every NETWORK_PROBE_INTERVAL or at once when the
+# route (interface, gateway or the interface's address) changes; the public IP
+# is refetched on a slow TTL or on route change.
+# An expired public IP is still shown until a refetch succeeds.
+PROC_NET_ROUTE = '/proc/net/route'
+
+NETWORK_ROUTE_POLL_INTERVAL = 5  # seconds
+
+NETWORK_PROBE_INTERVAL = 30  # seconds
+
+NETWORK_PUBLIC_IP_TTL = 1800  # seconds
+
+PUBLIC_IP_SERVICES = ('https://api.ipify.org', 'https://ifconfig.me/ip')
+
+network_facts_lock = threading.Lock()
+
+network_facts_ready = threading.Event()  # set after the first reachability probe
+
+public_ip_cache = ttl_cache.TTLCache('public_ip', ttl=NETWORK_PUBLIC_IP_TTL, max_entries=1)
+
+network_facts = {
+    'internet': None,          # None until the first probe completes
+    'internet_checked_at': None,
+    'route': None,             # (interface, gateway) of the default route
+    'started': False
+}
+
+def read_default_route():
+    """(interface, gateway, address) of the lowest-metric IPv4 default route, or None
+
+    address is the interface's IPv4 address, so a new DHCP lease or PPP /
+    cellular address behind the same gateway counts as a change too.
+    """
+    best = None
+    try:
+        with open(PROC_NET_ROUTE) as f:
+            next(f)  # header
+            for line in f:
+                fields = line.split()
+                # Iface Destination Gateway Flags RefCnt Use Metric Mask ...
+                if len(fields) < 8 or fields[1] != '00000000' or fields[7] != '00000000':
+                    continue
+                if not int(fields[3], 16) & 0x1:  # RTF_UP
+                    continue
+                gateway = socket.inet_ntoa(bytes.fromhex(fields[2])[::-1])
+                metric = int(fields[6])
+                if best is None or metric < best[0]:
+                    best = (metric, fields[0], gateway)
+    except (OSError, ValueError, StopIteration):
+        return None
+    if best is None:
+        return None
+    return (best[1], best[2], netbird_provider.read_interface_state(best[1])['ip'])
+
+def check_internet():
+    """TCP connect to 8.8.8.8:53 (blocking, up to 3 s)"""
+    try:
+        socket.create_connection(("8.8.8.8", 53), timeout=3).close()
+        return True
+    except Exception:
+        return False
+
+def fetch_public_ip():
+    """Public IP from the first service that answers (blocking), or None"""
+    import urllib.request
+    for url in PUBLIC_IP_SERVICES:
+        try:
+            with urllib.request.urlopen(url, timeout=3) as response:
+                ip = response.read().decode('utf-8').strip()
+                if ip:
+                    return ip
+        except Exception:
+            continue
+    return None
+
+def _load_public_ip():
+    """fetch_public_ip() for public_ip_cache; raises so a failure is not cached"""
+    ip = fetch_public_ip()
+    if not ip:
+        raise RuntimeError('no public IP service answered')
+    return ip
+
+def probe_network_facts(route_changed=False):
+    """Refresh reachability, and the public IP when stale or the route changed"""
+    internet = check_internet()
+    with network_facts_lock:
+        network_facts['internet'] = internet
+        network_facts['internet_checked_at'] = time.time()
+    if route_changed:
+        public_ip_cache.invalidate()
+    network_facts_ready.set()
+
+    if internet:
+        try:
+            public_ip_cache.get('public_ip', _load_public_ip)  # no fetch while fresh
+        except RuntimeError:
+            pass
+
+def _network_prober():
+    """Background thread: watch the default route, probe reachability"""
+    last_probe = 0
+    while True:
+        started = time.monotonic()
+        try:
+            route = read_default_route()
+            with network_facts_lock:
+                route_changed = route != network_facts['route']
+                first = network_facts['internet_checked_at'] is None
+                network_facts['route'] = route
+            if route_changed and not first:
+                print(f"[Network] Default route changed: {route}")
+            if first or route_changed or time.time() - last_probe >= NETWORK_PROBE_INTERVAL:
+                probe_network_facts(route_changed=route_changed and not first)
+                last_probe = time.time()
+        except Exception as e:
+            print(f"[Network] Probe error: {e}")
+        metric_observe('taknet_watchdog_loop_duration_seconds', time.monotonic() - started, {'watchdog': 'network'})
+        time.sleep(NETWORK_ROUTE_POLL_INTERVAL)
+
+def start_network_prober():
+    """Start the background prober once"""
+    with network_facts_lock:
+        if network_facts['started']:
+            return
+        network_facts['started'] = True
+    threading.Thread(target=_network_prober, daemon=True).start()
+
+def get_network_facts(wait=0):
+    """
+    Cached network facts. wait > 0 blocks up to that many seconds for the
+    first probe after startup; otherwise internet is None until it lands.
+    """
+    start_network_prober()
+    if wait:
+        network_facts_ready.wait(wait)
+    age = public_ip_cache.age('public_ip')
+    with network_facts_lock:
+        return {
+            'internet': network_facts['internet'],
+            'public_ip': public_ip_cache.peek('public_ip'),
+            'interface': network_facts['route'][0] if network_facts['route'] else None,
+            'checked_at': network_facts['internet_checked_at'],
+            'public_ip_fetched_at': time.time() - age if age is not None else None
+        }
+
+# =============================================================
+# Container socket inspection (/proc instead of docker exec ss)
+# =============================================================
+# A container's network namespace is visible from the host through
+# /proc/<pid>/net/tcp{,6} of any process inside it. The PID is resolved with
+# one `docker inspect` per container start and re-validated against the
+# process start time, so steady-state checks spawn nothing.
+TCP_STATE_ESTABLISHED = '01'
+
+container_pid_lock = threading.Lock()
+
+container_pid_cache = {}  # name -> {'pid', 'proc_start'}
+
+def _proc_start_time(pid):
+    """Field 22 of /proc/<pid>/stat (start time in clock ticks), or None"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # comm may contain spaces; fields resume after the closing paren
+            return f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+def get_container_pid(name):
+    """Host PID of a running container's init process, or None if not running"""
+    with container_pid_lock:
+        cached = container_pid_cache.get(name)
+    if cached and _proc_start_time(cached['pid']) == cached['proc_start']:
+        metric_cache('container_pid', True)
+        return cached['pid']
+
+    metric_cache('container_pid', False)
+    pid = 0
+    try:
+        result = command_runner.run(
+            ['docker', 'inspect', '--format', '{{.State.Running}} {{.State.Pid}}', name],
+            capture_output=True, text=True, timeout=5
+        )
+        running, pid_str = result.stdout.split()
+        if result.returncode == 0 and running == 'true':
+            pid = int(pid_str)
+    except (OSError, subprocess.TimeoutExpired, ValueError):
+        pass
+
+    if pid <= 0:
+        with container_pid_lock:
+            container_pid_cache.pop(name, None)
+        return None
+
+    with container_pid_lock:
+        container_pid_cache[name] = {'pid': pid, 'proc_start': _proc_start_time(pid)}
+    return pid
+
+def read_container_tcp_connections(name, remote_ports):
+    """
+    ESTABLISHED TCP connections inside container `name` to any of remote_ports,
+    in one pass over /proc/<pid>/net/tcp and tcp6.
+    Returns {port: {'count', 'tx_queue', 'rx_queue', 'retransmits', 'remotes'}},
+    or None if the container is not running.
+    """
+    pid = get_container_pid(name)
+    if pid is None:
+        return None
+
+    wanted = {int(p): str(p) for p in remote_ports}
+    found = {str(p): {'count': 0, 'tx_queue': 0, 'rx_queue': 0, 'retransmits': 0, 'remotes': []}
+             for p in remote_ports}
+    read_any = False
+    for table in ('tcp', 'tcp6'):
+        try:
+            with open(f'/proc/{pid}/net/{table}') as f:
+                lines = f.readlines()[1:]
+            read_any = True
+        except OSError:
+            continue
+        for line in lines:
+            # sl local rem st tx_queue:rx_queue tr:tm->when retrnsmt uid timeout inode
+            fields = line.split()
+            if len(fields) < 7 or fields[3] != TCP_STATE_ESTABLISHED:
+                continue
+            rem_addr, rem_port = fields[2].split(':')
+            port = wanted.get(int(rem_port, 16))
+            if port is None:
+                continue
+            tx_queue, rx_queue = fields[4].split(':')
+            entry = found[port]
+            entry['count'] += 1
+            entry['tx_queue'] += int(tx_queue, 16)
+            entry['rx_queue'] += int(rx_queue, 16)
+            entry['retransmits'] += int(fields[6], 16)
+            entry['remotes'].append(_format_proc_addr(rem_addr, int(rem_port, 16)))
+
+    if not read_any:
+        # Container exited between inspect and read; force a fresh lookup next time
+        with container_pid_lock:
+            container_pid_cache.pop(name, None)
+        return None
+    return found
+
+def _format_proc_addr(hex_addr, port):
+    """host:port from a /proc/net/tcp{,6} address (little-endian 32-bit words)"""
+    raw = bytes.fromhex(hex_addr)
+    raw = b''.join(raw[i:i + 4][::-1] for i in range(0, len(raw), 4))
+    if len(raw) == 4:
+        return f"{socket.inet_ntop(socket.AF_INET, raw)}:{port}"
+    if raw[:12] == b'\0' * 10 + b'\xff\xff':
+        return f"{socket.inet_ntop(socket.AF_INET, raw[12:])}:{port}"
+    return f"[{socket.inet_ntop(socket.AF_INET6, raw)}]:{port}"
+
+def build_taknet_stats():
+    """TAKNET-PS feed status from ultrafeeder's aggregator connections (request-context-free)."""
+    env = read_env()
+
+    # Get aggregator host based on NetBird status
+    connection_host = env.get('TAKNET_PS_SERVER_HOST_FALLBACK', 'adsb.tak-solutions.com')
+    try:
+        if get_netbird_state()['connected']:
+            connection_host = env.get('TAKNET_PS_SERVER_HOST_VPN', 'vpn.tak-solutions.com')
+    except:
+        pass
+
+    # Aggregator Beast port (always 30004 by default); ultrafeeder may connect via
+    # internal claim proxy on BEAST_CLAIM_PROXY_PORT when a claim key is set.
+    aggregator_beast_port = env.get('TAKNET_PS_SERVER_PORT', '30004')
+    beast_check_port = taknet_ps_beast_status_port(env)
+    mlat_port = env.get('TAKNET_PS_MLAT_PORT', '30105')
+    mlat_enabled = env.get('TAKNET_PS_MLAT_ENABLED') == 'true'
+
+    # Check BEAST (data feed) and MLAT connections inside the ultrafeeder
+    # container in a single read of its socket tables
+    ports = [beast_check_port] + ([mlat_port] if mlat_enabled else [])
+    connections = read_container_tcp_connections('ultrafeeder', ports)
+    if connections is None:
+        print("⚠ ultrafeeder container not running")
+        connections = {}
+
+    beast_connection = connections.get(str(beast_check_port))
+    mlat_connection = connections.get(str(mlat_port)) if mlat_enabled else None
+    data_feed_active = bool(beast_connection and beast_connection['count'])
+    mlat_active = bool(mlat_connection and mlat_connection['count'])
+
+    return {
+        'success': True,
+        'data_feed_active': data_feed_active,
+        'mlat_active': mlat_active,
+        'mlat_enabled': mlat_enabled,
+        'connection_host': connection_host,
+        'beast_port': aggregator_beast_port,
+        'mlat_port': mlat_port,
+        'beast_connection': beast_connection,
+        'mlat_connection': mlat_connection
+    }
+
+# =============================================================
+# Link-quality sampler (continuous, low-rate)
+# =============================================================
+# One ICMP echo per target every LINK_QUALITY_INTERVAL seconds, sent from
+# this process (no ping spawn). Each target keeps a fixed-size ring of
+# samples; loss, mean, jitter and the sorted RTT list are updated as samples
+# enter and leave the window, so /api/network-quality answers instantly.
+# Targets: LINK_QUALITY_TARGETS in .env (comma-separated, default 8.8.8.8)
+# plus the currently selected TAKNET-PS host.
+LINK_QUALITY_INTERVAL = 5  # seconds between probes per target
+
+LINK_QUALITY_WINDOW = 120  # samples kept per target (10 min at 5 s)
+
+LINK_QUALITY_TIMEOUT = 2.0  # seconds to wait for an echo reply
+
+LINK_QUALITY_TARGET_REFRESH = 60  # seconds between target list / DNS refreshes
+
+LINK_QUALITY_DEFAULT_TARGET = '8.8.8.8'
+
+link_quality_lock = threading.Lock()
+
+link_quality_windows = {}  # target -> ring buffer dict (see new_link_window)
+
+link_quality_state = {'started': False, 'targets': [], 'taknet_host': None}
+
+def new_link_window():
+    """Empty ring buffer; rtt NaN marks a lost probe"""
+    return {
+        'ts': array('d', [0.0] * LINK_QUALITY_WINDOW),
+        'rtt': array('d', [float('nan')] * LINK_QUALITY_WINDOW),
+        'pos': 0,
+        'count': 0,
+        'lost': 0,
+        'rtt_sum': 0.0,
+        'sorted': [],       # RTTs of answered probes in the window, ascending
+        'jitter': 0.0,      # RFC 3550 style smoothed inter-sample RTT delta
+        'last_rtt': None
+    }
+
+def _push_link_sample(window, ts, rtt):
+    """Add one sample (rtt None = lost), evicting the oldest when full"""
+    pos = window['pos']
+    if window['count'] == LINK_QUALITY_WINDOW:
+        old = window['rtt'][pos]
+        if math.isnan(old):
+            window['lost'] -= 1
+        else:
+            window['rtt_sum'] -= old
+            del window['sorted'][bisect.bisect_left(window['sorted'], old)]
+    else:
+        window['count'] += 1
+
+    window['ts'][pos] = ts
+    if rtt is None:
+        window['rtt'][pos] = float('nan')
+        window['lost'] += 1
+    else:
+        window['rtt'][pos] = rtt
+        window['rtt_sum'] += rtt
+        bisect.insort(window['sorted'], rtt)
+        if window['last_rtt'] is not None:
+            window['jitter'] += (abs(rtt - window['last_rtt']) - window['jitter']) / 16
+        window['last_rtt'] = rtt
+    window['pos'] = (pos + 1) % LINK_QUALITY_WINDOW
+
+def _percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def link_window_stats(window):
+    """Loss %, mean/p50/p95 RTT and jitter for one window"""
+    count = window['count']
+    answered = len(window['sorted'])
+    stats = {
+        'samples': count,
+        'packet_loss': round(100 * window['lost'] / count) if count else None,
+        'avg_rtt_ms': round(window['rtt_sum'] / answered, 1) if answered else None,
+        'p50_rtt_ms': _percentile(window['sorted'], 50),
+        'p95_rtt_ms': _percentile(window['sorted'], 95),
+        'jitter_ms': round(window['jitter'], 1) if answered > 1 else None
+    }
+    for key in ('p50_rtt_ms', 'p95_rtt_ms'):
+        if stats[key] is not None:
+            stats[key] = round(stats[key], 1)
+    return stats
+
+def classify_link_quality(stats):
+    """poor/moderate/good thresholds (unchanged from the old 10-ping probe)"""
+    if not stats['samples']:
+        return 'unknown'
+    loss = stats['packet_loss']
+    avg_rtt = stats['avg_rtt_ms'] if stats['avg_rtt_ms'] is not None else 9999
+    if loss >= 30 or avg_rtt > 200:
+        return 'poor'
+    if loss >= 10 or avg_rtt > 80:
+        return 'moderate'
+    return 'good'
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+def icmp_ping(addr, seq, timeout=LINK_QUALITY_TIMEOUT):
+    """One ICMP echo to an IPv4 address; RTT in ms, or None if lost"""
+    try:
+        # Unprivileged ping socket where allowed, raw socket otherwise (root)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        raw = False
+    except PermissionError:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        raw = True
+    try:
+        ident = os.getpid() & 0xffff
+        seq &= 0xffff
+        payload = b'taknet-ps-linkq'
+        header = struct.pack('!BBHHH', 8, 0, 0, ident, seq)
+        packet = struct.pack('!BBHHH', 8, 0, _icmp_checksum(header + payload), ident, seq) + payload
+
+        sent = time.monotonic()
+        sock.sendto(packet, (addr, 0))
+        deadline = sent + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            sock.settimeout(remaining)
+            try:
+                data, (source, _) = sock.recvfrom(1024)
+            except socket.timeout:
+                return None
+            if source != addr:
+                continue  # a raw socket sees every echo reply, e.g. a late one from the previous target
+            if raw:
+                data = data[(data[0] & 0x0f) * 4:]  # strip IP header
+            if len(data) < 8:
+                continue
+            icmp_type, _, _, reply_id, reply_seq = struct.unpack('!BBHHH', data[:8])
+            # Ping sockets rewrite the identifier, so only match it on raw sockets
+            if icmp_type == 0 and reply_seq == seq and (not raw or reply_id == ident):
+                return (time.monotonic() - sent) * 1000
+    finally:
+        sock.close()
+
+def _link_quality_targets():
+    """Configured targets plus the selected TAKNET-PS host: [(name, ipv4)]"""
+    env = read_env()
+    names = [t.strip() for t in env.get('LINK_QUALITY_TARGETS', LINK_QUALITY_DEFAULT_TARGET).split(',') if t.strip()]
+    taknet_host = None
+    try:
+        # Same choice as get_taknet_connection_status, without its log lines every refresh
+        if env.get('TAKNET_PS_ENABLED', 'true').lower() == 'true':
+            taknet_host, _ = config_builder.select_taknet_host(env, netbird=get_netbird_state(), quiet=True)
+        if taknet_host and taknet_host not in names:
+            names.append(taknet_host)
+    except Exception:
+        pass
+
+    targets = []
+    for name in names:
+        try:
+            targets.append((name, socket.gethostbyname(name)))
+        except OSError:
+            targets.append((name, None))  # unresolvable counts as lost
+    return targets, taknet_host
+
+def _link_quality_sampler():
+    """Background thread: probe every target once per interval"""
+    seq = 0
+    targets = []
+    targets_at = 0
+    while True:
+        started = time.monotonic()
+        try:
+            if time.monotonic() - targets_at >= LINK_QUALITY_TARGET_REFRESH or not targets:
+                targets, taknet_host = _link_quality_targets()
+                targets_at = time.monotonic()
+                with link_quality_lock:
+                    link_quality_state['targets'] = [name for name, _ in targets]
+                    link_quality_state['taknet_host'] = taknet_host
+
+            for name, addr in targets:
+                rtt = None
+                if addr:
+                    seq += 1  # one per echo, so a reply can't match another target's request
+                    try:
+                        rtt = icmp_ping(addr, seq)
+                    except OSError:
+                        rtt = None
+                with link_quality_lock:
+                    window = link_quality_windows.setdefault(name, new_link_window())
+                    _push_link_sample(window, time.time(), rtt)
+        except Exception as e:
+            print(f"[Link quality] Sampler error: {e}")
+        metric_observe('taknet_watchdog_loop_duration_seconds', time.monotonic() - started, {'watchdog': 'link_quality'})
+        time.sleep(max(0.5, LINK_QUALITY_INTERVAL - (time.monotonic() - started)))
+
+def start_link_quality_sampler():
+    """Start the sampler once"""
+    with link_quality_lock:
+        if link_quality_state['started']:
+            return
+        link_quality_state['started'] = True
+    threading.Thread(target=_link_quality_sampler, daemon=True).start()
@@ -26,8 +26,12 @@ async function fetchWithTimeout(url, options = {}, timeoutMs = 8000) {
     }
 }
 
-// Bootstrap runs SDR scan + docker/TAKNET checks; slow on Pi or via tunnel — allow long wait
+// Server answers within its own deadline (slow sections come back stale/pending);
+// the long client timeout only covers slow tunnel links.
 const BOOTSTRAP_FETCH_MS = 90000;
+// Re-poll shortly when some sections were still pending on the server.
+const BOOTSTRAP_PENDING_REPOLL_MS = 3000;
+let pendingRepollTimer = null;
 
 async function fetchBootstrap() {
     const t0 = performance.now();
@@ -64,7 +68,8 @@ async function fetchBootstrap() {
 function renderNetworkStatus(networkStatus) {
     if (!networkStatus) return;
     const internetStatus = document.getElementById('internet-status');
-    if (internetStatus) {
+    // internet is null until the server's first background probe completes
+    if (internetStatus && networkStatus.internet !== null && networkStatus.internet !== undefined) {
         const statusDot = internetStatus.querySelector('.status-dot');
         const statusText = internetStatus.querySelector('.status-text');
         if (networkStatus.internet) {
@@ -429,13 +434,18 @@ function renderConnectionQualityInModal(networkQuality) {
             ? `${networkQuality.avg_rtt_ms} ms average RTT`
             : 'RTT not available';
     const loss = `${networkQuality.packet_loss ?? '—'}% packet loss`;
+    const fmtMs = (v) => (v !== null && v !== undefined ? `${v} ms` : '—');
+    const spread = `p50 ${fmtMs(networkQuality.p50_rtt_ms)} · p95 ${fmtMs(networkQuality.p95_rtt_ms)} · jitter ${fmtMs(networkQuality.jitter_ms)}`;
+    const windowMin = Math.round((networkQuality.window_seconds || 600) / 60);
+    const target = networkQuality.target || '8.8.8.8';
     body.innerHTML = `
         <div style="display:inline-flex;align-items:center;gap:8px;padding:10px 16px;border-radius:10px;font-weight:600;background:${s.bg};color:${s.color};margin-bottom:16px;">
             ${s.icon} ${s.label}
         </div>
         <p style="margin:0 0 8px 0;"><strong>Latency:</strong> ${rtt}</p>
+        <p style="margin:0 0 8px 0;"><strong>Spread:</strong> ${spread}</p>
         <p style="margin:0 0 16px 0;"><strong>Packet loss:</strong> ${loss}</p>
-        <p style="margin:0;font-size:0.85em;color:#9ca3af;">Based on ping to 8.8.8.8 (may take ~20 seconds).</p>
+        <p style="margin:0;font-size:0.85em;color:#9ca3af;">Based on ${networkQuality.samples || 0} pings to ${target} over the last ${windowMin} minutes.</p>
     `;
 }
 
@@ -455,12 +465,12 @@ function openConnectionQualityModal() {
     modal.style.display = 'flex';
     modal.setAttribute('aria-hidden', 'false');
     body.innerHTML =
-        '<p style="margin:0;color:#6b7280;">Running ping test… This usually takes about 20 seconds.</p>';
+        '<p style="margin:0;color:#6b7280;">Loading connection quality…</p>';
     if (btn) {
         btn.disabled = true;
         btn.textContent = '⏳ Testing…';
     }
-    fetchWithTimeout('/api/network-quality', {}, 30000)
+    fetchWithTimeout('/api/network-quality', {}, 10000)
         .then((resp) => {
             if (!resp.ok) throw new Error(String(resp.status));
             return resp.json();
@@ -528,24 +538,59 @@ function applySdrStatus(sdrStatus) {
     }
 }
 
+async function rescanSdrDevices() {
+    const btn = document.getElementById('sdr-rescan-btn');
+    const tbody = document.getElementById('sdr-table-body');
+    if (btn) btn.disabled = true;
+    if (tbody) {
+        tbody.innerHTML =
+            '<tr><td colspan="6" style="padding: 8px 12px; color: #9ca3af; font-style: italic;">Scanning for SDR devices...</td></tr>';
+    }
+    try {
+        // The bootstrap serves the cached inventory; rescan=1 probes USB now
+        const response = await fetchWithTimeout('/api/sdr/status?rescan=1', {}, 30000);
+        applySdrStatus(await response.json());
+    } catch (e) {
+        applySdrStatus({ success: false });
+    } finally {
+        if (btn) btn.disabled = false;
+    }
+}
+
 function applyBootstrap(data) {
     if (!data) return;
-    renderNetworkStatus(data.network_status);
-    renderCoreStatus(data.status);
-    applyServiceStates(data.status ? data.status.service_states : null);
-    applyTaknetStats(data.taknet_stats);
+    // Sections the server has not finished yet come back as {pending: true}; keep what is on screen.
+    const section = (key) => (data[key] && data[key].pending ? null : data[key]);
+    const status = section('status');
+    renderNetworkStatus(section('network_status'));
+    renderCoreStatus(status);
+    applyServiceStates(status ? status.service_states : null);
+    applyTaknetStats(section('taknet_stats'));
     applyFeedStats({
-        fr24: data.fr24_stats,
-        piaware: data.piaware_stats,
-        adsbfi: data.adsbfi_stats,
-        adsblol: data.adsblol_stats,
-        adsbx: data.adsbx_stats,
-        airplaneslive: data.airplaneslive_stats,
-        adsbhub: data.adsbhub_stats
+        fr24: section('fr24_stats'),
+        piaware: section('piaware_stats'),
+        adsbfi: section('adsbfi_stats'),
+        adsblol: section('adsblol_stats'),
+        adsbx: section('adsbx_stats'),
+        airplaneslive: section('airplaneslive_stats'),
+        adsbhub: section('adsbhub_stats')
     });
-    applyPowerStatus(data.power_status);
-    applySdrStatus(data.sdr_status);
+    applyPowerStatus(section('power_status'));
+    applySdrStatus(section('sdr_status'));
     lastUpdateTime = new Date();
+
+    const timings = data.timings && data.timings.sections ? data.timings.sections : {};
+    const pending = Object.keys(timings).filter((key) => timings[key].state === 'pending');
+    if (data.timings) {
+        debugLog(`bootstrap server time ${data.timings.total_ms}ms`, timings);
+    }
+    if (pending.length && !pendingRepollTimer) {
+        debugLog(`sections pending: ${pending.join(', ')}`);
+        pendingRepollTimer = setTimeout(() => {
+            pendingRepollTimer = null;
+            pollDashboard();
+        }, BOOTSTRAP_PENDING_REPOLL_MS);
+    }
 }
 
 async function pollDashboard() {
@@ -775,4 +820,5 @@ async function refreshDashboard() {
 }
 
 window.refreshDashboard = refreshDashboard;
+window.rescanSdrDevices = rescanSdrDevices;
 window.initDashboard = initDashboard;
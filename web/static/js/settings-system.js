@@ -0,0 +1,1522 @@
+// Settings: service progress, WiFi, reboot, performance profile and restart modals.
+// Service Progress Modal Functions
+function showServiceProgressModal(serviceName) {
+    const modal = document.getElementById('serviceProgressModal');
+    const title = document.getElementById('serviceProgressTitle');
+    const subtitle = document.getElementById('serviceProgressSubtitle');
+    const log = document.getElementById('serviceProgressLog');
+    
+    title.textContent = `Installing ${serviceName.toUpperCase()}`;
+    subtitle.textContent = `Please wait while ${serviceName} is downloaded and started...`;
+    log.innerHTML = '<div>⏳ Initializing download...</div>';
+    
+    document.getElementById('serviceProgressBar').style.width = '0%';
+    document.getElementById('serviceProgressText').textContent = '0%';
+    document.getElementById('serviceProgressCloseBtn').style.display = 'none';
+    
+    modal.style.display = 'flex';
+    
+    // Start monitoring progress
+    monitorServiceProgress(serviceName);
+}
+
+function closeServiceProgressModal() {
+    document.getElementById('serviceProgressModal').style.display = 'none';
+}
+
+function updateServiceProgressBar(percent, text, status) {
+    const bar = document.getElementById('serviceProgressBar');
+    const textEl = document.getElementById('serviceProgressText');
+    const label = document.getElementById('serviceProgressLabel');
+    
+    bar.style.width = percent + '%';
+    textEl.textContent = text;
+    if (status) {
+        label.textContent = status;
+    }
+}
+
+function addServiceProgressLog(message, type = 'info') {
+    const log = document.getElementById('serviceProgressLog');
+    const icon = type === 'success' ? '✓' : type === 'error' ? '✗' : '⏳';
+    const color = type === 'success' ? '#10b981' : type === 'error' ? '#ef4444' : '#6b7280';
+    
+    const line = document.createElement('div');
+    line.style.color = color;
+    line.innerHTML = `${icon} ${message}`;
+    log.appendChild(line);
+    log.scrollTop = log.scrollHeight;
+}
+
+async function monitorServiceProgress(serviceName) {
+    const maxWaitTime = 180000; // 3 minutes
+    const pollInterval = 2000; // 2 seconds
+    const startTime = Date.now();
+    let isComplete = false;
+    
+    while (!isComplete && (Date.now() - startTime) < maxWaitTime) {
+        await new Promise(resolve => setTimeout(resolve, pollInterval));
+        
+        try {
+            // Get service state
+            const stateResponse = await fetch(`/api/service/${serviceName}/state`);
+            const stateData = await stateResponse.json();
+            
+            // Get progress data
+            const progressResponse = await fetch('/api/service/progress');
+            const progressData = await progressResponse.json();
+            
+            // Update based on state
+            if (stateData.state === 'running') {
+                updateServiceProgressBar(100, 'Running', 'Complete');
+                addServiceProgressLog(`${serviceName} is now running`, 'success');
+                document.getElementById('serviceProgressCloseBtn').style.display = 'inline-block';
+                isComplete = true;
+            } else if (stateData.state === 'downloading' && progressData.service === serviceName) {
+                const percent = progressData.progress || 10;
+                const details = progressData.details || 'Downloading...';
+                updateServiceProgressBar(percent, details, 'Downloading');
+                
+                // Log significant progress changes
+                if (percent % 20 === 0) {
+                    addServiceProgressLog(`Downloading... ${percent}%`);
+                }
+            } else if (stateData.state === 'starting') {
+                updateServiceProgressBar(90, 'Starting...', 'Starting Service');
+                addServiceProgressLog('Container starting...');
+            } else if (stateData.state === 'stopped') {
+                updateServiceProgressBar(100, 'Stopped', 'Service Stopped');
+                addServiceProgressLog('Service stopped (may need restart)', 'error');
+                document.getElementById('serviceProgressCloseBtn').style.display = 'inline-block';
+                isComplete = true;
+            }
+        } catch (error) {
+            console.error('Progress check failed:', error);
+        }
+    }
+    
+    if (!isComplete) {
+        addServiceProgressLog('Timeout - service may still be starting', 'error');
+        document.getElementById('serviceProgressCloseBtn').style.display = 'inline-block';
+    }
+}
+
+
+// ========================================
+// WiFi Management Functions
+// ========================================
+
+// Check WiFi radio status
+async function checkWifiRadioStatus() {
+    const statusIcon = document.getElementById('wifi-radio-status-icon');
+    const statusText = document.getElementById('wifi-radio-status-text');
+    const statusIndicator = document.getElementById('wifi-radio-status');
+    const toggleBtn = document.getElementById('wifi-radio-toggle-btn');
+    const toggleText = document.getElementById('wifi-radio-toggle-text');
+    
+    try {
+        const response = await fetchPreloaded('/api/wifi/status');
+        const data = await response.json();
+        
+        if (data.success) {
+            if (data.enabled) {
+                // WiFi enabled
+                statusIcon.textContent = '✅';
+                statusText.textContent = 'Enabled';
+                statusIndicator.style.background = '#d1fae5';
+                statusIndicator.style.border = '1px solid #10b981';
+                toggleBtn.className = 'btn';
+                toggleText.textContent = '🔴 Disable WiFi';
+            } else {
+                // WiFi disabled
+                statusIcon.textContent = '⭕';
+                statusText.textContent = 'Disabled';
+                statusIndicator.style.background = '#f3f4f6';
+                statusIndicator.style.border = '1px solid #d1d5db';
+                toggleBtn.className = 'btn btn-primary';
+                toggleText.textContent = '🟢 Enable WiFi';
+            }
+            toggleBtn.disabled = false;
+        } else {
+            statusIcon.textContent = '⚠️';
+            statusText.textContent = 'Status unknown';
+            toggleBtn.disabled = true;
+        }
+    } catch (error) {
+        console.error('Error checking WiFi status:', error);
+        statusIcon.textContent = '❌';
+        statusText.textContent = 'Error';
+        toggleBtn.disabled = true;
+    }
+}
+
+// Toggle WiFi radio
+async function toggleWifiRadio() {
+    const statusIcon = document.getElementById('wifi-radio-status-icon');
+    const statusText = document.getElementById('wifi-radio-status-text');
+    const toggleBtn = document.getElementById('wifi-radio-toggle-btn');
+    const toggleText = document.getElementById('wifi-radio-toggle-text');
+    
+    // Determine current state
+    const isEnabled = statusText.textContent === 'Enabled';
+    
+    // Disable button during operation
+    toggleBtn.disabled = true;
+    toggleText.textContent = isEnabled ? '⏳ Disabling...' : '⏳ Enabling...';
+    
+    try {
+        const endpoint = isEnabled ? '/api/wifi/disable' : '/api/wifi/enable';
+        const response = await fetch(endpoint, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' }
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            showStatus(data.message, 'success');
+            // Refresh status
+            await checkWifiRadioStatus();
+            // Refresh saved networks list
+            await loadSavedWifiNetworks();
+        } else {
+            showStatus('Failed: ' + data.message, 'error');
+            toggleBtn.disabled = false;
+        }
+    } catch (error) {
+        showStatus('Error: ' + error.message, 'error');
+        toggleBtn.disabled = false;
+    }
+}
+
+// Add event listener for WiFi radio toggle button
+document.getElementById('wifi-radio-toggle-btn').addEventListener('click', toggleWifiRadio);
+
+// Check WiFi radio status on page load
+checkWifiRadioStatus();
+
+// Toggle between scan and manual entry
+function toggleWifiInputMode() {
+    const mode = document.querySelector('input[name="wifi-input-mode"]:checked').value;
+    const scanSection = document.getElementById('wifi-scan-section');
+    const manualSection = document.getElementById('wifi-manual-section');
+    
+    if (mode === 'scan') {
+        scanSection.style.display = 'block';
+        manualSection.style.display = 'none';
+    } else {
+        scanSection.style.display = 'none';
+        manualSection.style.display = 'block';
+    }
+}
+
+// Load saved WiFi networks
+async function loadSavedWifiNetworks() {
+    const listDiv = document.getElementById('saved-wifi-list');
+    
+    try {
+        const response = await fetchPreloaded('/api/wifi/saved');
+        const data = await response.json();
+        
+        if (data.success && data.networks && data.networks.length > 0) {
+            listDiv.innerHTML = data.networks.map(network => `
+                <div style="display: flex; align-items: center; justify-content: space-between; padding: 15px; background: #f9fafb; border: 2px solid #e5e7eb; border-radius: 8px; margin-bottom: 10px;">
+                    <div style="flex: 1;">
+                        <div style="font-weight: 600; font-size: 1.05em; color: #111827; margin-bottom: 4px;">
+                            ${network.ssid}
+                        </div>
+                        <div style="font-size: 0.9em; color: #6b7280;">
+                            ${network.connected ? '✓ Connected' : 'Configured'} • ${network.security || 'WPA2'}
+                        </div>
+                    </div>
+                    <button class="btn btn-danger" onclick="removeWifiNetwork('${network.ssid}')" style="padding: 8px 16px;">
+                        🗑️ Remove
+                    </button>
+                </div>
+            `).join('');
+        } else {
+            listDiv.innerHTML = `
+                <div style="text-align: center; padding: 20px; color: #9ca3af;">
+                    No WiFi networks configured
+                </div>
+            `;
+        }
+    } catch (error) {
+        listDiv.innerHTML = `
+            <div style="text-align: center; padding: 20px; color: #ef4444;">
+                Error loading saved networks: ${error.message}
+            </div>
+        `;
+    }
+}
+
+// Scan for WiFi networks
+async function scanWifiNetworks() {
+    const btn = document.getElementById('scan-wifi-btn');
+    const listDiv = document.getElementById('available-wifi-list');
+    
+    btn.disabled = true;
+    btn.textContent = '🔍 Scanning...';
+    listDiv.style.display = 'block';
+    listDiv.innerHTML = `
+        <div style="text-align: center; padding: 20px; color: #6b7280;">
+            <div style="margin-bottom: 10px;">Scanning for WiFi networks...</div>
+            <div style="font-size: 0.9em; color: #9ca3af;">This may take 10-15 seconds</div>
+        </div>
+    `;
+    
+    try {
+        const response = await fetch('/api/wifi/scan');
+        const data = await response.json();
+        
+        if (data.success && data.networks && data.networks.length > 0) {
+            listDiv.innerHTML = `
+                <h5 style="margin-bottom: 15px; color: #374151;">Available Networks (${data.networks.length})</h5>
+                ${data.networks.map(network => `
+                    <div style="display: flex; align-items: center; justify-content: space-between; padding: 15px; background: #f9fafb; border: 2px solid #e5e7eb; border-radius: 8px; margin-bottom: 10px; cursor: pointer; transition: all 0.2s;" 
+                         onclick="selectWifiNetwork('${network.ssid.replace(/'/g, "\'")}', '${network.security}', ${network.signal})">
+                        <div style="flex: 1;">
+                            <div style="font-weight: 600; font-size: 1.05em; color: #111827; margin-bottom: 4px;">
+                                ${network.ssid}
+                            </div>
+                            <div style="font-size: 0.9em; color: #6b7280;">
+                                Signal: ${network.signal}% • ${network.security || 'Open'}
+                            </div>
+                        </div>
+                        <div style="font-size: 1.5em;">
+                            ${network.signal >= 75 ? '📶' : network.signal >= 50 ? '📶' : network.signal >= 25 ? '📱' : '📉'}
+                        </div>
+                    </div>
+                `).join('')}
+            `;
+        } else {
+            listDiv.innerHTML = `
+                <div style="text-align: center; padding: 20px; color: #9ca3af;">
+                    No WiFi networks found. Make sure WiFi is enabled.
+                </div>
+            `;
+        }
+    } catch (error) {
+        listDiv.innerHTML = `
+            <div style="text-align: center; padding: 20px; color: #ef4444;">
+                Error scanning WiFi: ${error.message}
+            </div>
+        `;
+    } finally {
+        btn.disabled = false;
+        btn.textContent = '🔍 Scan WiFi Networks';
+    }
+}
+
+// Select a WiFi network from scan results
+let currentWifiSelection = null;
+
+function selectWifiNetwork(ssid, security, signal) {
+    // Store selection details
+    currentWifiSelection = { ssid, security, signal };
+    
+    // Show custom password modal
+    document.getElementById('wifi-modal-ssid').textContent = ssid;
+    document.getElementById('wifi-modal-security').textContent = security || 'Open';
+    document.getElementById('wifi-modal-signal').textContent = signal;
+    document.getElementById('wifi-modal-password').value = '';
+    document.getElementById('wifi-modal-password').type = 'password';
+    document.getElementById('wifiPasswordModal').style.display = 'block';
+    
+    // Focus password field
+    setTimeout(() => {
+        document.getElementById('wifi-modal-password').focus();
+    }, 100);
+}
+
+function closeWifiPasswordModal() {
+    document.getElementById('wifiPasswordModal').style.display = 'none';
+    currentWifiSelection = null;
+}
+
+function toggleWifiModalPassword() {
+    const field = document.getElementById('wifi-modal-password');
+    field.type = field.type === 'password' ? 'text' : 'password';
+}
+
+function confirmWifiPassword() {
+    const password = document.getElementById('wifi-modal-password').value;
+    
+    if (!currentWifiSelection) return;
+    
+    // DON'T close password modal yet - let addWifiNetwork handle it
+    // This prevents the modal from disappearing before status modal is shown
+    
+    // Add network with immediate connection
+    addWifiNetwork(currentWifiSelection.ssid, password, currentWifiSelection.security, false);
+}
+
+// Show WiFi status modal
+function showWifiStatus(message, showSpinner = true) {
+    const modal = document.getElementById('wifiStatusModal');
+    const spinner = document.getElementById('wifi-status-spinner');
+    const icon = document.getElementById('wifi-status-icon');
+    const messageDiv = document.getElementById('wifi-status-message');
+    
+    spinner.style.display = showSpinner ? 'block' : 'none';
+    icon.style.display = showSpinner ? 'none' : 'block';
+    messageDiv.textContent = message;
+    
+    modal.style.display = 'block';
+}
+
+function hideWifiStatus() {
+    document.getElementById('wifiStatusModal').style.display = 'none';
+}
+
+function showWifiSuccess(message) {
+    const icon = document.getElementById('wifi-status-icon');
+    const messageDiv = document.getElementById('wifi-status-message');
+    
+    icon.textContent = '✓';
+    icon.style.color = '#10b981';
+    messageDiv.textContent = message;
+    messageDiv.style.color = '#10b981';
+    
+    showWifiStatus(message, false);
+    
+    setTimeout(() => {
+        hideWifiStatus();
+    }, 2000);
+}
+
+function showWifiError(message) {
+    const icon = document.getElementById('wifi-status-icon');
+    const messageDiv = document.getElementById('wifi-status-message');
+    
+    icon.textContent = '✗';
+    icon.style.color = '#ef4444';
+    messageDiv.textContent = message;
+    messageDiv.style.color = '#ef4444';
+    
+    showWifiStatus(message, false);
+    
+    setTimeout(() => {
+        hideWifiStatus();
+    }, 3000);
+}
+
+// Add WiFi network (from scan selection or manual entry)
+async function addWifiNetwork(ssid, password, security, saveOnly = false) {
+    try {
+        // Show status modal FIRST
+        if (saveOnly) {
+            showWifiStatus('Saving WiFi configuration...');
+        } else {
+            showWifiStatus('Connecting to WiFi network...');
+        }
+        
+        // Wait for status modal to render, THEN close password modal
+        setTimeout(() => {
+            closeWifiPasswordModal();
+        }, 100);
+        
+        // Set up progress messages for connection attempts
+        let progressTimeout;
+        if (!saveOnly) {
+            let progress = 0;
+            const progressMessages = [
+                'Connecting to WiFi network...',
+                'Authenticating with network...',
+                'Obtaining IP address...',
+                'Verifying connection...',
+                'Finalizing connection...'
+            ];
+            
+            progressTimeout = setInterval(() => {
+                if (progress < progressMessages.length - 1) {
+                    progress++;
+                    showWifiStatus(progressMessages[progress]);
+                }
+            }, 5000); // Update message every 5 seconds
+        }
+        
+        const response = await fetch('/api/wifi/add', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ 
+                ssid, 
+                password, 
+                security,
+                saveOnly: saveOnly 
+            })
+        });
+        
+        // Clear progress timeout
+        if (progressTimeout) {
+            clearInterval(progressTimeout);
+        }
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            showWifiSuccess(data.message || 'WiFi network configured successfully!');
+            
+            // Reload saved networks after short delay
+            setTimeout(() => {
+                loadSavedWifiNetworks();
+            }, 500);
+            
+            // Clear available networks list if from scan
+            if (!saveOnly) {
+                setTimeout(() => {
+                    document.getElementById('available-wifi-list').style.display = 'none';
+                }, 2000);
+            }
+        } else {
+            showWifiError(data.message || 'Failed to configure WiFi network');
+        }
+    } catch (error) {
+        showWifiError('Error: ' + error.message);
+    }
+}
+
+// Add manual WiFi network
+async function addManualWifiNetwork() {
+    const ssid = document.getElementById('manual-ssid').value.trim();
+    const password = document.getElementById('manual-password').value;
+    const security = document.getElementById('manual-security').value;
+    
+    if (!ssid) {
+        showWifiError('Please enter an SSID');
+        return;
+    }
+    
+    if (security !== 'OPEN' && !password) {
+        showWifiError('Please enter a password for this secure network');
+        return;
+    }
+    
+    // Use saveOnly=true for manual entry (remote setup mode)
+    await addWifiNetwork(ssid, password, security, true);
+    
+    // Clear form after successful save
+    setTimeout(() => {
+        document.getElementById('manual-ssid').value = '';
+        document.getElementById('manual-password').value = '';
+        document.getElementById('manual-security').value = 'WPA2';
+    }, 500);
+}
+
+// Remove WiFi network
+async function removeWifiNetwork(ssid) {
+    if (!confirm(`Remove WiFi network "${ssid}"?`)) {
+        return;
+    }
+    
+    try {
+        showWifiStatus('Removing WiFi network...');
+        
+        const response = await fetch('/api/wifi/remove', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ ssid })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            showWifiSuccess('WiFi network removed successfully!');
+            
+            setTimeout(() => {
+                loadSavedWifiNetworks();
+            }, 500);
+        } else {
+            showWifiError(data.message || 'Failed to remove network');
+        }
+    } catch (error) {
+        showWifiError('Error: ' + error.message);
+    }
+}
+
+// Toggle password visibility
+function togglePasswordVisibility(fieldId) {
+    const field = document.getElementById(fieldId);
+    field.type = field.type === 'password' ? 'text' : 'password';
+}
+
+// Load saved networks on page load
+document.addEventListener('DOMContentLoaded', (function() {
+    const originalHandler = arguments.callee;
+    return function() {
+        if (originalHandler.called) return;
+        originalHandler.called = true;
+        loadSavedWifiNetworks();
+        
+        // Add Enter key listener for password modal
+        document.getElementById('wifi-modal-password').addEventListener('keypress', function(e) {
+            if (e.key === 'Enter') {
+                confirmWifiPassword();
+            }
+        });
+        
+        // Add Enter key listener for manual SSID
+        document.getElementById('manual-ssid').addEventListener('keypress', function(e) {
+            if (e.key === 'Enter') {
+                document.getElementById('manual-password').focus();
+            }
+        });
+        
+        // Add Enter key listener for manual password
+        document.getElementById('manual-password').addEventListener('keypress', function(e) {
+            if (e.key === 'Enter') {
+                addManualWifiNetwork();
+            }
+        });
+    };
+})());
+
+// ========== Reboot Device ==========
+async function rebootDevice() {
+    if (!confirm('Reboot this device now? The web interface will disconnect. The feeder will come back online in about one minute.')) {
+        return;
+    }
+    try {
+        const response = await fetch('/api/system/reboot', { method: 'POST' });
+        const data = await response.json();
+        if (data.success) {
+            document.body.innerHTML = '<div style="display:flex;flex-direction:column;align-items:center;justify-content:center;min-height:60vh;font-family:system-ui;padding:20px;"><div style="background:#fff;padding:32px 40px;border-radius:12px;box-shadow:0 4px 20px rgba(0,0,0,0.12);max-width:400px;text-align:center;"><p style="font-size:1.2em;color:#1f2937;margin:0 0 12px 0;">🔌 Rebooting...</p><p style="color:#6b7280;margin:0;font-size:0.95em;line-height:1.5;">The device will be back in about one minute. Refresh or revisit the page then.</p></div></div>';
+        } else {
+            alert('Reboot failed: ' + (data.error || data.message || 'Unknown error'));
+        }
+    } catch (e) {
+        alert('Reboot request failed: ' + e.message);
+    }
+}
+
+async function restartTunnelService() {
+    const btn = document.getElementById('restart-tunnel-btn');
+    const msg = document.getElementById('restart-tunnel-msg');
+    if (btn) btn.disabled = true;
+    if (msg) msg.textContent = 'Restarting…';
+    try {
+        const response = await fetch('/api/service/tunnel-client/restart', { method: 'POST' });
+        const data = await response.json().catch(() => ({}));
+        if (response.ok && data.success) {
+            if (msg) msg.textContent = '✓ Tunnel service restarted. Check dashboard in a few seconds.';
+        } else {
+            if (msg) msg.textContent = '✗ ' + (data.message || 'Restart failed. SSH: sudo systemctl restart tunnel-client');
+        }
+    } catch (e) {
+        if (msg) msg.textContent = '✗ ' + e.message;
+    }
+    if (btn) btn.disabled = false;
+}
+
+// ========== Performance Profile Functions ==========
+
+let profilePollTimer = null;
+
+async function refreshProfiles() {
+    const msg = document.getElementById('profile-msg');
+    const list = document.getElementById('profile-list');
+    const btn = document.getElementById('start-profile-btn');
+    try {
+        const response = await fetchPreloaded('/api/debug/profile');
+        const data = await response.json();
+        if (data.running) {
+            btn.disabled = true;
+            msg.textContent = `Profiling… ${Math.round(data.elapsed || 0)} / ${data.seconds} s`;
+            profilePollTimer = setTimeout(refreshProfiles, 1000);
+        } else {
+            btn.disabled = false;
+            msg.textContent = data.last_error ? '✗ ' + data.last_error : '';
+        }
+        list.innerHTML = '';
+        (data.profiles || []).forEach(p => {
+            const li = document.createElement('li');
+            const a = document.createElement('a');
+            a.href = `/api/debug/profile/${p.id}`;
+            a.textContent = p.id;
+            li.appendChild(a);
+            li.appendChild(document.createTextNode(` (${Math.max(1, Math.round(p.bytes / 1024))} KB)`));
+            list.appendChild(li);
+        });
+    } catch (e) {
+        btn.disabled = false;
+        msg.textContent = '✗ ' + e.message;
+    }
+}
+
+async function startProfile() {
+    const msg = document.getElementById('profile-msg');
+    const seconds = parseInt(document.getElementById('profile-seconds').value, 10) || 30;
+    clearTimeout(profilePollTimer);
+    try {
+        const response = await fetch('/api/debug/profile', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ seconds })
+        });
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok || !data.success) {
+            msg.textContent = '✗ ' + (data.message || 'Could not start profile');
+        }
+    } catch (e) {
+        msg.textContent = '✗ ' + e.message;
+    }
+    refreshProfiles();
+}
+
+// ========== Restart Services Functions ==========
+
+function showRestartServicesModal() {
+    // Uncheck all services by default
+    document.getElementById('selectAllServices').checked = false;
+    document.querySelectorAll('.service-checkbox').forEach(cb => {
+        cb.checked = false;
+    });
+    
+    document.getElementById('restartServicesModal').style.display = 'block';
+}
+
+function closeRestartServicesModal() {
+    document.getElementById('restartServicesModal').style.display = 'none';
+}
+
+function toggleAllServices() {
+    const selectAll = document.getElementById('selectAllServices');
+    const checkboxes = document.querySelectorAll('.service-checkbox');
+    checkboxes.forEach(cb => {
+        cb.checked = selectAll.checked;
+    });
+}
+
+async function confirmRestartServices() {
+    // Get selected services
+    const selectedServices = [];
+    document.querySelectorAll('.service-checkbox:checked').forEach(cb => {
+        selectedServices.push(cb.value);
+    });
+    
+    if (selectedServices.length === 0) {
+        alert('Please select at least one service to restart');
+        return;
+    }
+    
+    // Close selection modal
+    closeRestartServicesModal();
+    
+    // Show progress modal
+    showRestartProgressModal(selectedServices);
+    
+    // Start restart process
+    await restartSelectedServices(selectedServices);
+}
+
+function showRestartProgressModal(services) {
+    const modal = document.getElementById('restartProgressModal');
+    const listContainer = document.getElementById('restartServicesList');
+    
+    // Build service status list
+    listContainer.innerHTML = services.map(service => {
+        const names = {
+            'ultrafeeder': 'Ultrafeeder',
+            'fr24': 'FlightRadar24',
+            'piaware': 'PiAware',
+            'netbird': 'NetBird',
+            'tailscale': 'Tailscale',
+            'tunnel-client': 'Remote access tunnel'
+        };
+        return `
+            <div id="restart-status-${service}" style="display: flex; align-items: center; padding: 12px; border: 1px solid #e5e7eb; border-radius: 8px; margin-bottom: 8px;">
+                <div class="spinner" style="width: 20px; height: 20px; border: 3px solid #f3f3f3; border-top: 3px solid #667eea; border-radius: 50%; margin-right: 12px;"></div>
+                <div style="flex: 1;">
+                    <div style="font-weight: 600;">${names[service]}</div>
+                    <div id="restart-msg-${service}" style="font-size: 0.85em; color: #6b7280;">Waiting...</div>
+                </div>
+                <div id="restart-icon-${service}" style="font-size: 1.5em;">⏳</div>
+            </div>
+        `;
+    }).join('');
+    
+    // Add spinner animation
+    const style = document.createElement('style');
+    style.textContent = `
+        @keyframes spin {
+            0% { transform: rotate(0deg); }
+            100% { transform: rotate(360deg); }
+        }
+        .spinner {
+            animation: spin 1s linear infinite;
+        }
+    `;
+    document.head.appendChild(style);
+    
+    // Reset progress
+    document.getElementById('restartOverallProgress').style.width = '0%';
+    document.getElementById('restartOverallText').textContent = '0%';
+    document.getElementById('restartCompletionMessage').style.display = 'none';
+    
+    modal.style.display = 'block';
+}
+
+async function restartSelectedServices(services) {
+    const totalServices = services.length;
+    let completedServices = 0;
+    
+    for (const service of services) {
+        // Update status
+        updateServiceRestartStatus(service, 'Restarting...', '⏳');
+        
+        try {
+            // Call restart API
+            const response = await fetch(`/api/service/${service}/restart`, {
+                method: 'POST'
+            });
+            
+            if (response.ok) {
+                // Wait a bit for service to start
+                await new Promise(resolve => setTimeout(resolve, 2000));
+                
+                // Check if service is running
+                const statusResponse = await fetch(`/api/service/${service}/status`);
+                const statusData = await statusResponse.json();
+                
+                if (statusData.running) {
+                    updateServiceRestartStatus(service, 'Running', '✅');
+                } else {
+                    updateServiceRestartStatus(service, 'Started (checking...)', '⚠️');
+                }
+            } else {
+                updateServiceRestartStatus(service, 'Failed to restart', '❌');
+            }
+        } catch (error) {
+            updateServiceRestartStatus(service, `Error: ${error.message}`, '❌');
+        }
+        
+        // Update overall progress
+        completedServices++;
+        const progressPercent = Math.round((completedServices / totalServices) * 100);
+        document.getElementById('restartOverallProgress').style.width = progressPercent + '%';
+        document.getElementById('restartOverallText').textContent = progressPercent + '%';
+    }
+    
+    // Show completion message
+    document.getElementById('restartCompletionMessage').style.display = 'block';
+    
+    // Countdown and redirect
+    let countdown = 3;
+    const countdownEl = document.getElementById('restartCountdown');
+    const countdownInterval = setInterval(() => {
+        countdown--;
+        countdownEl.textContent = countdown;
+        if (countdown <= 0) {
+            clearInterval(countdownInterval);
+            window.location.href = '/dashboard';
+        }
+    }, 1000);
+}
+
+function updateServiceRestartStatus(service, message, icon) {
+    const messageEl = document.getElementById(`restart-msg-${service}`);
+    const iconEl = document.getElementById(`restart-icon-${service}`);
+    const spinnerEl = document.querySelector(`#restart-status-${service} .spinner`);
+    
+    if (messageEl) messageEl.textContent = message;
+    if (iconEl) iconEl.textContent = icon;
+    
+    // Hide spinner when complete
+    if (spinnerEl && (icon === '✅' || icon === '❌' || icon === '⚠️')) {
+        spinnerEl.style.display = 'none';
+    }
+}
+
+// ============================================================================
+// SYSTEM UPDATE FUNCTIONS
+// ============================================================================
+
+// Check for updates on page load; show scheduled banner if update already scheduled
+window.addEventListener('DOMContentLoaded', function() {
+    checkForUpdates();
+    refreshProfiles();
+    fetchPreloaded('/api/system/update/schedule/status').then(r => r.json()).then(function(d) {
+        if (d.success && d.scheduled) {
+            document.getElementById('update-scheduled').style.display = 'block';
+        }
+    }).catch(function() {});
+});
+
+async function checkForUpdates(refresh = false) {
+    const checkBtn = document.getElementById('check-update-btn');
+    const updateBtn = document.getElementById('update-btn');
+    const currentVersionEl = document.getElementById('current-version');
+    const latestVersionEl = document.getElementById('latest-version');
+    const latestVersionGroup = document.getElementById('latest-version-group');
+    const updateInfo = document.getElementById('update-info');
+    const updateError = document.getElementById('update-error');
+    const updateErrorText = document.getElementById('update-error-text');
+    const releaseNotes = document.getElementById('release-notes');
+
+    // Reset UI
+    checkBtn.disabled = true;
+    checkBtn.textContent = '🔄 Checking...';
+    updateBtn.style.display = 'none';
+    updateInfo.style.display = 'none';
+    updateError.style.display = 'none';
+
+    try {
+        // Page load reads the background checker's cached result;
+        // the button revalidates against GitHub now.
+        const response = await fetchPreloaded(refresh ? '/api/system/version?refresh=1' : '/api/system/version');
+        const data = await response.json();
+
+        if (data.success) {
+            // Show current version
+            currentVersionEl.textContent = `v${data.current_version}`;
+            document.getElementById('update-scheduled').style.display = 'none';
+
+            if (data.update_available) {
+                const priority = data.update_priority || 3;
+                latestVersionEl.textContent = `v${data.latest_version}`;
+                latestVersionGroup.style.display = 'block';
+                updateInfo.style.display = 'block';
+
+                if (data.release_info && data.release_info.release_notes) {
+                    releaseNotes.textContent = data.release_info.release_notes;
+                } else {
+                    releaseNotes.textContent = `New version ${data.latest_version} is available`;
+                }
+
+                if (priority === 1) {
+                    updateBtn.style.display = 'none';
+                    releaseNotes.textContent = (releaseNotes.textContent || '') + ' (Priority update — starting now...)';
+                    startPriority1Update();
+                    return;
+                }
+                if (priority === 2) {
+                    // Priority 2: schedule overnight update, but also allow user-initiated "Update Now"
+                    updateBtn.style.display = 'inline-block';
+                    fetch('/api/system/update/schedule', { method: 'POST' })
+                        .then(r => r.json())
+                        .then(d => {
+                            if (d.success) {
+                                document.getElementById('update-scheduled').style.display = 'block';
+                            }
+                        })
+                        .catch(() => {});
+                    checkBtn.disabled = false;
+                    checkBtn.textContent = '🔍 Check for Updates';
+                    return;
+                }
+                // priority 3: alert only, show Update button
+                updateBtn.style.display = 'inline-block';
+            } else if (data.error) {
+                // Error checking for updates
+                updateError.style.display = 'block';
+                updateErrorText.textContent = data.error;
+            } else {
+                // No update available
+                latestVersionEl.textContent = `v${data.latest_version} (current)`;
+                latestVersionGroup.style.display = 'block';
+            }
+        }
+
+        checkBtn.disabled = false;
+        checkBtn.textContent = '🔍 Check for Updates';
+
+    } catch (error) {
+        console.error('Error checking for updates:', error);
+        updateError.style.display = 'block';
+        updateErrorText.textContent = `Network error: ${error.message}`;
+        checkBtn.disabled = false;
+        checkBtn.textContent = '🔍 Check for Updates';
+    }
+}
+
+async function startUpdate() {
+    // Show confirmation modal instead of browser confirm
+    showUpdateConfirmModal();
+}
+
+function showUpdateConfirmModal() {
+    const modal = document.getElementById('updateConfirmModal');
+    modal.style.display = 'flex';
+    document.body.classList.add('modal-open');
+}
+
+function closeUpdateConfirmModal() {
+    const modal = document.getElementById('updateConfirmModal');
+    modal.style.display = 'none';
+    document.body.classList.remove('modal-open');
+}
+
+function startPriority1Update() {
+    confirmUpdate();
+}
+
+async function confirmUpdate() {
+    closeUpdateConfirmModal();
+
+    // Show progress modal and lock UI
+    const modal = document.getElementById('updateProgressModal');
+    const modalLog = document.getElementById('updateModalLog');
+    const statusText = document.getElementById('updateStatusText');
+    
+    modal.style.display = 'flex';
+    document.body.classList.add('modal-open');
+    modalLog.textContent = 'Starting update process...\n';
+    statusText.textContent = 'Initializing update...';
+
+    try {
+        const response = await fetch('/api/system/update', {
+            method: 'POST'
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            modalLog.textContent += 'Update initiated successfully!\n';
+            modalLog.textContent += 'Downloading latest version...\n\n';
+            statusText.textContent = 'Downloading update...';
+
+            // Poll for update status in modal
+            pollUpdateStatusModal();
+        } else {
+            modalLog.textContent += `\nERROR: ${data.message}\n`;
+            statusText.textContent = 'Update failed';
+            
+            // Allow closing modal on error
+            setTimeout(() => {
+                if (confirm('Update failed. Close this window?')) {
+                    modal.style.display = 'none';
+                    document.body.classList.remove('modal-open');
+                }
+            }, 2000);
+        }
+
+    } catch (error) {
+        console.error('Error starting update:', error);
+        modalLog.textContent += `\nERROR: ${error.message}\n`;
+        statusText.textContent = 'Update failed';
+        
+        // Allow closing modal on error
+        setTimeout(() => {
+            if (confirm('Update failed. Close this window?')) {
+                modal.style.display = 'none';
+                document.body.classList.remove('modal-open');
+            }
+        }, 2000);
+    }
+}
+
+let updatePollInterval = null;
+let noChangeCount = 0;
+let lastLogLength = 0;
+
+async function pollUpdateStatusModal() {
+    const modalLog = document.getElementById('updateModalLog');
+    const statusText = document.getElementById('updateStatusText');
+
+    // Clear any existing interval
+    if (updatePollInterval) {
+        clearInterval(updatePollInterval);
+    }
+
+    updatePollInterval = setInterval(async () => {
+        try {
+            const data = await fetchJsonSafe('/api/system/update/status');
+
+            if (data.success && data.log) {
+                modalLog.textContent = data.log;
+
+                // Auto-scroll to bottom
+                modalLog.scrollTop = modalLog.scrollHeight;
+                
+                // Update status text
+                if (data.is_updating) {
+                    statusText.textContent = 'Update in progress...';
+                } else {
+                    statusText.textContent = 'Finalizing update...';
+                }
+
+                // Check if update is complete (log not changing and no lock file)
+                if (data.log.length === lastLogLength) {
+                    noChangeCount++;
+                } else {
+                    noChangeCount = 0;
+                    lastLogLength = data.log.length;
+                }
+
+                // If no changes for 5 polls (10 seconds) and not updating, assume complete
+                if (!data.is_updating && noChangeCount >= 5) {
+                    clearInterval(updatePollInterval);
+                    statusText.textContent = 'Update complete! Restarting...';
+                    modalLog.textContent += '\n\n✅ Update complete! Web interface restarting...';
+                    modalLog.textContent += '\n⏳ Waiting for service to restart (this may take 10-20 seconds)...';
+                    
+                    // Wait for web service to restart, then hard refresh
+                    setTimeout(() => {
+                        waitForServiceAndReloadModal();
+                    }, 5000); // Wait 5 seconds for service to start restarting
+                }
+            }
+
+        } catch (error) {
+            // During adsb-web restart we can briefly get 502/503 HTML from proxy.
+            // Keep polling and show transient waiting status instead of JSON errors.
+            statusText.textContent = 'Waiting for web service...';
+            if (modalLog) {
+                modalLog.textContent += '\n⏳ Service temporarily unavailable, retrying...';
+                modalLog.scrollTop = modalLog.scrollHeight;
+            }
+        }
+
+    }, 2000); // Poll every 2 seconds
+}
+
+async function waitForServiceAndReloadModal() {
+    const modalLog = document.getElementById('updateModalLog');
+    const statusText = document.getElementById('updateStatusText');
+    let attempts = 0;
+    const maxAttempts = 15; // Try for 30 seconds (15 * 2 seconds)
+    
+    statusText.textContent = 'Waiting for service to restart...';
+    
+    const checkService = setInterval(async () => {
+        attempts++;
+        
+        try {
+            // Try to fetch a simple endpoint to check if service is up
+            const response = await fetch('/api/system/version', {
+                method: 'GET',
+                cache: 'no-cache'
+            });
+            
+            if (response.ok) {
+                // Service is back up - do hard refresh
+                clearInterval(checkService);
+                statusText.textContent = 'Service restored! Reloading...';
+                modalLog.textContent += '\n\n🔄 Service restored! Refreshing page now...';
+                
+                setTimeout(() => {
+                    // Hard refresh - clears cache
+                    location.reload(true);
+                }, 1000);
+            }
+        } catch (error) {
+            // Service not ready yet
+            if (attempts >= maxAttempts) {
+                clearInterval(checkService);
+                statusText.textContent = 'Service taking longer than expected';
+                modalLog.textContent += '\n\n⚠️ Service taking longer than expected.';
+                modalLog.textContent += '\n🔄 Please refresh this page manually in a few seconds.';
+            } else {
+                modalLog.textContent += '.';
+                modalLog.scrollTop = modalLog.scrollHeight;
+            }
+        }
+    }, 2000); // Check every 2 seconds
+}
+
+async function pollUpdateStatus() {
+    const updateLog = document.getElementById('update-log');
+
+    // Clear any existing interval
+    if (updatePollInterval) {
+        clearInterval(updatePollInterval);
+    }
+
+    updatePollInterval = setInterval(async () => {
+        try {
+            const data = await fetchJsonSafe('/api/system/update/status');
+
+            if (data.success && data.log) {
+                updateLog.textContent = data.log;
+
+                // Auto-scroll to bottom
+                updateLog.scrollTop = updateLog.scrollHeight;
+
+                // Check if update is complete (log not changing and no lock file)
+                if (data.log.length === lastLogLength) {
+                    noChangeCount++;
+                } else {
+                    noChangeCount = 0;
+                    lastLogLength = data.log.length;
+                }
+
+                // If no changes for 5 polls (10 seconds) and not updating, assume complete
+                if (!data.is_updating && noChangeCount >= 5) {
+                    clearInterval(updatePollInterval);
+                    updateLog.textContent += '\n\n✅ Update complete! Web interface restarting...';
+                    updateLog.textContent += '\n⏳ Waiting for service to restart (this may take 10-20 seconds)...';
+                    
+                    // Wait for web service to restart, then hard refresh
+                    setTimeout(() => {
+                        waitForServiceAndReload();
+                    }, 5000); // Wait 5 seconds for service to start restarting
+                }
+            }
+
+        } catch (error) {
+            if (updateLog) {
+                updateLog.textContent += '\n⏳ Service temporarily unavailable, retrying...';
+                updateLog.scrollTop = updateLog.scrollHeight;
+            }
+        }
+
+    }, 2000); // Poll every 2 seconds
+}
+
+async function waitForServiceAndReload() {
+    const updateLog = document.getElementById('update-log');
+    let attempts = 0;
+    const maxAttempts = 15; // Try for 30 seconds (15 * 2 seconds)
+    
+    const checkService = setInterval(async () => {
+        attempts++;
+        
+        try {
+            // Try to fetch a simple endpoint to check if service is up
+            const response = await fetch('/api/system/version', {
+                method: 'GET',
+                cache: 'no-cache'
+            });
+            
+            if (response.ok) {
+                // Service is back up - do hard refresh
+                clearInterval(checkService);
+                updateLog.textContent += '\n\n🔄 Service restored! Refreshing page now...';
+                
+                setTimeout(() => {
+                    // Hard refresh - clears cache
+                    location.reload(true);
+                }, 1000);
+            }
+        } catch (error) {
+            // Service not ready yet
+            if (attempts >= maxAttempts) {
+                clearInterval(checkService);
+                updateLog.textContent += '\n\n⚠️ Service taking longer than expected.';
+                updateLog.textContent += '\n🔄 Please refresh this page manually in a few seconds.';
+            } else {
+                updateLog.textContent += '.';
+                updateLog.scrollTop = updateLog.scrollHeight;
+            }
+        }
+    }, 2000); // Check every 2 seconds
+}
+
+// =============================================================
+// NetBird VPN Functions
+// =============================================================
+
+let netbirdConnected = false;
+
+document.addEventListener('DOMContentLoaded', function() {
+    checkNetbirdStatus();
+    setInterval(checkNetbirdStatus, 15000);
+    document.getElementById('netbird-toggle-btn').addEventListener('click', toggleNetbird);
+});
+
+async function checkNetbirdStatus() {
+    try {
+        const data = await fetchJsonSafe('/api/netbird/status');
+        updateNetbirdUI(data);
+    } catch (error) {
+        if (!isTransientServiceError(error)) {
+            console.error('NetBird status check failed:', error);
+        }
+        updateNetbirdUI({ installed: false, connected: false });
+    }
+}
+
+function updateNetbirdUI(data) {
+    const statusIcon   = document.getElementById('netbird-status-icon');
+    const statusText   = document.getElementById('netbird-status-text');
+    const indicator    = document.getElementById('netbird-status-indicator');
+    const toggleBtn    = document.getElementById('netbird-toggle-btn');
+    const toggleText   = document.getElementById('netbird-toggle-text');
+    const disconnected = document.getElementById('netbird-disconnected-section');
+    const connected    = document.getElementById('netbird-connected-section');
+    const display      = document.getElementById('netbird-status-display');
+
+    netbirdConnected = data.connected || false;
+
+    if (data.connected) {
+        indicator.style.background = '#d1fae5';
+        indicator.style.border     = '1px solid #10b981';
+        statusIcon.textContent     = '✓';
+        statusText.textContent     = 'Connected';
+        toggleBtn.className        = 'btn';
+        toggleText.textContent     = 'Disconnect';
+        disconnected.style.display = 'none';
+        connected.style.display    = 'block';
+        document.getElementById('netbird-ip').textContent = data.ip || '-';
+        display.innerHTML = `
+            <div style="background:#e8f5e9;border-left:4px solid #4caf50;padding:15px;border-radius:8px;">
+                <div style="display:flex;align-items:center;gap:10px;">
+                    <span style="font-size:1.5em;">✓</span>
+                    <div>
+                        <div style="font-weight:600;color:#2e7d32;">Connected</div>
+                        ${data.ip ? `<div style="font-size:0.9em;color:#666;margin-top:4px;">IP: ${data.ip}</div>` : ''}
+                    </div>
+                </div>
+            </div>`;
+    } else {
+        indicator.style.background = '#f3f4f6';
+        indicator.style.border     = '1px solid #d1d5db';
+        statusIcon.textContent     = '○';
+        statusText.textContent     = 'Not Connected';
+        toggleBtn.className        = 'btn btn-primary';
+        toggleText.textContent     = 'Connect';
+        disconnected.style.display = 'block';
+        connected.style.display    = 'none';
+        display.innerHTML = `
+            <div style="background:#f3f4f6;border-left:4px solid #9ca3af;padding:15px;border-radius:8px;">
+                <div style="display:flex;align-items:center;gap:10px;">
+                    <span style="font-size:1.5em;">○</span>
+                    <div style="font-weight:600;color:#4b5563;">Not Connected</div>
+                </div>
+            </div>`;
+    }
+}
+
+async function toggleNetbird() {
+    if (netbirdConnected) {
+        if (!confirm('Disconnect NetBird? The aggregator will fall back to public internet.')) return;
+        const btn = document.getElementById('netbird-toggle-btn');
+        btn.disabled = true;
+        document.getElementById('netbird-toggle-text').textContent = '⏳ Disconnecting...';
+        try {
+            const r = await fetch('/api/netbird/disable', { method: 'POST', headers: {'Content-Type':'application/json'} });
+            const d = await r.json();
+            showStatus(d.success ? 'NetBird disconnected' : 'Failed: ' + d.message, d.success ? 'success' : 'error');
+            await checkNetbirdStatus();
+        } catch(e) {
+            showStatus('Error: ' + e.message, 'error');
+        } finally {
+            btn.disabled = false;
+        }
+    } else {
+        const mgmtUrl  = document.getElementById('netbird_management_url').value.trim();
+        const setupKey = document.getElementById('netbird_setup_key').value.trim();
+        if (!mgmtUrl)  { showStatus('Management URL is required', 'error'); document.getElementById('netbird_management_url').focus(); return; }
+
+        // Open modal
+        const modal = document.getElementById('netbirdProgressModal');
+        document.getElementById('netbird-spinner').style.display = 'block';
+        document.getElementById('netbird-progress-text').textContent = 'Enrolling NetBird peer...';
+        document.getElementById('netbird-progress-detail').textContent = 'This usually takes 5–15 seconds';
+        document.getElementById('netbird-result').style.display = 'none';
+        document.getElementById('netbird-dismiss-btn').style.display = 'none';
+        modal.style.display = 'block';
+
+        try {
+            const r = await fetch('/api/netbird/enable', {
+                method: 'POST',
+                headers: {'Content-Type':'application/json'},
+                body: JSON.stringify({ management_url: mgmtUrl, setup_key: setupKey })
+            });
+            const d = await r.json();
+
+            document.getElementById('netbird-spinner').style.display = 'none';
+            const resultDiv = document.getElementById('netbird-result');
+            const iconEl    = document.getElementById('netbird-result-icon');
+            const msgEl     = document.getElementById('netbird-result-message');
+            resultDiv.style.display = 'block';
+
+            if (d.success) {
+                resultDiv.style.background = '#d1fae5';
+                resultDiv.style.border     = '2px solid #10b981';
+                iconEl.textContent         = '✓';
+                iconEl.style.color         = '#10b981';
+                msgEl.textContent          = 'NetBird connected successfully!';
+                msgEl.style.color          = '#10b981';
+                document.getElementById('netbird-progress-text').textContent = 'Complete!';
+                document.getElementById('netbird-progress-detail').textContent = '';
+                // Auto-dismiss after 2 seconds
+                setTimeout(() => {
+                    modal.style.display = 'none';
+                    checkNetbirdStatus();
+                }, 2000);
+            } else {
+                resultDiv.style.background = '#fee2e2';
+                resultDiv.style.border     = '2px solid #ef4444';
+                iconEl.textContent         = '✗';
+                iconEl.style.color         = '#ef4444';
+                msgEl.textContent          = d.message || 'Connection failed';
+                msgEl.style.color          = '#ef4444';
+                document.getElementById('netbird-progress-text').textContent = 'Failed';
+                document.getElementById('netbird-progress-detail').textContent = '';
+                document.getElementById('netbird-dismiss-btn').style.display = 'block';
+            }
+        } catch(e) {
+            document.getElementById('netbird-spinner').style.display = 'none';
+            const resultDiv = document.getElementById('netbird-result');
+            resultDiv.style.display    = 'block';
+            resultDiv.style.background = '#fee2e2';
+            resultDiv.style.border     = '2px solid #ef4444';
+            document.getElementById('netbird-result-icon').textContent = '✗';
+            document.getElementById('netbird-result-icon').style.color = '#ef4444';
+            document.getElementById('netbird-result-message').textContent = 'Error: ' + e.message;
+            document.getElementById('netbird-result-message').style.color = '#ef4444';
+            document.getElementById('netbird-progress-text').textContent = 'Failed';
+            document.getElementById('netbird-progress-detail').textContent = '';
+            document.getElementById('netbird-dismiss-btn').style.display = 'block';
+        }
+    }
+}
+
+// ============================================================================
+// PERIODIC REBOOT UI
+// ============================================================================
+
+function closePeriodicRebootSavedModal() {
+    const modal = document.getElementById('periodicRebootSavedModal');
+    if (!modal) return;
+    modal.style.display = 'none';
+}
+
+function showPeriodicRebootSavedModal(message) {
+    const modal = document.getElementById('periodicRebootSavedModal');
+    const textEl = document.getElementById('periodicRebootSavedText');
+    if (!modal || !textEl) return;
+    textEl.textContent = message || '';
+    modal.style.display = 'flex';
+}
+
+function updatePeriodicRebootUI() {
+    const enabledEl = document.getElementById('periodic-reboot-enabled');
+    const optionsEl = document.getElementById('periodic-reboot-options');
+    const unitEl = document.getElementById('periodic-reboot-unit');
+    const countEl = document.getElementById('periodic-reboot-count');
+    const timeEl = document.getElementById('periodic-reboot-time');
+    const summaryEl = document.getElementById('periodic-reboot-summary');
+    const suffixEl = document.getElementById('periodic-reboot-count-suffix');
+    const weekdayGroupEl = document.getElementById('periodic-reboot-weekday-group');
+    const weekdayEl = document.getElementById('periodic-reboot-weekday');
+    const hourlyNoteEl = document.getElementById('periodic-reboot-hourly-note');
+
+    if (!enabledEl || !optionsEl || !unitEl || !countEl || !timeEl || !summaryEl) return;
+
+    const enabled = enabledEl.checked;
+    optionsEl.style.opacity = enabled ? '1' : '0.6';
+
+    const unit = unitEl.value;
+    let count = parseInt(countEl.value || '1', 10);
+    if (isNaN(count) || count < 1) count = 1;
+
+    // For hourly schedules, enforce minute=00.
+    let time = timeEl.value || '02:00';
+    if (unit === 'hourly') {
+        if (!/^\d{2}:\d{2}$/.test(time)) time = '02:00';
+        time = time.split(':')[0] + ':00';
+        timeEl.value = time;
+        timeEl.step = '3600'; // seconds
+        if (hourlyNoteEl) hourlyNoteEl.style.display = 'block';
+    } else {
+        timeEl.step = '60';
+        if (hourlyNoteEl) hourlyNoteEl.style.display = 'none';
+    }
+
+    // Weekly day-of-week UI only for weekly.
+    if (weekdayGroupEl) weekdayGroupEl.style.display = (unit === 'weekly') ? 'block' : 'none';
+
+    const weekdayVal = weekdayEl ? parseInt(weekdayEl.value || '2', 10) : 2;
+    const weekdayNames = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
+    const weekdayName = weekdayNames[Math.max(0, Math.min(6, weekdayVal))] || 'Wednesday';
+
+    const unitBase = (unit === 'hourly') ? 'hour' : (unit === 'daily') ? 'day' : 'week';
+    const unitWord = (count === 1) ? unitBase : (unitBase + 's');
+
+    if (suffixEl) suffixEl.textContent = `Every ${count} ${unitWord}`;
+    if (!enabled) {
+        summaryEl.textContent = `Disabled. Configured for every ${count} ${unitWord}${unit === 'weekly' ? ` on ${weekdayName}` : ''} at ${time}.`;
+    } else {
+        summaryEl.textContent = `Enabled: every ${count} ${unitWord}${unit === 'weekly' ? ` on ${weekdayName}` : ''} at ${time}.`;
+    }
+}
+
+async function savePeriodicRebootSettings() {
+    const btn = document.getElementById('periodic-reboot-save-btn');
+    const enabled = document.getElementById('periodic-reboot-enabled').checked;
+    const unit = document.getElementById('periodic-reboot-unit').value;
+    let count = parseInt(document.getElementById('periodic-reboot-count').value || '1', 10);
+    const time = document.getElementById('periodic-reboot-time').value;
+    let timeFinal = time;
+
+    if (!/^\d{2}:\d{2}$/.test(timeFinal)) {
+        showStatus('Invalid time. Use HH:MM.', 'error');
+        return;
+    }
+    if (isNaN(count) || count < 1) count = 1;
+
+    const prevBtnText = btn ? btn.textContent : '';
+    if (btn) {
+        btn.disabled = true;
+        btn.textContent = 'Saving...';
+    }
+    showStatus('Saving periodic reboot settings...', 'info');
+
+    try {
+        if (unit === 'hourly') {
+            // Ensure minute=00.
+            timeFinal = timeFinal.split(':')[0] + ':00';
+        }
+
+        let weekday = 2;
+        if (unit === 'weekly') {
+            const weekdayEl = document.getElementById('periodic-reboot-weekday');
+            weekday = weekdayEl ? parseInt(weekdayEl.value || '2', 10) : 2;
+            if (isNaN(weekday)) weekday = 2;
+            weekday = Math.max(0, Math.min(6, weekday));
+        }
+
+        const response = await fetch('/api/system/periodic-reboot/settings', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                enabled: enabled,
+                interval_unit: unit,
+                interval_count: count,
+                reboot_time: timeFinal,
+                interval_weekday: weekday
+            })
+        });
+
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok || !data.success) {
+            throw new Error(data.error || data.message || 'Failed to save periodic reboot settings');
+        }
+
+        showStatus(data.message || 'Periodic reboot settings saved', 'success');
+        updatePeriodicRebootUI();
+
+        const weekdayNames = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
+        const weekdayName = weekdayNames[Math.max(0, Math.min(6, weekday))] || 'Wednesday';
+        const unitBase = (unit === 'hourly') ? 'hour' : (unit === 'daily') ? 'day' : 'week';
+        const unitWord = (count === 1) ? unitBase : (unitBase + 's');
+        const weeklyPart = (unit === 'weekly') ? ` on ${weekdayName}` : '';
+        const scheduleText = `every ${count} ${unitWord}${weeklyPart} at ${timeFinal}`;
+
+        if (enabled) {
+            showPeriodicRebootSavedModal(`Enabled: ${scheduleText}.`);
+        } else {
+            showPeriodicRebootSavedModal(`Disabled. Saved schedule: ${scheduleText}.`);
+        }
+    } catch (e) {
+        showStatus('Error: ' + e.message, 'error');
+    } finally {
+        if (btn) btn.disabled = false;
+        if (btn) btn.textContent = prevBtnText;
+    }
+}
+
+window.addEventListener('DOMContentLoaded', function() {
+    updatePeriodicRebootUI();
+    const enabledEl = document.getElementById('periodic-reboot-enabled');
+    const unitEl = document.getElementById('periodic-reboot-unit');
+    const countEl = document.getElementById('periodic-reboot-count');
+    const timeEl = document.getElementById('periodic-reboot-time');
+
+    if (enabledEl) enabledEl.addEventListener('change', updatePeriodicRebootUI);
+    if (unitEl) unitEl.addEventListener('change', updatePeriodicRebootUI);
+    if (countEl) countEl.addEventListener('input', updatePeriodicRebootUI);
+    if (timeEl) timeEl.addEventListener('change', updatePeriodicRebootUI);
+});
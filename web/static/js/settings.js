@@ -0,0 +1,1477 @@
+// Settings page: form handling, feeder/MLAT naming and VPN toggles.
+// Values from .env are set inline by settings.html before this file loads.
+
+// Page-load GETs go out as one /api/batch request, so over the aggregator
+// tunnel the page costs one round trip instead of one per endpoint.
+// fetchPreloaded(url) stands in for fetch(url): each batched answer is used
+// once, within SETTINGS_PRELOAD_MAX_AGE; polls and refreshes after an action
+// fetch directly.
+const SETTINGS_PRELOAD_PATHS = [
+    '/api/tailscale/status',
+    '/api/netbird/status',
+    '/api/wifi/status',
+    '/api/wifi/saved',
+    '/api/system/version',
+    '/api/system/update/schedule/status',
+    '/api/debug/profile'
+];
+const SETTINGS_PRELOAD_MAX_AGE = 5000; // ms
+const settingsPreloadUsed = new Set();
+const settingsPreload = fetch('/api/batch', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ requests: SETTINGS_PRELOAD_PATHS })
+}).then(function (response) {
+    return response.ok ? response.json() : null;
+}).then(function (data) {
+    const byPath = {};
+    ((data && data.responses) || []).forEach(function (item) { byPath[item.path] = item; });
+    return { responses: byPath, at: Date.now() };
+}).catch(function () { return null; });
+
+async function fetchPreloaded(url) {
+    if (SETTINGS_PRELOAD_PATHS.indexOf(url) !== -1 && !settingsPreloadUsed.has(url)) {
+        settingsPreloadUsed.add(url);
+        const preload = await settingsPreload;
+        const item = preload && preload.responses[url];
+        if (item && item.status !== 504 && Date.now() - preload.at < SETTINGS_PRELOAD_MAX_AGE) {
+            const body = typeof item.body === 'string' ? item.body : JSON.stringify(item.body);
+            return new Response(body, {
+                status: item.status,
+                headers: { 'Content-Type': item.content_type || 'application/json' }
+            });
+        }
+    }
+    return fetch(url);
+}
+let originalTailscaleState = false;
+
+// Set timezone dropdown
+document.addEventListener('DOMContentLoaded', function() {
+    const currentTz = SETTINGS_FEEDER_TZ;
+    document.getElementById('tz').value = currentTz;
+    
+    // Check Tailscale status on page load
+    checkTailscaleStatus();
+    
+    // Start polling Tailscale status every 10 seconds
+    setInterval(checkTailscaleStatus, 10000);
+    
+    // Toggle Tailscale (uses global tailscaleEnabled/tailscaleConnected variables)
+    
+    // Toggle Tailscale on/off
+    async function toggleTailscale() {
+        const toggleBtn = document.getElementById('tailscale-toggle-btn');
+        const toggleText = document.getElementById('tailscale-toggle-text');
+        
+        if (tailscaleEnabled) {
+            // User wants to disable - show confirmation
+            showDisableModal();
+        } else {
+            // User wants to enable
+            // Check if they provided an auth key (REQUIRED)
+            const initialKey = document.getElementById('tailscale_initial_key').value.trim();
+            
+            if (!initialKey || initialKey.length === 0) {
+                showStatus('Please enter a Tailscale auth key first', 'error');
+                document.getElementById('tailscale_initial_key').focus();
+                return;
+            }
+            
+            toggleBtn.disabled = true;
+            toggleText.textContent = '⏳ Enabling & Connecting...';
+            
+            try {
+                // First enable Tailscale
+                const response = await fetch('/api/tailscale/enable', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' }
+                });
+                
+                const result = await response.json();
+                
+                if (result.success) {
+                    updateTailscaleStatusUI(true, false);
+                    showStatus('Connecting to Tailscale...', 'info');
+                    
+                    // Get feeder name for hostname
+                    const siteName = document.getElementById('site_name').value.trim();
+                    const userZipCode = document.getElementById('zip_code').value.trim();
+                    const lat = document.getElementById('lat').value;
+                    const lon = document.getElementById('lon').value;
+                    
+                    let machineName = siteName;
+                    
+                    // First check if user entered a zip code
+                    if (userZipCode && siteName) {
+                        machineName = `${userZipCode}-${siteName}`;
+                    } else if (lat && lon && siteName) {
+                        // Try to get zip from coordinates
+                        const zipCode = await getZipCodeFromCoords(lat, lon);
+                        if (zipCode) {
+                            machineName = `${zipCode}-${siteName}`;
+                        } else {
+                            // Use current MLAT_SITE_NAME which should already have zip
+                            const currentFullName = SETTINGS_MLAT_SITE_NAME;
+                            if (currentFullName && currentFullName.includes('-')) {
+                                machineName = currentFullName;
+                            } else {
+                                machineName = siteName; // No zip available
+                            }
+                        }
+                    } else {
+                        // Use current MLAT_SITE_NAME as fallback
+                        const currentFullName = SETTINGS_MLAT_SITE_NAME;
+                        if (currentFullName) {
+                            machineName = currentFullName;
+                        }
+                    }
+                    
+                    // Sanitize machine name for Tailscale/DNS compatibility
+                    machineName = sanitizeMachineName(machineName);
+                    
+                    // Show progress modal and connect
+                    showTailscaleProgressModal(initialKey, machineName);
+                } else {
+                    showStatus('Failed to enable Tailscale: ' + result.message, 'error');
+                }
+            } catch (error) {
+                showStatus('Error enabling Tailscale: ' + error.message, 'error');
+            } finally {
+                toggleBtn.disabled = false;
+            }
+        }
+    }
+    
+    // Initialize status on page load
+    updateTailscaleStatusUI(tailscaleEnabled, false);
+    
+    // Add event listener to toggle button
+    document.getElementById('tailscale-toggle-btn').addEventListener('click', toggleTailscale);
+    
+    // If enabled in config, check actual connection status (any tailnet)
+    if (tailscaleEnabled) {
+        fetch('/api/tailscale/status')
+            .then(response => response.json())
+            .then(data => {
+                const connected = data.connected === true;
+                updateTailscaleStatusUI(true, connected, null, data.hostname, data.ip);
+            })
+            .catch(error => console.error('Error checking Tailscale status:', error));
+    }
+});
+
+// Tailscale toggle state (global scope)
+let tailscaleConnected = false;
+
+// Update Tailscale status UI (global scope for checkTailscaleStatus)
+// hostname and ip are optional; when connected, show them for SSH access from that tailnet
+function updateTailscaleStatusUI(enabled, connected, errorMessage, hostname, ip) {
+    const statusIcon = document.getElementById('tailscale-status-icon');
+    const statusText = document.getElementById('tailscale-status-text');
+    const statusIndicator = document.getElementById('tailscale-status-indicator');
+    const toggleBtn = document.getElementById('tailscale-toggle-btn');
+    const toggleText = document.getElementById('tailscale-toggle-text');
+    const sshHint = document.getElementById('tailscale-ssh-hint');
+    
+    if (enabled && connected) {
+        // Enabled and connected (any tailnet) - show green status and SSH hint
+        if (statusIndicator) {
+            statusIndicator.style.display = 'flex';
+            statusIcon.textContent = '✓';
+            statusIcon.parentElement.style.background = '#d1fae5';
+            statusIcon.parentElement.style.border = '1px solid #10b981';
+            if (hostname || ip) {
+                statusText.innerHTML = 'Connected' + (hostname ? ` as ${escapeHtml(hostname)}` : '') + (ip ? ` <span style="font-size: 0.9em; color: #059669;">(${escapeHtml(ip)})</span>` : '');
+            } else {
+                statusText.textContent = 'Connected';
+            }
+        }
+        if (sshHint && ip) {
+            sshHint.innerHTML = `SSH from any device on your tailnet: <code>ssh remote@${escapeHtml(ip)}</code>`;
+        }
+        toggleBtn.className = 'btn';
+        toggleText.textContent = '🔴 Disable Tailscale';
+        tailscaleEnabled = true;
+    } else {
+        // Disabled or not connected
+        if (statusIndicator) statusIndicator.style.display = 'flex';
+        if (statusIcon) statusIcon.textContent = '○';
+        if (statusText) statusText.textContent = 'Not connected';
+        if (statusIndicator) {
+            statusIndicator.style.background = '#f3f4f6';
+            statusIndicator.style.border = '1px solid #e5e7eb';
+        }
+        if (sshHint) sshHint.textContent = 'Use an auth key from your own tailnet to enable SSH from any device on that network.';
+        toggleBtn.className = 'btn btn-primary';
+        toggleText.textContent = 'Connect';
+        tailscaleEnabled = false;
+    }
+    
+    tailscaleConnected = connected;
+    toggleTailscaleConfig();
+}
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function toggleTailscaleConfig() {
+    const disabledSection = document.getElementById('tailscale-disabled-section');
+    
+    // Show auth key input when disabled, hide when enabled
+    disabledSection.style.display = tailscaleEnabled ? 'none' : 'block';
+}
+
+function showDisableModal() {
+    document.getElementById('disableModal').style.display = 'block';
+}
+
+function cancelDisable() {
+    document.getElementById('disableModal').style.display = 'none';
+}
+
+async function confirmDisable() {
+    document.getElementById('disableModal').style.display = 'none';
+    
+    const toggleBtn = document.getElementById('tailscale-toggle-btn');
+    const toggleText = document.getElementById('tailscale-toggle-text');
+    
+    toggleBtn.disabled = true;
+    toggleText.textContent = '⏳ Disabling...';
+    
+    try {
+        const response = await fetch('/api/tailscale/disable', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' }
+        });
+        
+        const result = await response.json();
+        
+        if (result.success) {
+            // Update UI directly
+            const statusIcon = document.getElementById('tailscale-status-icon');
+            const statusText = document.getElementById('tailscale-status-text');
+            const statusIndicator = document.getElementById('tailscale-status-indicator');
+            const disabledSection = document.getElementById('tailscale-disabled-section');
+            
+            // Show status indicator
+            if (statusIndicator) statusIndicator.style.display = 'flex';
+            statusIcon.textContent = '⭕';
+            statusText.textContent = 'Disabled';
+            statusIcon.parentElement.style.background = '#f3f4f6';
+            statusIcon.parentElement.style.border = '1px solid #d1d5db';
+            
+            // Update button
+            toggleBtn.className = 'btn btn-primary';
+            toggleText.textContent = 'Connect';
+            
+            // Show disabled section (with auth key input)
+            disabledSection.style.display = 'block';
+            
+            // CRITICAL: Update state variables
+            tailscaleEnabled = false;
+            tailscaleConnected = false;
+            
+            showStatus('Tailscale disabled successfully', 'success');
+        } else {
+            showStatus('Failed to disable Tailscale: ' + result.message, 'error');
+        }
+    } catch (error) {
+        showStatus('Error disabling Tailscale: ' + error.message, 'error');
+    } finally {
+        toggleBtn.disabled = false;
+    }
+}
+
+// Get zip code from coordinates
+async function getZipCodeFromCoords(lat, lon) {
+    try {
+        const response = await fetch(
+            `https://nominatim.openstreetmap.org/reverse?format=json&lat=${lat}&lon=${lon}&zoom=18&addressdetails=1`,
+            { headers: { 'User-Agent': 'TAKNET-PS-ADSB-Feeder/2.1' } }
+        );
+        
+        if (!response.ok) throw new Error('Geocoding failed');
+        const data = await response.json();
+        
+        if (data.address) {
+            return data.address.postcode || data.address.postal_code || null;
+        }
+        return null;
+    } catch (error) {
+        console.error('Failed to get zip code:', error);
+        return null;
+    }
+}
+
+// --- GPS Source UI ---
+function updateGpsSourceUI() {
+    const source = (document.querySelector('input[name="gps_source"]:checked') || {}).value || 'usb';
+    const networkPanel = document.getElementById('gps-network-config');
+    const actionButtons = document.getElementById('gps-action-buttons');
+    const checkLabel = document.getElementById('gps-check-btn-label');
+    const getLabel = document.getElementById('gps-get-btn-label');
+
+    // Show/hide network config
+    networkPanel.style.display = source === 'network' ? 'block' : 'none';
+
+    // Show/hide GPS action buttons
+    actionButtons.style.display = source === 'disabled' ? 'none' : '';
+
+    // Adapt button labels
+    if (source === 'network') {
+        checkLabel.textContent = 'Check network GPS';
+        getLabel.textContent = 'Get coordinates from network GPS';
+    } else {
+        checkLabel.textContent = 'Check GPS status';
+        getLabel.textContent = 'Get coordinates from GPS';
+    }
+
+    // Clear test result when switching
+    const testResult = document.getElementById('gps-test-result');
+    if (testResult) testResult.textContent = '';
+}
+
+function updateGpsProtocolUI() {
+    const protocol = (document.querySelector('input[name="gps_network_protocol"]:checked') || {}).value || 'gpsd';
+    const portInput = document.getElementById('gps_network_port');
+    // Swap default port hint
+    if (protocol === 'nmea') {
+        if (portInput.value === '2947' || portInput.value === '') {
+            portInput.value = '10110';
+        }
+    } else {
+        if (portInput.value === '10110' || portInput.value === '') {
+            portInput.value = '2947';
+        }
+    }
+}
+
+async function testGpsNetworkConnection() {
+    const btn = document.getElementById('gps-test-btn');
+    const resultSpan = document.getElementById('gps-test-result');
+    const host = (document.getElementById('gps_network_host').value || '').trim();
+    const port = document.getElementById('gps_network_port').value || '2947';
+    const protocol = (document.querySelector('input[name="gps_network_protocol"]:checked') || {}).value || 'gpsd';
+
+    if (!host) {
+        resultSpan.textContent = '⚠ Host is required.';
+        resultSpan.style.color = '#dc2626';
+        return;
+    }
+
+    btn.disabled = true;
+    resultSpan.textContent = '⏳ Testing...';
+    resultSpan.style.color = '#6b7280';
+
+    try {
+        const resp = await fetch('/api/gps/test-connection', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ host, port: parseInt(port, 10), protocol })
+        });
+        const data = await resp.json();
+        if (data.success) {
+            resultSpan.textContent = '✓ ' + data.message;
+            resultSpan.style.color = '#059669';
+        } else {
+            resultSpan.textContent = '✗ ' + data.message;
+            resultSpan.style.color = '#dc2626';
+        }
+    } catch (e) {
+        resultSpan.textContent = '✗ Connection test failed: ' + e.message;
+        resultSpan.style.color = '#dc2626';
+    } finally {
+        btn.disabled = false;
+    }
+}
+
+let gpsPollInterval = null;
+
+function openGpsCheckModal() {
+    document.getElementById('gpsCheckModal').style.display = 'block';
+    document.getElementById('gps-check-loading').style.display = 'block';
+    document.getElementById('gps-check-result').style.display = 'none';
+    fetch('/api/gps/check')
+        .then(r => r.json())
+        .then(data => {
+            document.getElementById('gps-check-loading').style.display = 'none';
+            document.getElementById('gps-check-result').style.display = 'block';
+            document.getElementById('gps-check-message').textContent = data.message || '';
+            document.getElementById('gps-check-gpsd-icon').textContent = data.gpsd_running ? '✓' : '✗';
+            document.getElementById('gps-check-gpsd-icon').style.color = data.gpsd_running ? '#059669' : '#dc2626';
+            document.getElementById('gps-check-gpsd-text').textContent = data.gpsd_running ? 'Running' : 'Not running';
+            document.getElementById('gps-check-device-icon').textContent = data.gps_present ? '✓' : '✗';
+            document.getElementById('gps-check-device-icon').style.color = data.gps_present ? '#059669' : '#dc2626';
+            document.getElementById('gps-check-device-text').textContent = data.gps_present ? 'Present and connected' : 'Not detected';
+            const details = data.details || {};
+            const detailLines = Object.entries(details).map(([k, v]) => k + ': ' + v);
+            document.getElementById('gps-check-details').textContent = detailLines.length ? detailLines.join(' • ') : '';
+        })
+        .catch(() => {
+            document.getElementById('gps-check-loading').style.display = 'none';
+            document.getElementById('gps-check-result').style.display = 'block';
+            document.getElementById('gps-check-message').textContent = 'Could not check GPS status.';
+            document.getElementById('gps-check-gpsd-text').textContent = '—';
+            document.getElementById('gps-check-device-text').textContent = '—';
+        });
+}
+
+function closeGpsCheckModal() {
+    document.getElementById('gpsCheckModal').style.display = 'none';
+}
+
+function openGpsModal() {
+    document.getElementById('gpsModal').style.display = 'block';
+    document.getElementById('gps-progress').style.display = 'block';
+    document.getElementById('gps-result').style.display = 'none';
+    document.getElementById('gps-buttons').style.display = 'none';
+    document.getElementById('gps-spinner').style.display = 'block';
+    document.getElementById('gps-btn-accept').style.display = 'inline-block';
+    startGpsAcquisition();
+}
+
+function startGpsAcquisition() {
+    document.getElementById('gps-status-text').textContent = 'Starting GPS...';
+    document.getElementById('gps-status-detail').textContent = 'Acquiring fix (up to 20 seconds)';
+    document.getElementById('gps-log').textContent = '';
+    fetch('/api/gps/start', { method: 'POST', headers: { 'Content-Type': 'application/json' } })
+        .then(r => r.json())
+        .then(() => { gpsPollInterval = setInterval(pollGpsStatus, 1200); pollGpsStatus(); })
+        .catch(() => {
+            document.getElementById('gps-status-text').textContent = 'Failed to start';
+            showGpsResultError('Could not start GPS acquisition');
+            showGpsButtons(false);
+        });
+}
+
+function pollGpsStatus() {
+    fetch('/api/gps/status')
+        .then(r => r.json())
+        .then(data => {
+            document.getElementById('gps-status-text').textContent = data.status === 'acquiring' ? 'Acquiring GPS fix...' : data.message || data.status;
+            if (data.satellites_used != null) {
+                document.getElementById('gps-status-detail').textContent = 'Satellites: ' + data.satellites_used + (data.mode ? ' • ' + data.mode : '');
+            }
+            if (data.log_lines && data.log_lines.length) {
+                document.getElementById('gps-log').textContent = data.log_lines.join('\n');
+                document.getElementById('gps-log').scrollTop = document.getElementById('gps-log').scrollHeight;
+            }
+            if (data.status === 'fix') {
+                clearInterval(gpsPollInterval);
+                gpsPollInterval = null;
+                document.getElementById('gps-spinner').style.display = 'none';
+                document.getElementById('gps-progress').style.display = 'none';
+                document.getElementById('gps-result').style.display = 'block';
+                document.getElementById('gps-result-success').style.display = 'block';
+                document.getElementById('gps-result-error').style.display = 'none';
+                document.getElementById('gps-result-lat').textContent = data.lat;
+                document.getElementById('gps-result-lon').textContent = data.lon;
+                document.getElementById('gps-result-alt').textContent = data.alt != null ? data.alt : '—';
+                document.getElementById('gps-result-accuracy').textContent = data.accuracy_m != null ? '~' + data.accuracy_m + ' m' : '—';
+                showGpsButtons(true);
+            } else if (data.status === 'timeout' || data.status === 'error') {
+                clearInterval(gpsPollInterval);
+                gpsPollInterval = null;
+                document.getElementById('gps-spinner').style.display = 'none';
+                document.getElementById('gps-progress').style.display = 'none';
+                document.getElementById('gps-result').style.display = 'block';
+                document.getElementById('gps-result-success').style.display = 'none';
+                document.getElementById('gps-result-error').style.display = 'block';
+                document.getElementById('gps-result-error-msg').textContent = data.message || data.status;
+                showGpsButtons(false);
+            }
+        })
+        .catch(() => {});
+}
+
+function showGpsResultError(msg) {
+    document.getElementById('gps-result').style.display = 'block';
+    document.getElementById('gps-result-success').style.display = 'none';
+    document.getElementById('gps-result-error').style.display = 'block';
+    document.getElementById('gps-result-error-msg').textContent = msg;
+}
+
+function showGpsButtons(showAccept) {
+    document.getElementById('gps-buttons').style.display = 'flex';
+    document.getElementById('gps-btn-accept').style.display = showAccept ? 'inline-block' : 'none';
+}
+
+function gpsModalTryAgain() {
+    document.getElementById('gps-progress').style.display = 'block';
+    document.getElementById('gps-result').style.display = 'none';
+    document.getElementById('gps-buttons').style.display = 'none';
+    document.getElementById('gps-spinner').style.display = 'block';
+    startGpsAcquisition();
+}
+
+function gpsModalAccept() {
+    fetch('/api/gps/status')
+        .then(r => r.json())
+        .then(data => {
+            if (data.lat != null) document.getElementById('lat').value = data.lat;
+            if (data.lon != null) document.getElementById('lon').value = data.lon;
+            if (data.alt != null) document.getElementById('alt').value = data.alt;
+        });
+    document.getElementById('gpsModal').style.display = 'none';
+}
+
+function gpsModalCancel() {
+    if (gpsPollInterval) clearInterval(gpsPollInterval);
+    gpsPollInterval = null;
+    document.getElementById('gpsModal').style.display = 'none';
+}
+
+// Sanitize machine name for Tailscale/DNS compatibility
+function sanitizeMachineName(name) {
+    if (!name) return 'adsb-feeder';
+    
+    // Convert to lowercase
+    let sanitized = name.toLowerCase();
+    
+    // Replace underscores and spaces with hyphens
+    sanitized = sanitized.replace(/[_\s]+/g, '-');
+    
+    // Remove any characters that aren't alphanumeric or hyphen
+    sanitized = sanitized.replace(/[^a-z0-9-]/g, '');
+    
+    // Remove leading/trailing hyphens
+    sanitized = sanitized.replace(/^-+|-+$/g, '');
+    
+    // Replace multiple consecutive hyphens with single hyphen
+    sanitized = sanitized.replace(/-{2,}/g, '-');
+    
+    // Limit to 63 characters (DNS label limit)
+    sanitized = sanitized.substring(0, 63);
+    
+    // If empty after sanitization, use default
+    if (!sanitized) {
+        sanitized = 'adsb-feeder';
+    }
+    
+    return sanitized;
+}
+
+// Update Tailscale configuration
+
+function showTailscaleProgressModal(authKey, hostname) {
+    const modal = document.getElementById('tailscaleProgressModal');
+    
+    // Show simplified modal
+    document.getElementById('tailscale-spinner').style.display = 'block';
+    document.getElementById('progress-status-text').textContent = 'Configuring Tailscale VPN...';
+    document.getElementById('progress-status-detail').textContent = 'This usually takes 5-10 seconds';
+    document.getElementById('tailscale-result').style.display = 'none';
+    modal.style.display = 'block';
+    
+    // Start the installation process
+    installTailscaleWithProgress(authKey, hostname);
+}
+
+async function installTailscaleWithProgress(authKey, hostname) {
+    try {
+        // Update status
+        document.getElementById('progress-status-text').textContent = 'Starting Tailscale installation...';
+        document.getElementById('progress-status-detail').textContent = 'This may take 10-30 seconds';
+        
+        const response = await fetch('/api/tailscale/install', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ 
+                auth_key: authKey,
+                hostname: hostname
+            })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            // Start polling for progress
+            pollTailscaleProgress();
+        } else {
+            // Show error
+            showTailscaleResult(false, data.message || 'Failed to start installation');
+        }
+    } catch (error) {
+        // Show error
+        console.error('Failed to start Tailscale installation:', error);
+        showTailscaleResult(false, 'Error: ' + error.message);
+    }
+}
+
+// Poll Tailscale installation progress
+let progressPollInterval = null;
+
+async function pollTailscaleProgress() {
+    let attempts = 0;
+    const maxAttempts = 60; // 60 seconds timeout
+    
+    progressPollInterval = setInterval(async () => {
+        attempts++;
+        
+        try {
+            const response = await fetch('/api/tailscale/progress');
+            const data = await response.json();
+            
+            updateTailscaleProgressUI(data);
+            
+            // Check if complete or failed
+            if (data.status === 'completed') {
+                clearInterval(progressPollInterval);
+                showTailscaleResult(true, 'Tailscale connected successfully!');
+                
+                // Reload page to update status
+                setTimeout(() => {
+                    location.reload();
+                }, 2000);
+            } else if (data.status === 'failed') {
+                clearInterval(progressPollInterval);
+                showTailscaleResult(false, data.message || 'Tailscale connection failed');
+            } else if (attempts >= maxAttempts) {
+                clearInterval(progressPollInterval);
+                showTailscaleResult(false, 'Timeout waiting for Tailscale connection');
+            }
+        } catch (error) {
+            console.error('Error polling progress:', error);
+            if (attempts >= maxAttempts) {
+                clearInterval(progressPollInterval);
+                showTailscaleResult(false, 'Error checking connection status');
+            }
+        }
+    }, 1000); // Poll every second
+}
+
+function updateTailscaleProgressUI(data) {
+    const statusText = document.getElementById('progress-status-text');
+    const statusDetail = document.getElementById('progress-status-detail');
+    
+    if (data.status === 'downloading') {
+        statusText.textContent = 'Downloading Tailscale...';
+        statusDetail.textContent = data.message || 'Please wait...';
+    } else if (data.status === 'installing') {
+        statusText.textContent = 'Installing Tailscale...';
+        statusDetail.textContent = data.message || 'Please wait...';
+    } else if (data.status === 'registering') {
+        statusText.textContent = 'Connecting to Tailscale network...';
+        statusDetail.textContent = data.message || 'Almost done...';
+    }
+}
+
+function showTailscaleResult(success, message) {
+    document.getElementById('tailscale-spinner').style.display = 'none';
+    const resultDiv = document.getElementById('tailscale-result');
+    
+    if (success) {
+        resultDiv.style.background = '#d1fae5';
+        resultDiv.style.border = '2px solid #10b981';
+        resultDiv.style.display = 'block';
+        document.getElementById('tailscale-result-icon').textContent = '✓';
+        document.getElementById('tailscale-result-icon').style.color = '#10b981';
+        document.getElementById('tailscale-result-message').textContent = message;
+        document.getElementById('tailscale-result-message').style.color = '#10b981';
+        document.getElementById('progress-status-text').textContent = 'Complete!';
+        document.getElementById('progress-status-detail').textContent = '';
+    } else {
+        resultDiv.style.background = '#fee2e2';
+        resultDiv.style.border = '2px solid #ef4444';
+        resultDiv.style.display = 'block';
+        document.getElementById('tailscale-result-icon').textContent = '✗';
+        document.getElementById('tailscale-result-icon').style.color = '#ef4444';
+        document.getElementById('tailscale-result-message').textContent = message;
+        document.getElementById('tailscale-result-message').style.color = '#ef4444';
+        document.getElementById('progress-status-text').textContent = 'Failed';
+        document.getElementById('progress-status-detail').textContent = '';
+    }
+}
+
+function isValidFeederClaimKey(raw) {
+    const value = (raw || '').trim();
+    if (value.length !== 36) return false;
+    return /^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$/.test(value);
+}
+
+function getLastSubmittedClaimKey() {
+    try {
+        return (localStorage.getItem('taknet_last_feeder_claim_key') || '').trim().toLowerCase();
+    } catch (e) {
+        return '';
+    }
+}
+
+function updateRegisterFeederButtonState() {
+    const claimEl = document.getElementById('taknet_feeder_claim_key');
+    const btn = document.getElementById('register-feeder-btn');
+    const indicator = document.getElementById('claim-submitted-indicator');
+    if (!claimEl || !btn) return;
+    const valid = isValidFeederClaimKey(claimEl.value);
+    btn.disabled = !valid;
+    btn.style.opacity = valid ? '1' : '0.6';
+    btn.style.cursor = valid ? 'pointer' : 'not-allowed';
+
+    if (indicator) {
+        const lastKey = getLastSubmittedClaimKey();
+        const currentKey = (claimEl.value || '').trim().toLowerCase();
+        const submitted = Boolean(valid && lastKey && currentKey === lastKey);
+        indicator.style.display = submitted ? 'block' : 'none';
+        if (submitted) {
+            btn.textContent = 'Registered ✓';
+        } else {
+            btn.textContent = 'Register feeder';
+        }
+    }
+}
+
+async function fetchJsonSafe(url, options) {
+    const response = options ? await fetch(url, options) : await fetchPreloaded(url);
+    const contentType = (response.headers.get('content-type') || '').toLowerCase();
+    if (!response.ok || contentType.indexOf('application/json') === -1) {
+        const text = await response.text().catch(function () { return ''; });
+        const err = new Error('HTTP ' + response.status + ' ' + (response.statusText || '') + (text ? ' (non-JSON response)' : ''));
+        err.httpStatus = response.status;
+        throw err;
+    }
+    return await response.json();
+}
+
+function isTransientServiceError(error) {
+    const status = Number(error && error.httpStatus);
+    if (status === 502 || status === 503 || status === 504) return true;
+    const msg = String((error && error.message) || error || '').toUpperCase();
+    return msg.indexOf('HTTP 502') !== -1 || msg.indexOf('HTTP 503') !== -1 || msg.indexOf('HTTP 504') !== -1;
+}
+
+// Browser extensions can throw this benign message during page reload/navigation.
+window.addEventListener('unhandledrejection', function (event) {
+    const reason = event && event.reason;
+    const message = String((reason && reason.message) || reason || '');
+    if (message.indexOf('A listener indicated an asynchronous response by returning true') !== -1) {
+        event.preventDefault();
+    }
+});
+
+function updateDeploymentModeUi() {
+    const selected = document.querySelector('input[name="feeder_deployment_mode"]:checked');
+    const mode = selected ? selected.value : 'stationary';
+    const box = document.getElementById('mobile-motion-criteria');
+    if (box) {
+        box.style.display = mode === 'mobile' ? 'block' : 'none';
+    }
+}
+
+async function registerFeeder() {
+    const claimEl = document.getElementById('taknet_feeder_claim_key');
+    const claimRaw = claimEl ? claimEl.value.trim() : '';
+    if (!isValidFeederClaimKey(claimRaw)) {
+        showStatus('Feeder claim key must be exactly 36 characters and a UUID (8-4-4-4-12 hex).', 'error');
+        return;
+    }
+    await saveAndRestartUltrafeeder();
+}
+
+window.addEventListener('DOMContentLoaded', function () {
+    const claimEl = document.getElementById('taknet_feeder_claim_key');
+    if (claimEl) {
+        updateRegisterFeederButtonState();
+        claimEl.addEventListener('input', updateRegisterFeederButtonState);
+        claimEl.addEventListener('change', updateRegisterFeederButtonState);
+    }
+    const modeRadios = document.querySelectorAll('input[name="feeder_deployment_mode"]');
+    modeRadios.forEach(function (el) {
+        el.addEventListener('change', updateDeploymentModeUi);
+    });
+    updateDeploymentModeUi();
+});
+
+async function saveSettings() {
+    const lat = document.getElementById('lat').value;
+    const lon = document.getElementById('lon').value;
+    const siteName = document.getElementById('site_name').value.trim();
+    const userZipCode = document.getElementById('zip_code').value.trim();
+    
+    // Validate coordinate format
+    const latPattern = /^-?\d+\.\d+$/;
+    const lonPattern = /^-?\d+\.\d+$/;
+    
+    if (lat && !latPattern.test(lat)) {
+        showStatus('Latitude must be in decimal format (e.g., 33.55390)', 'error');
+        return;
+    }
+    
+    if (lon && !lonPattern.test(lon)) {
+        showStatus('Longitude must be in decimal format (e.g., -117.21390)', 'error');
+        return;
+    }
+    
+    showStatus('Saving...', 'info');
+    
+    let finalSiteName;
+    let zipCode;
+    
+    if (userZipCode) {
+        // User provided zip code - use it
+        zipCode = userZipCode;
+        finalSiteName = `${zipCode}-${siteName}`;
+    } else if (lat && lon && siteName) {
+        // No user zip - estimate from coordinates
+        zipCode = await getZipCodeFromCoords(lat, lon);
+        if (zipCode) {
+            finalSiteName = `${zipCode}-${siteName}`;
+        } else {
+            finalSiteName = `00000-${siteName}`;
+        }
+    } else {
+        // Keep existing format
+        const currentFullName = SETTINGS_MLAT_SITE_NAME;
+        finalSiteName = currentFullName;
+    }
+    
+    const claimEl = document.getElementById('taknet_feeder_claim_key');
+    const claimRaw = claimEl ? claimEl.value.trim() : '';
+    if (claimRaw && !isValidFeederClaimKey(claimRaw)) {
+        showStatus('Feeder claim key must be exactly 36 characters and a UUID (8-4-4-4-12 hex), or left empty.', 'error');
+        return;
+    }
+    const config = {
+        FEEDER_DEPLOYMENT_MODE: (document.querySelector('input[name="feeder_deployment_mode"]:checked') || {}).value || 'stationary',
+        FEEDER_LAT: lat,
+        FEEDER_LONG: lon,
+        FEEDER_ALT_M: document.getElementById('alt').value,
+        FEEDER_TZ: document.getElementById('tz').value,
+        MLAT_SITE_NAME: finalSiteName,
+        ZIP_CODE: userZipCode || zipCode || '',
+        TAKNET_PS_FEEDER_CLAIM_KEY: claimRaw,
+        DUMP978_FORCE_OVERRIDE: document.getElementById('force_dump978').checked ? 'true' : 'false'
+    };
+    
+    try {
+        const response = await fetch('/api/config', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(config)
+        });
+        
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.message || 'Failed to save');
+        }
+        
+        // Always show save confirmation modal with restart option
+        showSaveModal(finalSiteName);
+        
+    } catch (error) {
+        showStatus('Error: ' + error.message, 'error');
+    }
+}
+
+// New function for save and restart
+async function saveAndRestartUltrafeeder() {
+    const lat = document.getElementById('lat').value;
+    const lon = document.getElementById('lon').value;
+    const siteName = document.getElementById('site_name').value.trim();
+    const userZipCode = document.getElementById('zip_code').value.trim();
+    
+    // Validate coordinate format
+    const latPattern = /^-?\d+\.\d+$/;
+    const lonPattern = /^-?\d+\.\d+$/;
+    
+    if (lat && !latPattern.test(lat)) {
+        showStatus('Latitude must be in decimal format (e.g., 33.55390)', 'error');
+        return;
+    }
+    
+    if (lon && !lonPattern.test(lon)) {
+        showStatus('Longitude must be in decimal format (e.g., -117.21390)', 'error');
+        return;
+    }
+    
+    const claimEl2 = document.getElementById('taknet_feeder_claim_key');
+    const claimRaw2 = claimEl2 ? claimEl2.value.trim() : '';
+    if (claimRaw2 && !isValidFeederClaimKey(claimRaw2)) {
+        showStatus('Feeder claim key must be exactly 36 characters and a UUID (8-4-4-4-12 hex) or left empty.', 'error');
+        return;
+    }
+    
+    let finalSiteName;
+    let zipCode;
+    
+    if (userZipCode) {
+        zipCode = userZipCode;
+        finalSiteName = `${zipCode}-${siteName}`;
+    } else if (lat && lon && siteName) {
+        zipCode = await getZipCodeFromCoords(lat, lon);
+        if (zipCode) {
+            finalSiteName = `${zipCode}-${siteName}`;
+        } else {
+            finalSiteName = `00000-${siteName}`;
+        }
+    } else {
+        const currentFullName = SETTINGS_MLAT_SITE_NAME;
+        finalSiteName = currentFullName;
+    }
+    
+    // Show modal
+    const modal = document.getElementById('saveRestartModal');
+    const statusDiv = document.getElementById('save-restart-status');
+    const logDiv = document.getElementById('save-restart-log');
+    
+    modal.style.display = 'flex';
+    statusDiv.textContent = 'Saving configuration...';
+    logDiv.style.display = 'none';
+    logDiv.innerHTML = '';
+    
+    const config = {
+        FEEDER_DEPLOYMENT_MODE: (document.querySelector('input[name="feeder_deployment_mode"]:checked') || {}).value || 'stationary',
+        FEEDER_LAT: lat,
+        FEEDER_LONG: lon,
+        FEEDER_ALT_M: document.getElementById('alt').value,
+        FEEDER_TZ: document.getElementById('tz').value,
+        MLAT_SITE_NAME: finalSiteName,
+        ZIP_CODE: userZipCode || zipCode || '',
+        TAKNET_PS_FEEDER_CLAIM_KEY: claimRaw2,
+        GPS_SOURCE: (document.querySelector('input[name="gps_source"]:checked') || {}).value || 'usb',
+        GPS_NETWORK_HOST: (document.getElementById('gps_network_host') || {}).value || '',
+        GPS_NETWORK_PORT: (document.getElementById('gps_network_port') || {}).value || '2947',
+        GPS_NETWORK_PROTOCOL: (document.querySelector('input[name="gps_network_protocol"]:checked') || {}).value || 'gpsd'
+    };
+    
+    try {
+        // Save configuration
+        const saveResponse = await fetch('/api/config', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(config)
+        });
+        
+        if (!saveResponse.ok) {
+            const errorData = await saveResponse.json();
+            throw new Error(errorData.message || 'Failed to save configuration');
+        }
+        
+        statusDiv.textContent = '✓ Configuration saved. Restarting Ultrafeeder...';
+        logDiv.style.display = 'block';
+        logDiv.innerHTML = 'Starting Ultrafeeder restart...\n';
+        
+        // Restart ultrafeeder
+        const restartResponse = await fetch('/api/service/restart', {
+            method: 'POST'
+        });
+        
+        if (!restartResponse.ok) {
+            throw new Error('Failed to restart Ultrafeeder');
+        }
+        
+        // Remember that this claim key was submitted so the UI can persist a confirmation badge.
+        // Aggregator owner assignment may take a moment; reconnection is triggered by the restart.
+        if (claimRaw2) {
+            try {
+                localStorage.setItem('taknet_last_feeder_claim_key', claimRaw2.trim().toLowerCase());
+                localStorage.setItem('taknet_last_feeder_claim_submitted_at', String(Date.now()));
+            } catch (e) {
+                // Non-fatal: localStorage may be blocked.
+            }
+            updateRegisterFeederButtonState();
+        }
+        
+        // Poll for progress
+        pollServiceRestartProgress();
+        
+    } catch (error) {
+        statusDiv.textContent = '❌ Error: ' + error.message;
+        logDiv.style.display = 'block';
+        logDiv.innerHTML += '\nError: ' + error.message;
+        
+        // Auto-close after 3 seconds
+        setTimeout(() => {
+            modal.style.display = 'none';
+        }, 3000);
+    }
+}
+
+let restartPollInterval = null;
+
+async function pollServiceRestartProgress() {
+    const statusDiv = document.getElementById('save-restart-status');
+    const logDiv = document.getElementById('save-restart-log');
+    
+    if (restartPollInterval) {
+        clearInterval(restartPollInterval);
+    }
+    
+    restartPollInterval = setInterval(async () => {
+        try {
+            const response = await fetch('/api/service/progress');
+            const data = await response.json();
+            
+            if (data.success) {
+                // Update log
+                logDiv.innerHTML = data.message || 'Restarting...';
+                logDiv.scrollTop = logDiv.scrollHeight;
+                
+                // Update status
+                statusDiv.textContent = `Restarting Ultrafeeder... ${data.progress}%`;
+                
+                // Check if complete
+                if (data.status === 'complete' || data.progress >= 100) {
+                    clearInterval(restartPollInterval);
+                    statusDiv.textContent = '✅ Ultrafeeder restarted successfully!';
+                    
+                    // 10-second countdown before redirect
+                    let countdown = 10;
+                    logDiv.innerHTML += `\n\n✅ Services restarting, reloading dashboard in <span id="redirect-timer">${countdown}</span>...`;
+                    
+                    const countdownInterval = setInterval(() => {
+                        countdown--;
+                        const timerSpan = document.getElementById('redirect-timer');
+                        if (timerSpan) timerSpan.textContent = countdown;
+                        
+                        if (countdown <= 0) {
+                            clearInterval(countdownInterval);
+                            window.location.href = '/dashboard';
+                        }
+                    }, 1000);
+                }
+            }
+        } catch (error) {
+            console.error('Error polling restart progress:', error);
+        }
+    }, 1000); // Poll every second
+}
+
+function showSaveModal(feederName) {
+    const modal = document.getElementById('saveConfirmModal');
+    const feederNameSpan = document.getElementById('savedFeederName');
+    feederNameSpan.textContent = feederName;
+    modal.style.display = 'flex';
+}
+
+function closeSaveModal() {
+    const modal = document.getElementById('saveConfirmModal');
+    modal.style.display = 'none';
+}
+
+async function restartServices() {
+    const modal = document.getElementById('saveConfirmModal');
+    const statusDiv = document.getElementById('restartStatus');
+    const btnContainer = document.getElementById('modalButtons');
+    
+    // Hide buttons, show status
+    btnContainer.style.display = 'none';
+    statusDiv.style.display = 'block';
+    statusDiv.innerHTML = '<p>🔄 Restarting services...</p>';
+    
+    try {
+        const response = await fetch('/api/service/restart', {
+            method: 'POST'
+        });
+        
+        if (!response.ok) throw new Error('Failed to restart');
+        
+        let countdown = 10;
+        statusDiv.innerHTML = `<p>✓ Services restarting, reloading dashboard in <span id="modal-redirect-timer">${countdown}</span>...</p>`;
+        
+        const countdownInterval = setInterval(() => {
+            countdown--;
+            const timerSpan = document.getElementById('modal-redirect-timer');
+            if (timerSpan) timerSpan.textContent = countdown;
+            
+            if (countdown <= 0) {
+                clearInterval(countdownInterval);
+                window.location.href = '/dashboard';
+            }
+        }, 1000);
+        
+    } catch (error) {
+        statusDiv.innerHTML = '<p class="error">✗ Error: ' + error.message + '</p>';
+        btnContainer.style.display = 'block';
+    }
+}
+
+function notNowRestart() {
+    closeSaveModal();
+    showStatus('✓ Configuration saved. Remember to restart services to apply changes.', 'success');
+}
+
+function showStatus(message, type) {
+    const status = document.getElementById('status');
+    status.textContent = message;
+    status.className = type;
+    status.style.display = 'block';
+}
+
+async function toggleForceDump978(enabled) {
+    try {
+        const response = await fetch('/api/sdrs/force-dump978', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ force: enabled })
+        });
+        
+        const result = await response.json();
+        if (result.success) {
+            showStatus('✓ Override updated. Restarting services...', 'success');
+            
+            // Trigger a restart to apply the new dump978 backend block
+            document.getElementById('saveConfirmModal').style.display = 'flex';
+            const feederNameSpan = document.getElementById('savedFeederName');
+            feederNameSpan.textContent = document.getElementById('site_name').value.trim() || 'Feeder';
+            
+        } else {
+            showStatus('✗ Failed to update override: ' + result.message, 'error');
+        }
+    } catch (error) {
+        showStatus('✗ Error updating override.', 'error');
+    }
+}
+
+// SDR Configuration Functions
+let sdrDevices = [];
+let currentSDRIndex = null;
+
+async function detectSDRDevices() {
+    const btn = document.getElementById('detectSDRBtn');
+    const section = document.getElementById('sdrDevicesSection');
+    const status = document.getElementById('sdrStatus');
+    
+    btn.disabled = true;
+    btn.textContent = '🔍 Detecting...';
+    status.style.display = 'block';
+    status.textContent = 'Scanning for SDR devices...';
+    status.className = 'info';
+    
+    try {
+        // Use enhanced detection endpoint; rescan=1 probes USB instead of the cached inventory
+        const response = await fetch('/api/sdrs/detect?rescan=1');
+        const data = await response.json();
+        
+        if (data.count > 0 && data.devices && data.devices.length > 0) {
+            // Get current configuration
+            const configResponse = await fetch('/api/sdrs/current-config');
+            const currentConfig = await configResponse.json();
+            
+            // Merge detection data with current configuration
+            sdrDevices = data.devices.map(device => {
+                // Determine current use and gain from config
+                let useFor = '';
+                let gain = 'auto';
+                
+                if (device.type === 'rtlsdr' && device.index === 0 && currentConfig.readsb_device === device.index.toString()) {
+                    useFor = '1090';
+                    gain = currentConfig.readsb_gain || 'auto';
+                } else if (device.type === 'ftdi' || (device.type === 'rtlsdr' && currentConfig.dump978_enabled)) {
+                    if (currentConfig.dump978_device === device.index.toString() || 
+                        (device.type === 'ftdi' && currentConfig.dump978_enabled)) {
+                        useFor = '978';
+                        gain = currentConfig.dump978_gain || 'auto';
+                    }
+                }
+                
+                return {
+                    ...device,
+                    useFor: useFor,
+                    gain: gain,
+                    biastee: false
+                };
+            });
+            
+            displaySDRDevices();
+            section.style.display = 'block';
+            status.textContent = `✓ Found ${data.count} device(s)`;
+            status.className = 'success';
+        } else {
+            status.textContent = '⚠ No SDR devices detected';
+            status.className = 'error';
+            section.style.display = 'none';
+        }
+    } catch (error) {
+        console.error('Detection error:', error);
+        status.textContent = 'Error detecting devices: ' + error.message;
+        status.className = 'error';
+        section.style.display = 'none';
+    } finally {
+        btn.disabled = false;
+        btn.textContent = '🔍 Detect Devices';
+    }
+}
+
+function displaySDRDevices() {
+    const tbody = document.getElementById('sdrTableBody');
+    tbody.innerHTML = '';
+    
+    sdrDevices.forEach((device, index) => {
+        const row = document.createElement('tr');
+        row.onclick = () => openSDRConfigModal(index);
+        
+        if (device.useFor) {
+            row.classList.add('configured');
+        }
+        
+        // Device type badge
+        const typeBadge = device.type === 'ftdi' 
+            ? '<span style="background: #fef3c7; color: #92400e; padding: 4px 10px; border-radius: 12px; font-size: 0.85em; font-weight: 600;">FTDI</span>'
+            : '<span style="background: #dbeafe; color: #1e40af; padding: 4px 10px; border-radius: 12px; font-size: 0.85em; font-weight: 600;">RTL-SDR</span>';
+        
+        // Device name with type badge
+        const deviceName = device.name || `${device.type.toUpperCase()} #${device.index}`;
+        
+        row.innerHTML = `
+            <td>
+                <div>${typeBadge}</div>
+                <div style="margin-top: 5px; font-size: 0.9em; color: #6b7280;">${deviceName}</div>
+            </td>
+            <td>${device.serial}</td>
+            <td>
+                ${device.useFor ? 
+                    `<span class="badge-${device.useFor}">${device.useFor} MHz</span>` : 
+                    '<span style="color: #9ca3af;">Not Configured</span>'
+                }
+            </td>
+            <td><strong>${device.gain || 'auto'}</strong></td>
+            <td>${device.biastee ? '✓ Enabled' : '—'}</td>
+        `;
+        
+        tbody.appendChild(row);
+    });
+}
+
+function openSDRConfigModal(index) {
+    currentSDRIndex = index;
+    const device = sdrDevices[index];
+    
+    // Device info with type badge
+    const typeBadge = device.type === 'ftdi' 
+        ? '<span style="background: #fef3c7; color: #92400e; padding: 4px 10px; border-radius: 12px; font-size: 0.85em; font-weight: 600; margin-left: 10px;">FTDI</span>'
+        : '<span style="background: #dbeafe; color: #1e40af; padding: 4px 10px; border-radius: 12px; font-size: 0.85em; font-weight: 600; margin-left: 10px;">RTL-SDR</span>';
+    
+    document.getElementById('sdrModalDeviceInfo').innerHTML = 
+        `${device.name || device.type.toUpperCase()} - Serial: ${device.serial}${typeBadge}`;
+    
+    // Frequency dropdown
+    const useForSelect = document.getElementById('sdrModalUseFor');
+    useForSelect.innerHTML = '<option value="">-- Select Frequency --</option>';
+    
+    if (device.supports_1090) {
+        useForSelect.innerHTML += '<option value="1090">1090 MHz (ADS-B)</option>';
+    } else {
+        useForSelect.innerHTML += '<option value="1090" disabled>1090 MHz (Not Supported)</option>';
+    }
+    
+    if (device.supports_978) {
+        useForSelect.innerHTML += '<option value="978">978 MHz (UAT)</option>';
+    }
+    
+    // Add Disabled option
+    useForSelect.innerHTML += '<option value="disabled">Disabled</option>';
+    
+    useForSelect.value = device.useFor || '';
+    
+    // Load driver-specific gain options
+    loadGainOptionsForSettings(device.driver || 'rtlsdr', device.gain || 'auto', device.type);
+    
+    // Bias tee
+    document.getElementById('sdrModalBiasTee').checked = device.biastee || false;
+    
+    document.getElementById('sdrConfigModal').style.display = 'flex';
+}
+
+async function loadGainOptionsForSettings(driver, currentGain, deviceType) {
+    const gainSelect = document.getElementById('sdrModalGain');
+    const gainHelp = document.getElementById('sdrModalGainHelp');
+    const ftdiNotice = document.getElementById('sdrModalFtdiNotice');
+    
+    // Handle FTDI special case
+    if (deviceType === 'ftdi') {
+        gainSelect.innerHTML = '<option value="auto">Auto Gain (Hardware Managed)</option>';
+        gainSelect.value = 'auto';
+        gainSelect.disabled = true;
+        ftdiNotice.style.display = 'block';
+        gainHelp.textContent = 'FTDI devices manage gain automatically';
+        return;
+    }
+    
+    // Enable for non-FTDI
+    gainSelect.disabled = false;
+    ftdiNotice.style.display = 'none';
+    
+    try {
+        const response = await fetch(`/api/sdrs/gain-options/${driver}`);
+        const data = await response.json();
+        
+        if (data.success) {
+            // Clear existing options
+            gainSelect.innerHTML = '';
+            
+            // Add all valid options
+            data.options.forEach(option => {
+                const opt = document.createElement('option');
+                opt.value = option;
+                opt.textContent = option;
+                
+                // Highlight recommended option
+                if (option === data.recommended) {
+                    opt.textContent += ' (recommended)';
+                }
+                
+                gainSelect.appendChild(opt);
+            });
+            
+            // Set current value or default
+            if (data.options.includes(currentGain)) {
+                gainSelect.value = currentGain;
+            } else {
+                gainSelect.value = data.default;
+            }
+            
+            // Update description
+            gainHelp.textContent = data.description;
+        } else {
+            // Fallback to generic options
+            gainSelect.innerHTML = '<option value="auto">Auto Gain (Recommended)</option>';
+            gainSelect.value = currentGain || 'auto';
+            gainHelp.textContent = 'Select gain level or use auto gain (recommended)';
+        }
+    } catch (error) {
+        console.error('Error loading gain options:', error);
+        // Fallback
+        gainSelect.innerHTML = '<option value="auto">Auto Gain (Recommended)</option>';
+        gainSelect.value = currentGain || 'auto';
+        gainHelp.textContent = 'Select gain level or use auto gain (recommended)';
+    }
+}
+
+function closeSDRConfigModal() {
+    document.getElementById('sdrConfigModal').style.display = 'none';
+    currentSDRIndex = null;
+}
+
+async function saveSDRDeviceConfig() {
+    if (currentSDRIndex === null) return;
+    
+    const useFor = document.getElementById('sdrModalUseFor').value;
+    const gain = document.getElementById('sdrModalGain').value;
+    const biastee = document.getElementById('sdrModalBiasTee').checked;
+    
+    // Validate
+    if (!useFor) {
+        alert('Please select a frequency (Use For)');
+        return;
+    }
+    
+    // Update local device
+    sdrDevices[currentSDRIndex].use = useFor;
+    sdrDevices[currentSDRIndex].useFor = useFor;
+    sdrDevices[currentSDRIndex].gain = gain;
+    sdrDevices[currentSDRIndex].biastee = biastee;
+    
+    // Build configuration in format expected by /api/sdrs/configure
+    const sdrsConfig = sdrDevices.map(device => ({
+        index: device.index,
+        serial: device.serial,
+        use: device.use || device.useFor || 'disabled',
+        gain: device.gain || 'auto',
+        biastee: device.biastee || false,
+        type: device.type || 'rtlsdr',
+        device_path: device.device_path || device.index.toString(),
+        driver: device.driver || 'rtlsdr'
+    }));
+    
+    // Save to backend using correct endpoint
+    try {
+        const response = await fetch('/api/sdrs/configure', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ sdrs: sdrsConfig })
+        });
+        
+        const result = await response.json();
+        
+        if (result.success) {
+            closeSDRConfigModal();
+            displaySDRDevices();
+            showStatus('✓ SDR configuration saved. Restart services to apply.', 'success');
+        } else {
+            alert('Error saving configuration: ' + (result.message || 'Unknown error'));
+        }
+    } catch (error) {
+        console.error('Error saving SDR config:', error);
+        alert('Error saving configuration: ' + error.message);
+    }
+}
+
+// Check Tailscale status (needed for DOMContentLoaded above)
+async function checkTailscaleStatus() {
+    try {
+        const data = await fetchJsonSafe('/api/tailscale/status');
+        
+        // Update top connection status box
+        updateTailscaleStatusDisplay(data);
+        
+        // Update toggle button and status indicator (any tailnet; show hostname/IP for SSH)
+        const enabled = data.installed || false;
+        const connected = data.connected || false;
+        updateTailscaleStatusUI(enabled, connected, null, data.hostname, data.ip);
+        
+    } catch (error) {
+        if (!isTransientServiceError(error)) {
+            console.error('Failed to check Tailscale status:', error);
+        }
+        updateTailscaleStatusDisplay({
+            installed: false,
+            connected: false,
+            error: 'Failed to check status'
+        });
+        updateTailscaleStatusUI(false, false);
+    }
+}
+
+// Update Tailscale status display (needed by checkTailscaleStatus)
+function updateTailscaleStatusDisplay(data) {
+    const statusDisplay = document.getElementById('tailscale-status-display');
+    const statusIndicator = document.getElementById('tailscale-status-indicator');
+    
+    if (!statusDisplay) return;
+    
+    if (!data) {
+        statusDisplay.innerHTML = '<div style="padding: 10px; text-align: center; color: #666;">Status unknown</div>';
+        if (statusIndicator) statusIndicator.style.display = 'flex';
+        return;
+    }
+    
+    let statusHTML = '';
+    
+    if (data.connected) {
+        // Connected - show green box
+        statusHTML = `
+            <div style="background: #e8f5e9; border-left: 4px solid #4caf50; padding: 15px; border-radius: 8px;">
+                <div style="display: flex; align-items: center; gap: 10px;">
+                    <span style="font-size: 1.5em;">✓</span>
+                    <div>
+                        <div style="font-weight: 600; color: #2e7d32;">Connected</div>
+                        ${data.ip ? `<div style="font-size: 0.9em; color: #666; margin-top: 4px;">IP: ${data.ip}</div>` : ''}
+                        ${data.hostname ? `<div style="font-size: 0.9em; color: #666;">Hostname: ${data.hostname}</div>` : ''}
+                    </div>
+                </div>
+            </div>
+        `;
+        // Hide the status indicator when connected
+        if (statusIndicator) statusIndicator.style.display = 'none';
+    } else {
+        // Not connected - show simple not connected message
+        statusHTML = `
+            <div style="background: #f3f4f6; border-left: 4px solid #9ca3af; padding: 15px; border-radius: 8px;">
+                <div style="display: flex; align-items: center; gap: 10px;">
+                    <span style="font-size: 1.5em;">○</span>
+                    <div>
+                        <div style="font-weight: 600; color: #4b5563;">Not Connected</div>
+                        <div style="font-size: 0.9em; color: #666; margin-top: 4px;">Enter auth key below to connect</div>
+                    </div>
+                </div>
+            </div>
+        `;
+        // Show the status indicator when not connected
+        if (statusIndicator) statusIndicator.style.display = 'flex';
+    }
+    
+    statusDisplay.innerHTML = statusHTML;
+}